@@ -0,0 +1,104 @@
+"""
+Benchmark the deduplication engine on a synthetic corpus.
+
+Each synthetic paper is emitted once as a "PubMed" record and, with some
+probability, again as a "SemanticScholar" record with the kinds of
+disagreement seen in practice (DOI case/resolver prefix, trailing period,
+punctuation, casing, Greek letters spelled out, typos, missing DOI).
+
+    python -m benchmarks.bench_dedup --records 200000
+"""
+import argparse
+import random
+import time
+
+from src.dedup import Deduplicator
+from src.providers.base import SearchResult
+
+DOMAIN_WORDS = (
+    "environmental dna metabarcoding detection fish amphibian river lake marine "
+    "survey monitoring species occurrence qpcr assay primer biodiversity estuary "
+    "sediment seasonal invasive endangered population abundance sampling filtration "
+    "degradation transport community coastal freshwater distribution genetic"
+).split()
+SYLLABLES = "ba ce di fo gu ha ke li mo nu pa re si to vu xa ze lo ri na".split()
+
+
+def make_vocabulary(size: int, rng: random.Random):
+    """Domain words plus generated words, standing in for a real title vocabulary."""
+    words = set(DOMAIN_WORDS)
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+GREEK = [("α", "alpha"), ("β", "beta"), ("δ", "delta")]
+
+
+def make_corpus(n_papers: int, duplicate_rate: float, seed: int = 7):
+    """Return shuffled (ground-truth paper id, SearchResult) pairs."""
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(3000, rng)
+    records = []
+    for paper_id in range(n_papers):
+        # Titles mix common domain words with rarer ones, as real titles do
+        words = rng.sample(DOMAIN_WORDS, rng.randint(3, 6)) + rng.sample(vocabulary, rng.randint(3, 6))
+        rng.shuffle(words)
+        if rng.random() < 0.1:
+            letter, name = rng.choice(GREEK)
+            words.insert(rng.randrange(len(words)), f"{letter}-diversity")
+        title = " ".join(words).capitalize() + f" {paper_id}"
+        doi = f"10.{1000 + paper_id % 9000}/EDNA.{paper_id}"
+        records.append((paper_id, SearchResult(title, ["Doe, J"], "2023", doi, "PubMed")))
+
+        if rng.random() < duplicate_rate:
+            variant = title.upper() if rng.random() < 0.3 else title
+            for letter, name in GREEK:
+                variant = variant.replace(letter, name)
+            if rng.random() < 0.5:
+                variant += "."
+            if rng.random() < 0.3:
+                variant = variant.replace(" ", ": ", 1)
+            if rng.random() < 0.2:
+                # Transposed characters, as in a mistyped title
+                i = rng.randrange(len(variant) - 1)
+                variant = variant[:i] + variant[i + 1] + variant[i] + variant[i + 2:]
+            if rng.random() < 0.1:
+                variant = "The " + variant
+            dup_doi = rng.choice(["", "", doi.lower(), f"https://doi.org/{doi}", doi])
+            records.append((paper_id, SearchResult(variant, ["J Doe"], "2023", dup_doi, "SemanticScholar")))
+
+    rng.shuffle(records)
+    return records
+
+
+def run(n_papers: int, duplicate_rate: float, threshold: float, num_perm: int, bands: int):
+    records = make_corpus(n_papers, duplicate_rate)
+    dedup = Deduplicator(threshold=threshold, num_perm=num_perm, bands=bands)
+
+    kept_ids = []
+    start = time.perf_counter()
+    for paper_id, record in records:
+        if dedup.add(record)[1]:
+            kept_ids.append(paper_id)
+    elapsed = time.perf_counter() - start
+
+    missed = len(kept_ids) - len(set(kept_ids))    # duplicates that slipped through
+    merged = n_papers - len(set(kept_ids))         # distinct papers wrongly collapsed
+    print(f"records={len(records)} papers={n_papers} threshold={threshold} "
+          f"num_perm={num_perm} bands={bands}")
+    print(f"  time={elapsed:.2f}s  throughput={len(records) / elapsed:,.0f} records/s")
+    print(f"  kept={len(kept_ids)}  missed_duplicates={missed}  false_merges={merged}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deduplication benchmark")
+    parser.add_argument("--records", type=int, default=50000, help="Number of distinct synthetic papers")
+    parser.add_argument("--duplicate-rate", type=float, default=0.6)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--num-perm", type=int, default=96)
+    parser.add_argument("--bands", type=int, default=12)
+    args = parser.parse_args()
+    run(args.records, args.duplicate_rate, args.threshold, args.num_perm, args.bands)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark the memory used per SearchResult.
+
+Builds the same synthetic results (authors drawn from a shared pool, two
+sources, a few dozen years, each string a separate object, as parsed
+responses are) in several layouts and measures each with tracemalloc:
+
+    dict      a plain dataclass with a __dict__ and no interning (the old SearchResult)
+    slotted   SearchResult: slots, interned source, year and author names
+    compact   SearchResult.compact(): the authors in a tuple
+    batch     SearchResultBatch: one column per field
+
+    python -m benchmarks.bench_memory --records 200000
+"""
+import argparse
+import gc
+import json
+import random
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from src.providers.base import SearchResult
+from src.result_batch import SearchResultBatch
+
+SURNAMES = "Smith Jones Taylor Brown Wilson Evans Thomas Roberts Walker Wright Green Hall Wood Clark".split()
+
+
+@dataclass
+class DictSearchResult:
+    """SearchResult as it was: a regular dataclass, strings not interned."""
+    title: str
+    authors: List[str]
+    year: str
+    doi: str
+    source: str
+    abstract: str = ""
+    url: str = ""
+    identifiers: Dict[str, str] = field(default_factory=dict)
+
+
+def make_fields(n_records: int, authors: int, abstract_chars: int, seed: int = 7):
+    """Yield the constructor arguments of n synthetic results, with fresh string objects."""
+    rng = random.Random(seed)
+    pool = [f"{rng.choice(SURNAMES)}{i}, {chr(65 + i % 26)}" for i in range(max(1, n_records // 20))]
+    for number in range(n_records):
+        yield (
+            f"Environmental DNA survey of river fish, study {number}",
+            ["".join(rng.choice(pool)) for _ in range(rng.randint(1, 2 * authors - 1))],
+            str(1990 + rng.randrange(35)),
+            f"10.{1000 + number % 9000}/edna.{number}",
+            "".join(rng.choice([("Pub", "Med"), ("Semantic", "Scholar")])),
+            "x" * abstract_chars,
+            "",
+            {'pmid': str(number)},
+        )
+
+
+def measure(build) -> int:
+    """Bytes still allocated after build() (the built object is kept alive until measured)."""
+    gc.collect()
+    tracemalloc.start()
+    built = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del built
+    return size
+
+
+def run(n_records: int, authors: int, abstract_chars: int) -> Dict[str, float]:
+    def fields():
+        return make_fields(n_records, authors, abstract_chars)
+
+    layouts = {
+        'dict': lambda: [DictSearchResult(*args) for args in fields()],
+        'slotted': lambda: [SearchResult(*args) for args in fields()],
+        'compact': lambda: [SearchResult(*args).compact() for args in fields()],
+        'batch': lambda: SearchResultBatch(SearchResult(*args) for args in fields()),
+    }
+    per_record = {name: measure(build) / n_records for name, build in layouts.items()}
+    print(f"records={n_records} authors~{authors} abstract_chars={abstract_chars}")
+    for name, size in per_record.items():
+        print(f"  {name:<8} {size:8.0f} bytes/record  ({1 - size / per_record['dict']:.0%} less than dict)")
+    return per_record
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SearchResult memory benchmark")
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--authors", type=int, default=4, help="Mean number of authors per record")
+    parser.add_argument("--abstract-chars", type=int, default=0,
+                        help="Abstract length (the same text in every layout; 0 isolates the per-record overhead)")
+    parser.add_argument("--json", default=None, metavar="PATH", help="Also write bytes per record as JSON")
+    args = parser.parse_args()
+    per_record = run(args.records, args.authors, args.abstract_chars)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(per_record, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+Benchmark the network-facing paths against local stand-in services.
+
+Each scenario starts the stand-ins of benchmarks/stub_services.py with its
+own latency, rate-limit and Backoff settings, then drives the real code:
+
+- search: PubMedProvider and SemanticScholarProvider over synthetic queries
+- zotero: ZoteroManager creating items and filing them into a second collection
+- main: a full ``python -m src.main`` run over a synthetic species list
+
+and reports throughput and per-call latency for each part, and the
+connections each stand-in accepted and the body bytes it sent. The
+"unpooled" scenario repeats the baseline without the shared keep-alive
+pools (--no-pool), for comparison.
+
+    python -m benchmarks.bench_services
+    python -m benchmarks.bench_services --scenario zotero-rate-limited --species 40 --json bench.json
+
+No live service is contacted. Bio.Entrez spaces its requests 0.37 s apart
+without an NCBI API key and 0.1 s apart with one; the benchmark sets a key
+so that PubMed runs at the pace of a configured production setup.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+import yaml
+from Bio import Entrez
+
+from benchmarks.stub_services import Behaviour, Corpus, StubServices
+from src import main as main_module
+from src.http_pool import ConnectionPools
+from src.metrics import METRICS, Histogram
+from src.providers.pubmed import PubMedProvider
+from src.providers.semantic_scholar import SemanticScholarProvider
+from src.zotero_manager import ZoteroManager
+
+GENERA = "Gadus Salmo Rana Bufo Anguilla Esox Perca Cottus Lota Thymallus Triturus Salamandra".split()
+EPITHETS = "morhua trutta temporaria bufo anguilla lucius fluviatilis gobio lota thymallus cristatus".split()
+
+
+@dataclass
+class Scenario:
+    name: str
+    description: str
+    # Each new connection costs 30 ms, about a TLS handshake to a nearby host
+    pubmed: Behaviour = field(default_factory=lambda: Behaviour(latency=0.02, handshake=0.03))
+    semantic_scholar: Behaviour = field(default_factory=lambda: Behaviour(latency=0.03, handshake=0.03))
+    zotero: Behaviour = field(default_factory=lambda: Behaviour(latency=0.02, handshake=0.03))
+    search_workers: int = 1
+    upload_workers: int = 1
+    pooled: bool = True
+
+
+SCENARIOS = [
+    Scenario("baseline", "Fast services, serial pipeline"),
+    Scenario("unpooled", "Baseline with each client opening its own connections", pooled=False),
+    Scenario("slow-zotero", "Zotero writes take 100-150 ms",
+             zotero=Behaviour(latency=0.1, jitter=0.05, handshake=0.03)),
+    Scenario("concurrent", "Slow Zotero with 4 search and 4 upload workers",
+             zotero=Behaviour(latency=0.1, jitter=0.05, handshake=0.03), search_workers=4, upload_workers=4),
+    Scenario("zotero-rate-limited", "Zotero allows 10 requests/s and answers 429 with Retry-After: 0.5",
+             zotero=Behaviour(latency=0.02, rate_limit=10, burst=5, retry_after=0.5)),
+    Scenario("zotero-backoff", "Zotero sends Backoff: 0.5 on every 25th response",
+             zotero=Behaviour(latency=0.02, backoff=0.5, backoff_every=25)),
+    Scenario("pubmed-rate-limited", "E-utilities allows 5 requests/s (Bio.Entrez retries 429s immediately)",
+             pubmed=Behaviour(latency=0.02, rate_limit=5, burst=2)),
+]
+
+
+def make_species(count: int) -> List[Dict]:
+    """Synthetic species entries in the species-list YAML layout."""
+    species = []
+    for i in range(count):
+        name = f"{GENERA[i % len(GENERA)]} {EPITHETS[i // len(GENERA) % len(EPITHETS)]}"
+        if i >= len(GENERA) * len(EPITHETS):
+            name += f" var. {i}"
+        species.append({'name': name, 'synonyms': [f"Synonym {i}"], 'keywords': ["eDNA", "metabarcoding"]})
+    return species
+
+
+def report_row(part: str, operations: int, unit: str, elapsed: float, latency: Histogram) -> Dict:
+    summary = latency.to_dict()
+    return {
+        'part': part,
+        'operations': operations,
+        'unit': unit,
+        'seconds': round(elapsed, 3),
+        'throughput': round(operations / elapsed, 2) if elapsed else None,
+        'p50': summary['p50'],
+        'p95': summary['p95'],
+        'p99': summary['p99'],
+    }
+
+
+def bench_search(services: StubServices, queries: List[str], limit: int, pools: ConnectionPools = None) -> List[Dict]:
+    env = services.env()
+    rows = []
+    for name, provider in (("search pubmed", PubMedProvider("bench@example.com", base_url=env['PUBMED_EUTILS_URL'],
+                                                            pools=pools)),
+                           ("search semantic_scholar",
+                            SemanticScholarProvider(api_url=env['SEMANTIC_SCHOLAR_API_URL'], pools=pools))):
+        latency = Histogram()
+        results = 0
+        start = time.perf_counter()
+        for query in queries:
+            call = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                results += len(provider.search(query, limit=limit))
+            latency.observe(time.perf_counter() - call)
+        rows.append(report_row(name, results, "results", time.perf_counter() - start, latency))
+    return rows
+
+
+def bench_zotero(services: StubServices, queries: List[str], limit: int, pools: ConnectionPools = None) -> List[Dict]:
+    env = services.env()
+    papers = PubMedProvider("bench@example.com", base_url=env['PUBMED_EUTILS_URL'],
+                            pools=pools).search(queries[0], limit=limit)
+    manager = ZoteroManager("1", "bench", library_type='group', endpoint=env['ZOTERO_API_URL'], pools=pools)
+    source = manager.create_or_get_collection("eDNA - bench source")
+    target = manager.create_or_get_collection("eDNA - bench target")
+
+    rows = []
+    latency = Histogram()
+    keys = []
+    start = time.perf_counter()
+    for paper in papers:
+        call = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            keys.append(manager.add_item(paper, source))
+        latency.observe(time.perf_counter() - call)
+    rows.append(report_row("zotero add_item", len(papers), "items", time.perf_counter() - start, latency))
+
+    latency = Histogram()
+    keys = [key for key in keys if key]
+    start = time.perf_counter()
+    for key in keys:
+        call = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            manager.add_to_collection(key, target)
+        latency.observe(time.perf_counter() - call)
+    rows.append(report_row("zotero add_to_collection", len(keys), "items", time.perf_counter() - start, latency))
+    return rows
+
+
+def bench_main(services: StubServices, scenario: Scenario, species: List[Dict], limit: int) -> List[Dict]:
+    """Run src.main end to end in a scratch directory and time it."""
+    env = {
+        **services.env(),
+        'ZOTERO_LIBRARY_ID': "1",
+        'ZOTERO_API_KEY': "bench",
+        'ZOTERO_LIBRARY_TYPE': "group",
+        'SEMANTIC_SCHOLAR_API_KEY': "",
+        'EMAIL': "bench@example.com",
+    }
+    saved_env = {name: os.environ.get(name) for name in env}
+    saved_argv, saved_cwd = sys.argv, os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        species_file = os.path.join(workdir, "species.yaml")
+        with open(species_file, 'w', encoding='utf-8') as f:
+            yaml.safe_dump({'species': species}, f)
+        sys.argv = ["src.main", species_file, "--limit", str(limit),
+                    "--search-workers", str(scenario.search_workers),
+                    "--upload-workers", str(scenario.upload_workers)]
+        if not scenario.pooled:
+            sys.argv.append("--no-pool")
+        os.environ.update(env)
+        os.chdir(workdir)
+        output = io.StringIO()
+        start = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(output):
+                main_module.main()
+        except SystemExit:
+            pass
+        finally:
+            elapsed = time.perf_counter() - start
+            os.chdir(saved_cwd)
+            sys.argv = saved_argv
+            for name, value in saved_env.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+
+    # Per-species latency is not observable from outside main(); report the run as one call
+    latency = Histogram()
+    latency.observe(elapsed)
+    row = report_row("main end to end", len(species), "species", elapsed, latency)
+    row['errors'] = sum(1 for line in output.getvalue().splitlines() if "Error" in line)
+    return [row]
+
+
+def run_scenario(scenario: Scenario, species_count: int, limit: int, parts) -> Dict:
+    species = make_species(species_count)
+    queries = [f'"{sp["name"]}" AND ("eDNA" OR "metabarcoding")' for sp in species]
+    rows = []
+    with StubServices(pubmed=scenario.pubmed, semantic_scholar=scenario.semantic_scholar,
+                      zotero=scenario.zotero, corpus=Corpus(results_per_query=limit)) as services:
+        pools = ConnectionPools() if scenario.pooled else None
+        if "search" in parts:
+            rows += bench_search(services, queries, limit, pools)
+        if "zotero" in parts:
+            rows += bench_zotero(services, queries, limit, pools)
+        if pools is not None:
+            pools.close()
+        if "main" in parts:
+            METRICS.reset()
+            rows += bench_main(services, scenario, species, limit)
+        stats = services.stats()
+    return {'scenario': scenario.name, 'description': scenario.description, 'rows': rows, 'services': stats}
+
+
+def print_report(result: Dict):
+    print(f"\n== {result['scenario']}: {result['description']}")
+    print(f"  {'part':<26} {'ops':>6} {'seconds':>8} {'ops/s':>9} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7}")
+    for row in result['rows']:
+        print(f"  {row['part']:<26} {row['operations']:>6} {row['seconds']:>8.2f} {row['throughput'] or 0:>9.1f} "
+              f"{row['p50'] or 0:>7.3f} {row['p95'] or 0:>7.3f} {row['p99'] or 0:>7.3f}"
+              + (f"  ({row['errors']} errors)" if row.get('errors') else ""))
+    served = ", ".join(f"{name} {stats['requests']} req/{stats['rate_limited']} 429/{stats['backoffs']} backoff"
+                       f"/{stats['connections']} conn/{stats['bytes'] / 1024:.0f} KiB"
+                       for name, stats in result['services'].items())
+    print(f"  served: {served}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark providers, Zotero and main() against local stand-ins")
+    parser.add_argument("--scenario", action="append", choices=[s.name for s in SCENARIOS],
+                        help="Scenario to run (repeatable; default: all)")
+    parser.add_argument("--species", type=int, default=12, help="Species (search queries) per scenario")
+    parser.add_argument("--limit", type=int, default=20, help="Results per provider per species")
+    parser.add_argument("--parts", default="search,zotero,main", help="Comma-separated parts to run")
+    parser.add_argument("--json", default=None, metavar="PATH", help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    Entrez.api_key = "benchmark"
+    parts = set(args.parts.split(","))
+    selected = [s for s in SCENARIOS if not args.scenario or s.name in args.scenario]
+    results = []
+    for scenario in selected:
+        result = run_scenario(scenario, args.species, args.limit, parts)
+        print_report(result)
+        results.append(result)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
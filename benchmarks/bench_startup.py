@@ -0,0 +1,135 @@
+"""
+Benchmark the start-up cost of ``python -m src.main``.
+
+The miner is launched thousands of times from workflow schedulers, so the
+time spent importing libraries adds up. Each scenario runs src.main in a
+fresh interpreter with ``-X importtime`` and reports the import time of the
+run and which heavy libraries it loaded:
+
+- help: ``--help`` (imports none of them)
+- offline: ``--offline`` against an empty local index (no network libraries)
+- dry-run: ``--dry-run`` against the stand-in services (no pyzotero)
+- full: a full run against the stand-in services
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --scenario help --repeat 20
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+import yaml
+
+from benchmarks.stub_services import Corpus, StubServices
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Libraries that dominate the start-up time, and what needs them
+HEAVY = {
+    'Bio': "PubMed",
+    'semanticscholar': "Semantic Scholar",
+    'pyzotero': "Zotero upload",
+    'httpx': "pooled HTTP",
+    'yaml': "species list",
+    'dotenv': ".env loading",
+}
+
+SCENARIOS = ["help", "offline", "dry-run", "full"]
+
+
+def _entries(stderr: str):
+    """(self, cumulative, depth, module) per line of ``-X importtime`` output, in completion order."""
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented by two spaces per level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        yield int(self_us), int(cumulative), depth, name.strip()
+
+
+def parse_importtime(stderr: str) -> Dict[str, Tuple[int, int]]:
+    """Self and cumulative import time in microseconds per module, from ``-X importtime`` output."""
+    return {name: (self_us, cumulative) for self_us, cumulative, _, name in _entries(stderr)}
+
+
+def top_level_time(stderr: str) -> int:
+    """Microseconds spent importing after interpreter start-up, i.e. after ``site``."""
+    total, started = 0, False
+    for _, cumulative, depth, name in _entries(stderr):
+        if depth == 0:
+            if started:
+                total += cumulative
+            started = started or name == "site"
+    return total
+
+
+def run_main(argv: List[str], env: Dict[str, str] = None, cwd: str = None) -> subprocess.CompletedProcess:
+    """Run ``python -X importtime -m src.main`` with ``argv`` in a fresh interpreter."""
+    full_env = {**os.environ, **(env or {}), 'PYTHONPATH': ROOT}
+    return subprocess.run([sys.executable, "-X", "importtime", "-m", "src.main", *argv],
+                          env=full_env, cwd=cwd or ROOT, capture_output=True, text=True, timeout=120)
+
+
+def run_scenario(name: str, workdir: str) -> subprocess.CompletedProcess:
+    """Run one scenario in ``workdir``; the network scenarios talk to fresh stand-in services."""
+    species_file = os.path.join(workdir, "species.yaml")
+    with open(species_file, 'w', encoding='utf-8') as f:
+        yaml.safe_dump({'species': [{'name': "Gadus morhua", 'keywords': ["eDNA"]}]}, f)
+    if name == "help":
+        return run_main(["--help"], cwd=workdir)
+    if name == "offline":
+        return run_main([species_file, "--offline", "--index", os.path.join(workdir, "index.sqlite")], cwd=workdir)
+
+    with StubServices(corpus=Corpus(results_per_query=3)) as services:
+        env = {**services.env(), 'EMAIL': "bench@example.com", 'ZOTERO_LIBRARY_ID': "1",
+               'ZOTERO_API_KEY': "bench", 'ZOTERO_LIBRARY_TYPE': "group", 'SEMANTIC_SCHOLAR_API_KEY': ""}
+        argv = [species_file, "--limit", "3", "--index", os.path.join(workdir, "index.sqlite"),
+                "--dedup-index", os.path.join(workdir, "dedup.sqlite"), "--journal-dir", ""]
+        if name == "dry-run":
+            argv.append("--dry-run")
+        return run_main(argv, env=env, cwd=workdir)
+
+
+def measure(name: str, repeat: int = 5) -> Dict:
+    """Median import time and wall time of a scenario over ``repeat`` runs, and the heavy libraries it loaded."""
+    import_us, wall = [], []
+    loaded = set()
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as workdir:
+            start = time.perf_counter()
+            result = run_scenario(name, workdir)
+            wall.append(time.perf_counter() - start)
+        if result.returncode not in (0, None):
+            raise RuntimeError(f"{name} failed ({result.returncode}): {result.stdout[-500:]}")
+        import_us.append(top_level_time(result.stderr))
+        loaded = set(HEAVY) & set(parse_importtime(result.stderr))
+    return {
+        'scenario': name,
+        'import_ms': round(statistics.median(import_us) / 1000, 1),
+        'wall_s': round(statistics.median(wall), 3),
+        'heavy': sorted(loaded),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the import time of src.main per command line")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS,
+                        help="Scenario to run (repeatable; default: all)")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per scenario (the median is reported)")
+    args = parser.parse_args()
+
+    print(f"  {'scenario':<10} {'imports ms':>10} {'wall s':>8}  heavy libraries loaded")
+    for name in args.scenario or SCENARIOS:
+        row = measure(name, args.repeat)
+        print(f"  {row['scenario']:<10} {row['import_ms']:>10.1f} {row['wall_s']:>8.3f}  "
+              f"{', '.join(row['heavy']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
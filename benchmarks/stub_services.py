@@ -0,0 +1,447 @@
+"""
+Local stand-ins for the services a run talks to, for offline benchmarks.
+
+Each StubServer is a threaded HTTP server on 127.0.0.1 that answers like one
+service, closely enough for the real clients (Bio.Entrez, semanticscholar,
+pyzotero) to talk to it unchanged:
+
+- "pubmed": E-utilities esearch.fcgi / efetch.fcgi (XML)
+- "semantic_scholar": the Graph API paper search (JSON)
+- "zotero": the Web API calls ZoteroManager makes (collections, item
+  template, item creation, item fetch and collection PATCH)
+
+Search results are synthetic but deterministic: the same query always
+returns the same papers, a share of the papers is returned by both search
+services (as real PubMed and Semantic Scholar results overlap) and a share
+is common to every query (papers relevant to several species).
+
+Latency, connection set-up cost, rate limits and the Retry-After/Backoff
+behaviour are set per service with a Behaviour:
+
+    with StubServices(zotero=Behaviour(latency=0.05, rate_limit=20)) as services:
+        os.environ.update(services.env())
+        ...
+"""
+import gzip
+import hashlib
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape
+
+WORDS = (
+    "environmental dna metabarcoding detection fish amphibian river lake marine "
+    "survey monitoring occurrence qpcr assay primer biodiversity estuary sediment "
+    "seasonal invasive endangered population abundance sampling filtration"
+).split()
+
+ESEARCH_DOCTYPE = ('<!DOCTYPE eSearchResult PUBLIC "-//NLM//DTD esearch 20060628//EN" '
+                   '"https://eutils.ncbi.nlm.nih.gov/eutils/dtd/20060628/esearch.dtd">')
+EFETCH_DOCTYPE = ('<!DOCTYPE PubmedArticleSet PUBLIC "-//NLM//DTD PubMedArticle, 1st January 2025//EN" '
+                  '"https://dtd.nlm.nih.gov/ncbi/pubmed/out/pubmed_250101.dtd">')
+
+
+@dataclass
+class Behaviour:
+    """
+    How a stand-in service responds.
+
+    Args:
+        latency: Seconds added to every response
+        handshake: Seconds added to the first response of each new connection
+            (stands in for the TCP and TLS handshakes of a remote service)
+        jitter: Extra random delay of up to this many seconds
+        rate_limit: Requests per second served before answering 429 (default: unlimited)
+        burst: Requests allowed at once before the rate limit applies
+        retry_after: Retry-After seconds sent with a 429
+        backoff: Backoff seconds sent with every ``backoff_every``-th successful response
+        backoff_every: How often a Backoff header is sent (0: never)
+        error_rate: Share of requests answered with a 503
+        seed: Seed of the jitter and error draws
+    """
+    latency: float = 0.0
+    handshake: float = 0.0
+    jitter: float = 0.0
+    rate_limit: Optional[float] = None
+    burst: int = 5
+    retry_after: float = 1.0
+    backoff: float = 0.0
+    backoff_every: int = 0
+    error_rate: float = 0.0
+    seed: int = 7
+
+
+@dataclass
+class Corpus:
+    """
+    Synthetic search results.
+
+    Args:
+        results_per_query: Papers matching each query
+        overlap: Share of a query's papers returned by both search services
+        shared: Share of a query's papers that every query returns
+        empty: Share of queries that match no paper at all (species nobody has studied)
+    """
+    results_per_query: int = 40
+    overlap: float = 0.5
+    shared: float = 0.1
+    empty: float = 0.0
+
+    def _draw(self, query: str, position: int) -> float:
+        digest = hashlib.sha1(f"{query}\0{position}".encode('utf-8')).digest()
+        return int.from_bytes(digest[:4], 'big') / 2 ** 32
+
+    def pmids(self, query: str) -> List[str]:
+        """PMIDs matching ``query``, in relevance order."""
+        if self.empty and self._draw(query, -1) < self.empty:
+            return []
+        base = int.from_bytes(hashlib.sha1(query.encode('utf-8')).digest()[:3], 'big') * 1000
+        return [str(1000 + position) if self._draw(query, position) < self.shared
+                else str(10_000_000 + base + position)
+                for position in range(self.results_per_query)]
+
+    def paper(self, pmid: str) -> Dict:
+        """The paper behind a PMID."""
+        rng = random.Random(int(pmid))
+        title = " ".join(rng.choice(WORDS) for _ in range(8)).capitalize() + f" {pmid}"
+        return {
+            'pmid': pmid,
+            'title': title,
+            'authors': [(rng.choice("ABCDEFGH") + "son", rng.choice("JKLMN")) for _ in range(rng.randint(1, 4))],
+            'year': str(rng.randint(2005, 2025)),
+            'doi': f"10.5555/edna.{pmid}",
+            'abstract': " ".join(rng.choice(WORDS) for _ in range(120)),
+        }
+
+    def s2_papers(self, query: str) -> List[Dict]:
+        """Semantic Scholar matches of ``query``: some are PubMed papers, the rest are not indexed there."""
+        papers = []
+        for position, pmid in enumerate(self.pmids(query)):
+            if self._draw(query + "\0s2", position) < self.overlap:
+                paper = self.paper(pmid)
+            else:
+                paper = self.paper(str(50_000_000 + int(pmid)))
+                paper['pmid'] = None
+            papers.append(paper)
+        return papers
+
+
+class _RateLimiter:
+    """Token bucket: ``rate`` requests per second, up to ``burst`` at once."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without TCP_NODELAY every
+    # keep-alive response would wait out the client's delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        self.server.stub._count('connections')
+        self.fresh = True
+
+    def do_GET(self):
+        self.server.stub.handle(self, "GET")
+
+    def do_POST(self):
+        self.server.stub.handle(self, "POST")
+
+    def do_PATCH(self):
+        self.server.stub.handle(self, "PATCH")
+
+
+class StubServer:
+    """One stand-in service on a local port."""
+
+    SERVICES = ('pubmed', 'semantic_scholar', 'zotero')
+
+    def __init__(self, service: str, behaviour: Optional[Behaviour] = None, corpus: Optional[Corpus] = None):
+        """
+        Initialize the StubServer.
+
+        Args:
+            service: "pubmed", "semantic_scholar" or "zotero"
+            behaviour: Latency, rate limit and error settings (default: none of them)
+            corpus: Synthetic search results (default: Corpus())
+        """
+        if service not in self.SERVICES:
+            raise ValueError(f"Unknown service '{service}'")
+        self.service = service
+        self.behaviour = behaviour or Behaviour()
+        self.corpus = corpus or Corpus()
+        self.limiter = (_RateLimiter(self.behaviour.rate_limit, self.behaviour.burst)
+                        if self.behaviour.rate_limit else None)
+        self.rng = random.Random(self.behaviour.seed)
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'posts': 0, 'rate_limited': 0, 'errors': 0, 'backoffs': 0, 'connections': 0,
+                      'bytes': 0}
+        # Zotero library state
+        self.collections: Dict[str, Dict] = {}
+        self.items: Dict[str, Dict] = {}
+        self.version = 0
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        """Start serving in a background thread and return the base URL."""
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        threading.Thread(target=self._server.serve_forever, name=f"stub-{self.service}", daemon=True).start()
+        return self.url
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _count(self, name: str, value: int = 1) -> int:
+        with self.lock:
+            self.stats[name] += value
+            return self.stats[name]
+
+    def handle(self, request: BaseHTTPRequestHandler, method: str):
+        length = int(request.headers.get('Content-Length') or 0)
+        body = request.rfile.read(length) if length else b""
+        served = self._count('requests')
+        if method == "POST":
+            self._count('posts')
+        behaviour = self.behaviour
+
+        with self.lock:
+            delay = behaviour.latency + (self.rng.random() * behaviour.jitter if behaviour.jitter else 0.0)
+            failed = behaviour.error_rate and self.rng.random() < behaviour.error_rate
+        if request.fresh:
+            delay += behaviour.handshake
+            request.fresh = False
+        if delay:
+            time.sleep(delay)
+
+        if self.limiter is not None and not self.limiter.allow():
+            self._count('rate_limited')
+            self._send(request, 429, b'{"message": "Too Many Requests"}', "application/json",
+                       {'Retry-After': f"{behaviour.retry_after:g}"})
+            return
+        if failed:
+            self._count('errors')
+            self._send(request, 503, b'{"message": "Service Unavailable"}', "application/json")
+            return
+
+        url = urlparse(request.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        if method == "POST" and self.service == 'pubmed':
+            # E-utilities clients POST their parameters for long ID lists
+            params.update({key: values[-1] for key, values in parse_qs(body.decode('utf-8')).items()})
+        try:
+            status, payload, content_type = getattr(self, f"_{self.service}")(method, url.path, params, body)
+        except Exception as e:
+            status, payload, content_type = 400, json.dumps({'error': str(e)}).encode('utf-8'), "application/json"
+
+        headers = {}
+        if status < 400 and behaviour.backoff_every and served % behaviour.backoff_every == 0:
+            self._count('backoffs')
+            headers['Backoff'] = f"{behaviour.backoff:g}"
+        self._send(request, status, payload, content_type, headers)
+
+    def _send(self, request, status: int, payload: bytes, content_type: str, headers: Optional[Dict] = None):
+        request.send_response(status)
+        request.send_header('Content-Type', content_type)
+        if payload and 'gzip' in request.headers.get('Accept-Encoding', ''):
+            payload = gzip.compress(payload, compresslevel=6)
+            request.send_header('Content-Encoding', 'gzip')
+        request.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            request.send_header(name, value)
+        request.end_headers()
+        request.wfile.write(payload)
+        self._count('bytes', len(payload))
+
+    # --- E-utilities ---
+
+    def _pubmed(self, method, path, params, body):
+        if path.endswith("/esearch.fcgi"):
+            pmids = self.corpus.pmids(params.get('term', ''))
+            start = int(params.get('retstart', 0))
+            if params.get('rettype') == "count":
+                # Count only, no IDs
+                xml = ('<?xml version="1.0" encoding="UTF-8" ?>\n' + ESEARCH_DOCTYPE +
+                       f"\n<eSearchResult><Count>{len(pmids)}</Count></eSearchResult>\n")
+                return 200, xml.encode('utf-8'), "text/xml; charset=UTF-8"
+            page = pmids[start:start + int(params.get('retmax', 20))]
+            xml = ('<?xml version="1.0" encoding="UTF-8" ?>\n' + ESEARCH_DOCTYPE +
+                   f"\n<eSearchResult><Count>{len(pmids)}</Count><RetMax>{len(page)}</RetMax>"
+                   f"<RetStart>{start}</RetStart><IdList>" +
+                   "".join(f"<Id>{pmid}</Id>" for pmid in page) +
+                   "</IdList><TranslationSet/></eSearchResult>\n")
+            return 200, xml.encode('utf-8'), "text/xml; charset=UTF-8"
+        if path.endswith("/efetch.fcgi"):
+            articles = "".join(self._pubmed_article(self.corpus.paper(pmid))
+                               for pmid in params.get('id', '').split(",") if pmid)
+            xml = ('<?xml version="1.0" ?>\n' + EFETCH_DOCTYPE +
+                   f"\n<PubmedArticleSet>{articles}</PubmedArticleSet>\n")
+            return 200, xml.encode('utf-8'), "text/xml; charset=UTF-8"
+        return 404, b"Not Found", "text/plain"
+
+    @staticmethod
+    def _pubmed_article(paper: Dict) -> str:
+        authors = "".join(f'<Author ValidYN="Y"><LastName>{last}</LastName><ForeName>{first}</ForeName></Author>'
+                          for last, first in paper['authors'])
+        return (
+            f'<PubmedArticle><MedlineCitation Status="MEDLINE" Owner="NLM">'
+            f'<PMID Version="1">{paper["pmid"]}</PMID><Article PubModel="Print">'
+            f'<Journal><JournalIssue CitedMedium="Internet"><PubDate><Year>{paper["year"]}</Year></PubDate>'
+            f'</JournalIssue><Title>Journal of Synthetic Ecology</Title></Journal>'
+            f'<ArticleTitle>{escape(paper["title"])}</ArticleTitle>'
+            f'<ELocationID EIdType="doi" ValidYN="Y">{paper["doi"]}</ELocationID>'
+            f'<Abstract><AbstractText>{escape(paper["abstract"])}</AbstractText></Abstract>'
+            f'<AuthorList CompleteYN="Y">{authors}</AuthorList></Article></MedlineCitation>'
+            f'<PubmedData><ArticleIdList><ArticleId IdType="pubmed">{paper["pmid"]}</ArticleId>'
+            f'</ArticleIdList></PubmedData></PubmedArticle>'
+        )
+
+    # --- Semantic Scholar ---
+
+    def _semantic_scholar(self, method, path, params, body):
+        if not path.endswith("/paper/search"):
+            return 404, b'{"error": "Not found"}', "application/json"
+        papers = self.corpus.s2_papers(params.get('query', ''))
+        offset = int(params.get('offset', 0))
+        limit = int(params.get('limit', 100))
+        page = papers[offset:offset + limit]
+        data = {
+            'total': len(papers),
+            'offset': offset,
+            'data': [{
+                'paperId': hashlib.sha1(paper['doi'].encode('utf-8')).hexdigest(),
+                'title': paper['title'],
+                'year': int(paper['year']),
+                'authors': [{'authorId': None, 'name': f"{first} {last}"} for last, first in paper['authors']],
+                'externalIds': {'DOI': paper['doi'], **({'PubMed': paper['pmid']} if paper['pmid'] else {})},
+                'url': f"https://www.semanticscholar.org/paper/{paper['doi']}",
+                'abstract': paper['abstract'],
+            } for paper in page],
+        }
+        if offset + len(page) < len(papers):
+            data['next'] = offset + len(page)
+        return 200, json.dumps(data).encode('utf-8'), "application/json"
+
+    # --- Zotero Web API ---
+
+    def _zotero(self, method, path, params, body):
+        parts = [part for part in path.split("/") if part]
+        if parts == ['items', 'new']:
+            template = {'itemType': params.get('itemType', 'journalArticle'), 'title': '', 'creators': [],
+                        'abstractNote': '', 'date': '', 'DOI': '', 'url': '', 'libraryCatalog': '',
+                        'extra': '', 'collections': [], 'tags': [], 'relations': {}}
+            return 200, json.dumps(template).encode('utf-8'), "application/json"
+        if len(parts) < 3:
+            return 404, b'{"error": "Not found"}', "application/json"
+        kind, rest = parts[2], parts[3:]
+        with self.lock:
+            if kind == 'collections' and not rest and method == "GET":
+                return self._json(list(self.collections.values()))
+            if kind == 'collections' and not rest and method == "POST":
+                return self._json(self._create('collections', json.loads(body)))
+            if kind == 'items' and not rest and method == "POST":
+                return self._json(self._create('items', json.loads(body)))
+            if kind == 'items' and len(rest) == 1 and rest[0] in self.items:
+                item = self.items[rest[0]]
+                if method == "GET":
+                    return self._json(item)
+                if method == "PATCH":
+                    self.version += 1
+                    item['data'].update(json.loads(body))
+                    item['version'] = item['data']['version'] = self.version
+                    return 204, b"", "application/json"
+        return 404, b'{"error": "Not found"}', "application/json"
+
+    @staticmethod
+    def _json(payload):
+        return 200, json.dumps(payload).encode('utf-8'), "application/json"
+
+    def _create(self, kind: str, objects: List[Dict]) -> Dict:
+        store = self.collections if kind == 'collections' else self.items
+        successful = {}
+        for position, data in enumerate(objects):
+            self.version += 1
+            key = f"{len(store) + 1:08X}"
+            data = {**data, 'key': key, 'version': self.version}
+            store[key] = {'key': key, 'version': self.version, 'library': {}, 'links': {},
+                          'meta': {'numCollections': 0}, 'data': data}
+            successful[str(position)] = store[key]
+        return {'successful': successful, 'success': {position: obj['key'] for position, obj in successful.items()},
+                'unchanged': {}, 'failed': {}}
+
+
+class StubServices:
+    """The three stand-in services, started and stopped together."""
+
+    def __init__(self, pubmed: Optional[Behaviour] = None, semantic_scholar: Optional[Behaviour] = None,
+                 zotero: Optional[Behaviour] = None, corpus: Optional[Corpus] = None):
+        """
+        Initialize the StubServices.
+
+        Args:
+            pubmed: Behaviour of the E-utilities stand-in
+            semantic_scholar: Behaviour of the Semantic Scholar stand-in
+            zotero: Behaviour of the Zotero stand-in
+            corpus: Synthetic search results shared by the search services
+        """
+        corpus = corpus or Corpus()
+        self.servers = {
+            'pubmed': StubServer('pubmed', pubmed, corpus),
+            'semantic_scholar': StubServer('semantic_scholar', semantic_scholar, corpus),
+            'zotero': StubServer('zotero', zotero, corpus),
+        }
+
+    def __enter__(self) -> 'StubServices':
+        for server in self.servers.values():
+            server.start()
+        return self
+
+    def __exit__(self, *exc):
+        for server in self.servers.values():
+            server.stop()
+
+    def env(self) -> Dict[str, str]:
+        """Environment variables pointing Config at the stand-ins."""
+        return {
+            'PUBMED_EUTILS_URL': self.servers['pubmed'].url,
+            'SEMANTIC_SCHOLAR_API_URL': self.servers['semantic_scholar'].url,
+            'ZOTERO_API_URL': self.servers['zotero'].url,
+        }
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Requests, POSTs, 429s, errors, Backoff headers, connections accepted and body bytes sent, per service."""
+        return {name: dict(server.stats) for name, server in self.servers.items()}
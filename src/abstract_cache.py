@@ -2,6 +2,7 @@ import yaml
 from pathlib import Path
 from datetime import datetime
 from typing import List, Dict, Optional
+from src.metrics import METRICS
 from src.providers.base import SearchResult
 
 
@@ -40,12 +41,12 @@ class AbstractCache:
 
     def _read_cache(self) -> Dict:
         """Read and parse the YAML cache file."""
-        with open(self.cache_file, 'r', encoding='utf-8') as f:
+        with METRICS.timer("cache", operation="read"), open(self.cache_file, 'r', encoding='utf-8') as f:
             return yaml.safe_load(f) or {}
 
     def _write_cache(self, data: Dict):
         """Write data to the YAML cache file."""
-        with open(self.cache_file, 'w', encoding='utf-8') as f:
+        with METRICS.timer("cache", operation="write"), open(self.cache_file, 'w', encoding='utf-8') as f:
             yaml.dump(data, f, allow_unicode=True, default_flow_style=False, sort_keys=False)
 
     def add_papers(self, species_name: str, papers: List[SearchResult], zotero_keys: List[str],
@@ -82,29 +83,78 @@ class AbstractCache:
         else:
             species_entry['last_updated'] = datetime.now().isoformat()
 
-        # Add papers to species entry
+        # Add papers to species entry; a replayed write (resumed run) adds nothing twice
+        existing_keys = {entry.get('zotero_key') for entry in species_entry['papers']}
         for paper, zotero_key in zip(papers, zotero_keys):
+            if zotero_key in existing_keys:
+                continue
+            existing_keys.add(zotero_key)
             paper_entry = {
                 'zotero_key': zotero_key,
                 'title': paper.title,
-                'authors': paper.authors,
+                'authors': list(paper.authors or []),
                 'year': paper.year,
                 'doi': paper.doi,
                 'source': paper.source,
                 'url': paper.url,
                 'abstract': paper.abstract,
+                'identifiers': dict(paper.identifiers or {}),
                 'added_at': datetime.now().isoformat()
             }
             species_entry['papers'].append(paper_entry)
 
-        # Update metadata
+        self._update_metadata(cache_data)
+        self._write_cache(cache_data)
+
+    @staticmethod
+    def _update_metadata(cache_data: Dict):
+        """Refresh the timestamps and totals in the cache metadata."""
         cache_data['metadata']['last_updated'] = datetime.now().isoformat()
         cache_data['metadata']['total_species'] = len(cache_data.get('species', []))
         cache_data['metadata']['total_papers'] = sum(
             len(sp.get('papers', [])) for sp in cache_data.get('species', [])
         )
 
+    def merge_from(self, other: 'AbstractCache') -> int:
+        """
+        Merge another cache (e.g. from a shard run) into this one.
+
+        Species are matched by name; papers already cached for a species
+        (same Zotero key) are not added twice.
+
+        Args:
+            other: AbstractCache to read papers from
+
+        Returns:
+            Number of papers added
+        """
+        cache_data = self._read_cache()
+        species_by_name = {sp['name']: sp for sp in cache_data.setdefault('species', [])}
+        added = 0
+        for other_sp in other._read_cache().get('species', []):
+            species_entry = species_by_name.get(other_sp['name'])
+            if species_entry is None:
+                species_entry = dict(other_sp, papers=[])
+                cache_data['species'].append(species_entry)
+                species_by_name[other_sp['name']] = species_entry
+            else:
+                species_entry['keywords'] = list(dict.fromkeys(
+                    (species_entry.get('keywords') or []) + (other_sp.get('keywords') or [])
+                ))
+                species_entry['last_updated'] = max(species_entry.get('last_updated', ''),
+                                                    other_sp.get('last_updated', ''))
+
+            existing_keys = {entry.get('zotero_key') for entry in species_entry['papers']}
+            for paper_entry in other_sp.get('papers', []):
+                if paper_entry.get('zotero_key') in existing_keys:
+                    continue
+                existing_keys.add(paper_entry.get('zotero_key'))
+                species_entry['papers'].append(paper_entry)
+                added += 1
+
+        self._update_metadata(cache_data)
         self._write_cache(cache_data)
+        return added
 
     def get_species_papers(self, species_name: str) -> Optional[Dict]:
         """
@@ -0,0 +1,242 @@
+"""
+Record and replay the HTTP exchanges of a run.
+
+A cassette is a gzip-compressed JSON-lines file with one exchange per line:
+the request method, URL and body digest, and the response status, the few
+headers the clients read, and the body. Recording wraps the live request:
+
+    cassette = Cassette("data/cassettes/run.jsonl.gz", mode="record")
+    response = cassette.exchange("GET", url, None, live=lambda: fetch(url))
+
+Replaying answers the same requests from the file without touching the
+network, at full speed. Identical requests are answered in the order they
+were recorded (so a collection listing fetched before and after an upload
+replays both states); once exhausted, the last response is repeated.
+"""
+import base64
+import gzip
+import hashlib
+import json
+import threading
+import zlib
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+MODES = ('record', 'replay')
+
+# Query parameters that identify the caller rather than the request
+VOLATILE_PARAMS = frozenset({'email', 'tool', 'api_key'})
+
+# Response headers worth keeping: the clients read these for content, the rest
+# is noise. Backoff/Retry-After are left out so that a replay runs at full speed.
+KEPT_HEADERS = frozenset({'content-type', 'total-results', 'last-modified-version', 'link'})
+
+
+class CassetteMiss(LookupError):
+    """A replayed request was not recorded in the cassette."""
+
+
+@dataclass
+class Response:
+    status: int
+    headers: Dict[str, str] = field(default_factory=dict)
+    body: bytes = b""
+
+
+def request_key(method: str, url: str, body: Optional[bytes] = None) -> str:
+    """
+    Identify a request by method, path, query and body digest.
+
+    The query is sorted and stripped of caller parameters. The host is left
+    out, so a cassette recorded against one endpoint (e.g. the benchmark
+    stand-ins) replays under another.
+    """
+    parts = urlsplit(url)
+    query = sorted((name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if name not in VOLATILE_PARAMS)
+    if body and method.upper() == "POST" and b"=" in body and not body.lstrip().startswith((b"{", b"[")):
+        # A form body (long E-utilities ID lists are POSTed) carries caller parameters too
+        form = sorted((name, value) for name, value in parse_qsl(body.decode('utf-8'), keep_blank_values=True)
+                      if name not in VOLATILE_PARAMS)
+        body = urlencode(form).encode('utf-8')
+    key = f"{method.upper()} {urlunsplit(('', '', parts.path, urlencode(query), ''))}"
+    if body:
+        key += " " + hashlib.sha1(body).hexdigest()[:16]
+    return key
+
+
+class Cassette:
+    """Thread-safe recorder/player of HTTP exchanges."""
+
+    def __init__(self, path: str, mode: str = "replay"):
+        """
+        Initialize the Cassette.
+
+        Args:
+            path: Cassette file (gzip-compressed JSON lines)
+            mode: "record" to write live exchanges, "replay" to answer from the file
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode '{mode}', expected one of {', '.join(MODES)}")
+        self.path = Path(path)
+        self.mode = mode
+        self.lock = threading.Lock()
+        self.recorded = 0
+        self.replayed = 0
+        self._responses: Dict[str, deque] = {}
+        self._last: Dict[str, Response] = {}
+        self._file = None
+        if mode == "replay":
+            if not self.path.exists():
+                raise FileNotFoundError(f"Cassette not found: {path}")
+            self._load()
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = gzip.open(self.path, 'wt', encoding='utf-8')
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def __len__(self) -> int:
+        return sum(len(queue) for queue in self._responses.values())
+
+    def _load(self):
+        for line in self._decompress(self.path.read_bytes()).splitlines():
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut short when the recording run died
+                continue
+            self._responses.setdefault(entry['key'], deque()).append(self._decode(entry))
+
+    @staticmethod
+    def _decompress(data: bytes) -> bytes:
+        """Decompress every gzip member, keeping what precedes a truncated or damaged tail."""
+        chunks = []
+        while data:
+            stream = zlib.decompressobj(wbits=31)
+            try:
+                chunks.append(stream.decompress(data))
+            except zlib.error:
+                break
+            if not stream.eof:
+                # The recording run died before closing the gzip stream
+                break
+            data = stream.unused_data
+        return b"".join(chunks)
+
+    @staticmethod
+    def _decode(entry: Dict) -> Response:
+        body = entry.get('body', "")
+        if isinstance(body, dict):
+            body = base64.b64decode(body['b64'])
+        else:
+            body = body.encode('utf-8')
+        return Response(entry['status'], entry.get('headers', {}), body)
+
+    @staticmethod
+    def _encode(key: str, response: Response) -> Dict:
+        try:
+            body = response.body.decode('utf-8')
+        except UnicodeDecodeError:
+            body = {'b64': base64.b64encode(response.body).decode('ascii')}
+        headers = {name.lower(): value for name, value in response.headers.items() if name.lower() in KEPT_HEADERS}
+        return {'key': key, 'status': response.status, 'headers': headers, 'body': body}
+
+    def replay(self, method: str, url: str, body: Optional[bytes] = None) -> Optional[Response]:
+        """
+        Return the recorded response to a request.
+
+        Returns:
+            The response when replaying, None when recording
+
+        Raises:
+            CassetteMiss: The request was not recorded
+        """
+        if not self.replaying:
+            return None
+        key = request_key(method, url, body)
+        with self.lock:
+            queue = self._responses.get(key)
+            if queue:
+                self._last[key] = queue.popleft()
+            elif key not in self._last:
+                raise CassetteMiss(f"No recorded response for {key}")
+            self.replayed += 1
+            return self._last[key]
+
+    def record(self, method: str, url: str, body: Optional[bytes], response: Response) -> Response:
+        """Append an exchange to the cassette."""
+        line = json.dumps(self._encode(request_key(method, url, body), response), ensure_ascii=False)
+        with self.lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            self.recorded += 1
+        return response
+
+    def exchange(self, method: str, url: str, body: Optional[bytes], live: Callable[[], Response]) -> Response:
+        """
+        Answer a request from the cassette, or perform it with ``live`` and record it.
+
+        Rate-limited (429) responses are passed through but not recorded: the
+        client retries, and the replay gets the response that finally came back.
+        """
+        response = self.replay(method, url, body)
+        if response is None:
+            response = live()
+            if response.status != 429:
+                self.record(method, url, body, response)
+        return response
+
+    def httpx_client(self, httpx_module, **kwargs):
+        """
+        An httpx-style Client whose requests go through the cassette.
+
+        Args:
+            httpx_module: The httpx (or API-compatible) module the caller uses
+            **kwargs: Passed to the Client (e.g. timeout, follow_redirects)
+        """
+        return httpx_module.Client(transport=_HttpxTransport(self, httpx_module), **kwargs)
+
+    def close(self):
+        """Finish the recording."""
+        if self._file is not None:
+            with self.lock:
+                self._file.close()
+                self._file = None
+
+
+class _HttpxTransport:
+    """httpx transport answering from, or recording into, a Cassette."""
+
+    def __init__(self, cassette: Cassette, httpx_module):
+        self.cassette = cassette
+        self.httpx = httpx_module
+        self.inner = None if cassette.replaying else httpx_module.HTTPTransport()
+
+    def handle_request(self, request):
+        body = request.read() or None
+
+        def live() -> Response:
+            response = self.inner.handle_request(request)
+            try:
+                content = response.read()
+            finally:
+                response.close()
+            # The body is stored decoded, so drop the encoding it travelled with
+            headers = {name: value for name, value in response.headers.items()
+                       if name.lower() not in ('content-encoding', 'content-length', 'transfer-encoding')}
+            return Response(response.status_code, headers, content)
+
+        response = self.cassette.exchange(request.method, str(request.url), body, live)
+        return self.httpx.Response(response.status, headers=response.headers, content=response.body,
+                                   request=request)
+
+    def close(self):
+        if self.inner is not None:
+            self.inner.close()
+
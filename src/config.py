@@ -1,8 +1,17 @@
 import os
 from dataclasses import dataclass
-from dotenv import load_dotenv
 
-load_dotenv()
+_env_loaded = False
+
+
+def load_env():
+    """Load the .env file into the environment, once per process."""
+    global _env_loaded
+    if not _env_loaded:
+        # Imported here so `--help` and imports of this module skip python-dotenv
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
 
 @dataclass
 class Config:
@@ -11,8 +20,13 @@ class Config:
     ZOTERO_LIBRARY_TYPE: str = None
     SEMANTIC_SCHOLAR_API_KEY: str = None
     EMAIL: str = None
+    # Service endpoint overrides, e.g. for the stand-in services of the benchmarks
+    PUBMED_EUTILS_URL: str = None
+    SEMANTIC_SCHOLAR_API_URL: str = None
+    ZOTERO_API_URL: str = None
 
     def __post_init__(self):
+        load_env()
         if self.ZOTERO_LIBRARY_ID is None:
             self.ZOTERO_LIBRARY_ID = os.getenv("ZOTERO_LIBRARY_ID", "")
         if self.ZOTERO_API_KEY is None:
@@ -23,6 +37,12 @@ class Config:
             self.SEMANTIC_SCHOLAR_API_KEY = os.getenv("SEMANTIC_SCHOLAR_API_KEY", "")
         if self.EMAIL is None:
             self.EMAIL = os.getenv("EMAIL", "")
+        if self.PUBMED_EUTILS_URL is None:
+            self.PUBMED_EUTILS_URL = os.getenv("PUBMED_EUTILS_URL", "")
+        if self.SEMANTIC_SCHOLAR_API_URL is None:
+            self.SEMANTIC_SCHOLAR_API_URL = os.getenv("SEMANTIC_SCHOLAR_API_URL", "")
+        if self.ZOTERO_API_URL is None:
+            self.ZOTERO_API_URL = os.getenv("ZOTERO_API_URL", "")
 
     def validate(self):
         errors = []
@@ -0,0 +1,304 @@
+import re
+import unicodedata
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.providers.base import SearchResult
+
+_DOI_PREFIX_RE = re.compile(r'^(?:https?://(?:dx\.)?doi\.org/|doi:\s*)', re.IGNORECASE)
+_TAG_RE = re.compile(r'<[^>]+>')
+_NON_ALNUM_RE = re.compile(r'[^0-9a-z]+')
+
+# Greek letters are spelled out so "α-diversity" and "alpha-diversity" normalize alike
+_GREEK = {
+    'α': 'alpha', 'β': 'beta', 'γ': 'gamma', 'δ': 'delta', 'ε': 'epsilon', 'ζ': 'zeta',
+    'η': 'eta', 'θ': 'theta', 'ι': 'iota', 'κ': 'kappa', 'λ': 'lambda', 'μ': 'mu',
+    'ν': 'nu', 'ξ': 'xi', 'ο': 'omicron', 'π': 'pi', 'ρ': 'rho', 'σ': 'sigma',
+    'ς': 'sigma', 'τ': 'tau', 'υ': 'upsilon', 'φ': 'phi', 'χ': 'chi', 'ψ': 'psi',
+    'ω': 'omega', 'ϵ': 'epsilon', 'ϑ': 'theta', 'ϕ': 'phi', 'µ': 'mu',
+}
+_GREEK_TABLE = str.maketrans({k: f' {v} ' for k, v in _GREEK.items()})
+
+_MASK64 = (1 << 64) - 1
+_MASK63 = (1 << 63) - 1
+_MIX_MULTIPLIER = 0x9E3779B97F4A7C15
+_EMPTY = 1 << 64
+_DENSIFY_OFFSET = 1 << 58
+
+
+def normalize_doi(doi: Optional[str]) -> str:
+    """
+    Normalize a DOI for comparison: strip resolver prefixes, whitespace,
+    trailing punctuation and case (DOIs are case-insensitive).
+    """
+    if not doi:
+        return ""
+    doi = _DOI_PREFIX_RE.sub("", doi.strip())
+    return doi.rstrip(" .;,").lower()
+
+
+def normalize_title(title: Optional[str]) -> str:
+    """
+    Normalize a title for comparison: drop markup, spell out Greek letters,
+    remove accents, case and punctuation, and collapse whitespace.
+    """
+    if not title:
+        return ""
+    text = unicodedata.normalize('NFKC', _TAG_RE.sub(" ", title)).casefold()
+    if not text.isascii():
+        text = text.translate(_GREEK_TABLE)
+        text = unicodedata.normalize('NFKD', text)
+        text = "".join(c for c in text if not unicodedata.combining(c))
+    return _NON_ALNUM_RE.sub(" ", text).strip()
+
+
+def shingles(text: str, size: int = 5) -> set:
+    """Character shingles of a normalized title (the title itself if shorter than size)."""
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def jaccard(a: set, b: set) -> float:
+    """Jaccard similarity of two sets."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class MinHasher:
+    """
+    Computes MinHash signatures using one-permutation hashing with densification.
+
+    Each shingle is hashed once and assigned to one of ``num_perm`` bins; the
+    signature is the minimum per bin, with empty bins filled from the next
+    non-empty bin. This has the same collision property as ``num_perm``
+    independent permutations but costs one hash per shingle instead of
+    ``num_perm``, which keeps pure-Python signatures cheap at millions of records.
+    """
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        self.num_perm = num_perm
+        self.seed = (seed * _MIX_MULTIPLIER) & _MASK64
+
+    def signature(self, shingle_set: Iterable[str]) -> Tuple[int, ...]:
+        """Compute the MinHash signature of a set of shingles."""
+        n = self.num_perm
+        seed = self.seed
+        # crc32 is stable across processes (unlike hash()), so signatures can be persisted
+        hashes = [((zlib.crc32(s.encode('utf-8')) ^ seed) * _MIX_MULTIPLIER) & _MASK64
+                  for s in shingle_set]
+        if not hashes:
+            return ()
+        bins = [_EMPTY] * n
+        for h in hashes:
+            h ^= h >> 31
+            b = h % n
+            v = h // n
+            if v < bins[b]:
+                bins[b] = v
+        if _EMPTY not in bins:
+            return tuple(bins)
+
+        # Densify: an empty bin borrows the value of the next non-empty bin
+        # (circularly), offset by the distance so borrowed values stay distinct.
+        # One backward pass, started just after the last non-empty bin.
+        last = max(i for i in range(n) if bins[i] != _EMPTY)
+        signature = list(bins)
+        value, distance = bins[last], 0
+        for step in range(1, n + 1):
+            i = (last - step) % n
+            distance += 1
+            if bins[i] == _EMPTY:
+                signature[i] = value + distance * _DENSIFY_OFFSET
+            else:
+                value, distance = bins[i], 0
+        return tuple(signature)
+
+
+def identifier_keys(result: SearchResult) -> List[str]:
+    """Fingerprints for provider identifiers, e.g. "pmid:12345"."""
+    return [f"{name}:{str(value).strip().lower()}"
+            for name, value in (result.identifiers or {}).items() if value]
+
+
+def merge_results(kept: SearchResult, other: SearchResult) -> SearchResult:
+    """
+    Fill the gaps in ``kept`` with fields from a duplicate ``other``, in place.
+
+    Non-empty fields of ``kept`` win, except the abstract, where the longer
+    one is kept. Identifiers are unioned so the merged record carries e.g.
+    both the PMID and the Semantic Scholar paper ID.
+    """
+    if not kept.title and other.title:
+        kept.title = other.title
+    if not kept.authors and other.authors:
+        kept.authors = list(other.authors)
+    if not kept.year and other.year:
+        kept.year = other.year
+    if not kept.doi and other.doi:
+        kept.doi = other.doi
+    if other.abstract and len(other.abstract) > len(kept.abstract or ""):
+        kept.abstract = other.abstract
+    if not kept.url and other.url:
+        kept.url = other.url
+    if other.identifiers:
+        merged = dict(other.identifiers)
+        merged.update(kept.identifiers or {})
+        kept.identifiers = merged
+    return kept
+
+
+def band_keys(signature: Tuple[int, ...], bands: int) -> List[int]:
+    """
+    Hash each LSH band of a signature to an integer key.
+
+    Uses an explicit multiplicative mix rather than hash() so keys are stable
+    across processes and Python versions and fit a signed 64-bit column.
+    """
+    rows = len(signature) // bands
+    keys = []
+    for band in range(bands):
+        h = band + 1
+        for value in signature[band * rows:(band + 1) * rows]:
+            h = ((h ^ value) * _MIX_MULTIPLIER) & _MASK64
+        keys.append(h & _MASK63)
+    return keys
+
+
+class Deduplicator:
+    """
+    Detects duplicate SearchResults across providers.
+
+    Two records are duplicates when their normalized DOIs or a provider
+    identifier (PMID, ...) match, or, if they do not carry two different
+    DOIs, when their normalized titles are equal or their title shingles have
+    a Jaccard similarity of at least ``threshold``. Near-duplicate candidates
+    are found with banded MinHash LSH, so each lookup only compares against
+    records sharing a band rather than against every record seen so far.
+
+    Duplicates are merged field by field into the first occurrence (see
+    merge_results), so a single search pass yields complete records.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 96, bands: int = 12,
+                 shingle_size: int = 5, seed: int = 1, merge: bool = True):
+        """
+        Initialize the Deduplicator.
+
+        Args:
+            threshold: Minimum title Jaccard similarity for a near-duplicate (default: 0.8)
+            num_perm: Number of MinHash bins (default: 96)
+            bands: Number of LSH bands; must divide num_perm. More bands find
+                more candidates at lower similarity (default: 12, i.e. bands of
+                8 rows, which starts catching candidates around 0.73 similarity)
+            shingle_size: Character shingle length (default: 5)
+            seed: Seed for the MinHash hash family (default: 1)
+            merge: Merge fields of duplicates into the kept record (default: True)
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.merge = merge
+        self.hasher = MinHasher(num_perm=num_perm, seed=seed)
+
+        self.records: List[SearchResult] = []
+        self._titles: List[str] = []
+        self._dois: List[str] = []
+        self._by_doi: Dict[str, int] = {}
+        self._by_id: Dict[str, int] = {}
+        self._by_title: Dict[str, int] = {}
+        self._buckets: Dict[int, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _compatible(self, doi: str, record_id: int) -> bool:
+        """Records with two different DOIs are never merged on title alone."""
+        other = self._dois[record_id]
+        return not doi or not other or doi == other
+
+    def _find(self, doi: str, title: str,
+              ids: Iterable[str] = ()) -> Tuple[Optional[int], Optional[List[int]]]:
+        if doi and doi in self._by_doi:
+            return self._by_doi[doi], None
+        for key in ids:
+            if key in self._by_id:
+                return self._by_id[key], None
+        if not title:
+            return None, None
+
+        record_id = self._by_title.get(title)
+        if record_id is not None and self._compatible(doi, record_id):
+            return record_id, None
+
+        shingle_set = shingles(title, self.shingle_size)
+        keys = band_keys(self.hasher.signature(shingle_set), self.bands)
+        seen = set()
+        for key in keys:
+            for candidate in self._buckets.get(key, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                if not self._compatible(doi, candidate):
+                    continue
+                other = shingles(self._titles[candidate], self.shingle_size)
+                if jaccard(shingle_set, other) >= self.threshold:
+                    return candidate, None
+        return None, keys
+
+    def find_duplicate(self, result: SearchResult) -> Optional[SearchResult]:
+        """Return the already-seen record that duplicates ``result``, if any."""
+        record_id, _ = self._find(normalize_doi(result.doi), normalize_title(result.title),
+                                  identifier_keys(result))
+        return self.records[record_id] if record_id is not None else None
+
+    def _register(self, record_id: int, doi: str, ids: Iterable[str]):
+        """Make a record findable by a DOI or identifiers learnt from a duplicate."""
+        if doi and not self._dois[record_id]:
+            self._dois[record_id] = doi
+            self._by_doi[doi] = record_id
+        for key in ids:
+            self._by_id.setdefault(key, record_id)
+
+    def add(self, result: SearchResult) -> Tuple[SearchResult, bool]:
+        """
+        Add a record unless it duplicates one already seen.
+
+        Returns:
+            (kept record, True if ``result`` was new)
+        """
+        doi = normalize_doi(result.doi)
+        title = normalize_title(result.title)
+        ids = identifier_keys(result)
+        record_id, keys = self._find(doi, title, ids)
+        if record_id is not None:
+            kept = self.records[record_id]
+            if self.merge:
+                merge_results(kept, result)
+            # A title match may reveal the DOI or PMID of a record that arrived without one
+            self._register(record_id, doi, ids)
+            return kept, False
+
+        record_id = len(self.records)
+        self.records.append(result)
+        self._titles.append(title)
+        self._dois.append(doi)
+        self._register(record_id, doi, ids)
+        if doi:
+            self._by_doi[doi] = record_id
+        if title:
+            self._by_title.setdefault(title, record_id)
+            for key in keys:
+                self._buckets.setdefault(key, []).append(record_id)
+        return result, True
+
+    def deduplicate(self, results: Iterable[SearchResult]) -> List[SearchResult]:
+        """
+        Add records in order and return those that were new, first occurrence kept
+        (with any later duplicates merged into it).
+        """
+        return [result for result in results if self.add(result)[1]]
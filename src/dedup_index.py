@@ -0,0 +1,199 @@
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+from src.dedup import (MinHasher, band_keys, identifier_keys, jaccard, normalize_doi,
+                       normalize_title, shingles)
+from src.providers.base import SearchResult
+
+
+class DedupIndex:
+    """
+    Persistent index of papers already uploaded to Zotero, shared by all
+    runs and species.
+
+    Each record maps a normalized DOI, identifier or title fingerprint to the
+    Zotero item key and the species whose abstract-cache entry holds it. Near-duplicate
+    titles are matched with the same MinHash LSH scheme as
+    src.dedup.Deduplicator, with the band keys stored in SQLite.
+    """
+
+    def __init__(self, index_file: str = "data/dedup_index.sqlite", threshold: float = 0.8,
+                 num_perm: int = 96, bands: int = 12, shingle_size: int = 5):
+        """
+        Initialize the DedupIndex.
+
+        Args:
+            index_file: Path to the SQLite index file (default: data/dedup_index.sqlite)
+            threshold: Minimum title Jaccard similarity for a near-duplicate (default: 0.8)
+            num_perm: Number of MinHash bins (default: 96)
+            bands: Number of LSH bands (default: 12)
+            shingle_size: Character shingle length (default: 5)
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.shingle_size = shingle_size
+        self.hasher = MinHasher(num_perm=num_perm)
+
+        self.index_file = Path(index_file)
+        self.index_file.parent.mkdir(parents=True, exist_ok=True)
+        # Shared by the dedup and cache stages of the run pipeline
+        self.conn = sqlite3.connect(str(self.index_file), check_same_thread=False)
+        self.lock = threading.RLock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._initialize_index()
+
+    def _initialize_index(self):
+        """Create the record, fingerprint, band and membership tables if missing."""
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS records (
+                id INTEGER PRIMARY KEY,
+                zotero_key TEXT NOT NULL,
+                doi TEXT,
+                title TEXT,
+                cache_species TEXT,
+                added_at TEXT
+            );
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                fingerprint TEXT PRIMARY KEY,
+                record_id INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS bands (
+                band_key INTEGER NOT NULL,
+                record_id INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS bands_key ON bands (band_key);
+            CREATE TABLE IF NOT EXISTS memberships (
+                record_id INTEGER NOT NULL,
+                species TEXT NOT NULL,
+                PRIMARY KEY (record_id, species)
+            );
+        """)
+        self.conn.commit()
+
+    @staticmethod
+    def _title_fingerprint(title: str) -> str:
+        return "title:" + hashlib.sha1(title.encode('utf-8')).hexdigest()
+
+    def _compatible(self, doi: str, record_doi: str) -> bool:
+        """Records with two different DOIs are never merged on title alone."""
+        return not doi or not record_doi or doi == record_doi
+
+    def _find(self, doi: str, title: str, ids=()) -> Optional[int]:
+        exact = ([f"doi:{doi}"] if doi else []) + [f"id:{key}" for key in ids]
+        for fingerprint in exact:
+            row = self.conn.execute(
+                "SELECT record_id FROM fingerprints WHERE fingerprint = ?", (fingerprint,)
+            ).fetchone()
+            if row:
+                return row[0]
+        if not title:
+            return None
+
+        row = self.conn.execute(
+            "SELECT r.id, r.doi FROM fingerprints f JOIN records r ON r.id = f.record_id "
+            "WHERE f.fingerprint = ?", (self._title_fingerprint(title),)
+        ).fetchone()
+        if row and self._compatible(doi, row[1]):
+            return row[0]
+
+        shingle_set = shingles(title, self.shingle_size)
+        keys = band_keys(self.hasher.signature(shingle_set), self.bands)
+        placeholders = ",".join("?" * len(keys))
+        candidates = self.conn.execute(
+            f"SELECT DISTINCT r.id, r.doi, r.title FROM bands b JOIN records r ON r.id = b.record_id "
+            f"WHERE b.band_key IN ({placeholders})", keys
+        ).fetchall()
+        for record_id, record_doi, record_title in candidates:
+            if not self._compatible(doi, record_doi):
+                continue
+            if jaccard(shingle_set, shingles(record_title, self.shingle_size)) >= self.threshold:
+                return record_id
+        return None
+
+    def lookup(self, result: SearchResult) -> Optional[Dict]:
+        """
+        Find a previously uploaded paper matching ``result``.
+
+        Returns:
+            Dictionary with record_id, zotero_key, cache_species (the species
+            whose cache entry holds the paper) and species (every species
+            collection it was filed under), or None if the paper is new
+        """
+        with self.lock:
+            record_id = self._find(normalize_doi(result.doi), normalize_title(result.title),
+                                   identifier_keys(result))
+            if record_id is None:
+                return None
+            zotero_key, cache_species = self.conn.execute(
+                "SELECT zotero_key, cache_species FROM records WHERE id = ?", (record_id,)
+            ).fetchone()
+            species = [row[0] for row in self.conn.execute(
+                "SELECT species FROM memberships WHERE record_id = ? ORDER BY species", (record_id,)
+            )]
+        return {
+            'record_id': record_id,
+            'zotero_key': zotero_key,
+            'cache_species': cache_species,
+            'species': species
+        }
+
+    def add(self, result: SearchResult, zotero_key: str, species_name: str) -> int:
+        """
+        Record a paper that was just uploaded to Zotero and cached for a species.
+
+        Returns:
+            The record id
+        """
+        doi = normalize_doi(result.doi)
+        title = normalize_title(result.title)
+        with self.lock, self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO records (zotero_key, doi, title, cache_species, added_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (zotero_key, doi, title, species_name, datetime.now().isoformat())
+            )
+            record_id = cur.lastrowid
+            if doi:
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO fingerprints VALUES (?, ?)", (f"doi:{doi}", record_id)
+                )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO fingerprints VALUES (?, ?)",
+                [(f"id:{key}", record_id) for key in identifier_keys(result)]
+            )
+            if title:
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO fingerprints VALUES (?, ?)",
+                    (self._title_fingerprint(title), record_id)
+                )
+                keys = band_keys(self.hasher.signature(shingles(title, self.shingle_size)), self.bands)
+                self.conn.executemany(
+                    "INSERT INTO bands VALUES (?, ?)", [(key, record_id) for key in keys]
+                )
+            self.conn.execute(
+                "INSERT OR IGNORE INTO memberships VALUES (?, ?)", (record_id, species_name)
+            )
+        return record_id
+
+    def add_species(self, record_id: int, species_name: str):
+        """Record that an existing paper was also filed under another species."""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO memberships VALUES (?, ?)", (record_id, species_name)
+            )
+
+    def count(self) -> int:
+        """Return the number of indexed papers."""
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def close(self):
+        """Close the underlying database connection."""
+        self.conn.close()
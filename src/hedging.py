@@ -0,0 +1,175 @@
+"""
+Per-request timeouts and hedged requests for the search providers.
+
+A Hedger runs each request in a worker thread. Once the request has taken
+longer than the provider's observed p95 latency, it sends a duplicate and
+returns whichever response arrives first:
+
+    hedger = Hedger("pubmed", RateLimiter(3.0), timeout=30.0, hedge=True)
+    body = hedger.call("efetch", lambda: fetch(ids))
+
+Every attempt, the duplicates included, takes a token from the provider's
+RateLimiter. The first attempt waits for its token; a duplicate is only sent
+when a token is free at that moment, so hedging never exceeds the quota.
+A request still running past the timeout is abandoned and TimeoutError is
+raised; its worker thread is a daemon and does not hold up the exit.
+"""
+import queue
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from src.metrics import METRICS, Histogram
+
+# Latency quantile after which a duplicate request is sent
+HEDGE_QUANTILE = 0.95
+
+# Completed requests needed before the quantile is trusted
+MIN_SAMPLES = 20
+
+
+class RateLimiter:
+    """Thread-safe token bucket: ``rate`` requests per second, bursts of up to ``burst``."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Initialize the RateLimiter.
+
+        Args:
+            rate: Requests per second
+            burst: Requests that may be sent back to back after an idle period
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self) -> bool:
+        """Take a token if one is free now; never waits."""
+        with self.lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def acquire(self):
+        """Take a token, waiting for one if the bucket is empty."""
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class Hedger:
+    """Runs a provider's requests with a timeout and, optionally, one hedged duplicate."""
+
+    def __init__(self, service: str, limiter: Optional[RateLimiter] = None, timeout: float = None,
+                 hedge: bool = False, hedge_after: float = None):
+        """
+        Initialize the Hedger.
+
+        Args:
+            service: Service name for metrics, e.g. "pubmed"
+            limiter: Rate limiter shared by every attempt (None for no limit)
+            timeout: Seconds after which a request is abandoned (None to wait indefinitely)
+            hedge: Send a duplicate once a request exceeds the observed p95 latency
+            hedge_after: Fixed hedge delay in seconds instead of the observed p95
+        """
+        self.service = service
+        self.limiter = limiter
+        self.timeout = timeout
+        self.hedge = hedge or hedge_after is not None
+        self.hedge_after = hedge_after
+        self.lock = threading.Lock()
+        # Latency of completed attempts, per operation
+        self.latency: Dict[str, Histogram] = {}
+
+    def hedge_delay(self, operation: str) -> Optional[float]:
+        """Seconds after which a duplicate of ``operation`` is sent, or None for no hedging yet."""
+        if not self.hedge:
+            return None
+        if self.hedge_after is not None:
+            return self.hedge_after
+        with self.lock:
+            histogram = self.latency.get(operation)
+            if histogram is None or histogram.count < MIN_SAMPLES:
+                return None
+            return histogram.quantile(HEDGE_QUANTILE)
+
+    def _observe(self, operation: str, seconds: float):
+        with self.lock:
+            self.latency.setdefault(operation, Histogram()).observe(seconds)
+
+    def _launch(self, attempt: int, operation: str, fn: Callable, results: queue.Queue):
+        def run():
+            start = time.perf_counter()
+            try:
+                value = fn()
+            except Exception as e:
+                results.put((attempt, False, e))
+            else:
+                self._observe(operation, time.perf_counter() - start)
+                results.put((attempt, True, value))
+
+        threading.Thread(target=run, name=f"{self.service}-{operation}-{attempt}", daemon=True).start()
+
+    def call(self, operation: str, fn: Callable):
+        """
+        Run ``fn`` with the timeout and hedging of this service.
+
+        Returns:
+            The result of the first attempt to succeed
+
+        Raises:
+            TimeoutError: No attempt finished within the timeout
+            Exception: The error of the last attempt, if every attempt failed
+        """
+        if self.limiter is not None:
+            self.limiter.acquire()
+        start = time.monotonic()
+        deadline = start + self.timeout if self.timeout else None
+        delay = self.hedge_delay(operation)
+        hedge_at = start + delay if delay is not None else None
+
+        results = queue.Queue()
+        self._launch(0, operation, fn, results)
+        pending = 1
+        while True:
+            wakeups = [t for t in (deadline, hedge_at) if t is not None]
+            wait = max(0.0, min(wakeups) - time.monotonic()) if wakeups else None
+            try:
+                attempt, ok, value = results.get(timeout=wait)
+            except queue.Empty:
+                if deadline is not None and time.monotonic() >= deadline:
+                    METRICS.inc("request_timeouts", service=self.service, operation=operation)
+                    raise TimeoutError(f"{self.service} {operation} timed out after {self.timeout:g}s")
+                hedge_at = None
+                if self.limiter is None or self.limiter.try_acquire():
+                    METRICS.inc("hedged_requests", service=self.service, operation=operation)
+                    self._launch(1, operation, fn, results)
+                    pending += 1
+                else:
+                    # The quota has no room for a duplicate; keep waiting on the first attempt
+                    METRICS.inc("hedges_skipped", service=self.service, operation=operation)
+                continue
+
+            pending -= 1
+            if ok:
+                if attempt:
+                    METRICS.inc("hedge_wins", service=self.service, operation=operation)
+                return value
+            if not pending:
+                raise value
@@ -0,0 +1,143 @@
+"""
+Shared keep-alive HTTP connection pools.
+
+E-utilities, Semantic Scholar and Zotero requests go through one client per
+HTTP library (httpx for the providers, pyzotero's httpx2, or httpx before
+pyzotero 1.15), so concurrent species reuse open connections instead of
+paying a TCP and TLS handshake for every request:
+
+    client = POOLS.client()             # httpx.Client
+    zotero_client = POOLS.client(httpx2)
+
+Each client keeps up to ``max_keepalive`` idle connections, opens at most
+``per_host`` concurrent connections to any one host, asks for gzip/deflate
+responses and speaks HTTP/2 when the ``h2`` package is installed. The
+compressed bytes received are counted per host in the ``wire_bytes`` metric.
+"""
+import importlib.util
+import threading
+from typing import Dict, Optional
+
+import httpx
+
+from src.metrics import METRICS
+
+# HTTP/2 needs the optional h2 package (pip install httpx[http2])
+HTTP2 = importlib.util.find_spec("h2") is not None
+
+ACCEPT_ENCODING = "gzip, deflate"
+
+
+class _MeteredStream:
+    """Response body stream that counts the bytes received and frees the host slot on close."""
+
+    def __init__(self, stream, host: str, release):
+        self.stream = stream
+        self.host = host
+        self.release = release
+        self.received = 0
+
+    def __iter__(self):
+        for chunk in self.stream:
+            self.received += len(chunk)
+            yield chunk
+
+    def close(self):
+        try:
+            self.stream.close()
+        finally:
+            if self.release is not None:
+                METRICS.inc("wire_bytes", self.received, host=self.host)
+                self.release()
+                self.release = None
+
+
+class _PooledTransport:
+    """Transport that caps concurrent requests per host and meters response bytes."""
+
+    def __init__(self, inner, httpx_module, per_host: int):
+        self.inner = inner
+        self.httpx = httpx_module
+        self.per_host = per_host
+        self.slots: Dict[str, threading.BoundedSemaphore] = {}
+        self.lock = threading.Lock()
+        # Clients only accept response streams derived from their own module's SyncByteStream
+        self.stream_class = type("MeteredStream", (_MeteredStream, httpx_module.SyncByteStream), {})
+
+    def _slot(self, host: str) -> threading.BoundedSemaphore:
+        with self.lock:
+            if host not in self.slots:
+                self.slots[host] = threading.BoundedSemaphore(self.per_host)
+            return self.slots[host]
+
+    def handle_request(self, request):
+        host = request.url.netloc.decode('ascii')
+        slot = self._slot(host)
+        slot.acquire()
+        try:
+            response = self.inner.handle_request(request)
+        except BaseException:
+            slot.release()
+            raise
+        return self.httpx.Response(response.status_code, headers=response.headers,
+                                   stream=self.stream_class(response.stream, host, slot.release),
+                                   extensions=response.extensions, request=request)
+
+    def close(self):
+        self.inner.close()
+
+
+class ConnectionPools:
+    """One pooled, keep-alive client per HTTP library, shared by every provider and Zotero client."""
+
+    def __init__(self, per_host: int = 8, max_keepalive: int = 16, keepalive_expiry: float = 30.0,
+                 timeout: float = 30.0, http2: Optional[bool] = None):
+        """
+        Initialize the ConnectionPools.
+
+        Args:
+            per_host: Concurrent connections (requests in flight) per host
+            max_keepalive: Idle connections kept open per client
+            keepalive_expiry: Seconds an idle connection is kept open
+            timeout: Default request timeout in seconds
+            http2: Use HTTP/2 (default: when the h2 package is installed)
+        """
+        self.per_host = per_host
+        self.max_keepalive = max_keepalive
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self.http2 = HTTP2 if http2 is None else http2
+        self.clients: Dict[str, object] = {}
+        self.lock = threading.Lock()
+
+    def client(self, httpx_module=httpx):
+        """
+        The shared client of ``httpx_module`` (httpx, or an API-compatible module such as httpx2).
+
+        Clients follow redirects and are safe to use from several threads.
+        """
+        with self.lock:
+            client = self.clients.get(httpx_module.__name__)
+            if client is None:
+                limits = httpx_module.Limits(max_keepalive_connections=self.max_keepalive,
+                                             keepalive_expiry=self.keepalive_expiry)
+                transport = httpx_module.HTTPTransport(http2=self.http2, limits=limits)
+                client = httpx_module.Client(
+                    transport=_PooledTransport(transport, httpx_module, self.per_host),
+                    headers={'Accept-Encoding': ACCEPT_ENCODING},
+                    timeout=self.timeout,
+                    follow_redirects=True,
+                )
+                self.clients[httpx_module.__name__] = client
+            return client
+
+    def close(self):
+        """Close every client and its idle connections."""
+        with self.lock:
+            clients, self.clients = list(self.clients.values()), {}
+        for client in clients:
+            client.close()
+
+
+# Pools shared by every module of a run
+POOLS = ConnectionPools()
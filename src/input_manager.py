@@ -1,7 +1,36 @@
-import yaml
-from dataclasses import dataclass
-from typing import List, Optional
+"""
+Species lists, read as a stream.
+
+A list can be YAML (a ``species`` sequence), JSON Lines (one species object
+per line) or CSV (columns ``name``, ``synonyms``, ``keywords`` and
+``date_range``; several synonyms or keywords are separated by ``;``):
+
+    species:                          {"name": "Gadus morhua", "keywords": ["eDNA"]}
+      - name: Gadus morhua
+        keywords: [eDNA]              name,synonyms,keywords,date_range
+                                      Gadus morhua,Atlantic cod,eDNA;environmental DNA,2020:2024
+
+iter_species() parses one entry at a time (YAML from parser events, not a
+loaded document), so a run can start on a 100k-taxon checklist while the
+rest of it is still being read. Entries without a usable name or with
+malformed fields are reported and skipped; a syntax error raises ValueError.
+"""
+import csv
+import json
 import os
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import yaml
+from yaml.composer import Composer
+from yaml.events import MappingEndEvent, MappingStartEvent, SequenceEndEvent, SequenceStartEvent
+
+# Input formats by file extension
+FORMATS = {'.yaml': 'yaml', '.yml': 'yaml', '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.csv': 'csv'}
+
+# Separator of several synonyms or keywords in one CSV cell
+CSV_LIST_SEPARATOR = ";"
+
 
 @dataclass
 class SpeciesQuery:
@@ -9,33 +38,135 @@ class SpeciesQuery:
     synonyms: List[str]
     keywords: List[str]
     date_range: Optional[str] = None
+    # Vernacular names from a taxonomy index (see src.taxonomy): searched, but never
+    # shared with other species, as "trout" or "cod" name many unrelated taxa
+    common_names: List[str] = field(default_factory=list)
+
+
+class _EntryLoader(Composer, getattr(yaml, 'CSafeLoader', yaml.SafeLoader)):
+    """
+    Safe YAML loader that composes one node at a time from the event stream.
+
+    libyaml's loader only composes whole documents; the pure-Python Composer
+    methods on top of its parser compose single entries at C parsing speed.
+    """
+
+    def __init__(self, stream):
+        super(Composer, self).__init__(stream)
+        Composer.__init__(self)
+
+    def next_object(self):
+        """Compose and construct the next node of the stream."""
+        return self.construct_document(self.compose_node(None, None))
+
 
 class InputManager:
-    def __init__(self, filepath: str):
+    def __init__(self, filepath: str, format: str = None):
+        """
+        Initialize the InputManager.
+
+        Args:
+            filepath: Path to the species list
+            format: "yaml", "jsonl" or "csv" (default: from the file extension, else YAML)
+        """
         self.filepath = filepath
         if not os.path.exists(filepath):
             raise FileNotFoundError(f"Input file not found: {filepath}")
+        self.format = format or FORMATS.get(os.path.splitext(filepath)[1].lower(), 'yaml')
+        if self.format not in set(FORMATS.values()):
+            raise ValueError(f"Unknown species list format: {self.format}")
 
     def load_species_list(self) -> List[SpeciesQuery]:
-        with open(self.filepath, 'r', encoding='utf-8') as f:
-            try:
-                data = yaml.safe_load(f)
-            except yaml.YAMLError as e:
-                raise ValueError(f"Error parsing YAML file: {e}")
+        return list(self.iter_species())
 
-        if not data or 'species' not in data:
+    def iter_species(self) -> Iterator[SpeciesQuery]:
+        """
+        Yield the species of the list as they are parsed.
+
+        Raises:
+            ValueError: The file is not valid YAML, JSON Lines or CSV, or has no species list
+        """
+        with open(self.filepath, 'r', encoding='utf-8', newline='' if self.format == 'csv' else None) as f:
+            for where, entry in getattr(self, f"_{self.format}_entries")(f):
+                species = self._species(entry, where)
+                if species is not None:
+                    yield species
+
+    def _yaml_entries(self, f) -> Iterator[Tuple[str, Dict]]:
+        loader = _EntryLoader(f)
+        try:
+            loader.get_event()  # StreamStart
+            if loader.check_event(yaml.StreamEndEvent):
+                raise ValueError("Invalid YAML format: 'species' list is missing")
+            loader.get_event()  # DocumentStart
+            if not loader.check_event(MappingStartEvent):
+                raise ValueError("Invalid YAML format: 'species' list is missing")
+            loader.get_event()
+            while not loader.check_event(MappingEndEvent):
+                key = loader.next_object()
+                if key != 'species':
+                    # Other top-level keys are parsed and discarded
+                    loader.next_object()
+                    continue
+                if not loader.check_event(SequenceStartEvent):
+                    break
+                loader.get_event()
+                while not loader.check_event(SequenceEndEvent):
+                    line = loader.peek_event().start_mark.line + 1
+                    yield f"line {line}", loader.next_object()
+                return
             raise ValueError("Invalid YAML format: 'species' list is missing")
+        except yaml.YAMLError as e:
+            raise ValueError(f"Error parsing YAML file: {e}")
+        finally:
+            loader.dispose()
+
+    def _jsonl_entries(self, f) -> Iterator[Tuple[str, Dict]]:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield f"line {number}", json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Error parsing JSON Lines file at line {number}: {e}")
+
+    def _csv_entries(self, f) -> Iterator[Tuple[str, Dict]]:
+        reader = csv.DictReader(f)
+        if not reader.fieldnames or 'name' not in reader.fieldnames:
+            raise ValueError("Invalid CSV format: a 'name' column is required")
+        try:
+            for row in reader:
+                entry = {key: value for key, value in row.items() if key and value not in (None, "")}
+                for key in ('synonyms', 'keywords'):
+                    if key in entry:
+                        entry[key] = [part.strip() for part in entry[key].split(CSV_LIST_SEPARATOR) if part.strip()]
+                yield f"line {reader.line_num}", entry
+        except csv.Error as e:
+            raise ValueError(f"Error parsing CSV file at line {reader.line_num}: {e}")
 
-        species_list = []
-        for item in data['species']:
-            if 'name' not in item:
-                continue # Skip invalid entries
-            
-            species_list.append(SpeciesQuery(
-                species_name=item['name'],
-                synonyms=item.get('synonyms', []),
-                keywords=item.get('keywords', []),
-                date_range=item.get('date_range')
-            ))
-        
-        return species_list
+    @staticmethod
+    def _species(entry, where: str) -> Optional[SpeciesQuery]:
+        """Validate one entry; a malformed one is reported and skipped (None)."""
+        if not isinstance(entry, dict):
+            print(f"Skipping species entry at {where}: expected a mapping, got {type(entry).__name__}")
+            return None
+        name = entry.get('name')
+        if name is None or not str(name).strip():
+            # Entries without a name are skipped silently, as they always were
+            return None
+        lists = {}
+        for key in ('synonyms', 'keywords'):
+            value = entry.get(key) or []
+            if isinstance(value, str):
+                value = [value]
+            if not isinstance(value, list) or any(isinstance(item, (dict, list)) for item in value):
+                print(f"Skipping species entry at {where} ({name}): '{key}' must be a list of names")
+                return None
+            lists[key] = [str(item) for item in value]
+        date_range = entry.get('date_range')
+        return SpeciesQuery(
+            species_name=str(name).strip(),
+            synonyms=lists['synonyms'],
+            keywords=lists['keywords'],
+            date_range=str(date_range) if date_range is not None else None,
+        )
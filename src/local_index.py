@@ -0,0 +1,239 @@
+import json
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from src.providers.base import SearchResult
+
+# Identifier under which search() returns the Zotero item key of an indexed paper
+ZOTERO_IDENTIFIER = "zotero"
+
+
+class LocalIndex:
+    """
+    On-disk full-text index of cached papers, backed by SQLite FTS5.
+    Papers are stored once (keyed by DOI or normalized title) regardless of
+    how many species they were cached under.
+    """
+
+    def __init__(self, index_file: str = "data/local_index.sqlite"):
+        """
+        Initialize the LocalIndex.
+
+        Args:
+            index_file: Path to the SQLite index file (default: data/local_index.sqlite)
+        """
+        self.index_file = Path(index_file)
+        self.index_file.parent.mkdir(parents=True, exist_ok=True)
+        # The run pipeline searches and writes from different threads; self.lock
+        # serializes use of the shared connection
+        self.conn = sqlite3.connect(str(self.index_file), check_same_thread=False)
+        self.lock = threading.RLock()
+        # WAL lets searches run while a nightly ingestion is writing
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._initialize_index()
+
+    def _initialize_index(self):
+        """Create the paper table and its FTS5 shadow table if missing."""
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS papers (
+                id INTEGER PRIMARY KEY,
+                record_key TEXT UNIQUE NOT NULL,
+                title TEXT,
+                authors TEXT,
+                year TEXT,
+                doi TEXT,
+                source TEXT,
+                url TEXT,
+                abstract TEXT,
+                zotero_key TEXT,
+                identifiers TEXT
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(
+                title, abstract, content='papers', content_rowid='id'
+            );
+        """)
+        # Indexes created before identifiers were tracked lack the column
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(papers)")}
+        if 'identifiers' not in columns:
+            self.conn.execute("ALTER TABLE papers ADD COLUMN identifiers TEXT")
+        self.conn.commit()
+
+    @staticmethod
+    def _record_key(paper: SearchResult) -> str:
+        """Identity used to store a paper only once (same rule as main's dedup)."""
+        return paper.doi if paper.doi else paper.title.lower().strip()
+
+    def add_papers(self, papers: Iterable[SearchResult],
+                   zotero_keys: Optional[List[str]] = None) -> int:
+        """
+        Add papers to the index, skipping ones that are already indexed.
+
+        Args:
+            papers: SearchResult objects to index
+            zotero_keys: Optional Zotero item keys corresponding to each paper
+
+        Returns:
+            Number of newly indexed papers
+        """
+        papers = list(papers)
+        keys = list(zotero_keys) if zotero_keys else [None] * len(papers)
+        added = 0
+        with self.lock, self.conn:
+            for paper, zotero_key in zip(papers, keys):
+                record_key = self._record_key(paper)
+                if record_key and self.upsert_paper(record_key, paper, zotero_key, replace=False):
+                    added += 1
+        return added
+
+    def upsert_paper(self, record_key: str, paper: SearchResult,
+                     zotero_key: Optional[str] = None, replace: bool = True) -> bool:
+        """
+        Insert a paper under an explicit key, or replace the stored version.
+
+        Does not commit; callers group calls in a transaction (``with index.conn:``).
+
+        Args:
+            record_key: Unique key of the record (e.g. "pmid:12345")
+            paper: SearchResult to store
+            zotero_key: Optional Zotero item key
+            replace: Overwrite an existing record with the same key
+
+        Returns:
+            True if the paper was written, False if it already existed and replace is False
+        """
+        existing = self.conn.execute(
+            "SELECT id FROM papers WHERE record_key = ?", (record_key,)
+        ).fetchone()
+        if existing:
+            if not replace:
+                return False
+            self.delete_paper(record_key)
+        cur = self.conn.execute(
+            "INSERT INTO papers "
+            "(record_key, title, authors, year, doi, source, url, abstract, zotero_key, identifiers) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (record_key, paper.title, json.dumps(list(paper.authors or [])),
+             paper.year, paper.doi, paper.source, paper.url, paper.abstract,
+             zotero_key, json.dumps(dict(paper.identifiers or {})))
+        )
+        self.conn.execute(
+            "INSERT INTO papers_fts (rowid, title, abstract) VALUES (?, ?, ?)",
+            (cur.lastrowid, paper.title or "", paper.abstract or "")
+        )
+        return True
+
+    def delete_paper(self, record_key: str) -> bool:
+        """
+        Remove a paper and its full-text entry. Does not commit.
+
+        Returns:
+            True if a record was deleted
+        """
+        row = self.conn.execute(
+            "SELECT id, title, abstract FROM papers WHERE record_key = ?", (record_key,)
+        ).fetchone()
+        if not row:
+            return False
+        rowid, title, abstract = row
+        self.conn.execute(
+            "INSERT INTO papers_fts (papers_fts, rowid, title, abstract) VALUES ('delete', ?, ?, ?)",
+            (rowid, title or "", abstract or "")
+        )
+        self.conn.execute("DELETE FROM papers WHERE id = ?", (rowid,))
+        return True
+
+    def index_cache(self, abstract_cache) -> int:
+        """
+        Index every paper stored in an AbstractCache.
+
+        Args:
+            abstract_cache: AbstractCache instance to read papers from
+
+        Returns:
+            Number of newly indexed papers
+        """
+        cache_data = abstract_cache._read_cache()
+        added = 0
+        for sp in cache_data.get('species', []):
+            papers = []
+            keys = []
+            for entry in sp.get('papers', []):
+                papers.append(SearchResult(
+                    title=entry.get('title') or "",
+                    authors=entry.get('authors') or [],
+                    year=entry.get('year') or "",
+                    doi=entry.get('doi') or "",
+                    source=entry.get('source') or "",
+                    abstract=entry.get('abstract') or "",
+                    url=entry.get('url') or "",
+                    identifiers=entry.get('identifiers') or {}
+                ))
+                keys.append(entry.get('zotero_key'))
+            added += self.add_papers(papers, keys)
+        return added
+
+    def search(self, match_expression: str, limit: int = 10) -> List[SearchResult]:
+        """
+        Run an FTS5 MATCH expression and return ranked results.
+
+        Title hits are weighted above abstract hits in the BM25 ranking. Papers
+        indexed with a Zotero item key carry it as ``identifiers['zotero']``, so
+        a run files them instead of uploading them again.
+
+        Args:
+            match_expression: FTS5 query string
+            limit: Maximum number of results
+
+        Returns:
+            List of SearchResult objects, best match first
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT p.title, p.authors, p.year, p.doi, p.source, p.url, p.abstract, p.identifiers, p.zotero_key "
+                "FROM papers_fts JOIN papers p ON p.id = papers_fts.rowid "
+                "WHERE papers_fts MATCH ? "
+                "ORDER BY bm25(papers_fts, 10.0, 1.0) LIMIT ?",
+                (match_expression, limit)
+            ).fetchall()
+        results = []
+        for title, authors, year, doi, source, url, abstract, identifiers, zotero_key in rows:
+            identifiers = json.loads(identifiers) if identifiers else {}
+            if zotero_key:
+                identifiers[ZOTERO_IDENTIFIER] = zotero_key
+            results.append(SearchResult(
+                title=title or "",
+                authors=json.loads(authors) if authors else [],
+                year=year or "",
+                doi=doi or "",
+                source=source or "",
+                abstract=abstract or "",
+                url=url or "",
+                identifiers=identifiers
+            ))
+        return results
+
+    def count(self) -> int:
+        """Return the number of indexed papers."""
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+
+    def close(self):
+        """Close the underlying database connection."""
+        self.conn.close()
+
+
+if __name__ == "__main__":
+    # Bootstrap or refresh the index from an existing abstract cache:
+    #   python -m src.local_index [cache_file] [index_file]
+    from src.abstract_cache import AbstractCache
+
+    cache_path = sys.argv[1] if len(sys.argv) > 1 else "data/abstracts_cache.yaml"
+    index_path = sys.argv[2] if len(sys.argv) > 2 else "data/local_index.sqlite"
+    index = LocalIndex(index_path)
+    new_papers = index.index_cache(AbstractCache(cache_path))
+    print(f"Indexed {new_papers} new papers ({index.count()} total) into {index_path}")
+    index.close()
@@ -1,28 +1,146 @@
 import argparse
+import importlib
 import sys
-from typing import List
+from datetime import timedelta
 
-from src.config import Config
-from src.input_manager import InputManager, SpeciesQuery
-from src.providers.pubmed import PubMedProvider
-from src.providers.semantic_scholar import SemanticScholarProvider
-from src.zotero_manager import ZoteroManager
-from src.providers.base import SearchResult
-from src.abstract_cache import AbstractCache
+from src.metrics import METRICS
+from src.profiling import PROCESS_WIDE, PROFILER
+
+# Where each class (and the shared POOLS) used by main() lives. They are
+# imported on first use, so a run only pays for the libraries its flags need:
+# --help imports none of them, --dry-run skips pyzotero, and --offline also
+# skips Biopython, semanticscholar and httpx.
+LAZY_IMPORTS = {
+    'Config': 'src.config',
+    'InputManager': 'src.input_manager',
+    'PubMedProvider': 'src.providers.pubmed',
+    'SemanticScholarProvider': 'src.providers.semantic_scholar',
+    'LocalSearchProvider': 'src.providers.local',
+    'LocalPubMedProvider': 'src.providers.local',
+    'ZoteroManager': 'src.zotero_manager',
+    'AbstractCache': 'src.abstract_cache',
+    'Cassette': 'src.cassette',
+    'POOLS': 'src.http_pool',
+    'DedupIndex': 'src.dedup_index',
+    'NegativeCache': 'src.negative_cache',
+    'TaxonomyIndex': 'src.taxonomy',
+    'RunJournal': 'src.run_journal',
+    'SpeciesRunner': 'src.runner',
+    'select_providers': 'src.providers.registry',
+    'plan_search_workers': 'src.providers.registry',
+    'LOCAL_PUBMED': 'src.providers.registry',
+    'plan_run': 'src.planner',
+    'RunPlan': 'src.planner',
+    'parse_shard': 'src.shards',
+    'shard_of': 'src.shards',
+}
+
+
+def __getattr__(name):
+    """Import a LAZY_IMPORTS name on first access and keep it as a module attribute."""
+    if name not in LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(LAZY_IMPORTS[name]), name)
+    globals()[name] = value
+    return value
+
+
+def load(name):
+    """A LAZY_IMPORTS name, imported if needed (tests patch these on this module)."""
+    return getattr(sys.modules[__name__], name)
 
 def main():
     parser = argparse.ArgumentParser(description="eDNA Literature Miner")
-    parser.add_argument("species_list", help="Path to YAML file containing species list")
+    parser.add_argument("species_list", help="Path to the species list (YAML, or .jsonl / .csv)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Feed species to the pipeline as the list is parsed, instead of loading it first "
+                             "(for very large checklists)")
     parser.add_argument("--dry-run", action="store_true", help="Perform search but do not save to Zotero")
     parser.add_argument("--limit", type=int, default=10, help="Number of results per provider per species")
+    parser.add_argument("--local-first", action="store_true",
+                        help="Search the local index of cached papers first and skip remote providers when it has enough hits")
+    parser.add_argument("--offline", action="store_true",
+                        help="Search only the local index (no network access; implies --dry-run)")
+    parser.add_argument("--index", default="data/local_index.sqlite", help="Path to the local full-text index")
+    parser.add_argument("--dedup-threshold", type=float, default=0.8,
+                        help="Title similarity (0-1) above which records without conflicting DOIs are duplicates")
+    parser.add_argument("--dedup-index", default="data/dedup_index.sqlite",
+                        help="Persistent index of papers already in Zotero, shared across runs and species ('' to disable)")
+    parser.add_argument("--negative-cache", default="data/negative_cache.sqlite",
+                        help="Record provider queries that found nothing and skip them until a re-check that backs "
+                             "off exponentially ('' to disable)")
+    parser.add_argument("--negative-max-days", type=float, default=90, metavar="DAYS",
+                        help="Longest wait before an empty query is searched again (default: 90)")
+    parser.add_argument("--taxonomy", default=None, metavar="INDEX",
+                        help="Add each species' synonyms and common names from a taxonomy index "
+                             "(build one from an NCBI taxdump with python -m src.taxonomy build)")
+    parser.add_argument("--no-common-names", action="store_true",
+                        help="With --taxonomy, add scientific synonyms only")
+    parser.add_argument("--pubmed-index", default=None,
+                        help="Answer PubMed queries from a local index built by src.pubmed_ingest instead of E-utilities")
+    parser.add_argument("--target", type=int, default=None,
+                        help="Stop searching a species once this many unique results are found")
+    parser.add_argument("--page-size", type=int, default=None,
+                        help="Results fetched per provider request (default: provider maximum)")
+    parser.add_argument("--no-merge-queries", action="store_true",
+                        help="Search every species with its own query, even when species share a name or synonym")
+    parser.add_argument("--merge-window", type=int, default=10_000, metavar="N",
+                        help="With --stream, look for species sharing a name or synonym N species at a time")
+    parser.add_argument("--providers", default=None, metavar="NAMES",
+                        help="Comma-separated search providers, in search order (default: pubmed,semantic_scholar; "
+                             "plugins register more under the edna_lit_miner.providers entry point group)")
+    parser.add_argument("--search-workers", type=int, default=None,
+                        help="Species searched concurrently (default: the sum of the providers' concurrency caps)")
+    parser.add_argument("--upload-workers", type=int, default=1,
+                        help="Species uploaded to Zotero concurrently")
+    parser.add_argument("--queue-size", type=int, default=4,
+                        help="Species buffered between pipeline stages")
+    parser.add_argument("--shard", default=None, metavar="I/N",
+                        help="Process only the species hashed to shard I of N (merge outputs with src.shards)")
+    parser.add_argument("--plan", nargs="?", const="data/plan.json", default=None, metavar="PATH",
+                        help="Only count each species' results (one cheap request per provider), print the "
+                             "expected yield and cost of the run, and write the plan to PATH "
+                             "(default: data/plan.json); nothing is fetched or uploaded")
+    parser.add_argument("--from-plan", default=None, metavar="PATH",
+                        help="Run species in order of the expected yield counted by --plan, capping each "
+                             "provider's limit at its count and skipping species that matched nothing")
+    parser.add_argument("--metrics-json", default=None, metavar="PATH",
+                        help="Write request, stage and cache metrics as JSON at the end of the run")
+    parser.add_argument("--metrics-prom", default=None, metavar="PATH",
+                        help="Write metrics as a Prometheus textfile (for the node exporter textfile collector)")
+    parser.add_argument("--profile", nargs="?", const="data/profile", default=None, metavar="DIR",
+                        help="Profile each stage and write pstats dumps and a summary to DIR (default: data/profile)")
+    parser.add_argument("--profile-sample-interval", type=float, default=None, metavar="SECONDS",
+                        help="With --profile, also sample stacks every SECONDS into profile.folded (flamegraph input)")
+    parser.add_argument("--resume", default=None, metavar="RUN_ID",
+                        help="Resume an interrupted run, skipping the stages it already finished")
+    parser.add_argument("--journal-dir", default="data/runs",
+                        help="Directory of run journals ('' to disable journaling)")
+    parser.add_argument("--request-timeout", type=float, default=None, metavar="SECONDS",
+                        help="Abandon a PubMed or Semantic Scholar request after SECONDS")
+    parser.add_argument("--hedge", action="store_true",
+                        help="Send a duplicate PubMed or Semantic Scholar request once one exceeds the observed p95 "
+                             "latency, within the provider's rate limit")
+    parser.add_argument("--no-pool", action="store_true",
+                        help="Let each client open its own connections instead of the shared keep-alive pools")
+    cassette_group = parser.add_mutually_exclusive_group()
+    cassette_group.add_argument("--record", default=None, metavar="CASSETTE",
+                                help="Record every PubMed, Semantic Scholar and Zotero exchange to CASSETTE")
+    cassette_group.add_argument("--replay", default=None, metavar="CASSETTE",
+                                help="Answer PubMed, Semantic Scholar and Zotero requests from CASSETTE (no network)")
     
     args = parser.parse_args()
+    if args.offline or args.plan:
+        args.dry_run = True
+    if args.profile:
+        PROFILER.enable(args.profile, sample_interval=args.profile_sample_interval)
 
     # 1. Load Config
     try:
-        config = Config()
-        if not args.dry_run:
-            config.validate()
+        with PROFILER.stage("config"):
+            config = load("Config")()
+            if not args.dry_run:
+                config.validate()
         print("Configuration loaded.")
     except Exception as e:
         print(f"Configuration Error: {e}")
@@ -30,49 +148,186 @@ def main():
 
     # 2. Load Species List
     try:
-        input_manager = InputManager(args.species_list)
-        species_list = input_manager.load_species_list()
-        print(f"Loaded {len(species_list)} species from {args.species_list}")
+        input_manager = load("InputManager")(args.species_list)
+        stream = args.stream
+        if stream and (args.plan or args.from_plan or args.resume):
+            print("--stream is ignored with --plan, --from-plan and --resume, which need the whole list.")
+            stream = False
+        if stream:
+            # Parsed lazily: species enter the pipeline as they are read
+            species_list = input_manager.iter_species()
+            print(f"Streaming species from {args.species_list}")
+        else:
+            with PROFILER.stage("input"):
+                species_list = input_manager.load_species_list()
+            print(f"Loaded {len(species_list)} species from {args.species_list}")
+        shard = None
+        if args.shard:
+            shard = load("parse_shard")(args.shard)
+            shard_of = load("shard_of")
+            if stream:
+                species_list = (sp for sp in species_list if shard_of(sp.species_name, shard[1]) == shard[0])
+                print(f"Shard {shard[0]}/{shard[1]}: processing the species assigned to this machine.")
+            else:
+                species_list = [sp for sp in species_list if shard_of(sp.species_name, shard[1]) == shard[0]]
+                print(f"Shard {shard[0]}/{shard[1]}: {len(species_list)} species assigned to this machine.")
     except Exception as e:
         print(f"Input Error: {e}")
         sys.exit(1)
 
+    # Synonyms and common names from a local taxonomy, added before planning and query merging
+    taxonomy = None
+    if args.taxonomy:
+        try:
+            taxonomy = load("TaxonomyIndex")(args.taxonomy)
+        except Exception as e:
+            print(f"Taxonomy Error: {e}")
+            sys.exit(1)
+        common_names = not args.no_common_names
+        if stream:
+            species_list = (taxonomy.expand(sp, common_names=common_names) for sp in species_list)
+            print(f"Expanding synonyms from {args.taxonomy} ({len(taxonomy)} taxa).")
+        else:
+            expanded = [taxonomy.expand(sp, common_names=common_names) for sp in species_list]
+            added = sum(new is not old for new, old in zip(expanded, species_list))
+            species_list = expanded
+            print(f"Expanded synonyms of {added} of {len(species_list)} species from {args.taxonomy}.")
+
+    # Counts from an earlier --plan: highest expected yield first, empty species skipped
+    species_limits = None
+    if args.from_plan:
+        try:
+            plan = load("RunPlan").load(args.from_plan)
+        except Exception as e:
+            print(f"Plan Error: {e}")
+            sys.exit(1)
+        species_list, skipped = plan.order(species_list, args.limit)
+        species_limits = plan.limits(args.limit)
+        print(f"Following plan {args.from_plan}: {len(species_list)} species by expected yield, "
+              f"{len(skipped)} skipped (no results).")
+
+    # Cassette: records the run's HTTP exchanges, or replays a recorded run
+    cassette = None
+    if args.record or args.replay:
+        try:
+            cassette = load("Cassette")(args.record or args.replay, mode="record" if args.record else "replay")
+        except Exception as e:
+            print(f"Cassette Error: {e}")
+            sys.exit(1)
+        if cassette.replaying:
+            print(f"Replaying {len(cassette)} recorded exchanges from {cassette.path}.")
+        else:
+            print(f"Recording exchanges to {cassette.path}.")
+
+    # Shared keep-alive connections for E-utilities, Semantic Scholar and Zotero
+    pools = None if args.no_pool or args.offline else load("POOLS")
+
     # 3. Initialize Providers
+    try:
+        specs = load("select_providers")(args.providers)
+    except ValueError as e:
+        print(f"Provider Error: {e}")
+        sys.exit(1)
     providers = []
-    
-    # PubMed
-    if config.EMAIL:
+    local_provider = None
+    if args.local_first or args.offline:
         try:
-            providers.append(PubMedProvider(email=config.EMAIL))
-            print("PubMed Provider initialized.")
+            local_provider = load("LocalSearchProvider")(index_file=args.index)
+            print(f"Local index initialized ({local_provider.index.count()} papers).")
         except Exception as e:
-             print(f"Failed to init PubMed Provider: {e}")
-    elif args.dry_run:
-        print("Dry Run: Using dummy email for PubMed.")
-        providers.append(PubMedProvider(email="dryrun@example.com"))
-    else:
-         print("Warning: EMAIL env var not set, skipping PubMed.")
-
-    # Semantic Scholar
-    # API Key is optional but good to have
-    try:
-        providers.append(SemanticScholarProvider(api_key=config.SEMANTIC_SCHOLAR_API_KEY))
-        print("Semantic Scholar Provider initialized.")
-    except Exception as e:
-        print(f"Failed to init Semantic Scholar Provider: {e}")
+            print(f"Failed to open local index: {e}")
+            if args.offline:
+                sys.exit(1)
+
+    # Remote providers: only the selected ones are imported and built, in the order given
+    if args.offline:
+        print("Offline mode: searching local index only.")
+    for spec in specs:
+        provider = None
+        if spec.name == "pubmed" and args.pubmed_index:
+            spec = load("LOCAL_PUBMED")
+            try:
+                provider = load("LocalPubMedProvider")(index_file=args.pubmed_index)
+                print("Local PubMed Provider initialized.")
+            except Exception as e:
+                print(f"Failed to open local PubMed index: {e}")
+        elif spec.network and args.offline:
+            continue
+        elif spec.name == "pubmed":
+            if config.EMAIL:
+                try:
+                    provider = load("PubMedProvider")(email=config.EMAIL, base_url=config.PUBMED_EUTILS_URL or None,
+                                                      cassette=cassette, timeout=args.request_timeout,
+                                                      hedge=args.hedge, pools=pools)
+                    print("PubMed Provider initialized.")
+                except Exception as e:
+                    print(f"Failed to init PubMed Provider: {e}")
+            elif args.dry_run:
+                print("Dry Run: Using dummy email for PubMed.")
+                provider = load("PubMedProvider")(email="dryrun@example.com",
+                                                  base_url=config.PUBMED_EUTILS_URL or None,
+                                                  cassette=cassette, timeout=args.request_timeout,
+                                                  hedge=args.hedge, pools=pools)
+            else:
+                print("Warning: EMAIL env var not set, skipping PubMed.")
+        elif spec.name == "semantic_scholar":
+            # API Key is optional but good to have
+            try:
+                provider = load("SemanticScholarProvider")(api_key=config.SEMANTIC_SCHOLAR_API_KEY,
+                                                           api_url=config.SEMANTIC_SCHOLAR_API_URL or None,
+                                                           cassette=cassette,
+                                                           timeout=args.request_timeout,
+                                                           hedge=args.hedge,
+                                                           pools=pools)
+                print("Semantic Scholar Provider initialized.")
+            except Exception as e:
+                print(f"Failed to init Semantic Scholar Provider: {e}")
+        else:
+            # Provider from an entry point plugin
+            try:
+                provider = spec.load()(config=config, cassette=cassette, timeout=args.request_timeout,
+                                       hedge=args.hedge, pools=pools)
+                print(f"{spec.name} provider initialized.")
+            except Exception as e:
+                print(f"Failed to init {spec.name} provider: {e}")
+        if provider is not None:
+            provider.spec = spec
+            providers.append(provider)
 
-    if not providers:
+    if not providers and local_provider is None:
         print("No search providers available. Exiting.")
         sys.exit(1)
 
+    # Preflight: count only, estimate the run, and stop
+    if args.plan:
+        workers = args.search_workers or load("plan_search_workers")(provider.spec for provider in providers)
+        plan = load("plan_run")(species_list, providers, limit=args.limit, page_size=args.page_size,
+                                workers=workers)
+        print(plan.report())
+        try:
+            plan.write(args.plan)
+            print(f"Plan written to {args.plan} (run it with --from-plan {args.plan})")
+        except Exception as e:
+            print(f"Failed to write plan to {args.plan}: {e}")
+        if taxonomy is not None:
+            taxonomy.close()
+        if pools is not None:
+            pools.close()
+        if cassette is not None:
+            cassette.close()
+        return
+
     # 4. Initialize Zotero (if not dry run)
     zotero_manager = None
     if not args.dry_run:
         try:
-            zotero_manager = ZoteroManager(
+            zotero_manager = load("ZoteroManager")(
                 library_id=config.ZOTERO_LIBRARY_ID,
                 api_key=config.ZOTERO_API_KEY,
-                library_type=config.ZOTERO_LIBRARY_TYPE
+                library_type=config.ZOTERO_LIBRARY_TYPE,
+                endpoint=config.ZOTERO_API_URL or None,
+                cassette=cassette,
+                pools=pools
             )
             print("Zotero Manager initialized.")
         except Exception as e:
@@ -80,87 +335,129 @@ def main():
              sys.exit(1)
 
     # 5. Initialize Abstract Cache
-    abstract_cache = AbstractCache()
+    abstract_cache = load("AbstractCache")()
     print("Abstract Cache initialized.")
+    local_index = None
+    dedup_index = None
+    if not args.dry_run:
+        # Kept in step with the cache only when it is searched (--local-first); no index file otherwise
+        local_index = local_provider.index if local_provider else None
+        if args.dedup_index:
+            dedup_index = load("DedupIndex")(args.dedup_index, threshold=args.dedup_threshold)
+            print(f"Dedup index initialized ({dedup_index.count()} known papers).")
+    negative_cache = None
+    if not args.dry_run and args.negative_cache:
+        negative_cache = load("NegativeCache")(args.negative_cache,
+                                               max_interval=timedelta(days=args.negative_max_days))
+        print(f"Negative cache initialized ({negative_cache.count()} queries known to find nothing).")
 
-    # 6. Process Each Species
-    for species in species_list:
-        print(f"\nProcessing species: {species.species_name}")
-        
-        # Build Query
-        # Simple strategy: Name OR Synonyms + Keywords
-        # e.g. ("Gadus morhua" OR "Atlantic cod") AND ("eDNA" OR "environmental DNA")
-        
-        query_terms = [f'"{species.species_name}"'] + [f'"{syn}"' for syn in species.synonyms]
-        if len(query_terms) > 1:
-            name_part = "(" + " OR ".join(query_terms) + ")"
+    # Run journal: records finished stages so an interrupted run can be resumed
+    journal = None
+    if not args.dry_run and args.journal_dir:
+        try:
+            run_id = args.resume
+            if run_id is None and shard is not None:
+                run_id = load("RunJournal").new_run_id(f"shard{shard[0]}of{shard[1]}")
+            journal = load("RunJournal")(args.journal_dir, run_id=run_id, resume=bool(args.resume))
+        except Exception as e:
+            print(f"Journal Error: {e}")
+            sys.exit(1)
+        if args.resume:
+            finished = sum(journal.completed(sp.species_name, 'cached') for sp in species_list)
+            print(f"Resuming run {journal.run_id}: {finished} of {len(species_list)} species already done.")
         else:
-            name_part = query_terms[0]
-            
-        keyword_part = ""
-        if species.keywords:
-            kw_terms = [f'"{kw}"' for kw in species.keywords]
-            if len(kw_terms) > 1:
-                keyword_part = " AND (" + " OR ".join(kw_terms) + ")"
-            else:
-                keyword_part = f" AND {kw_terms[0]}"
-        
-        full_query = name_part + keyword_part
-        print(f"  Query: {full_query}")
-        
-        all_results: List[SearchResult] = []
-        
-        for provider in providers:
-            print(f"  Searching {provider.__class__.__name__}...")
-            results = provider.search(full_query, limit=args.limit)
-            print(f"    Found {len(results)} results.")
-            all_results.extend(results)
-            
-        # Deduplication (by Title or DOI)
-        unique_results = {}
-        for res in all_results:
-            key = res.doi if res.doi else res.title.lower().strip()
-            if key not in unique_results:
-                unique_results[key] = res
-        
-        deduplicated = list(unique_results.values())
-        print(f"  Total unique results: {len(deduplicated)}")
-        
-        if args.dry_run:
-            print("  Dry Run: Skipping Zotero upload and cache.")
-            for res in deduplicated[:3]: # Print first 3
-                 print(f"    - [{res.source}] {res.title} ({res.year})")
+            print(f"Run ID: {journal.run_id} (resume with --resume {journal.run_id})")
+    elif args.resume:
+        print("Nothing to resume: journaling is disabled for dry runs and with --journal-dir ''.")
+        sys.exit(1)
+
+    # Extra Zotero clients so concurrent uploads do not share one session
+    zotero_managers = []
+    if zotero_manager is not None:
+        zotero_managers = [zotero_manager] + [
+            load("ZoteroManager")(
+                library_id=config.ZOTERO_LIBRARY_ID,
+                api_key=config.ZOTERO_API_KEY,
+                library_type=config.ZOTERO_LIBRARY_TYPE,
+                endpoint=config.ZOTERO_API_URL or None,
+                cassette=cassette,
+                pools=pools
+            )
+            for _ in range(args.upload_workers - 1)
+        ]
+
+    # 6. Process Each Species
+    # Search, dedup, upload and cache run as pipeline stages, so the search for
+    # one species overlaps with the Zotero upload of the previous one
+    runner = load("SpeciesRunner")(
+        providers,
+        limit=args.limit,
+        local_provider=local_provider,
+        dedup_threshold=args.dedup_threshold,
+        target=args.target,
+        page_size=args.page_size,
+        zotero_managers=zotero_managers,
+        abstract_cache=abstract_cache,
+        local_index=local_index,
+        dedup_index=dedup_index,
+        journal=journal,
+        dry_run=args.dry_run,
+        species_limits=species_limits,
+        negative_cache=negative_cache,
+        merge_queries=not args.no_merge_queries,
+        merge_window=args.merge_window
+    )
+    search_workers = args.search_workers
+    if search_workers is None:
+        search_workers = load("plan_search_workers")(provider.spec for provider in providers)
+        print(f"Searching {search_workers} species at once (the providers' concurrency caps).")
+    try:
+        runner.run(
+            species_list,
+            search_workers=search_workers,
+            upload_workers=args.upload_workers,
+            queue_size=args.queue_size
+        )
+    except ValueError as e:
+        # A streamed species list turned out malformed part-way; the species before it were processed
+        print(f"Input Error: {e}")
+        sys.exit(1)
+    if runner.failed:
+        names = ", ".join(sp.species_name for sp in runner.failed)
+        print(f"\nSearch failed for {len(runner.failed)} species: {names}")
+        if journal is not None:
+            print(f"Retry them with --resume {journal.run_id}")
+    if journal is not None:
+        journal.close()
+    if taxonomy is not None:
+        taxonomy.close()
+    if pools is not None:
+        pools.close()
+    if cassette is not None:
+        cassette.close()
+        if cassette.replaying:
+            print(f"Replayed {cassette.replayed} exchanges from {cassette.path}.")
         else:
-            if zotero_manager:
-                collection_name = f"eDNA - {species.species_name}"
-                try:
-                    col_id = zotero_manager.create_or_get_collection(collection_name)
-                    print(f"  Target Collection ID: {col_id}")
-
-                    zotero_keys = []
-                    count = 0
-                    for item in deduplicated:
-                        # Simple check might be needed here to avoid duplicates in Zotero if code runs twice
-                        # But requires searching Zotero first. For MVP, we just add.
-                        new_key = zotero_manager.add_item(item, col_id)
-                        if new_key:
-                            zotero_keys.append(new_key)
-                            count += 1
-                    print(f"  Added {count} items to Zotero.")
-
-                    # Save to abstract cache
-                    if zotero_keys:
-                        papers_to_cache = [item for item, key in zip(deduplicated, zotero_keys) if key]
-                        abstract_cache.add_papers(
-                            species_name=species.species_name,
-                            papers=papers_to_cache,
-                            zotero_keys=zotero_keys,
-                            keywords=species.keywords
-                        )
-                        print(f"  Cached {len(zotero_keys)} papers to abstracts_cache.yaml")
+            print(f"Recorded {cassette.recorded} exchanges to {cassette.path}.")
 
-                except Exception as e:
-                    print(f"  Error processing Zotero for {species.species_name}: {e}")
+    summary = METRICS.summary_lines()
+    if summary:
+        print("\nRequest summary:")
+        print("\n".join(summary))
+    for path, write in ((args.metrics_json, METRICS.write_json), (args.metrics_prom, METRICS.write_prometheus)):
+        if path:
+            try:
+                write(path)
+                print(f"Metrics written to {path}")
+            except Exception as e:
+                print(f"Failed to write metrics to {path}: {e}")
+
+    profile_dir = PROFILER.finish()
+    if profile_dir is not None:
+        print("\nProfile (wall-clock vs CPU per stage):")
+        print(PROFILER.summary())
+        dumps = "run.pstats" if PROCESS_WIDE else "<stage>.pstats"
+        print(f"Profile written to {profile_dir} (summary.txt, {dumps})")
 
     print("\nProcessing Complete.")
 
@@ -0,0 +1,251 @@
+"""
+Run instrumentation: request counts, bytes, errors and latency histograms.
+
+Code records into the module-level METRICS registry:
+
+    with METRICS.request("pubmed", "esearch"):
+        ...
+
+and main exports it at the end of a run as JSON (--metrics-json) or as a
+Prometheus textfile (--metrics-prom) for the node exporter's textfile
+collector.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+# Upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float('inf'))
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """Return True if an exception reports HTTP 429 (Too Many Requests)."""
+    response = getattr(error, 'response', None)
+    for status in (getattr(error, 'code', None), getattr(error, 'status_code', None),
+                   getattr(response, 'status_code', None)):
+        if status == 429:
+            return True
+    return 'too many requests' in str(error).lower()
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram with interpolated quantiles."""
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value: float):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile by linear interpolation inside its bucket."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(BUCKETS, self.counts):
+            if count and seen + count >= rank:
+                upper = self.max if bound == float('inf') else min(bound, self.max)
+                lower = max(lower, self.min)
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = bound
+        return self.max
+
+    def to_dict(self) -> Dict:
+        summary = {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'min': self.min,
+            'max': self.max,
+        }
+        for q in QUANTILES:
+            value = self.quantile(q)
+            summary[f"p{int(q * 100)}"] = round(value, 6) if value is not None else None
+        return summary
+
+
+def _label_key(labels: Dict[str, str]) -> Tuple:
+    return tuple(sorted(labels.items()))
+
+
+class Metrics:
+    """Thread-safe registry of counters and histograms, keyed by name and labels."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget everything recorded so far."""
+        with self.lock:
+            self.counters: Dict[str, Dict[Tuple, float]] = {}
+            self.histograms: Dict[str, Dict[Tuple, Histogram]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Add ``value`` to a counter."""
+        key = _label_key(labels)
+        with self.lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        """Record a latency in a histogram."""
+        key = _label_key(labels)
+        with self.lock:
+            self.histograms.setdefault(name, {}).setdefault(key, Histogram()).observe(seconds)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Time the enclosed block into ``<name>_seconds``; failures count in ``<name>_errors``."""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.inc(f"{name}_errors", **labels)
+            raise
+        finally:
+            self.observe(f"{name}_seconds", time.perf_counter() - start, **labels)
+
+    @contextmanager
+    def request(self, service: str, operation: str):
+        """
+        Instrument one network request to ``service`` (e.g. "pubmed", "zotero").
+
+        Records the request count and latency, and counts failures and
+        HTTP 429 responses separately.
+        """
+        self.inc("requests", service=service, operation=operation)
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.inc("request_errors", service=service, operation=operation)
+            if is_rate_limited(e):
+                self.inc("rate_limited", service=service, operation=operation)
+            raise
+        finally:
+            self.observe("request_seconds", time.perf_counter() - start,
+                         service=service, operation=operation)
+
+    def add_bytes(self, service: str, operation: str, size: int):
+        """Count response bytes received from ``service``."""
+        self.inc("response_bytes", size, service=service, operation=operation)
+
+    def summary_lines(self):
+        """One line per service and operation: request count, errors and latency quantiles."""
+        with self.lock:
+            requests = dict(self.histograms.get("request_seconds", {}))
+            errors = dict(self.counters.get("request_errors", {}))
+            limited = dict(self.counters.get("rate_limited", {}))
+        lines = []
+        for key, hist in sorted(requests.items()):
+            labels = dict(key)
+            summary = hist.to_dict()
+            lines.append(
+                f"  {labels['service']} {labels['operation']}: {hist.count} requests, "
+                f"{errors.get(key, 0):g} errors ({limited.get(key, 0):g} rate limited), "
+                f"p50 {summary['p50']:.3f}s p95 {summary['p95']:.3f}s p99 {summary['p99']:.3f}s"
+            )
+        return lines
+
+    def to_dict(self) -> Dict:
+        """Snapshot of every series, with histogram quantiles."""
+        with self.lock:
+            return {
+                'counters': {
+                    name: [{'labels': dict(key), 'value': value} for key, value in sorted(series.items())]
+                    for name, series in sorted(self.counters.items())
+                },
+                'histograms': {
+                    name: [{'labels': dict(key), **hist.to_dict()} for key, hist in sorted(series.items())]
+                    for name, series in sorted(self.histograms.items())
+                },
+            }
+
+    def to_prometheus(self, prefix: str = "edna_lit_miner") -> str:
+        """Render every series in the Prometheus text exposition format."""
+        def fmt(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+            return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+        lines = []
+        with self.lock:
+            for name, series in sorted(self.counters.items()):
+                metric = f"{prefix}_{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{metric}{fmt(key)} {value:g}")
+            for name, series in sorted(self.histograms.items()):
+                metric = f"{prefix}_{name}"
+                lines.append(f"# TYPE {metric} histogram")
+                for key, hist in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(BUCKETS, hist.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float('inf') else f"{bound:g}"
+                        lines.append(f"{metric}_bucket{fmt(key, [('le', le)])} {cumulative}")
+                    lines.append(f"{metric}_sum{fmt(key)} {hist.sum:.6f}")
+                    lines.append(f"{metric}_count{fmt(key)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path: str):
+        """Write the JSON snapshot to ``path``."""
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def write_prometheus(self, path: str):
+        """
+        Write a Prometheus textfile. The file is written next to ``path`` and
+        renamed into place, so the node exporter never reads a partial file.
+        """
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(target.name + f".{os.getpid()}.tmp")
+        tmp.write_text(self.to_prometheus(), encoding='utf-8')
+        os.replace(tmp, target)
+
+
+class CountingReader:
+    """Binary stream wrapper that counts the response bytes read through it."""
+
+    def __init__(self, stream, service: str, operation: str, metrics: Optional['Metrics'] = None):
+        self.stream = stream
+        self.service = service
+        self.operation = operation
+        self.metrics = metrics or METRICS
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.stream.read(size)
+        if data:
+            self.metrics.add_bytes(self.service, self.operation, len(data))
+        return data
+
+    def close(self):
+        self.stream.close()
+
+
+# Registry shared by every module of a run
+METRICS = Metrics()
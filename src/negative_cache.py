@@ -0,0 +1,101 @@
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+
+# Re-check a query this long after its first empty search; each further empty search doubles the wait
+BASE_INTERVAL = timedelta(days=1)
+
+
+class NegativeCache:
+    """
+    Persistent record of (provider, query) pairs whose last searches found nothing.
+
+    A query that comes back empty is not searched again until its re-check
+    time. The wait starts at ``base_interval`` and doubles with each
+    consecutive empty search, up to ``max_interval``. With weekly runs and the
+    defaults, a species nobody has studied is searched in each of the next
+    three runs, then after two, three and five weeks, and so on up to the
+    maximum. A search that finds anything removes the pair.
+    """
+
+    def __init__(self, cache_file: str = "data/negative_cache.sqlite", max_interval: timedelta = timedelta(days=90),
+                 base_interval: timedelta = BASE_INTERVAL):
+        """
+        Initialize the NegativeCache.
+
+        Args:
+            cache_file: Path to the SQLite file (default: data/negative_cache.sqlite)
+            max_interval: Longest wait between two searches of an empty query (default: 90 days)
+            base_interval: Wait after the first empty search (default: 1 day)
+        """
+        self.max_interval = max_interval
+        self.base_interval = base_interval
+        self.cache_file = Path(cache_file)
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        # Shared by the search workers of the run pipeline
+        self.conn = sqlite3.connect(str(self.cache_file), check_same_thread=False)
+        self.lock = threading.RLock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS empty_queries (
+                provider TEXT NOT NULL,
+                query TEXT NOT NULL,
+                misses INTEGER NOT NULL,
+                checked_at TEXT NOT NULL,
+                recheck_at TEXT NOT NULL,
+                PRIMARY KEY (provider, query)
+            )
+        """)
+        self.conn.commit()
+
+    @staticmethod
+    def _now() -> datetime:
+        return datetime.now(timezone.utc)
+
+    def interval(self, misses: int) -> timedelta:
+        """Wait before searching again after ``misses`` consecutive empty searches."""
+        # Past 2**20 base intervals the cap has long been reached
+        return min(self.base_interval * 2 ** min(max(misses - 1, 0), 20), self.max_interval)
+
+    def recheck_at(self, provider: str, query: str) -> Optional[datetime]:
+        """When an empty query is due to be searched again (None: not known to be empty)."""
+        with self.lock:
+            row = self.conn.execute("SELECT misses, checked_at FROM empty_queries WHERE provider = ? AND query = ?",
+                                    (provider, query)).fetchone()
+        if row is None:
+            return None
+        # Computed from the current max_interval, so lowering it takes effect at once
+        return datetime.fromisoformat(row[1]) + self.interval(row[0])
+
+    def skip(self, provider: str, query: str) -> bool:
+        """True if the query found nothing recently enough that searching it again can wait."""
+        due = self.recheck_at(provider, query)
+        return due is not None and self._now() < due
+
+    def record(self, provider: str, query: str, found: int):
+        """Record the outcome of a completed search: an empty one backs off further, any result clears the pair."""
+        with self.lock:
+            if found:
+                self.conn.execute("DELETE FROM empty_queries WHERE provider = ? AND query = ?", (provider, query))
+            else:
+                row = self.conn.execute("SELECT misses FROM empty_queries WHERE provider = ? AND query = ?",
+                                        (provider, query)).fetchone()
+                misses = (row[0] if row else 0) + 1
+                now = self._now()
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO empty_queries (provider, query, misses, checked_at, recheck_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (provider, query, misses, now.isoformat(), (now + self.interval(misses)).isoformat()))
+            self.conn.commit()
+
+    def count(self) -> int:
+        """Return the number of queries known to be empty."""
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM empty_queries").fetchone()[0]
+
+    def close(self):
+        """Close the underlying database connection."""
+        self.conn.close()
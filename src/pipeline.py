@@ -0,0 +1,114 @@
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, List
+
+from src.metrics import METRICS
+
+# Marks the end of a stage's input; passed on once every worker has seen it
+_DONE = object()
+
+
+@dataclass
+class Stage:
+    """
+    One step of a Pipeline.
+
+    ``func`` takes an item and returns the item to hand to the next stage,
+    or None to drop it. Exceptions are reported and the item is dropped.
+    """
+    name: str
+    func: Callable[[Any], Any]
+    workers: int = 1
+
+
+class Pipeline:
+    """
+    Runs items through a sequence of stages connected by bounded queues.
+
+    Every stage has its own pool of worker threads, so a slow stage (e.g. the
+    Zotero upload) overlaps with the others instead of adding to them. When a
+    queue is full the stage feeding it blocks, which keeps at most
+    ``queue_size`` items waiting between any two stages (back-pressure).
+    A stage with a single worker processes items in the order it receives them.
+    """
+
+    def __init__(self, stages: List[Stage], queue_size: int = 4):
+        """
+        Initialize the Pipeline.
+
+        Args:
+            stages: Stages in processing order
+            queue_size: Capacity of each inter-stage queue (default: 4)
+        """
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage")
+        for stage in stages:
+            if stage.workers < 1:
+                raise ValueError(f"Stage '{stage.name}' needs at least one worker")
+        self.stages = stages
+        self.queue_size = queue_size
+
+    def run(self, items: Iterable) -> List:
+        """
+        Feed ``items`` through every stage and wait for them to drain.
+
+        ``items`` is consumed lazily, as the first stage takes them. An
+        exception raised while producing an item is re-raised once the items
+        before it have drained.
+
+        Returns:
+            Items returned by the last stage, in completion order
+        """
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        outputs = []
+        outputs_lock = threading.Lock()
+        threads = []
+
+        for position, stage in enumerate(self.stages):
+            inbox = queues[position]
+            outbox = queues[position + 1] if position + 1 < len(queues) else None
+            remaining = [stage.workers]
+            remaining_lock = threading.Lock()
+
+            def work(stage=stage, inbox=inbox, outbox=outbox, remaining=remaining,
+                     remaining_lock=remaining_lock):
+                while True:
+                    item = inbox.get()
+                    if item is _DONE:
+                        # Let sibling workers see the marker too; the last one forwards it
+                        inbox.put(_DONE)
+                        with remaining_lock:
+                            remaining[0] -= 1
+                            last = remaining[0] == 0
+                        if last and outbox is not None:
+                            outbox.put(_DONE)
+                        return
+                    try:
+                        with METRICS.timer("stage", stage=stage.name):
+                            result = stage.func(item)
+                    except Exception as e:
+                        print(f"Error in {stage.name} stage: {e}")
+                        continue
+                    if result is None:
+                        continue
+                    if outbox is not None:
+                        outbox.put(result)
+                    else:
+                        with outputs_lock:
+                            outputs.append(result)
+
+            for number in range(stage.workers):
+                thread = threading.Thread(target=work, name=f"{stage.name}-{number}", daemon=True)
+                thread.start()
+                threads.append(thread)
+
+        try:
+            for item in items:
+                queues[0].put(item)
+        finally:
+            # Items already fed drain through even if producing the next one raised
+            queues[0].put(_DONE)
+            for thread in threads:
+                thread.join()
+        return outputs
@@ -0,0 +1,307 @@
+"""
+Count-only preflight of a run (--plan).
+
+plan_run() asks every provider only how many papers match each species
+(PubMed: an esearch with rettype=count; Semantic Scholar: the ``total`` of a
+one-result search), one small request per provider per species and query
+part. From the counts and the quotas the providers declare in their
+ProviderSpec it estimates the requests, bytes and time of the real run, and
+prints a yield table:
+
+    plan = plan_run(species_list, providers, limit=50)
+    print(plan.report())
+    plan.write("data/plan.json")
+
+A run started with --from-plan then searches the species in order of
+expected yield, caps each provider's limit at the papers it counted, and
+skips a provider (or the whole species) where it counted none, so the quota
+goes to the species that return something.
+"""
+import json
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from src.hedging import RateLimiter
+from src.input_manager import SpeciesQuery
+from src.providers.base import SearchProvider
+from src.providers.registry import ProviderSpec
+from src.query import species_query
+from src.runner import provider_name, provider_queries
+
+
+@dataclass
+class SpeciesPlan:
+    """What the providers counted for one species."""
+    species_name: str
+    # Matching papers per provider (None: the provider cannot count, or counting failed)
+    counts: Dict[str, Optional[int]] = field(default_factory=dict)
+    # Query parts searched per provider (over its query length cap)
+    parts: Dict[str, int] = field(default_factory=dict)
+    # Providers whose count failed
+    failed: List[str] = field(default_factory=list)
+
+    def limits(self, limit: int) -> Dict[str, int]:
+        """Results to fetch per provider: ``limit``, capped at what the provider counted."""
+        return {name: limit if count is None else min(limit, count) for name, count in self.counts.items()}
+
+    def expected(self, limit: int) -> int:
+        """Results the run is expected to fetch for the species (before deduplication)."""
+        return sum(self.limits(limit).values())
+
+
+def provider_rate(provider: SearchProvider) -> Optional[float]:
+    """The pace the provider actually keeps (e.g. PubMed with an API key), else the declared one."""
+    limiter = getattr(provider, 'limiter', None)
+    if isinstance(limiter, RateLimiter):
+        return limiter.rate
+    spec = getattr(provider, 'spec', None)
+    return spec.rate() if isinstance(spec, ProviderSpec) else None
+
+
+def count_gates(providers: Sequence[SearchProvider]) -> Dict[int, Tuple[threading.BoundedSemaphore, RateLimiter]]:
+    """
+    Per-provider slots and rate limiters shared by the species counted at once.
+
+    As in SpeciesRunner, each provider with a ProviderSpec gets ``spec.concurrency``
+    slots; each with a known rate also gets its own RateLimiter, so counting
+    several species at once never sends a provider more than it allows.
+    """
+    gates = {}
+    for provider in providers:
+        spec = getattr(provider, 'spec', None)
+        if not isinstance(spec, ProviderSpec):
+            continue
+        rate = provider_rate(provider)
+        gates[id(provider)] = (threading.BoundedSemaphore(spec.concurrency), RateLimiter(rate) if rate else None)
+    return gates
+
+
+def count_species(species: SpeciesQuery, providers: Sequence[SearchProvider],
+                  gates: Dict[int, Tuple[threading.BoundedSemaphore, RateLimiter]] = None) -> Tuple[SpeciesPlan, int]:
+    """
+    Count the papers every provider matches for a species.
+
+    Args:
+        species: Species to count
+        providers: Search providers
+        gates: Slots and rate limiters from count_gates() (default: count unthrottled)
+
+    Returns:
+        (plan of the species, count requests sent)
+    """
+    plan = SpeciesPlan(species.species_name)
+    tree = species_query(species)
+    requests = 0
+    for provider in providers:
+        name = provider_name(provider)
+        queries = provider_queries(tree, provider)
+        plan.parts[name] = len(queries)
+        slot, limiter = (gates or {}).get(id(provider), (None, None))
+        try:
+            total = 0
+            for query in queries:
+                requests += 1
+                with slot or nullcontext():
+                    if limiter is not None:
+                        limiter.acquire()
+                    # Parts may match the same paper, so the sum is an upper bound
+                    total += provider.count(query)
+            plan.counts[name] = total
+        except NotImplementedError:
+            requests -= 1
+            plan.counts[name] = None
+        except Exception as e:
+            print(f"  Count failed for {species.species_name} on {name}: {e}")
+            plan.counts[name] = None
+            plan.failed.append(name)
+    return plan, requests
+
+
+def estimate(spec: ProviderSpec, plans: Sequence[SpeciesPlan], limit: int, page_size: int = None,
+             rate: float = None, planned: bool = True) -> Dict[str, float]:
+    """
+    Requests, response bytes and seconds a run is expected to spend on one provider.
+
+    Args:
+        spec: The provider's declared page size, requests per page and bytes per result
+        plans: Counts of every species
+        limit: Results per provider per species
+        page_size: Results per request (default: the provider maximum)
+        rate: Requests per second allowed (default: the spec's rate limit)
+        planned: Run with --from-plan, which skips what counted nothing;
+            otherwise every species and query part costs at least one search
+    """
+    page = max(1, min(page_size or spec.page_size, spec.page_size, limit))
+    rate = rate or spec.rate()
+    requests = result_bytes = 0
+    for plan in plans:
+        if spec.name not in plan.counts:
+            continue
+        fetched = plan.limits(limit)[spec.name]
+        parts = plan.parts.get(spec.name, 1)
+        if fetched:
+            requests += max(math.ceil(fetched / page), parts) * spec.requests_per_page
+            result_bytes += fetched * spec.result_bytes
+        elif not planned:
+            # A search that finds nothing still costs its first request
+            requests += parts
+    return {
+        'requests': requests,
+        'bytes': result_bytes,
+        'seconds': round(requests / rate, 1) if rate else 0.0,
+    }
+
+
+def _human_bytes(count: float) -> str:
+    for unit in ("B", "kB", "MB"):
+        if count < 1000:
+            return f"{count:.0f} {unit}"
+        count /= 1000
+    return f"{count:.1f} GB"
+
+
+class RunPlan:
+    """The counts of a preflight, and what the run is expected to cost."""
+
+    def __init__(self, species: List[SpeciesPlan], limit: int, providers: List[str] = None,
+                 estimates: Dict[str, Dict] = None, unplanned: Dict[str, Dict] = None, count_requests: int = 0):
+        """
+        Initialize the RunPlan.
+
+        Args:
+            species: Counts per species, in species list order
+            limit: Results per provider per species the counts were planned for
+            providers: Provider names, in search order
+            estimates: Cost per provider of the run with --from-plan
+            unplanned: Cost per provider of the same run without the plan
+            count_requests: Requests the preflight sent
+        """
+        self.species = species
+        self.limit = limit
+        self.providers = providers or list(dict.fromkeys(name for plan in species for name in plan.counts))
+        self.estimates = estimates or {}
+        self.unplanned = unplanned or {}
+        self.count_requests = count_requests
+
+    def by_yield(self, limit: int = None) -> List[SpeciesPlan]:
+        """Species plans from the highest expected yield to the lowest (ties keep list order)."""
+        limit = limit or self.limit
+        return sorted(self.species, key=lambda plan: -plan.expected(limit))
+
+    def empty(self) -> List[SpeciesPlan]:
+        """Species every provider counted no papers for."""
+        return [plan for plan in self.species
+                if plan.counts and all(count == 0 for count in plan.counts.values())]
+
+    def limits(self, limit: int = None) -> Dict[str, Dict[str, int]]:
+        """Results per provider per species (for SpeciesRunner's species_limits)."""
+        limit = limit or self.limit
+        return {plan.species_name: plan.limits(limit) for plan in self.species}
+
+    def order(self, species_list: Sequence[SpeciesQuery],
+              limit: int = None) -> Tuple[List[SpeciesQuery], List[SpeciesQuery]]:
+        """
+        Species to run, highest expected yield first, and those skipped because nothing matched.
+
+        Species the plan does not cover run last, in list order.
+        """
+        by_name = {species.species_name: species for species in species_list}
+        empty = {plan.species_name for plan in self.empty()}
+        planned = [by_name[plan.species_name] for plan in self.by_yield(limit)
+                   if plan.species_name in by_name and plan.species_name not in empty]
+        covered = {plan.species_name for plan in self.species}
+        unplanned = [species for species in species_list if species.species_name not in covered]
+        skipped = [species for species in species_list if species.species_name in empty]
+        return planned + unplanned, skipped
+
+    def report(self) -> str:
+        """The yield table and the estimated cost of the run."""
+        width = max([len("species")] + [len(plan.species_name) for plan in self.species])
+        columns = [max(len(name), 6) for name in self.providers]
+        lines = [f"Plan for {len(self.species)} species (limit {self.limit} per provider):",
+                 f"  {'species':<{width}}  " + "  ".join(f"{name:>{column}}" for name, column in
+                                                         zip(self.providers, columns)) + "  expected"]
+        for plan in self.by_yield():
+            cells = []
+            for name, column in zip(self.providers, columns):
+                count = plan.counts.get(name)
+                cell = "failed" if name in plan.failed else "-" if count is None else str(count)
+                cells.append(f"{cell:>{column}}")
+            lines.append(f"  {plan.species_name:<{width}}  " + "  ".join(cells) +
+                         f"  {plan.expected(self.limit):>8}")
+
+        empty = self.empty()
+        if empty:
+            lines.append(f"Species with no results: {len(empty)} (skipped with --from-plan)")
+        lines.append(f"Counting took {self.count_requests} requests.")
+        if self.estimates:
+            costs = "; ".join(f"{name} {cost['requests']} requests, {_human_bytes(cost['bytes'])}"
+                              for name, cost in self.estimates.items())
+            slowest = max(self.estimates, key=lambda name: self.estimates[name]['seconds'])
+            unplanned = sum(cost['requests'] for cost in self.unplanned.values())
+            lines.append(f"Estimated run: {costs}; about {self.estimates[slowest]['seconds']:.0f}s "
+                         f"at the providers' rate limits ({slowest} is the slowest; "
+                         f"{unplanned} requests without the plan).")
+        return "\n".join(lines)
+
+    def to_dict(self) -> Dict:
+        return {
+            'limit': self.limit,
+            'providers': self.providers,
+            'count_requests': self.count_requests,
+            'estimates': self.estimates,
+            'unplanned': self.unplanned,
+            'species': [{'name': plan.species_name, 'counts': plan.counts, 'parts': plan.parts,
+                         'failed': plan.failed} for plan in self.species],
+        }
+
+    def write(self, path: str):
+        """Write the plan as JSON, for a later run's --from-plan."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> 'RunPlan':
+        """Read a plan written by write()."""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        species = [SpeciesPlan(entry['name'], dict(entry.get('counts', {})), dict(entry.get('parts', {})),
+                               list(entry.get('failed', []))) for entry in data.get('species', [])]
+        return cls(species, data['limit'], providers=data.get('providers'), estimates=data.get('estimates'),
+                   unplanned=data.get('unplanned'), count_requests=data.get('count_requests', 0))
+
+
+def plan_run(species_list: Sequence[SpeciesQuery], providers: Sequence[SearchProvider], limit: int = 10,
+             page_size: int = None, workers: int = 1) -> RunPlan:
+    """
+    Count every species on every provider and estimate the run.
+
+    Args:
+        species_list: Species to plan
+        providers: Search providers (their ``spec`` declares the quotas)
+        limit: Results per provider per species
+        page_size: Results fetched per provider request (default: provider maximum)
+        workers: Species counted at once (each provider still within its concurrency and rate)
+    """
+    gates = count_gates(providers)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        counted = list(executor.map(lambda species: count_species(species, providers, gates), species_list))
+    plans = [plan for plan, _ in counted]
+
+    estimates, unplanned = {}, {}
+    for provider in providers:
+        spec = getattr(provider, 'spec', None)
+        if not isinstance(spec, ProviderSpec):
+            spec = ProviderSpec(provider_name(provider), "")
+        rate = provider_rate(provider)
+        estimates[spec.name] = estimate(spec, plans, limit, page_size, rate)
+        unplanned[spec.name] = estimate(spec, plans, limit, page_size, rate, planned=False)
+    return RunPlan(plans, limit, [provider_name(provider) for provider in providers], estimates, unplanned,
+                   count_requests=sum(requests for _, requests in counted))
@@ -0,0 +1,229 @@
+"""
+Built-in profiling mode (``python -m src.main ... --profile``).
+
+Code marks the stages of a run with the module-level PROFILER:
+
+    with PROFILER.stage("parse"):
+        ...
+
+When profiling is off, stage() returns a shared no-op context. When it is
+on, each stage gets wall-clock/CPU totals. Time is exclusive: entering a
+nested stage (e.g. "parse" inside "search") pauses the enclosing one.
+
+Function profiles depend on the Python version. Before 3.12, cProfile hooks
+one thread at a time, so each stage of each thread gets its own profile.
+From 3.12, cProfile runs on sys.monitoring: one profiler sees every thread
+and a second one cannot start. A single profile then covers the whole run.
+At the end of the run, finish() writes <dir>/<stage>.pstats (or run.pstats
+from 3.12; load with ``python -m pstats``) and a summary.txt with the
+wall-clock vs CPU breakdown and the top functions of each profile.
+With a sample interval it also writes profile.folded, stack samples in the
+folded format read by flamegraph.pl, inferno and speedscope.
+"""
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+_NULL = nullcontext()
+
+# cProfile on sys.monitoring (3.12+): one process-wide profile instead of one per stage and thread
+PROCESS_WIDE = sys.version_info >= (3, 12)
+
+
+class _Frame:
+    """A stage active on one thread."""
+
+    def __init__(self, name: str, profile: Optional[cProfile.Profile]):
+        self.name = name
+        self.profile = profile
+        self.wall_start = 0.0
+        self.cpu_start = 0.0
+
+    def resume(self):
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.thread_time()
+        if self.profile is not None:
+            self.profile.enable()
+
+    def pause(self) -> Tuple[float, float]:
+        if self.profile is not None:
+            self.profile.disable()
+        return time.perf_counter() - self.wall_start, time.thread_time() - self.cpu_start
+
+
+class Profiler:
+    """Per-stage cProfile, wall-clock/CPU accounting and optional stack sampling."""
+
+    def __init__(self):
+        self.enabled = False
+        self.out_dir: Optional[Path] = None
+        self.lock = threading.Lock()
+        self._local = threading.local()
+        # (thread id, stage) -> profile, so repeated blocks accumulate in one profile
+        self._profiles: Dict = {}
+        # The whole run's profile where cProfile is process-wide
+        self._run_profile: Optional[cProfile.Profile] = None
+        # thread id -> stack of active stages, read by the sampler
+        self._stacks: Dict[int, List[_Frame]] = {}
+        self.totals: Dict[str, Dict[str, float]] = {}
+        self._samples: Dict[str, int] = {}
+        self._sampler: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def enable(self, out_dir: str = "data/profile", sample_interval: Optional[float] = None):
+        """
+        Start profiling.
+
+        Args:
+            out_dir: Directory for the pstats dumps, summary and samples (default: data/profile)
+            sample_interval: Seconds between stack samples for profile.folded (default: no sampling)
+        """
+        with self.lock:
+            self._profiles = {}
+            self._stacks = {}
+            self.totals = {}
+            self._samples = {}
+        self._local = threading.local()
+        self.enabled = True
+        self.out_dir = Path(out_dir)
+        if PROCESS_WIDE:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+                self._run_profile = profile
+            except ValueError as e:
+                # Another tool holds the profiler slot; stages are still timed
+                print(f"Function profiling unavailable: {e}")
+        if sample_interval:
+            self._stop.clear()
+            self._sampler = threading.Thread(target=self._sample, args=(sample_interval,),
+                                             name="profile-sampler", daemon=True)
+            self._sampler.start()
+
+    def stage(self, name: str):
+        """Context manager marking a stage; a no-op unless profiling is enabled."""
+        if not self.enabled:
+            return _NULL
+        return self._stage(name)
+
+    @contextmanager
+    def _stage(self, name: str):
+        stack: List[_Frame] = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+            with self.lock:
+                self._stacks[threading.get_ident()] = stack
+        if stack:
+            self._add(stack[-1].name, *stack[-1].pause(), calls=0)
+
+        profile = None
+        if not PROCESS_WIDE:
+            with self.lock:
+                profile = self._profiles.setdefault((threading.get_ident(), name), cProfile.Profile())
+        frame = _Frame(name, profile)
+        stack.append(frame)
+        frame.resume()
+        try:
+            yield
+        finally:
+            self._add(name, *frame.pause(), calls=1)
+            stack.pop()
+            if stack:
+                stack[-1].resume()
+
+    def _add(self, name: str, wall: float, cpu: float, calls: int):
+        with self.lock:
+            totals = self.totals.setdefault(name, {'calls': 0, 'wall': 0.0, 'cpu': 0.0})
+            totals['calls'] += calls
+            totals['wall'] += wall
+            totals['cpu'] += cpu
+
+    def _sample(self, interval: float):
+        """Record the stack of every thread, rooted at its current stage."""
+        me = threading.get_ident()
+        while not self._stop.wait(interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                calls = []
+                while frame is not None:
+                    code = frame.f_code
+                    calls.append(f"{Path(code.co_filename).stem}:{code.co_name}")
+                    frame = frame.f_back
+                stack = self._stacks.get(ident)
+                root = stack[-1].name if stack else "(no stage)"
+                folded = ";".join([root] + calls[::-1])
+                with self.lock:
+                    self._samples[folded] = self._samples.get(folded, 0) + 1
+
+    def summary(self) -> str:
+        """Wall-clock vs CPU table, one row per stage."""
+        lines = [f"{'stage':<10} {'calls':>7} {'wall s':>10} {'cpu s':>10} {'cpu %':>6}"]
+        with self.lock:
+            totals = sorted(self.totals.items(), key=lambda item: -item[1]['wall'])
+        for name, t in totals:
+            share = 100 * t['cpu'] / t['wall'] if t['wall'] else 0.0
+            lines.append(f"{name:<10} {t['calls']:>7} {t['wall']:>10.3f} {t['cpu']:>10.3f} {share:>5.0f}%")
+        return "\n".join(lines)
+
+    def finish(self, top: int = 15) -> Optional[Path]:
+        """
+        Stop profiling and write the dumps.
+
+        Returns:
+            The output directory, or None if profiling was not enabled
+        """
+        if not self.enabled:
+            return None
+        self.enabled = False
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+            self._sampler = None
+        if self._run_profile is not None:
+            self._run_profile.disable()
+
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        by_stage: Dict[str, List[cProfile.Profile]] = {}
+        with self.lock:
+            for (_, name), profile in self._profiles.items():
+                by_stage.setdefault(name, []).append(profile)
+        if self._run_profile is not None:
+            by_stage["run"] = [self._run_profile]
+            self._run_profile = None
+
+        report = [self.summary(), ""]
+        for name, profiles in sorted(by_stage.items()):
+            stats = None
+            for profile in profiles:
+                try:
+                    stats = pstats.Stats(profile) if stats is None else stats.add(profile)
+                except TypeError:
+                    # The profile never ran (e.g. another profiler was active)
+                    continue
+            if stats is None:
+                continue
+            stats.dump_stats(str(self.out_dir / f"{name}.pstats"))
+            buffer = io.StringIO()
+            stats.stream = buffer
+            stats.sort_stats("cumulative").print_stats(top)
+            report.append(f"=== {name} ===")
+            report.append(buffer.getvalue().strip())
+            report.append("")
+        (self.out_dir / "summary.txt").write_text("\n".join(report), encoding="utf-8")
+
+        if self._samples:
+            with open(self.out_dir / "profile.folded", "w", encoding="utf-8") as f:
+                for stack, count in sorted(self._samples.items()):
+                    f.write(f"{stack} {count}\n")
+        return self.out_dir
+
+
+# Profiler shared by every module of a run
+PROFILER = Profiler()
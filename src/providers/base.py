@@ -1,18 +1,66 @@
+import sys
 from abc import ABC, abstractmethod
-from typing import List
-from dataclasses import dataclass
+from typing import Dict, Iterator, List, Sequence
+from dataclasses import dataclass, field
 
-@dataclass
+# Slotted (no per-instance __dict__): runs hold millions of records
+@dataclass(slots=True)
 class SearchResult:
     title: str
-    authors: List[str]
+    # A list, or a tuple once compact()
+    authors: Sequence[str]
     year: str
     doi: str
     source: str  # 'PubMed' or 'SemanticScholar'
     abstract: str = ""
     url: str = ""
+    # Provider identifiers, e.g. {'pmid': '12345', 'pmcid': 'PMC1', 's2': '<paperId>'}
+    identifiers: Dict[str, str] = field(default_factory=dict)
+
+    def __post_init__(self):
+        # Sources, years and author names repeat across millions of records: keep one copy of each
+        # (as plain str: sys.intern rejects subclasses such as Bio.Entrez's StringElement)
+        intern = sys.intern
+        if isinstance(self.source, str):
+            self.source = intern(str(self.source))
+        if isinstance(self.year, str):
+            self.year = intern(str(self.year))
+        if self.authors:
+            interned = [intern(str(name)) if isinstance(name, str) else name for name in self.authors]
+            self.authors = tuple(interned) if isinstance(self.authors, tuple) else interned
+
+    def compact(self) -> 'SearchResult':
+        """Store the authors as a tuple (smaller than a list), in place; returns the record."""
+        if not isinstance(self.authors, tuple):
+            self.authors = tuple(self.authors or ())
+        return self
 
 class SearchProvider(ABC):
+    # ProviderSpec the provider was selected from (set when src.main builds it)
+    spec = None
+    # iter_search raises ProviderFailed when a search fails, so no results means the
+    # service found nothing (only such searches go into the NegativeCache)
+    reports_failures = False
+
     @abstractmethod
     def search(self, query: str, limit: int = 10) -> List[SearchResult]:
         pass
+
+    def iter_search(self, query: str, limit: int = 10, page_size: int = None) -> Iterator[SearchResult]:
+        """
+        Streaming variant of search(): yields results as each page arrives.
+
+        Consumers may stop iterating at any point; providers that page fetch
+        no further pages once the generator is closed. The default
+        implementation yields from a single search() call.
+        """
+        yield from self.search(query, limit=limit)
+
+    def count(self, query: str) -> int:
+        """
+        Number of papers matching ``query``, without fetching them (see src.planner).
+
+        Raises:
+            NotImplementedError: The provider cannot count without searching
+        """
+        raise NotImplementedError(f"{self.__class__.__name__} cannot count results")
@@ -0,0 +1,116 @@
+import re
+from typing import List
+
+from src.local_index import LocalIndex
+from src.metrics import METRICS
+from src.providers.base import SearchProvider, SearchResult
+
+# Quoted phrase, parenthesis, or bare word; optional PubMed field tag such as [tiab]
+_TOKEN_RE = re.compile(r'\s*(?:"([^"]*)"|(\()|(\))|([^\s()"\[]+))(?:\[[^\]]*\])?')
+_OPERATORS = {"AND", "OR", "NOT"}
+
+
+def to_fts_query(query: str) -> str:
+    """
+    Translate the boolean query syntax built in main() into an FTS5 MATCH expression.
+
+    e.g. ("Gadus morhua" OR "Atlantic cod") AND "eDNA"
+    Every term is emitted as a quoted phrase so punctuation inside species
+    names cannot be misread as FTS5 syntax. PubMed field tags are dropped.
+
+    Raises:
+        ValueError: If the query is empty or malformed
+    """
+    tokens = []
+    pos = 0
+    query = query.strip()
+    while pos < len(query):
+        match = _TOKEN_RE.match(query, pos)
+        if not match or match.end() == pos:
+            raise ValueError(f"Cannot parse query near: {query[pos:]!r}")
+        phrase, lparen, rparen, word = match.groups()
+        if lparen:
+            tokens.append(("(", None))
+        elif rparen:
+            tokens.append((")", None))
+        elif word is not None and word.upper() in _OPERATORS:
+            tokens.append((word.upper(), None))
+        else:
+            text = phrase if phrase is not None else word
+            if text.strip():
+                tokens.append(("TERM", text.strip()))
+        pos = match.end()
+        while pos < len(query) and query[pos].isspace():
+            pos += 1
+
+    rendered, pos = _parse_or(tokens, 0)
+    if pos != len(tokens):
+        raise ValueError(f"Unexpected token in query: {tokens[pos][0]}")
+    return rendered
+
+
+def _parse_or(tokens, pos):
+    left, pos = _parse_and(tokens, pos)
+    parts = [left]
+    while pos < len(tokens) and tokens[pos][0] == "OR":
+        right, pos = _parse_and(tokens, pos + 1)
+        parts.append(right)
+    return (parts[0] if len(parts) == 1 else "(" + " OR ".join(parts) + ")"), pos
+
+
+def _parse_and(tokens, pos):
+    left, pos = _parse_not(tokens, pos)
+    parts = [left]
+    while pos < len(tokens) and tokens[pos][0] in ("AND", "TERM", "("):
+        if tokens[pos][0] == "AND":
+            pos += 1
+        right, pos = _parse_not(tokens, pos)
+        parts.append(right)
+    return (parts[0] if len(parts) == 1 else "(" + " AND ".join(parts) + ")"), pos
+
+
+def _parse_not(tokens, pos):
+    left, pos = _parse_primary(tokens, pos)
+    while pos < len(tokens) and tokens[pos][0] == "NOT":
+        right, pos = _parse_primary(tokens, pos + 1)
+        left = f"({left} NOT {right})"
+    return left, pos
+
+
+def _parse_primary(tokens, pos):
+    if pos >= len(tokens):
+        raise ValueError("Unexpected end of query")
+    kind, value = tokens[pos]
+    if kind == "(":
+        inner, pos = _parse_or(tokens, pos + 1)
+        if pos >= len(tokens) or tokens[pos][0] != ")":
+            raise ValueError("Unbalanced parentheses in query")
+        return inner, pos + 1
+    if kind == "TERM":
+        return '"' + value.replace('"', '""') + '"', pos + 1
+    raise ValueError(f"Unexpected token in query: {kind}")
+
+
+class LocalSearchProvider(SearchProvider):
+    """Answers queries from the on-disk full-text index of cached papers."""
+
+    def __init__(self, index_file: str = "data/local_index.sqlite"):
+        self.index = LocalIndex(index_file)
+
+    def search(self, query: str, limit: int = 10) -> List[SearchResult]:
+        try:
+            with METRICS.request("local_index", "search"):
+                return self.index.search(to_fts_query(query), limit=limit)
+        except Exception as e:
+            print(f"Error searching local index: {e}")
+            return []
+
+
+class LocalPubMedProvider(LocalSearchProvider):
+    """
+    Answers PubMed queries from a local index built by src.pubmed_ingest
+    from NCBI baseline/update files, with no E-utilities calls.
+    """
+
+    def __init__(self, index_file: str = "data/pubmed_index.sqlite"):
+        super().__init__(index_file=index_file)
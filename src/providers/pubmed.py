@@ -1,87 +1,244 @@
-from typing import List
+import io
+from typing import Iterator, List
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
 from Bio import Entrez
+from src.cassette import Cassette, Response
+from src.hedging import Hedger, RateLimiter
+from src.http_pool import ConnectionPools
+from src.metrics import METRICS, CountingReader
+from src.profiling import PROFILER
 from src.providers.base import SearchProvider, SearchResult
+from src.providers.registry import PUBMED
+from src.resilience import FATAL, ProviderFailed, Resilience
+
+EUTILS_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils"
+
+# NCBI asks for POST beyond ~200 IDs; long URLs are POSTed too (as Bio.Entrez does)
+POST_IDS = 200
+POST_LENGTH = 1000
 
 class PubMedProvider(SearchProvider):
-    def __init__(self, email: str):
+    # E-utilities page size for esearch/efetch round trips
+    PAGE_SIZE = PUBMED.page_size
+    reports_failures = True
+
+    def __init__(self, email: str, base_url: str = None, cassette: Cassette = None,
+                 timeout: float = None, hedge: bool = False, resilience: Resilience = None,
+                 pools: ConnectionPools = None):
         Entrez.email = email
+        # Sent with every request; the requests are built here rather than by Bio.Entrez, which
+        # retries 429/5xx itself without backoff (the resilience layer does the retrying)
+        self.email = email
+        # E-utilities root to use instead of NCBI's (e.g. a stand-in server)
+        self.base_url = base_url.rstrip("/") if base_url else None
+        # Records or replays the E-utilities exchanges
+        self.cassette = cassette
+        # Shared keep-alive connections instead of Bio.Entrez's one connection per request
+        self.pools = pools
+        # NCBI's quota: 3 requests/s, 10 with an API key (the pace Bio.Entrez keeps)
+        self.limiter = RateLimiter(PUBMED.rate(keyed=bool(Entrez.api_key)))
+        # Per-request timeout and hedged duplicates, within that quota
+        self.hedger = None
+        if timeout or hedge:
+            self.hedger = Hedger("pubmed", self.limiter, timeout=timeout, hedge=hedge)
+        # Retries, backoff and circuit breaker around each round trip
+        self.resilience = resilience or Resilience("pubmed")
+
+    def _eutils(self, tool: str, **params):
+        """Run an E-utilities request, with the hedger's timeout and duplicates if one is set."""
+        if self.hedger is None:
+            return self._open_eutils(tool, **params)
+
+        def attempt():
+            # Read the whole body inside the attempt: a stalled response can hang the read too
+            handle = self._open_eutils(tool, **params)
+            try:
+                body = handle.read()
+            finally:
+                handle.close()
+            return io.BytesIO(body.encode('utf-8') if isinstance(body, str) else body)
+
+        return self.hedger.call(tool, attempt)
+
+    def _build_request(self, tool: str, params) -> Request:
+        """Build an E-utilities request: caller parameters added, ID lists joined, POST when long."""
+        params = dict(params, tool=Entrez.tool, email=self.email, api_key=Entrez.api_key)
+        params = {name: value for name, value in params.items() if value is not None}
+        if isinstance(params.get('id'), (list, tuple)):
+            params['id'] = ",".join(str(i) for i in params['id'])
+        url = f"{self.base_url or EUTILS_URL}/{tool}.fcgi"
+        query = urlencode(params, doseq=True)
+        if len(query) > POST_LENGTH or str(params.get('id', "")).count(",") + 1 >= POST_IDS:
+            return Request(url, data=query.encode('utf-8'), method="POST")
+        return Request(f"{url}?{query}", method="GET")
+
+    def _open_eutils(self, tool: str, **params):
+        """Open an E-utilities request, recorded or replayed by the cassette if one is set."""
+        request = self._build_request(tool, params)
+        if self.cassette is None:
+            if self.pools is None:
+                self._pace()
+                return urlopen(request)
+            return io.BytesIO(self._send(request).body)
+        response = self.cassette.exchange(request.get_method(), request.full_url, request.data,
+                                          lambda: self._send(request))
+        return io.BytesIO(response.body)
+
+    def _pace(self):
+        """Keep to NCBI's quota (the hedger already paces every attempt)."""
+        if self.hedger is None:
+            self.limiter.acquire()
+
+    def _send(self, request) -> Response:
+        """Send a built request, over the pooled client if one is set."""
+        self._pace()
+        if self.pools is not None:
+            headers = dict(request.header_items())
+            if request.data:
+                headers['Content-Type'] = "application/x-www-form-urlencoded"
+            response = self.pools.client().request(request.get_method(), request.full_url,
+                                                   content=request.data, headers=headers)
+            # 429/5xx surface as HTTPStatusError, for the resilience layer to retry
+            response.raise_for_status()
+            return Response(response.status_code, {'content-type': response.headers.get('content-type', '')},
+                            response.content)
+
+        # 429/5xx surface as HTTPError, for the resilience layer to retry
+        with urlopen(request) as handle:
+            return Response(handle.status, {'content-type': handle.headers.get('Content-Type', '')},
+                            handle.read())
 
     def search(self, query: str, limit: int = 10) -> List[SearchResult]:
+        return list(self.iter_search(query, limit=limit))
+
+    def _request(self, tool: str, **params):
+        """One parsed E-utilities round trip, retried by the resilience layer."""
+        def attempt():
+            with METRICS.request("pubmed", tool):
+                handle = self._eutils(tool, **params)
+                with PROFILER.stage("parse"):
+                    record = Entrez.read(CountingReader(handle, "pubmed", tool))
+                handle.close()
+            return record
+
+        return self.resilience.call(tool, attempt)
+
+    def iter_search(self, query: str, limit: int = 10, page_size: int = None) -> Iterator[SearchResult]:
+        """
+        Stream results page by page (esearch for the IDs, then efetch).
+
+        Raises:
+            ProviderFailed: A request failed after retries, or the circuit is open
+        """
+        page_size = min(page_size or self.PAGE_SIZE, limit)
+        retstart = 0
+        try:
+            while retstart < limit:
+                # 1. Search for the IDs of this page
+                retmax = min(page_size, limit - retstart)
+                record = self._request("esearch", db="pubmed", term=query, retstart=retstart, retmax=retmax)
+
+                id_list = record.get("IdList", [])
+                if not id_list:
+                    return
+
+                # 2. Fetch details for IDs
+                papers = self._request("efetch", db="pubmed", id=id_list, retmode="xml")
+
+                with PROFILER.stage("parse"):
+                    page = self._parse_articles(papers)
+                yield from page
+
+                retstart += len(id_list)
+                if len(id_list) < retmax or retstart >= int(record.get("Count", retstart)):
+                    return
+
+        except ProviderFailed:
+            raise
+        except Exception as e:
+            raise ProviderFailed("pubmed", "search", FATAL, e) from e
+
+    def count(self, query: str) -> int:
+        """
+        Number of papers matching ``query``: one esearch with rettype=count, which returns no IDs.
+
+        Raises:
+            ProviderFailed: The request failed after retries, or the circuit is open
+        """
         try:
-            # 1. Search for IDs
-            handle = Entrez.esearch(db="pubmed", term=query, retmax=limit)
-            record = Entrez.read(handle)
-            handle.close()
+            record = self._request("esearch", db="pubmed", term=query, rettype="count")
+            return int(record["Count"])
+        except ProviderFailed:
+            raise
+        except Exception as e:
+            raise ProviderFailed("pubmed", "count", FATAL, e) from e
+
+    def _parse_articles(self, papers) -> List[SearchResult]:
+        results = []
+        # 'PubmedArticle' usually contains the list
+        article_list = papers.get("PubmedArticle", [])
+        
+        for article in article_list:
+            medline_citation = article.get("MedlineCitation", {})
+            article_data = medline_citation.get("Article", {})
             
-            id_list = record.get("IdList", [])
-            if not id_list:
-                return []
-
-            # 2. Fetch details for IDs
-            handle = Entrez.efetch(db="pubmed", id=id_list, retmode="xml")
-            papers = Entrez.read(handle)
-            handle.close()
-
-            results = []
-            # 'PubmedArticle' usually contains the list
-            article_list = papers.get("PubmedArticle", [])
+            # Title (Entrez returns StringElement subclasses; keep plain str so results serialize)
+            title = str(article_data.get("ArticleTitle", ""))
             
-            for article in article_list:
-                medline_citation = article.get("MedlineCitation", {})
-                article_data = medline_citation.get("Article", {})
-                
-                # Title
-                title = article_data.get("ArticleTitle", "")
-                
-                # Authors
-                author_list = article_data.get("AuthorList", [])
-                authors = []
-                for author in author_list:
-                    last_name = author.get("LastName", "")
-                    fore_name = author.get("ForeName", "")
-                    if last_name or fore_name:
-                        authors.append(f"{last_name}, {fore_name}")
-
-                # Year
-                journal = article_data.get("Journal", {})
-                journal_issue = journal.get("JournalIssue", {})
-                pub_date = journal_issue.get("PubDate", {})
-                year = pub_date.get("Year", "")
-                
-                # DOI and URL
-                doi = ""
-                elocation_id = article_data.get("ELocationID", [])
-                for eid in elocation_id:
-                    if eid.attributes.get("EIdType") == "doi":
-                        doi = str(eid)
-                        break
-                
-                url = f"https://pubmed.ncbi.nlm.nih.gov/{medline_citation.get('PMID', '')}/"
-
-                # Abstract
-                abstract_text = ""
-                abstract = article_data.get("Abstract", {})
-                if "AbstractText" in abstract:
-                    # AbstractText can be a list or single string
-                    abstract_parts = abstract["AbstractText"]
-                    if isinstance(abstract_parts, list):
-                         abstract_text = " ".join([str(x) for x in abstract_parts])
-                    else:
-                        abstract_text = str(abstract_parts)
-
-
-                results.append(SearchResult(
-                    title=title,
-                    authors=authors,
-                    year=year,
-                    doi=doi,
-                    source="PubMed",
-                    abstract=abstract_text,
-                    url=url
-                ))
-                
-            return results
+            # Authors
+            author_list = article_data.get("AuthorList", [])
+            authors = []
+            for author in author_list:
+                last_name = author.get("LastName", "")
+                fore_name = author.get("ForeName", "")
+                if last_name or fore_name:
+                    authors.append(f"{last_name}, {fore_name}")
 
-        except Exception as e:
-            print(f"Error searching PubMed: {e}")
-            return []
+            # Year
+            journal = article_data.get("Journal", {})
+            journal_issue = journal.get("JournalIssue", {})
+            pub_date = journal_issue.get("PubDate", {})
+            year = str(pub_date.get("Year", ""))
+            
+            # DOI and URL
+            doi = ""
+            elocation_id = article_data.get("ELocationID", [])
+            for eid in elocation_id:
+                if eid.attributes.get("EIdType") == "doi":
+                    doi = str(eid)
+                    break
+            
+            pmid = str(medline_citation.get('PMID', ''))
+            url = f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/"
+
+            # Identifiers
+            identifiers = {'pmid': pmid} if pmid else {}
+            for article_id in article.get("PubmedData", {}).get("ArticleIdList", []):
+                if getattr(article_id, "attributes", {}).get("IdType") == "pmc":
+                    identifiers['pmcid'] = str(article_id)
+
+            # Abstract
+            abstract_text = ""
+            abstract = article_data.get("Abstract", {})
+            if "AbstractText" in abstract:
+                # AbstractText can be a list or single string
+                abstract_parts = abstract["AbstractText"]
+                if isinstance(abstract_parts, list):
+                     abstract_text = " ".join([str(x) for x in abstract_parts])
+                else:
+                    abstract_text = str(abstract_parts)
+
+
+            results.append(SearchResult(
+                title=title,
+                authors=authors,
+                year=year,
+                doi=doi,
+                source="PubMed",
+                abstract=abstract_text,
+                url=url,
+                identifiers=identifiers
+            ))
+            
+        return results
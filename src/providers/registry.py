@@ -0,0 +1,156 @@
+"""
+Registry of search providers.
+
+Each provider is described by a ProviderSpec: its name on the command line,
+where its class lives, the rate limit of its service, how many searches it
+may have in flight at once and what the service supports. Specs are plain
+data, so listing and selecting providers imports none of them; a provider's
+module is only imported, and the provider built, when it is selected:
+
+    specs = select_providers("pubmed,semantic_scholar")
+    provider = specs[0].load()(email="me@example.com")
+
+Other packages add providers through the ``edna_lit_miner.providers`` entry
+point group. Each entry point names a ProviderSpec:
+
+    [project.entry-points."edna_lit_miner.providers"]
+    crossref = "edna_crossref:CROSSREF"
+
+A plugin provider is built with the keyword arguments ``config``,
+``cassette``, ``timeout``, ``hedge`` and ``pools`` (see src.main).
+"""
+import importlib
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+ENTRY_POINT_GROUP = "edna_lit_miner.providers"
+
+
+@dataclass(frozen=True)
+class ProviderSpec:
+    """What a search provider declares about itself."""
+    # Name used with --providers
+    name: str
+    # "module:attribute" of the provider class (or any callable returning a provider)
+    factory: str
+    description: str = ""
+    # Requests per second the service allows (None: no limit, e.g. a local index)
+    rate_limit: Optional[float] = None
+    # Requests per second with an API key, if the service grants more
+    keyed_rate_limit: Optional[float] = None
+    # Searches of this provider in flight at once, across all species
+    concurrency: int = 1
+    # Results can be restricted to a publication date range
+    date_filter: bool = False
+    # Deep result sets can be paged through in large pages
+    bulk_paging: bool = False
+    # Records can be fetched by ID in batches
+    batch_lookup: bool = False
+    # The provider calls a remote service (skipped by --offline)
+    network: bool = True
+    # Query syntax the provider understands (see src.query: boolean, pubmed or plain)
+    query_syntax: str = "boolean"
+    # Longest query sent in one search; longer synonym sets are searched in parts
+    max_query_length: Optional[int] = None
+    # Largest page of results one search request returns
+    page_size: int = 100
+    # Requests per page of results (E-utilities: an esearch for the IDs, then an efetch)
+    requests_per_page: int = 1
+    # Typical uncompressed response bytes per result, for run estimates (see src.planner)
+    result_bytes: int = 2000
+
+    def load(self):
+        """Import the provider class."""
+        module, _, attribute = self.factory.partition(":")
+        return getattr(importlib.import_module(module), attribute)
+
+    def rate(self, keyed: bool = False) -> Optional[float]:
+        """Requests per second allowed, with or without an API key."""
+        if keyed and self.keyed_rate_limit is not None:
+            return self.keyed_rate_limit
+        return self.rate_limit
+
+    @property
+    def capabilities(self) -> List[str]:
+        return [name for name in ("date_filter", "bulk_paging", "batch_lookup") if getattr(self, name)]
+
+
+PUBMED = ProviderSpec(
+    "pubmed", "src.providers.pubmed:PubMedProvider", "PubMed through NCBI E-utilities",
+    # NCBI allows 3 requests/s, 10 with an API key, and no more than 3 at a time
+    rate_limit=3.0, keyed_rate_limit=10.0, concurrency=3,
+    date_filter=True, bulk_paging=True, batch_lookup=True,
+    # Terms are searched in titles and abstracts; requests over 1000 characters are POSTed
+    query_syntax="pubmed", max_query_length=4000,
+    # MEDLINE XML with the abstract runs to several kB per article
+    page_size=100, requests_per_page=2, result_bytes=6000,
+)
+
+SEMANTIC_SCHOLAR = ProviderSpec(
+    "semantic_scholar", "src.providers.semantic_scholar:SemanticScholarProvider",
+    "Semantic Scholar Academic Graph search",
+    # The rate granted to an API key; keyless requests share a pool with every other client
+    rate_limit=1.0, concurrency=1,
+    date_filter=True, batch_lookup=True,
+    # Relevance search without operators, sent as a GET query string
+    query_syntax="plain", max_query_length=300,
+    page_size=100, result_bytes=1500,
+)
+
+# Stands in for PubMed when --pubmed-index is given
+LOCAL_PUBMED = ProviderSpec(
+    "pubmed", "src.providers.local:LocalPubMedProvider", "PubMed baseline in a local index",
+    concurrency=4, bulk_paging=True, network=False,
+)
+
+BUILTIN: Dict[str, ProviderSpec] = {spec.name: spec for spec in (PUBMED, SEMANTIC_SCHOLAR)}
+
+DEFAULT_PROVIDERS = ",".join(BUILTIN)
+
+
+def discover_providers() -> Dict[str, ProviderSpec]:
+    """The built-in providers and those registered under the entry point group, by name."""
+    from importlib.metadata import entry_points
+
+    providers = dict(BUILTIN)
+    for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+        try:
+            spec = entry_point.load()
+        except Exception as e:
+            print(f"Failed to load provider plugin {entry_point.name}: {e}")
+            continue
+        if not isinstance(spec, ProviderSpec):
+            print(f"Ignoring provider plugin {entry_point.name}: {entry_point.value} is not a ProviderSpec")
+            continue
+        providers.setdefault(spec.name, spec)
+    return providers
+
+
+def select_providers(names: str = None, available: Dict[str, ProviderSpec] = None) -> List[ProviderSpec]:
+    """
+    Specs of a comma-separated list of provider names, in the order given.
+
+    Entry points are only scanned when a name is not a built-in provider.
+
+    Raises:
+        ValueError: A name matches no provider
+    """
+    wanted = [name.strip() for name in (names or DEFAULT_PROVIDERS).split(",") if name.strip()]
+    if not wanted:
+        raise ValueError("No providers selected")
+    if available is None:
+        available = BUILTIN if all(name in BUILTIN for name in wanted) else discover_providers()
+    unknown = [name for name in wanted if name not in available]
+    if unknown:
+        raise ValueError(f"Unknown provider(s): {', '.join(unknown)} (available: {', '.join(sorted(available))})")
+    return [available[name] for name in dict.fromkeys(wanted)]
+
+
+def plan_search_workers(specs: Iterable[ProviderSpec]) -> int:
+    """
+    Species to search at once so that every provider can use its concurrency cap.
+
+    Each species queries its providers one after another, so one worker keeps
+    at most one request in flight; the caps of all providers add up.
+    """
+    return max(1, sum(spec.concurrency for spec in specs))
@@ -1,42 +1,265 @@
-from typing import List
+import asyncio
+import json
+from typing import Iterator, List
+import httpx
 from semanticscholar import SemanticScholar
+from semanticscholar.ApiRequester import ApiRequester
+from semanticscholar.SemanticScholarException import (BadQueryParametersException, GatewayTimeoutException,
+                                                      InternalServerErrorException, ObjectNotFoundException)
+from src.cassette import Cassette, Response
+from src.hedging import Hedger, RateLimiter
+from src.http_pool import ConnectionPools
+from src.metrics import METRICS
 from src.providers.base import SearchProvider, SearchResult
+from src.providers.registry import SEMANTIC_SCHOLAR
+from src.resilience import FATAL, ProviderFailed, Resilience
+
+
+# Releases of the client whose internals the requesters below hook into (as pinned in requirements.txt)
+SUPPORTED_CLIENT = "semanticscholar>=0.8.4,<0.13"
+
+
+class UnsupportedClient(RuntimeError):
+    """The installed semanticscholar release lacks the hooks this provider relies on."""
+
+    def __init__(self, detail: str):
+        super().__init__(f"Unsupported semanticscholar client ({detail}); install {SUPPORTED_CLIENT}")
+
+
+def _async_client(sch: SemanticScholar):
+    """The client's async half, whose ``_requester`` sends every request (no public hook exists)."""
+    client = getattr(sch, '_AsyncSemanticScholar', None)
+    if client is None or not hasattr(client, '_requester'):
+        raise UnsupportedClient("no _AsyncSemanticScholar._requester")
+    return client
+
+
+class _CassetteRequester(ApiRequester):
+    """
+    ApiRequester that records or replays its exchanges.
+
+    The semanticscholar client opens a fresh httpx client for every request,
+    so the cassette sits one level up, around the decoded JSON payload.
+    """
+
+    def __init__(self, requester: ApiRequester, cassette: Cassette):
+        super().__init__(requester.timeout, requester.retry)
+        self.inner = requester
+        self.cassette = cassette
+
+    async def get_data_async(self, url, parameters, headers, payload=None):
+        method = 'POST' if payload else 'GET'
+        parameters = parameters.lstrip("&")
+        full_url = f"{url}?{parameters}" if parameters else url
+        body = json.dumps(payload).encode('utf-8') if payload else None
+
+        response = self.cassette.replay(method, full_url, body)
+        if response is None:
+            data = await self.inner.get_data_async(url, parameters, headers, payload)
+            response = self.cassette.record(method, full_url, body, Response(
+                200, {'content-type': 'application/json'}, json.dumps(data).encode('utf-8')))
+        return json.loads(response.body)
+
+
+class _HttpRequester(ApiRequester):
+    """
+    ApiRequester that sends its requests over the shared keep-alive client, or a client per request.
+
+    The semanticscholar client opens (and closes) a new httpx.AsyncClient
+    for every request. Status handling follows the client's, except that
+    statuses it does not handle raise instead of returning {}. A 429 also
+    raises httpx's HTTPStatusError, whose response keeps the Retry-After
+    header for the resilience layer. The client's ConnectionRefusedError
+    does not keep it. Each request first takes a token from ``limiter``.
+    """
+
+    def __init__(self, requester: ApiRequester, pools: ConnectionPools = None, limiter: RateLimiter = None):
+        super().__init__(requester.timeout, requester.retry)
+        self.pools = pools
+        self.limiter = limiter
+
+    async def get_data_async(self, url, parameters, headers, payload=None):
+        if self.limiter is not None:
+            self.limiter.acquire()
+        method = 'POST' if payload else 'GET'
+        options = {'params': parameters.lstrip("&"), 'headers': headers, 'json': payload, 'timeout': self.timeout}
+        if self.pools is not None:
+            response = self.pools.client().request(method, url, **options)
+        else:
+            with httpx.Client() as client:
+                response = client.request(method, url, **options)
+        status = response.status_code
+        if status == 200:
+            data = response.json()
+            return {} if len(data) == 1 and 'error' in data else data
+        if status == 400:
+            raise BadQueryParametersException(response.json()['error'])
+        if status == 403:
+            raise PermissionError('HTTP status 403 Forbidden.')
+        if status == 404:
+            raise ObjectNotFoundException(response.json()['error'])
+        if status == 500:
+            raise InternalServerErrorException(response.json().get('message', ''))
+        if status == 504:
+            raise GatewayTimeoutException(response.json().get('message', ''))
+        # 429 and the statuses the client answers with {} (e.g. 502, 503)
+        response.raise_for_status()
+        return {}
+
+
+class _GuardedRequester(ApiRequester):
+    """
+    ApiRequester that runs each request through the provider's resilience
+    layer (retries, circuit breaker) and, if set, its Hedger (timeout and
+    hedged duplicates).
+    """
+
+    def __init__(self, requester: ApiRequester, resilience: Resilience, hedger: Hedger = None):
+        super().__init__(requester.timeout, requester.retry)
+        self.inner = requester
+        self.resilience = resilience
+        self.hedger = hedger
+
+    async def get_data_async(self, url, parameters, headers, payload=None):
+        operation = url.rstrip("/").rsplit("/", 1)[-1]
+
+        def attempt():
+            # Each attempt runs its own event loop, off the client's loop
+            try:
+                data = asyncio.run(self.inner.get_data_async(url, parameters, headers, payload))
+            except Exception as e:
+                # With retry=False the client still wraps the error in tenacity's RetryError
+                last_attempt = getattr(e, 'last_attempt', None)
+                if last_attempt is None:
+                    raise
+                raise last_attempt.exception() from None
+            if data == {}:
+                # The client answers statuses it does not handle (e.g. 502, 503) with {};
+                # PaginatedResults would then request the same page forever
+                raise ConnectionError("Semantic Scholar returned an empty response (unhandled HTTP error)")
+            return data
+
+        if self.hedger is not None:
+            hedged = attempt
+            attempt = lambda: self.hedger.call(operation, hedged)
+        return await asyncio.to_thread(self.resilience.call, operation, attempt)
+
 
 class SemanticScholarProvider(SearchProvider):
-    def __init__(self, api_key: str = None):
+    # Largest page the paper search endpoint serves
+    PAGE_SIZE = SEMANTIC_SCHOLAR.page_size
+    reports_failures = True
+
+    def __init__(self, api_key: str = None, api_url: str = None, cassette: Cassette = None,
+                 timeout: float = None, hedge: bool = False, resilience: Resilience = None,
+                 pools: ConnectionPools = None):
         if not api_key:
             api_key = None
-        self.sch = SemanticScholar(api_key=api_key)
+        # The resilience layer does the retrying, honouring Retry-After and the
+        # circuit breaker, instead of the client's fixed 10 attempts
+        options = {'api_key': api_key, 'retry': False}
+        if api_url:
+            options['api_url'] = api_url.rstrip("/")
+        if timeout:
+            options['timeout'] = timeout
+        try:
+            self.sch = SemanticScholar(**options)
+        except TypeError as e:
+            # Releases before 0.8.4 have no retry option
+            raise UnsupportedClient(str(e)) from e
+        # 1 request/s, with or without an API key (unauthenticated clients share a pool and are throttled sooner)
+        self.limiter = RateLimiter(SEMANTIC_SCHOLAR.rate(keyed=bool(api_key)))
+        # Per-request timeout and hedged duplicates, within that pace
+        hedger = None
+        if timeout or hedge:
+            hedger = Hedger("semantic_scholar", self.limiter, timeout=timeout, hedge=hedge)
+        client = _async_client(self.sch)
+        # The hedger already paces every attempt
+        client._requester = _HttpRequester(client._requester, pools, self.limiter if hedger is None else None)
+        self.resilience = resilience or Resilience("semantic_scholar")
+        client._requester = _GuardedRequester(client._requester, self.resilience, hedger)
+        if cassette is not None:
+            # Outermost, so that a replay never retries or waits on the hedger
+            client._requester = _CassetteRequester(client._requester, cassette)
 
     def search(self, query: str, limit: int = 10) -> List[SearchResult]:
+        return list(self.iter_search(query, limit=limit))
+
+    def iter_search(self, query: str, limit: int = 10, page_size: int = None) -> Iterator[SearchResult]:
+        """
+        Stream results, fetching further pages as the consumer reaches them.
+
+        Raises:
+            ProviderFailed: A request failed after retries, or the circuit is open
+        """
+        page_size = min(page_size or self.PAGE_SIZE, limit)
         try:
-            # search_paper returns a PaginatedResults object
-            results = self.sch.search_paper(query, limit=limit)
-            
-            search_results = []
-            for item in results:
-                # item is a Paper object
-                authors = [author.name for author in item.authors] if item.authors else []
-                
-                # Handling potentially missing fields gracefully
-                title = item.title if item.title else ""
-                year = str(item.year) if item.year else ""
-                doi = item.externalIds.get('DOI') if item.externalIds else ""
-                url = item.url if item.url else ""
-                abstract = item.abstract if item.abstract else ""
-
-                search_results.append(SearchResult(
-                    title=title,
-                    authors=authors,
-                    year=year,
-                    doi=doi if doi else "",
-                    source="SemanticScholar",
-                    abstract=abstract,
-                    url=url
-                ))
-            
-            return search_results
+            # search_paper returns a PaginatedResults object; iterating it
+            # fetches further pages on demand, so stop as soon as limit is reached
+            with METRICS.request("semantic_scholar", "search"):
+                results = self.sch.search_paper(query, limit=page_size)
 
+            items = iter(results)
+            for count in range(limit):
+                if count and count % page_size == 0:
+                    # The first item of each further page triggers its fetch
+                    with METRICS.request("semantic_scholar", "search"):
+                        item = next(items, None)
+                else:
+                    item = next(items, None)
+                if item is None:
+                    return
+                yield self._to_result(item)
+
+        except ProviderFailed:
+            raise
+        except Exception as e:
+            raise ProviderFailed("semantic_scholar", "search", FATAL, e) from e
+
+    def count(self, query: str) -> int:
+        """
+        Number of papers matching ``query``: the ``total`` of a one-result search.
+
+        Raises:
+            ProviderFailed: The request failed after retries, or the circuit is open
+        """
+        try:
+            with METRICS.request("semantic_scholar", "count"):
+                results = self.sch.search_paper(query, limit=1, fields=['paperId'])
+            return int(results.total)
+        except ProviderFailed:
+            raise
         except Exception as e:
-            print(f"Error searching Semantic Scholar: {e}")
-            return []
+            raise ProviderFailed("semantic_scholar", "count", FATAL, e) from e
+
+    def _to_result(self, item) -> SearchResult:
+        # item is a Paper object
+        authors = [author.name for author in item.authors] if item.authors else []
+
+        # Handling potentially missing fields gracefully
+        title = item.title if item.title else ""
+        year = str(item.year) if item.year else ""
+        doi = item.externalIds.get('DOI') if item.externalIds else ""
+        url = item.url if item.url else ""
+        abstract = item.abstract if item.abstract else ""
+
+        identifiers = {}
+        if item.paperId:
+            identifiers['s2'] = str(item.paperId)
+        external_ids = item.externalIds or {}
+        for external_name, name in (('PubMed', 'pmid'), ('PubMedCentral', 'pmcid'), ('ArXiv', 'arxiv')):
+            if external_ids.get(external_name):
+                identifiers[name] = str(external_ids[external_name])
+        if 'pmcid' in identifiers and not identifiers['pmcid'].startswith('PMC'):
+            identifiers['pmcid'] = 'PMC' + identifiers['pmcid']
+
+        return SearchResult(
+            title=title,
+            authors=authors,
+            year=year,
+            doi=doi if doi else "",
+            source="SemanticScholar",
+            abstract=abstract,
+            url=url,
+            identifiers=identifiers
+        )
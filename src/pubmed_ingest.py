@@ -0,0 +1,241 @@
+import argparse
+import gzip
+import os
+import sys
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from src.local_index import LocalIndex
+from src.providers.base import SearchResult
+
+# (pmid, title, authors, year, doi, abstract) -- plain tuples pickle cheaply between processes
+Record = Tuple[str, str, List[str], str, str, str]
+
+
+def _text(elem) -> str:
+    """Full text of an element, including inline markup such as <i> or <sup>."""
+    return "".join(elem.itertext()) if elem is not None else ""
+
+
+def _parse_article(citation) -> Record:
+    """Map a MedlineCitation element to the fields PubMedProvider extracts."""
+    pmid = (citation.findtext("PMID") or "").strip()
+    article = citation.find("Article")
+    if article is None:
+        return pmid, "", [], "", "", ""
+
+    title = _text(article.find("ArticleTitle"))
+
+    authors = []
+    for author in article.iterfind("AuthorList/Author"):
+        last_name = author.findtext("LastName") or ""
+        fore_name = author.findtext("ForeName") or ""
+        if last_name or fore_name:
+            authors.append(f"{last_name}, {fore_name}")
+
+    year = article.findtext("Journal/JournalIssue/PubDate/Year") or ""
+
+    doi = ""
+    for eid in article.iterfind("ELocationID"):
+        if eid.get("EIdType") == "doi":
+            doi = (eid.text or "").strip()
+            break
+
+    abstract = " ".join(_text(part) for part in article.iterfind("Abstract/AbstractText"))
+    return pmid, title, authors, year, doi, abstract
+
+
+def iter_pubmed_file(path: str) -> Iterator[Tuple[str, object]]:
+    """
+    Stream a PubMed baseline or update file without loading it into memory.
+
+    Args:
+        path: Path to a .xml or .xml.gz file
+
+    Yields:
+        ("article", Record) for each citation and ("delete", pmid) for each
+        PMID listed in a DeleteCitation block
+    """
+    opener = gzip.open if str(path).endswith(".gz") else open
+    with opener(path, "rb") as f:
+        context = ET.iterparse(f, events=("start", "end"))
+        _, root = next(context)
+        in_delete = False
+        for event, elem in context:
+            if event == "start":
+                if elem.tag == "DeleteCitation":
+                    in_delete = True
+                continue
+            if elem.tag == "MedlineCitation":
+                yield "article", _parse_article(elem)
+            elif elem.tag == "PMID" and in_delete:
+                yield "delete", (elem.text or "").strip()
+            elif elem.tag == "DeleteCitation":
+                in_delete = False
+            if elem.tag in ("PubmedArticle", "DeleteCitation"):
+                # Drop finished subtrees so memory stays flat on 30k-article files
+                root.clear()
+
+
+def parse_file(path: str) -> Tuple[str, List[Record], List[str]]:
+    """Parse one file completely; runs in a worker process."""
+    records = []
+    deletions = []
+    for kind, value in iter_pubmed_file(path):
+        if kind == "article":
+            records.append(value)
+        else:
+            deletions.append(value)
+    return path, records, deletions
+
+
+def record_to_result(record: Record) -> SearchResult:
+    """Build the SearchResult PubMedProvider would return for this record."""
+    pmid, title, authors, year, doi, abstract = record
+    return SearchResult(
+        title=title,
+        authors=authors,
+        year=year,
+        doi=doi,
+        source="PubMed",
+        abstract=abstract,
+        url=f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/",
+        identifiers={'pmid': pmid} if pmid else {}
+    )
+
+
+class PubMedIngestor:
+    """
+    Loads PubMed baseline/update files into a LocalIndex.
+
+    Files are parsed in parallel worker processes but applied to the index in
+    file-name order, so later update files correctly revise or delete records
+    from earlier ones. Each file is committed in a single transaction together
+    with its entry in the ingestion ledger, which makes runs resumable per file.
+    """
+
+    def __init__(self, index: LocalIndex, workers: int = None):
+        """
+        Initialize the PubMedIngestor.
+
+        Args:
+            index: LocalIndex to write into
+            workers: Number of parser processes (default: CPU count)
+        """
+        self.index = index
+        self.workers = workers or os.cpu_count() or 1
+        self.index.conn.execute("""
+            CREATE TABLE IF NOT EXISTS ingested_files (
+                name TEXT PRIMARY KEY,
+                size INTEGER,
+                mtime REAL,
+                records INTEGER,
+                deletions INTEGER,
+                ingested_at TEXT
+            )
+        """)
+        self.index.conn.commit()
+
+    @staticmethod
+    def _signature(path: str) -> Tuple[int, float]:
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime
+
+    def is_ingested(self, path: str) -> bool:
+        """Check whether an unchanged copy of this file was already ingested."""
+        row = self.index.conn.execute(
+            "SELECT size, mtime FROM ingested_files WHERE name = ?",
+            (os.path.basename(path),)
+        ).fetchone()
+        return row is not None and tuple(row) == self._signature(path)
+
+    def pending_files(self, paths: Iterable[str]) -> List[str]:
+        """Return the files that still need ingesting, in the order they must be applied."""
+        files = sorted(set(paths), key=os.path.basename)
+        return [p for p in files if not self.is_ingested(p)]
+
+    def _apply(self, path: str, records: List[Record], deletions: List[str]):
+        size, mtime = self._signature(path)
+        with self.index.conn:
+            for record in records:
+                if record[0]:
+                    self.index.upsert_paper(f"pmid:{record[0]}", record_to_result(record))
+            for pmid in deletions:
+                self.index.delete_paper(f"pmid:{pmid}")
+            self.index.conn.execute(
+                "INSERT OR REPLACE INTO ingested_files VALUES (?, ?, ?, ?, ?, ?)",
+                (os.path.basename(path), size, mtime, len(records), len(deletions),
+                 datetime.now().isoformat())
+            )
+
+    def ingest(self, paths: Iterable[str]) -> Dict[str, int]:
+        """
+        Ingest every file that has not been ingested yet.
+
+        Args:
+            paths: Baseline/update file paths
+
+        Returns:
+            Dictionary with counts of files, records and deletions applied
+        """
+        pending = self.pending_files(paths)
+        stats = {'files': 0, 'records': 0, 'deletions': 0}
+        if not pending:
+            return stats
+
+        # Keep at most two files per worker parsed ahead of the writer to bound memory
+        window = self.workers * 2
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(parse_file, p) for p in pending[:window]]
+            next_index = len(futures)
+            while futures:
+                path, records, deletions = futures.pop(0).result()
+                if next_index < len(pending):
+                    futures.append(executor.submit(parse_file, pending[next_index]))
+                    next_index += 1
+                self._apply(path, records, deletions)
+                stats['files'] += 1
+                stats['records'] += len(records)
+                stats['deletions'] += len(deletions)
+                print(f"Ingested {os.path.basename(path)}: "
+                      f"{len(records)} records, {len(deletions)} deletions")
+        return stats
+
+
+def find_pubmed_files(paths: Iterable[str]) -> List[str]:
+    """Expand directories into the PubMed XML files they contain."""
+    files = []
+    for p in paths:
+        path = Path(p)
+        if path.is_dir():
+            files.extend(str(f) for f in path.glob("*.xml.gz"))
+            files.extend(str(f) for f in path.glob("*.xml"))
+        else:
+            files.append(str(path))
+    return files
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Ingest PubMed baseline/update files into a local index")
+    parser.add_argument("paths", nargs="+", help="PubMed .xml.gz files or directories containing them")
+    parser.add_argument("--index", default="data/pubmed_index.sqlite", help="Path to the local PubMed index")
+    parser.add_argument("--workers", type=int, default=None, help="Number of parser processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    index = LocalIndex(args.index)
+    ingestor = PubMedIngestor(index, workers=args.workers)
+    files = find_pubmed_files(args.paths)
+    if not files:
+        print("No PubMed files found.")
+        sys.exit(1)
+    stats = ingestor.ingest(files)
+    print(f"Done: {stats['files']} files, {stats['records']} records, "
+          f"{stats['deletions']} deletions; index holds {index.count()} papers.")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+Species queries as a small boolean tree, rendered per provider.
+
+A species query is the species name or any synonym, and any keyword:
+
+    tree = species_query(species)     # And(Or(name, *synonyms), Or(*keywords))
+    render(tree)                      # ("Gadus morhua" OR "Atlantic cod") AND "eDNA"
+    render(tree, PUBMED)              # ("Gadus morhua"[tiab] OR "Atlantic cod"[tiab]) AND "eDNA"[tiab]
+    render(tree, PLAIN)               # Gadus morhua Atlantic cod eDNA
+
+BOOLEAN is the syntax of the local indexes and of the run's logs, PUBMED
+restricts every term to titles and abstracts, and PLAIN is for relevance
+search engines without query operators, such as Semantic Scholar.
+
+A provider may cap the length of a rendered query. split() then breaks the
+largest OR group into several sub-queries that each fit; searching all of
+them and merging the results covers the same papers as the whole query.
+
+Merged checklists list the same taxon under several accepted names, or give
+species overlapping synonyms. shared_names() finds the names (compared case-
+and whitespace-insensitively) that species with the same keywords have in
+common, where searching each name once for all of them takes fewer queries
+than searching each species with its own. Such a species gets the results of
+its shared names; any other is searched with its one query:
+
+    shared = shared_names(species_list).get(id(species))
+    parts = [name.tree for name in shared] if shared else [species_query(species)]
+"""
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple, Union
+
+BOOLEAN = "boolean"
+PUBMED = "pubmed"
+PLAIN = "plain"
+SYNTAXES = (BOOLEAN, PUBMED, PLAIN)
+
+# PubMed field tag every term is searched in: title and abstract
+PUBMED_FIELD = "tiab"
+
+
+@dataclass(frozen=True)
+class Term:
+    """A word or phrase, matched as a whole."""
+    text: str
+
+
+@dataclass(frozen=True)
+class Or:
+    children: Tuple['Node', ...]
+
+
+@dataclass(frozen=True)
+class And:
+    children: Tuple['Node', ...]
+
+
+Node = Union[Term, Or, And]
+
+
+def canonical(text: str) -> str:
+    """A name or keyword as compared across species: case-folded, with whitespace collapsed."""
+    return " ".join(text.split()).casefold()
+
+
+def _unique(texts: Iterable[str]) -> List[str]:
+    """Texts without canonical duplicates, keeping the first spelling of each."""
+    unique = {}
+    for text in texts:
+        unique.setdefault(canonical(text), text)
+    return list(unique.values())
+
+
+def _query(names: Iterable[str], keywords: Iterable[str]) -> Node:
+    names = Or(tuple(Term(name) for name in _unique(names)))
+    keywords = _unique(keywords)
+    if not keywords:
+        return names
+    return And((names, Or(tuple(Term(keyword) for keyword in keywords))))
+
+
+def species_query(species) -> Node:
+    """The query of a SpeciesQuery: its name, any synonym or common name, and any of its keywords."""
+    return _query([species.species_name, *species.synonyms, *species.common_names], species.keywords)
+
+
+def name_key(name: str, keywords: Iterable[str]) -> Tuple[FrozenSet[str], str]:
+    """What makes two species' searches of a name the same: the canonical name and set of keywords."""
+    return frozenset(canonical(keyword) for keyword in keywords), canonical(name)
+
+
+@dataclass
+class SharedName:
+    """A name (with its keywords) that several species search: one query, whose results each of them gets."""
+    key: Tuple[FrozenSet[str], str]
+    tree: Node
+    members: List = field(default_factory=list)
+
+
+def shared_names(species_list: Iterable) -> Dict[int, List[SharedName]]:
+    """
+    The shared names each species searches instead of its own query, by ``id()`` of the species.
+
+    Two species share a name when it is a canonical name or synonym of both
+    and they have the same set of keywords. Species with different keywords
+    ask different questions and share nothing. Common names are never
+    shared: one vernacular name often covers unrelated taxa.
+
+    Splitting a species into its names only pays when it saves queries. A
+    species searches its shared names only when all of its names are
+    shared; a name of its own would need a query anyway. The species linked
+    through shared names must also have fewer names between them than there
+    are species: two species with the same two names would need two queries
+    either way. Species left out search their own query.
+    """
+    species_list = list(species_list)
+    names = {}
+    # Query of each name, in the spelling it was first listed with
+    trees = {}
+    for species in species_list:
+        names[id(species)] = []
+        for name in _unique([species.species_name, *species.synonyms]):
+            key = name_key(name, species.keywords)
+            names[id(species)].append(key)
+            if key not in trees:
+                trees[key] = _query([name], species.keywords)
+
+    # Species whose every name is shared with another such species
+    candidates = {id(species): species for species in species_list if not species.common_names}
+    while True:
+        members: Dict[Tuple, List] = {}
+        for key, species in candidates.items():
+            for name in names[key]:
+                members.setdefault(name, []).append(species)
+        left = {key: species for key, species in candidates.items()
+                if all(len(members[name]) > 1 for name in names[key])}
+        if len(left) == len(candidates):
+            break
+        candidates = left
+
+    # Groups of species linked by shared names: searched by name only if that takes fewer queries
+    shared = {}
+    seen = set()
+    for key, species in candidates.items():
+        if key in seen:
+            continue
+        group, group_names, stack = [], {}, [species]
+        seen.add(key)
+        while stack:
+            member = stack.pop()
+            group.append(member)
+            for name in names[id(member)]:
+                if name not in group_names:
+                    group_names[name] = None
+                    for other in members[name]:
+                        if id(other) not in seen:
+                            seen.add(id(other))
+                            stack.append(other)
+        if len(group_names) >= len(group):
+            continue
+        by_key = {name: SharedName(name, trees[name], members[name]) for name in group_names}
+        for member in group:
+            shared[id(member)] = [by_key[name] for name in names[id(member)]]
+    return shared
+
+
+def render(node: Node, syntax: str = BOOLEAN) -> str:
+    """
+    Render a query in a provider's syntax.
+
+    Raises:
+        ValueError: Unknown syntax
+    """
+    if syntax not in SYNTAXES:
+        raise ValueError(f"Unknown query syntax: {syntax!r} (expected one of {', '.join(SYNTAXES)})")
+    if isinstance(node, Term):
+        if syntax == PLAIN:
+            return node.text
+        if syntax == PUBMED:
+            return f'"{node.text}"[{PUBMED_FIELD}]'
+        return f'"{node.text}"'
+    parts = [render(child, syntax) for child in node.children]
+    if syntax == PLAIN:
+        # No operators: the engine ranks papers by how many of the words they match
+        return " ".join(dict.fromkeys(parts))
+    if len(parts) == 1:
+        return parts[0]
+    if isinstance(node, Or):
+        return "(" + " OR ".join(parts) + ")"
+    return " AND ".join(parts)
+
+
+def split(node: Node, syntax: str = BOOLEAN, max_length: Optional[int] = None) -> List[Node]:
+    """
+    Sub-queries of ``node`` whose renderings fit in ``max_length`` characters.
+
+    The OR group with the most terms is packed into as few parts as fit, and
+    parts still too long are split on their next largest group. A single
+    term longer than the cap is returned as it is.
+    """
+    if max_length is None or len(render(node, syntax)) <= max_length:
+        return [node]
+    groups = [path for path in _or_groups(node) if len(_at(node, path).children) > 1]
+    if not groups:
+        return [node]
+    path = max(groups, key=lambda path: len(_at(node, path).children))
+
+    parts = []
+    current = []
+    for child in _at(node, path).children:
+        candidate = current + [child]
+        if current and len(render(_replace(node, path, Or(tuple(candidate))), syntax)) > max_length:
+            parts.append(current)
+            current = [child]
+        else:
+            current = candidate
+    parts.append(current)
+    return [sub_query for part in parts
+            for sub_query in split(_replace(node, path, Or(tuple(part))), syntax, max_length)]
+
+
+def _or_groups(node: Node, path: Tuple[int, ...] = ()):
+    """Paths (child indexes from the root) of every OR group."""
+    if isinstance(node, Term):
+        return
+    if isinstance(node, Or):
+        yield path
+    for index, child in enumerate(node.children):
+        yield from _or_groups(child, path + (index,))
+
+
+def _at(node: Node, path: Tuple[int, ...]) -> Node:
+    for index in path:
+        node = node.children[index]
+    return node
+
+
+def _replace(node: Node, path: Tuple[int, ...], new: Node) -> Node:
+    if not path:
+        return new
+    children = list(node.children)
+    children[path[0]] = _replace(children[path[0]], path[1:], new)
+    return type(node)(tuple(children))
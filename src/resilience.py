@@ -0,0 +1,246 @@
+"""
+Retries and circuit breaking for the search providers.
+
+Every provider request goes through a Resilience object:
+
+    resilience = Resilience("pubmed")
+    record = resilience.call("esearch", lambda: fetch(query))
+
+Errors are classified first. Rate limits (HTTP 429) and transient failures
+(5xx, timeouts, dropped connections) are retried with exponential backoff
+and full jitter, waiting at least as long as a ``Retry-After`` header asks.
+Anything else (a bad query, a parse error) is not retried.
+
+Each provider has a CircuitBreaker. After repeated transient failures it
+opens and requests fail at once, without touching the service, until a
+cool-down has passed; then a single probe request decides whether it closes.
+
+A request that cannot be completed raises ProviderFailed, so a failed
+search is never mistaken for one that found nothing.
+"""
+import http.client
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional
+from urllib.error import URLError
+
+from src.metrics import METRICS, is_rate_limited
+
+RATE_LIMITED = "rate_limited"
+TRANSIENT = "transient"
+FATAL = "fatal"
+
+# HTTP statuses worth retrying
+TRANSIENT_STATUS = frozenset({408, 500, 502, 503, 504})
+
+# Exception classes (by name, anywhere in the MRO) that report a transient
+# failure without an HTTP status, e.g. httpx's transport errors and the
+# semanticscholar client's 500/504 exceptions
+TRANSIENT_NAMES = frozenset({'TransportError', 'InternalServerErrorException', 'GatewayTimeoutException'})
+
+
+class ProviderFailed(Exception):
+    """A provider request failed after retries, or was refused by an open circuit."""
+
+    def __init__(self, service: str, operation: str, kind: str, cause: Optional[BaseException] = None,
+                 message: str = None):
+        self.service = service
+        self.operation = operation
+        self.kind = kind
+        self.cause = cause
+        super().__init__(message or f"{service} {operation} failed ({kind}): {cause}")
+
+
+class CircuitOpen(ProviderFailed):
+    """The provider's circuit breaker is open; no request was sent."""
+
+    def __init__(self, service: str, operation: str, retry_in: float):
+        self.retry_in = retry_in
+        super().__init__(service, operation, "circuit_open",
+                         message=f"{service} {operation} skipped: circuit open, next attempt in {retry_in:.0f}s")
+
+
+def status_of(error: BaseException) -> Optional[int]:
+    """HTTP status carried by an exception, if any."""
+    response = getattr(error, 'response', None)
+    for status in (getattr(error, 'code', None), getattr(error, 'status_code', None),
+                   getattr(response, 'status_code', None)):
+        if isinstance(status, int):
+            return status
+    return None
+
+
+def classify(error: BaseException) -> str:
+    """Return RATE_LIMITED, TRANSIENT or FATAL for a request error."""
+    if is_rate_limited(error):
+        return RATE_LIMITED
+    status = status_of(error)
+    if status is not None:
+        return TRANSIENT if status in TRANSIENT_STATUS else FATAL
+    if isinstance(error, PermissionError):
+        return FATAL
+    if isinstance(error, (ConnectionError, TimeoutError, URLError, http.client.HTTPException)):
+        return TRANSIENT
+    if any(cls.__name__ in TRANSIENT_NAMES for cls in type(error).__mro__):
+        return TRANSIENT
+    return FATAL
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds to wait according to the ``Retry-After`` header of an error response, if any."""
+    headers = getattr(error, 'headers', None)
+    if headers is None:
+        headers = getattr(getattr(error, 'response', None), 'headers', None)
+    value = headers.get('Retry-After') if headers is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, capped, honouring Retry-After."""
+
+    def __init__(self, max_attempts: int = 4, base_delay: float = 1.0, max_delay: float = 60.0):
+        """
+        Initialize the RetryPolicy.
+
+        Args:
+            max_attempts: Attempts per request, the first included
+            base_delay: Backoff ceiling of the first retry, in seconds; doubles per retry
+            max_delay: Longest wait between attempts, in seconds
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, error: BaseException) -> float:
+        """Seconds to wait after failed attempt number ``attempt`` (0-based)."""
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        asked = retry_after(error)
+        if asked is not None:
+            return min(self.max_delay, max(asked, backoff))
+        return backoff
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures; lets one probe through after a cool-down."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60.0):
+        """
+        Initialize the CircuitBreaker.
+
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds the circuit stays open before a probe is allowed
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self.lock:
+            if self.opened_at is None:
+                return "closed"
+            if self._probing or time.monotonic() - self.opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def retry_in(self) -> float:
+        """Seconds until a request may be sent again (0 when closed)."""
+        with self.lock:
+            if self.opened_at is None:
+                return 0.0
+            return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now. After the cool-down, only one probe at a time is let through."""
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if self._probing or time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                # A failed probe restarts the cool-down
+                self.opened_at = time.monotonic()
+                self._probing = False
+
+    def release_probe(self):
+        """Let another probe through after one that said nothing about the service's health."""
+        with self.lock:
+            self._probing = False
+
+
+class Resilience:
+    """Retry policy and circuit breaker of one provider."""
+
+    def __init__(self, service: str, policy: Optional[RetryPolicy] = None,
+                 breaker: Optional[CircuitBreaker] = None, sleep: Callable[[float], None] = time.sleep):
+        """
+        Initialize the Resilience layer.
+
+        Args:
+            service: Service name for metrics and errors, e.g. "pubmed"
+            policy: Retry policy (default: RetryPolicy())
+            breaker: Circuit breaker (default: CircuitBreaker())
+            sleep: Function used to wait between attempts
+        """
+        self.service = service
+        self.policy = policy or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.sleep = sleep
+
+    def call(self, operation: str, fn: Callable):
+        """
+        Run ``fn``, retrying rate limits and transient errors.
+
+        Raises:
+            CircuitOpen: The circuit is open; ``fn`` was not called
+            ProviderFailed: ``fn`` failed with a fatal error, or on every attempt
+        """
+        for attempt in range(self.policy.max_attempts):
+            if not self.breaker.allow():
+                METRICS.inc("circuit_open", service=self.service, operation=operation)
+                raise CircuitOpen(self.service, operation, self.breaker.retry_in())
+            try:
+                result = fn()
+            except Exception as e:
+                kind = classify(e)
+                if kind == FATAL:
+                    # The request is at fault, not the service: retrying would not help, and
+                    # it says nothing about the service's health, so the breaker's state is left
+                    # alone (only a probe slot it held is handed back)
+                    self.breaker.release_probe()
+                    raise ProviderFailed(self.service, operation, kind, e) from e
+                self.breaker.record_failure()
+                if attempt + 1 >= self.policy.max_attempts:
+                    raise ProviderFailed(self.service, operation, kind, e) from e
+                METRICS.inc("retries", service=self.service, operation=operation)
+                self.sleep(self.policy.delay(attempt, e))
+                continue
+            self.breaker.record_success()
+            return result
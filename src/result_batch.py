@@ -0,0 +1,156 @@
+"""
+Columnar storage of many SearchResults.
+
+A SearchResultBatch keeps one list or array per field instead of one object
+per record. Sources, years and author names go into a shared string table
+and are stored as 32-bit ids, and each record's authors are a slice of one
+flat id array. Records are rebuilt as SearchResults only when read, so bulk
+work can run over millions of results:
+
+    batch = SearchResultBatch(results)
+    unique = batch.deduplicate()
+    unique.write_jsonl("data/results.jsonl")
+
+See benchmarks/bench_memory.py for the memory used per record.
+"""
+import json
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.dedup import Deduplicator
+from src.providers.base import SearchResult
+
+
+class SearchResultBatch:
+    """Search results stored by column, with repeated strings stored once."""
+
+    def __init__(self, results: Iterable[SearchResult] = ()):
+        """
+        Initialize the SearchResultBatch.
+
+        Args:
+            results: Records to add, in order
+        """
+        self.titles: List[str] = []
+        self.dois: List[str] = []
+        self.abstracts: List[str] = []
+        self.urls: List[str] = []
+        # None for the many records without identifiers
+        self._identifiers: List[Optional[Dict[str, str]]] = []
+        self._strings: List[str] = []
+        self._string_ids: Dict[str, int] = {}
+        self._sources = array('I')
+        self._years = array('I')
+        # Author ids of all records; record i's are _authors[_author_ends[i - 1]:_author_ends[i]]
+        self._authors = array('I')
+        self._author_ends = array('Q')
+        self.extend(results)
+
+    def _id(self, value: str) -> int:
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = self._string_ids[value] = len(self._strings)
+            self._strings.append(value)
+        return string_id
+
+    def append(self, result: SearchResult):
+        """Add a record (its fields are copied; the record itself is not kept)."""
+        self.titles.append(result.title)
+        self.dois.append(result.doi)
+        self.abstracts.append(result.abstract)
+        self.urls.append(result.url)
+        self._identifiers.append(dict(result.identifiers) if result.identifiers else None)
+        self._sources.append(self._id(result.source))
+        self._years.append(self._id(result.year))
+        self._authors.extend(self._id(name) for name in result.authors or ())
+        self._author_ends.append(len(self._authors))
+
+    def extend(self, results: Iterable[SearchResult]):
+        for result in results:
+            self.append(result)
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+    def _index(self, index: int) -> int:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("SearchResultBatch index out of range")
+        return index
+
+    def source(self, index: int) -> str:
+        return self._strings[self._sources[self._index(index)]]
+
+    def year(self, index: int) -> str:
+        return self._strings[self._years[self._index(index)]]
+
+    def authors(self, index: int) -> Tuple[str, ...]:
+        index = self._index(index)
+        start = self._author_ends[index - 1] if index else 0
+        return tuple(self._strings[string_id] for string_id in self._authors[start:self._author_ends[index]])
+
+    def identifiers(self, index: int) -> Dict[str, str]:
+        return dict(self._identifiers[self._index(index)] or {})
+
+    def sources(self) -> List[str]:
+        """The source of every record."""
+        strings = self._strings
+        return [strings[string_id] for string_id in self._sources]
+
+    def years(self) -> List[str]:
+        """The year of every record."""
+        strings = self._strings
+        return [strings[string_id] for string_id in self._years]
+
+    def __getitem__(self, index: int) -> SearchResult:
+        """A new SearchResult holding the fields of record ``index``."""
+        index = self._index(index)
+        return SearchResult(self.titles[index], list(self.authors(index)), self.year(index), self.dois[index],
+                            self.source(index), self.abstracts[index], self.urls[index], self.identifiers(index))
+
+    def __iter__(self) -> Iterator[SearchResult]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def deduplicate(self, deduplicator: Deduplicator = None) -> 'SearchResultBatch':
+        """
+        A batch of the records that are not duplicates of an earlier one, in order.
+
+        Later duplicates are merged into the kept record (see merge_results).
+
+        Args:
+            deduplicator: Deduplicator to use, e.g. one already holding earlier records
+                (default: a new one with the default threshold)
+        """
+        deduplicator = deduplicator or Deduplicator()
+        return SearchResultBatch([result for result in self if deduplicator.add(result)[1]])
+
+    def to_dicts(self) -> Iterator[Dict]:
+        """Yield each record as a dict with the fields of SearchResult (as dataclasses.asdict would)."""
+        for index in range(len(self)):
+            yield {
+                'title': self.titles[index],
+                'authors': list(self.authors(index)),
+                'year': self.year(index),
+                'doi': self.dois[index],
+                'source': self.source(index),
+                'abstract': self.abstracts[index],
+                'url': self.urls[index],
+                'identifiers': self.identifiers(index),
+            }
+
+    def write_jsonl(self, path: str) -> int:
+        """
+        Write one JSON object per record.
+
+        Returns:
+            Number of records written
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            for record in self.to_dicts():
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return len(self)
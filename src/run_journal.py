@@ -0,0 +1,130 @@
+import json
+import os
+import threading
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from src.providers.base import SearchResult
+
+
+class RunJournal:
+    """
+    Append-only record of what a run has finished, one JSON event per line.
+
+    For each species the journal records the stages it completed: the search
+    results ("searched"), the dedup verdict ("deduplicated"), every paper
+    filed into its Zotero collection ("filed") and the end of the upload
+    ("uploaded"), and the abstract-cache write ("cached"). Every event is
+    flushed and fsynced before the run moves on, so after a crash a resumed
+    run replays only the stages that had not finished.
+    """
+
+    STAGES = ('searched', 'deduplicated', 'filed', 'uploaded', 'cached')
+
+    def __init__(self, journal_dir: str = "data/runs", run_id: Optional[str] = None,
+                 resume: bool = False):
+        """
+        Initialize the RunJournal.
+
+        Args:
+            journal_dir: Directory holding one <run-id>.jsonl file per run (default: data/runs)
+            run_id: Run identifier (default: a new timestamp-based id)
+            resume: Require the journal of ``run_id`` to exist and load it
+        """
+        self.run_id = run_id or self.new_run_id()
+        self.path = Path(journal_dir) / f"{self.run_id}.jsonl"
+        if resume and not self.path.exists():
+            raise FileNotFoundError(f"No journal for run '{self.run_id}' in {journal_dir}")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.species: Dict[str, Dict] = {}
+        if self.path.exists():
+            self._load()
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    @staticmethod
+    def new_run_id(suffix: str = "") -> str:
+        """Return a fresh timestamp-based run id, e.g. 20260101-120000-123456."""
+        run_id = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        return f"{run_id}-{suffix}" if suffix else run_id
+
+    def _state(self, species_name: str) -> Dict:
+        return self.species.setdefault(species_name, {'stages': set(), 'filed': {}})
+
+    def _apply(self, event: Dict):
+        state = self._state(event['species'])
+        stage = event['stage']
+        state['stages'].add(stage)
+        if stage == 'searched':
+            state['results'] = event['results']
+        elif stage == 'filed':
+            state['filed'][event['index']] = event['zotero_key']
+
+    def _load(self):
+        """Replay the events of an earlier (possibly interrupted) run."""
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    # A line cut short by a crash; its stage did not complete
+                    continue
+                self._apply(event)
+
+    def record(self, species_name: str, stage: str, **data):
+        """Durably record that ``species_name`` completed ``stage``."""
+        if stage not in self.STAGES:
+            raise ValueError(f"Unknown stage '{stage}'")
+        event = {'species': species_name, 'stage': stage, 'at': datetime.now().isoformat(), **data}
+        with self.lock:
+            self._file.write(json.dumps(event, ensure_ascii=False) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._apply(event)
+
+    def record_search(self, species_name: str, results: List[SearchResult]):
+        """Record the unique search results of a species."""
+        self.record(species_name, 'searched', results=[asdict(result) for result in results])
+
+    def completed(self, species_name: str, stage: str) -> bool:
+        """Return True if ``species_name`` completed ``stage`` in this run."""
+        return stage in self.species.get(species_name, {}).get('stages', ())
+
+    def search_results(self, species_name: str) -> Optional[List[SearchResult]]:
+        """Return the journaled search results of a species, or None if it was not searched."""
+        state = self.species.get(species_name)
+        if not state or 'results' not in state:
+            return None
+        return [SearchResult(**result) for result in state['results']]
+
+    def filed(self, species_name: str) -> Dict[int, str]:
+        """Return {index in the search results: Zotero key} of papers already filed for a species."""
+        return dict(self.species.get(species_name, {}).get('filed', {}))
+
+    def merge_from(self, journal_file: str) -> int:
+        """
+        Append the events of another journal (e.g. from a shard run).
+
+        Returns:
+            Number of events merged
+        """
+        merged = 0
+        with open(journal_file, 'r', encoding='utf-8') as f, self.lock:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self._file.write(json.dumps(event, ensure_ascii=False) + "\n")
+                self._apply(event)
+                merged += 1
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        return merged
+
+    def close(self):
+        """Close the journal file."""
+        self._file.close()
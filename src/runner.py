@@ -0,0 +1,650 @@
+import queue
+import threading
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass, field, replace
+from itertools import islice
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from src.abstract_cache import AbstractCache
+from src.dedup import Deduplicator
+from src.dedup_index import DedupIndex
+from src.input_manager import SpeciesQuery
+from src.local_index import ZOTERO_IDENTIFIER, LocalIndex
+from src.metrics import METRICS
+from src.negative_cache import NegativeCache
+from src.pipeline import Pipeline, Stage
+from src.profiling import PROFILER
+from src.providers.base import SearchProvider, SearchResult
+from src.providers.registry import ProviderSpec
+from src.query import Node, SharedName, render, shared_names, species_query, split
+from src.resilience import ProviderFailed, Resilience
+from src.run_journal import RunJournal
+
+if TYPE_CHECKING:
+    # pyzotero is only imported by runs that upload
+    from src.zotero_manager import ZoteroManager
+
+
+def build_query(species: SpeciesQuery) -> str:
+    """
+    Build the boolean query for a species.
+
+    Simple strategy: Name OR Synonyms + Keywords
+    e.g. ("Gadus morhua" OR "Atlantic cod") AND ("eDNA" OR "environmental DNA")
+    """
+    return render(species_query(species))
+
+
+def provider_name(provider: SearchProvider) -> str:
+    """The name a provider was selected by (its class name if it has no spec)."""
+    spec = getattr(provider, 'spec', None)
+    return spec.name if isinstance(spec, ProviderSpec) else provider.__class__.__name__
+
+
+def provider_queries(tree: Node, provider: SearchProvider) -> List[str]:
+    """A query rendered in the provider's syntax, split into parts that fit its length cap."""
+    spec = getattr(provider, 'spec', None)
+    if not isinstance(spec, ProviderSpec):
+        return [render(tree)]
+    return [render(part, spec.query_syntax) for part in split(tree, spec.query_syntax, spec.max_query_length)]
+
+
+def collect_results(results: Iterable[SearchResult], deduplicator: Deduplicator, target: int = None) -> int:
+    """
+    Feed streamed provider results into a deduplicator.
+
+    Stops consuming, and closes the provider's generator so no further pages
+    are fetched, once the deduplicator holds ``target`` unique records.
+
+    Returns:
+        Number of results consumed
+    """
+    found = 0
+    try:
+        for result in results:
+            found += 1
+            with PROFILER.stage("dedup"):
+                deduplicator.add(result)
+            if target and len(deduplicator) >= target:
+                break
+    finally:
+        if hasattr(results, "close"):
+            results.close()
+    return found
+
+
+class _SharedSearch:
+    """One provider's search of a shared name, run by the first species to need it and reused by the others."""
+
+    def __init__(self, service: str, species_name: str):
+        # The species that searches
+        self.species_name = species_name
+        self.done = threading.Event()
+        # Until the search completes, the others fail this provider and are requeued
+        self.error: Optional[ProviderFailed] = ProviderFailed(
+            service, "search", "shared", message=f"{service} search shared with {species_name} did not complete")
+        self.results: List[SearchResult] = []
+
+
+class _SharedName:
+    """The searches of a shared name, kept until every species sharing it has its results."""
+
+    def __init__(self, members: int):
+        self.pending = members
+        # By provider name and rendered query
+        self.searches: Dict[Tuple[str, str], _SharedSearch] = {}
+
+
+class _Claim:
+    """A paper one species of the current run is uploading; later species wait for its key."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.zotero_key: Optional[str] = None
+        self.record_id: Optional[int] = None
+
+
+@dataclass
+class SpeciesWork:
+    """A species as it moves through the run pipeline."""
+    species: SpeciesQuery
+    query: str = ""
+    # Unique results of the search stage
+    results: List[SearchResult] = field(default_factory=list)
+    # Providers whose search failed; the species is requeued instead of uploaded
+    failed: List[str] = field(default_factory=list)
+    # Dedup stage verdicts, keyed by position in results: papers to upload
+    # (index, item, claim), papers already in Zotero (index, item, zotero_key,
+    # record_id, None for a local index hit the DedupIndex does not know), papers
+    # another species of this run is uploading (index, item, claim)
+    new: List = field(default_factory=list)
+    reuse: List = field(default_factory=list)
+    waiting: List = field(default_factory=list)
+    already_filed: int = 0
+    # Upload stage output, written by the cache stage
+    papers: List[SearchResult] = field(default_factory=list)
+    zotero_keys: List[str] = field(default_factory=list)
+    log: List[str] = field(default_factory=list)
+
+
+class SpeciesRunner:
+    """
+    Processes species through four pipeline stages:
+
+    1. search: build the query and stream every provider into a per-species
+       Deduplicator
+    2. dedup: match the unique results against the persistent DedupIndex and
+       against papers claimed by species earlier in this run
+    3. upload: create or reuse Zotero items in the species collection
+    4. cache: write the abstract cache and the local full-text index
+
+    With a RunJournal, each completed stage is journaled and stages a resumed
+    run already finished are skipped.
+
+    The dedup and cache stages run a single worker: the first is what orders
+    claims between species (so an upload never waits on a later species), the
+    second serializes writes to the YAML cache.
+    """
+
+    def __init__(self, providers: Sequence[SearchProvider], limit: int = 10,
+                 local_provider: Optional[SearchProvider] = None,
+                 dedup_threshold: float = 0.8, target: int = None, page_size: int = None,
+                 zotero_managers: Sequence['ZoteroManager'] = (),
+                 abstract_cache: Optional[AbstractCache] = None,
+                 local_index: Optional[LocalIndex] = None,
+                 dedup_index: Optional[DedupIndex] = None,
+                 journal: Optional[RunJournal] = None,
+                 dry_run: bool = False,
+                 species_limits: Optional[Dict[str, Dict[str, int]]] = None,
+                 negative_cache: Optional[NegativeCache] = None,
+                 merge_queries: bool = True, merge_window: int = 10_000):
+        """
+        Initialize the SpeciesRunner.
+
+        Args:
+            providers: Remote (or local PubMed) search providers; a provider's
+                ``spec`` caps how many species search it at once
+            limit: Results per provider per species
+            local_provider: Optional provider over the local index, searched first
+            dedup_threshold: Title similarity above which records are duplicates
+            target: Stop searching a species once this many unique results are held
+            page_size: Results fetched per provider request
+            zotero_managers: One ZoteroManager per upload worker
+            abstract_cache: Cache the uploaded papers are written to
+            local_index: Full-text index kept in step with the cache
+            dedup_index: Persistent index of papers already in Zotero
+            journal: Optional journal of completed stages, for resumable runs
+            dry_run: Search only; print results instead of uploading
+            species_limits: Results per provider for some species, by species
+                and provider name, overriding ``limit`` (from a RunPlan; 0 skips
+                the provider)
+            negative_cache: Queries recently found empty, skipped until their re-check time
+            merge_queries: Search a name or synonym that several species share
+                (with the same keywords) once, and give each of them its results
+            merge_window: Species of a streamed species list grouped at a time
+        """
+        self.providers = list(providers)
+        self.limit = limit
+        self.local_provider = local_provider
+        self.dedup_threshold = dedup_threshold
+        self.target = target
+        self.page_size = page_size
+        self.abstract_cache = abstract_cache
+        self.local_index = local_index
+        self.dedup_index = dedup_index
+        self.journal = journal
+        self.dry_run = dry_run
+        self.species_limits = species_limits or {}
+        self.negative_cache = negative_cache
+        self.merge_queries = merge_queries
+        self.merge_window = merge_window
+        # Shared names of each species of the current pass (by id of the species), and their searches
+        self._shared_names: Dict[int, List[SharedName]] = {}
+        self._searches: Dict[int, _SharedName] = {}
+        self._searches_lock = threading.Lock()
+
+        # Searches in flight per provider, capped at the concurrency its spec declares
+        self._slots = {id(provider): threading.BoundedSemaphore(provider.spec.concurrency)
+                       for provider in self.providers if isinstance(getattr(provider, 'spec', None), ProviderSpec)}
+
+        self._zotero_pool = queue.Queue()
+        for manager in zotero_managers:
+            self._zotero_pool.put(manager)
+        self._print_lock = threading.Lock()
+
+        # Papers claimed for upload by species of this run, matched like any other duplicate
+        self._claims = Deduplicator(threshold=dedup_threshold, merge=False)
+        self._claim_of = {}
+
+        # Species whose search failed in this run (still failing after the requeues)
+        self.failed: List[SpeciesQuery] = []
+        self._failed_lock = threading.Lock()
+
+    def _emit(self, work: SpeciesWork):
+        """Print a stage's messages as one block, so concurrent species do not interleave."""
+        if work.log:
+            with self._print_lock:
+                print("\n".join(work.log))
+            work.log = []
+
+    def _completed(self, work: SpeciesWork, stage: str) -> bool:
+        return self.journal is not None and self.journal.completed(work.species.species_name, stage)
+
+    def search(self, work: SpeciesWork) -> SpeciesWork:
+        with PROFILER.stage("search"):
+            return self._search(work)
+
+    def _search(self, work: SpeciesWork) -> SpeciesWork:
+        species = work.species
+        work.log.append(f"\nProcessing species: {species.species_name}")
+        tree = species_query(species)
+        work.query = render(tree)
+        work.log.append(f"  Query: {work.query}")
+        with self._searches_lock:
+            shared = self._shared_names.get(id(species), [])
+        parts = [(None, tree)]
+        if shared:
+            parts = [(name, name.tree) for name in shared]
+            work.log.append(f"  Its {len(shared)} names are shared with other species; each is searched once.")
+
+        try:
+            return self._search_species(work, parts)
+        finally:
+            # Every species counts, however it got its results, or the searches are never forgotten
+            for name in shared:
+                self._release(name)
+
+    def _search_species(self, work: SpeciesWork,
+                        parts: List[Tuple[Optional[SharedName], Node]]) -> Optional[SpeciesWork]:
+        species = work.species
+        if self._completed(work, 'searched'):
+            work.results = self.journal.search_results(species.species_name)
+            work.log.append(f"  Resumed {len(work.results)} unique results from the run journal.")
+            self._emit(work)
+            return work
+
+        self._search_providers(work, parts, self.species_limits.get(species.species_name, {}))
+
+        if work.failed:
+            work.log.append(f"  Search incomplete ({', '.join(work.failed)} failed); species requeued.")
+            with self._failed_lock:
+                self.failed.append(species)
+            self._emit(work)
+            return None
+
+        work.log.append(f"  Total unique results: {len(work.results)}")
+        if self.journal is not None and not self.dry_run:
+            self.journal.record_search(species.species_name, work.results)
+        self._emit(work)
+        return work
+
+    def _search_providers(self, work: SpeciesWork, parts: List[Tuple[Optional[SharedName], Node]],
+                          limits: Dict[str, int]):
+        """Search every provider for each query part, into work.results (or work.failed)."""
+        # Results stream into the deduplicator (normalized DOI, then near-duplicate
+        # titles) page by page, so searching stops as soon as the target is met
+        deduplicator = Deduplicator(threshold=self.dedup_threshold)
+        remote_providers = self.providers
+
+        # Local index first: enough local hits make the remote calls unnecessary
+        if self.local_provider is not None:
+            found = collect_results(self.local_provider.iter_search(work.query, limit=self.limit), deduplicator)
+            work.log.append(f"  Local index: {found} results.")
+            if found >= self.limit:
+                work.log.append("  Local index satisfied the limit, skipping remote providers.")
+                remote_providers = []
+
+        for provider in remote_providers:
+            if self.target and len(deduplicator) >= self.target:
+                work.log.append(f"  Reached target of {self.target} unique results, skipping remaining providers.")
+                break
+            provider_limit = limits.get(provider_name(provider), self.limit)
+            if not provider_limit:
+                work.log.append(f"  Skipping {provider.__class__.__name__}: the plan counted no results.")
+                continue
+            name = provider_name(provider)
+            queries = [(shared, query) for shared, tree in parts for query in provider_queries(tree, provider)]
+            if self.negative_cache is not None:
+                # Queries that found nothing recently wait for their re-check time
+                pending = [(shared, query) for shared, query in queries if not self.negative_cache.skip(name, query)]
+                if len(pending) < len(queries):
+                    METRICS.inc("negative_cache_hits", len(queries) - len(pending), service=name)
+                if not pending:
+                    due = min(self.negative_cache.recheck_at(name, query) for _, query in queries)
+                    work.log.append(f"  Skipping {provider.__class__.__name__}: no results recently "
+                                    f"(next check after {due:%Y-%m-%d}).")
+                    continue
+                if len(pending) < len(queries):
+                    work.log.append(f"  {len(queries) - len(pending)} of {len(queries)} query parts "
+                                    f"found nothing recently; skipped.")
+                queries = pending
+            # A provider that returns [] on errors could put a failed search in the negative cache
+            record_empty = self.negative_cache is not None and getattr(provider, 'reports_failures', False) is True
+            work.log.append(f"  Searching {provider.__class__.__name__}...")
+            reused = sum(shared is not None for shared, _ in queries)
+            if reused:
+                work.log.append(f"    Searching {len(queries)} parts, {reused} shared with other species.")
+            elif len(queries) > 1:
+                work.log.append(f"    Query too long; searching {len(queries)} parts.")
+            try:
+                found = 0
+                for part, (shared, query) in enumerate(queries):
+                    limit = provider_limit
+                    if part:
+                        if found >= provider_limit or (self.target and len(deduplicator) >= self.target):
+                            break
+                        limit = provider_limit - found
+                    if len(queries) > 1:
+                        # The parts share the provider's limit; later parts take up what earlier ones left
+                        limit = -(-limit // (len(queries) - part))
+                    if shared is not None:
+                        results = self._shared_search(work, shared, provider, query, record_empty)
+                        # Every species sharing the search gets these records: the deduplicator merges
+                        # duplicates into the records it keeps, so each species takes its own copies
+                        copies = (replace(result, identifiers=dict(result.identifiers)) for result in results[:limit])
+                        found += collect_results(copies, deduplicator, target=self.target)
+                        continue
+                    with self._slots.get(id(provider)) or nullcontext():
+                        results = provider.iter_search(query, limit=limit, page_size=self.page_size)
+                        part_found = collect_results(results, deduplicator, target=self.target)
+                    if record_empty:
+                        self.negative_cache.record(name, query, part_found)
+                    found += part_found
+            except ProviderFailed as e:
+                # Not the same as finding nothing: the species is searched again later
+                work.failed.append(provider.__class__.__name__)
+                work.log.append(f"    Failed: {e}")
+                continue
+            work.log.append(f"    Found {found} results.")
+
+        if not work.failed:
+            work.results = deduplicator.records
+
+    def _shared_search(self, work: SpeciesWork, shared: SharedName, provider: SearchProvider, query: str,
+                       record_empty: bool) -> List[SearchResult]:
+        """
+        One provider's results for a query part several species share.
+
+        The first species to need them searches, at the largest limit of any
+        species sharing the name; the others wait for its results and take
+        as many as their own limit allows.
+
+        Raises:
+            ProviderFailed: The search failed (for every species sharing it)
+        """
+        name = provider_name(provider)
+        with self._searches_lock:
+            searches = self._searches[id(shared)].searches
+            search = searches.get((name, query))
+            leader = search is None
+            if leader:
+                search = searches[(name, query)] = _SharedSearch(name, work.species.species_name)
+        if not leader:
+            # Waits outside the provider's slots, which the searching species may need
+            search.done.wait()
+            if search.error is not None:
+                raise search.error
+            return search.results
+        try:
+            limit = max(self.species_limits.get(member.species_name, {}).get(name, self.limit)
+                        for member in shared.members)
+            with self._slots.get(id(provider)) or nullcontext():
+                search.results = list(provider.iter_search(query, limit=limit, page_size=self.page_size))
+            if record_empty:
+                self.negative_cache.record(name, query, len(search.results))
+            search.error = None
+        except ProviderFailed as e:
+            search.error = e
+            raise
+        finally:
+            search.done.set()
+        return search.results
+
+    def dedup(self, work: SpeciesWork) -> SpeciesWork:
+        with PROFILER.stage("dedup"):
+            return self._dedup(work)
+
+    def _dedup(self, work: SpeciesWork) -> SpeciesWork:
+        if self.dry_run or self._completed(work, 'uploaded'):
+            return work
+        name = work.species.species_name
+
+        # Papers an interrupted run already filed for this species are not uploaded again
+        filed = self.journal.filed(name) if self.journal is not None else {}
+        for index, zotero_key in filed.items():
+            work.papers.append(work.results[index])
+            work.zotero_keys.append(zotero_key)
+
+        for index, item in enumerate(work.results):
+            if index in filed:
+                continue
+            # Papers uploaded by earlier runs or for other species are reused, not re-uploaded
+            known = self.dedup_index.lookup(item) if self.dedup_index is not None else None
+            if known:
+                if name in known['species']:
+                    work.already_filed += 1
+                else:
+                    work.reuse.append((index, item, known['zotero_key'], known['record_id']))
+                continue
+            zotero_key = (item.identifiers or {}).get(ZOTERO_IDENTIFIER)
+            if zotero_key:
+                # A local index hit (or a duplicate merged with one) is already in Zotero
+                work.reuse.append((index, item, zotero_key, None))
+                continue
+            if self.dedup_index is None:
+                work.new.append((index, item, _Claim()))
+                continue
+
+            kept, is_new = self._claims.add(item)
+            if is_new:
+                claim = self._claim_of[id(kept)] = _Claim()
+                work.new.append((index, item, claim))
+            else:
+                work.waiting.append((index, item, self._claim_of[id(kept)]))
+
+        if self.journal is not None:
+            self.journal.record(name, 'deduplicated', new=len(work.new), reuse=len(work.reuse),
+                                waiting=len(work.waiting), already_filed=work.already_filed)
+        return work
+
+    def _file(self, work: SpeciesWork, index: int, item: SearchResult, zotero_key: str):
+        """Note a paper placed in the species collection."""
+        work.papers.append(item)
+        work.zotero_keys.append(zotero_key)
+        if self.journal is not None:
+            self.journal.record(work.species.species_name, 'filed', index=index, zotero_key=zotero_key)
+
+    def upload(self, work: SpeciesWork) -> Optional[SpeciesWork]:
+        with PROFILER.stage("zotero"):
+            return self._upload(work)
+
+    def _upload(self, work: SpeciesWork) -> Optional[SpeciesWork]:
+        species = work.species
+        if self.dry_run:
+            work.log.append(f"\nResults for {species.species_name}")
+            work.log.append("  Dry Run: Skipping Zotero upload and cache.")
+            for res in work.results[:3]:  # Print first 3
+                work.log.append(f"    - [{res.source}] {res.title} ({res.year})")
+            self._emit(work)
+            return None
+
+        if self._completed(work, 'uploaded'):
+            for index, zotero_key in self.journal.filed(species.species_name).items():
+                work.papers.append(work.results[index])
+                work.zotero_keys.append(zotero_key)
+            return work
+
+        zotero_manager = self._zotero_pool.get()
+        work.log.append(f"\nUploading species: {species.species_name}")
+        try:
+            collection_name = f"eDNA - {species.species_name}"
+            col_id = zotero_manager.create_or_get_collection(collection_name)
+            work.log.append(f"  Target Collection ID: {col_id}")
+
+            count = 0
+            for index, item, claim in work.new:
+                new_key = zotero_manager.add_item(item, col_id)
+                if new_key:
+                    if self.dedup_index is not None:
+                        claim.record_id = self.dedup_index.add(item, new_key, species.species_name)
+                    claim.zotero_key = new_key
+                    self._file(work, index, item, new_key)
+                    count += 1
+                claim.done.set()
+
+            reused = 0
+            for index, item, zotero_key, record_id in work.reuse:
+                if zotero_manager.add_to_collection(zotero_key, col_id):
+                    if record_id is not None:
+                        self.dedup_index.add_species(record_id, species.species_name)
+                    elif self.dedup_index is not None:
+                        self.dedup_index.add(item, zotero_key, species.species_name)
+                    self._file(work, index, item, zotero_key)
+                    reused += 1
+
+            # Papers an earlier species of this run is uploading: wait for its key
+            for index, item, claim in work.waiting:
+                claim.done.wait()
+                if claim.zotero_key is None:
+                    # The other upload failed; try this one ourselves
+                    new_key = zotero_manager.add_item(item, col_id)
+                    if new_key:
+                        if self.dedup_index is not None:
+                            self.dedup_index.add(item, new_key, species.species_name)
+                        self._file(work, index, item, new_key)
+                        count += 1
+                elif zotero_manager.add_to_collection(claim.zotero_key, col_id):
+                    if self.dedup_index is not None and claim.record_id is not None:
+                        self.dedup_index.add_species(claim.record_id, species.species_name)
+                    self._file(work, index, item, claim.zotero_key)
+                    reused += 1
+
+            work.log.append(f"  Added {count} items to Zotero.")
+            if self.dedup_index is not None:
+                work.log.append(f"  Reused {reused} items already in Zotero; "
+                                f"{work.already_filed} already filed for this species.")
+            if self.journal is not None:
+                self.journal.record(species.species_name, 'uploaded', zotero_keys=work.zotero_keys)
+            return work
+
+        except Exception as e:
+            work.log.append(f"  Error processing Zotero for {species.species_name}: {e}")
+            return None
+        finally:
+            # Never leave a later species waiting on a claim this one gave up on
+            for _, _, claim in work.new:
+                claim.done.set()
+            self._zotero_pool.put(zotero_manager)
+            self._emit(work)
+
+    def cache(self, work: SpeciesWork) -> SpeciesWork:
+        with PROFILER.stage("cache"):
+            return self._cache(work)
+
+    def _cache(self, work: SpeciesWork) -> SpeciesWork:
+        species = work.species
+        try:
+            if work.zotero_keys:
+                self.abstract_cache.add_papers(
+                    species_name=species.species_name,
+                    papers=work.papers,
+                    zotero_keys=work.zotero_keys,
+                    keywords=species.keywords
+                )
+                work.log.append(f"  Cached {len(work.zotero_keys)} papers to abstracts_cache.yaml")
+
+                # Keep the local full-text index in step with the cache
+                if self.local_index is not None:
+                    self.local_index.add_papers(work.papers, work.zotero_keys)
+            if self.journal is not None:
+                self.journal.record(species.species_name, 'cached')
+        except Exception as e:
+            work.log.append(f"  Error caching papers for {species.species_name}: {e}")
+        self._emit(work)
+        return work
+
+    def _cool_down(self) -> float:
+        """Seconds until every provider's circuit breaker lets requests through again."""
+        waits = [provider.resilience.breaker.retry_in() for provider in self.providers
+                 if isinstance(getattr(provider, 'resilience', None), Resilience)]
+        return max(waits, default=0.0)
+
+    def run(self, species_list: Iterable[SpeciesQuery], search_workers: int = 1,
+            upload_workers: int = 1, queue_size: int = 4, requeue: int = 1) -> List[SpeciesWork]:
+        """
+        Run every species through the pipeline.
+
+        Species whose search failed are run again, up to ``requeue`` more
+        times, once the providers' circuit breakers have cooled down. Those
+        still failing are left in ``self.failed``.
+
+        Returns:
+            The species that reached the cache stage
+        """
+        pipeline = Pipeline([
+            Stage("search", self.search, workers=search_workers),
+            Stage("dedup", self.dedup),
+            Stage("upload", self.upload, workers=upload_workers),
+            Stage("cache", self.cache),
+        ], queue_size=queue_size)
+        if self.journal is not None:
+            # Finished species never reach the search stage, so they are left out of query groups too
+            unfinished = (species for species in species_list
+                          if not self.journal.completed(species.species_name, 'cached'))
+            species_list = list(unfinished) if isinstance(species_list, Sequence) else unfinished
+        done = pipeline.run(SpeciesWork(species) for species in self._group(species_list))
+
+        for _ in range(requeue):
+            if not self.failed:
+                break
+            failed, self.failed = self.failed, []
+            wait = self._cool_down()
+            print(f"\nRequeuing {len(failed)} species whose search failed"
+                  + (f", after a {wait:.0f}s circuit breaker cool-down." if wait else "."))
+            time.sleep(wait)
+            done += pipeline.run(SpeciesWork(species) for species in self._group(failed))
+        return done
+
+    def _group(self, species_list: Iterable[SpeciesQuery]) -> Iterator[SpeciesQuery]:
+        """
+        Yield the species of a pass, finding the names they share (see src.query.shared_names).
+
+        A list is searched for shared names as a whole. A stream (e.g.
+        InputManager.iter_species) is searched ``merge_window`` species at a
+        time, so the run starts before the stream ends; species further apart
+        search their names separately.
+        """
+        self._shared_names, self._searches = {}, {}
+        if not self.merge_queries:
+            yield from species_list
+            return
+        if isinstance(species_list, Sequence):
+            windows = iter([species_list])
+        else:
+            species_iter = iter(species_list)
+            windows = iter(lambda: list(islice(species_iter, self.merge_window)), [])
+        for window in windows:
+            shared = shared_names(window)
+            names = {id(name): name for species_names in shared.values() for name in species_names}
+            with self._searches_lock:
+                self._shared_names.update(shared)
+                for key, name in names.items():
+                    self._searches[key] = _SharedName(len(name.members))
+            if shared:
+                print(f"{len(shared)} species share all their names and synonyms with others; "
+                      f"searching the {len(names)} shared names once each instead of {len(shared)} species queries.")
+            yield from window
+
+    def _release(self, shared: SharedName):
+        """Forget a shared name's searches once every species sharing it has its results."""
+        with self._searches_lock:
+            searches = self._searches.get(id(shared))
+            if searches is None:
+                return
+            searches.pending -= 1
+            if searches.pending == 0:
+                del self._searches[id(shared)]
+                for member in shared.members:
+                    if self._shared_names.get(id(member)) is not None:
+                        del self._shared_names[id(member)]
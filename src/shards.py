@@ -0,0 +1,99 @@
+"""
+Split a species list across machines and merge the results afterwards.
+
+Each machine runs ``python -m src.main species.yaml --shard i/N`` (1 <= i <= N)
+and processes only the species hashed to its shard. The per-shard abstract
+caches and run journals are then combined with:
+
+    python -m src.shards merge shard1/abstracts_cache.yaml shard2/abstracts_cache.yaml \\
+        --out data/abstracts_cache.yaml --journal shard1/runs/<id>.jsonl --journal shard2/runs/<id>.jsonl
+"""
+import argparse
+import hashlib
+import sys
+from pathlib import Path
+from typing import Tuple
+
+from src.abstract_cache import AbstractCache
+from src.run_journal import RunJournal
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """
+    Parse an ``i/N`` shard spec.
+
+    Returns:
+        (index, count), with 1 <= index <= count
+    """
+    try:
+        index, count = (int(part) for part in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"Invalid shard '{spec}', expected i/N (e.g. 1/4)")
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Invalid shard '{spec}', expected 1 <= i <= N")
+    return index, count
+
+
+def shard_of(species_name: str, count: int) -> int:
+    """
+    Return the 1-based shard a species belongs to.
+
+    The assignment hashes the normalized name, so it is the same on every
+    machine and does not depend on the order of the species list.
+    """
+    digest = hashlib.sha1(species_name.strip().lower().encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % count + 1
+
+
+def merge_caches(cache_files, out_file: str) -> int:
+    """
+    Merge abstract caches into ``out_file`` (created if missing).
+
+    Returns:
+        Number of papers added
+    """
+    target = AbstractCache(out_file)
+    return sum(target.merge_from(AbstractCache(path)) for path in cache_files)
+
+
+def merge_journals(journal_files, out_file: str) -> int:
+    """
+    Combine run journals into the journal at ``out_file`` (<dir>/<run-id>.jsonl).
+
+    Returns:
+        Number of events merged
+    """
+    out_path = Path(out_file)
+    journal = RunJournal(str(out_path.parent), run_id=out_path.stem)
+    try:
+        return sum(journal.merge_from(path) for path in journal_files)
+    finally:
+        journal.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Merge the outputs of sharded runs")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    merge = subparsers.add_parser("merge", help="Merge per-shard abstract caches and run journals")
+    merge.add_argument("caches", nargs="*", help="Per-shard abstract cache files")
+    merge.add_argument("--out", default="data/abstracts_cache.yaml", help="Merged abstract cache")
+    merge.add_argument("--journal", action="append", default=[], help="Per-shard run journal (repeatable)")
+    merge.add_argument("--journal-out", default=None,
+                       help="Merged run journal (default: data/runs/<new run id>-merged.jsonl)")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.caches:
+            added = merge_caches(args.caches, args.out)
+            print(f"Merged {len(args.caches)} caches into {args.out}: {added} papers added.")
+        if args.journal:
+            journal_out = args.journal_out or f"data/runs/{RunJournal.new_run_id('merged')}.jsonl"
+            events = merge_journals(args.journal, journal_out)
+            print(f"Merged {len(args.journal)} journals into {journal_out}: {events} events.")
+    except Exception as e:
+        print(f"Merge Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
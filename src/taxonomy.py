@@ -0,0 +1,341 @@
+"""
+Local taxonomy index for synonym expansion.
+
+Synonyms in species lists are kept by hand and are rarely complete. The NCBI
+taxdump (``names.dmp``, optionally ``nodes.dmp`` to keep only species-level
+taxa) is read once into a compact binary index:
+
+    python -m src.taxonomy build names.dmp --nodes nodes.dmp --out data/taxonomy.idx
+    python -m src.taxonomy lookup data/taxonomy.idx "Gadus morhua"
+
+Runs memory-map the index instead of loading it: a lookup hashes the
+canonical name (see src.query.canonical), probes an open-addressing table
+and reads that taxon's names, touching a few pages of the file whatever its
+size. ``--taxonomy data/taxonomy.idx`` then adds each species' scientific
+synonyms and common names to the ones in its species list.
+
+Any file of ``tax_id <TAB> name <TAB> name class`` lines grouped by tax_id
+can stand in for names.dmp.
+
+Index layout (little-endian):
+
+    header   magic, version, taxon count, slot count, section offsets
+    slots    (name hash u64, taxon number u32) per slot, 0 = empty
+    taxa     (tax_id u32, names offset u64, name count u16) per taxon
+    names    (name class u8, length u16, UTF-8 bytes) per name
+"""
+import argparse
+import gzip
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from array import array
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from src.input_manager import SpeciesQuery
+from src.query import canonical
+
+MAGIC = b"EDNATAX\0"
+VERSION = 1
+HEADER = struct.Struct("<8sIIIQQQ")
+SLOT = struct.Struct("<QI")
+TAXON = struct.Struct("<IQH")
+NAME = struct.Struct("<BH")
+
+# Name classes kept, by NCBI name class
+SCIENTIFIC, SYNONYM, COMMON = 0, 1, 2
+NAME_CLASSES = {
+    "scientific name": SCIENTIFIC,
+    "synonym": SYNONYM,
+    "equivalent name": SYNONYM,
+    "genbank synonym": SYNONYM,
+    "genbank common name": COMMON,
+    "common name": COMMON,
+}
+
+# Ranks kept when nodes.dmp is given
+SPECIES_RANKS = ("species", "subspecies", "varietas", "forma")
+
+
+def name_hash(name: str) -> int:
+    """Stable 64-bit hash of a name's canonical form."""
+    return int.from_bytes(hashlib.blake2b(canonical(name).encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+@dataclass
+class Taxon:
+    tax_id: int
+    scientific_name: str
+    synonyms: List[str] = field(default_factory=list)
+    common_names: List[str] = field(default_factory=list)
+
+
+def _open(path: str):
+    if str(path).endswith(".gz"):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+def _fields(line: str) -> List[str]:
+    """Fields of a .dmp line (``\\t|\\t`` separated, ending in ``\\t|``) or a TSV line."""
+    line = line.rstrip("\n")
+    if line.endswith("\t|"):
+        return line[:-2].split("\t|\t")
+    return line.split("\t")
+
+
+def _set_bit(bitmap: bytearray, number: int):
+    if number // 8 >= len(bitmap):
+        bitmap.extend(bytes(number // 8 + 1 - len(bitmap) + (1 << 16)))
+    bitmap[number // 8] |= 1 << (number % 8)
+
+
+def _has_bit(bitmap: bytearray, number: int) -> bool:
+    return number // 8 < len(bitmap) and bool(bitmap[number // 8] >> (number % 8) & 1)
+
+
+def read_ranks(nodes_file: str, ranks=SPECIES_RANKS) -> bytearray:
+    """Bitmap of the tax_ids of nodes.dmp whose rank is one of ``ranks`` (a few hundred kB for all of NCBI)."""
+    wanted = set(ranks)
+    bitmap = bytearray()
+    with _open(nodes_file) as f:
+        for line in f:
+            fields = _fields(line)
+            if len(fields) >= 3 and fields[2].strip() in wanted:
+                _set_bit(bitmap, int(fields[0]))
+    return bitmap
+
+
+def read_names(names_file: str, ranks: bytearray = None) -> Iterator[Tuple[int, List[Tuple[int, str]]]]:
+    """
+    Yield (tax_id, [(name class, name), ...]) per taxon of a names.dmp grouped by tax_id.
+
+    Raises:
+        ValueError: The file is not grouped by tax_id
+    """
+    current, names, seen = None, [], bytearray()
+    with _open(names_file) as f:
+        for number, line in enumerate(f, 1):
+            fields = _fields(line)
+            if len(fields) < 3:
+                continue
+            name_class = NAME_CLASSES.get(fields[-1].strip() if len(fields) == 3 else fields[3].strip())
+            if name_class is None:
+                continue
+            tax_id = int(fields[0])
+            if ranks is not None and not _has_bit(ranks, tax_id):
+                continue
+            if tax_id != current:
+                if current is not None:
+                    yield current, names
+                if _has_bit(seen, tax_id):
+                    raise ValueError(f"{names_file} is not grouped by tax_id (tax_id {tax_id} again at line {number})")
+                _set_bit(seen, tax_id)
+                current, names = tax_id, []
+            names.append((name_class, fields[1].strip()))
+    if current is not None:
+        yield current, names
+
+
+def build_index(names_file: str, out_file: str, nodes_file: str = None) -> int:
+    """
+    Build the index of a names.dmp (restricted to species-level taxa with a nodes.dmp).
+
+    The dump is streamed: only the name hashes and the index under
+    construction are held in memory.
+
+    Returns:
+        Number of taxa indexed
+    """
+    ranks = read_ranks(nodes_file) if nodes_file else None
+    out_file = Path(out_file)
+    out_file.parent.mkdir(parents=True, exist_ok=True)
+    names_tmp = out_file.with_suffix(out_file.suffix + ".names")
+    taxa = bytearray()
+    # Per lookup key: hash, taxon number, and whether it is a scientific name (inserted first)
+    hashes, numbers, scientific = array('Q'), array('I'), array('B')
+
+    offset = 0
+    with open(names_tmp, 'wb') as names_out:
+        for tax_id, names in read_names(names_file, ranks):
+            names.sort(key=lambda entry: entry[0])
+            if names[0][0] != SCIENTIFIC:
+                continue
+            number = len(taxa) // TAXON.size + 1
+            taxa += TAXON.pack(tax_id, offset, len(names))
+            for name_class, name in names:
+                encoded = name.encode('utf-8')[:0xFFFF]
+                names_out.write(NAME.pack(name_class, len(encoded)) + encoded)
+                offset += NAME.size + len(encoded)
+                if name_class != COMMON:
+                    # Common names are shared by many taxa, so they expand a species but never identify one
+                    hashes.append(name_hash(name))
+                    numbers.append(number)
+                    scientific.append(name_class == SCIENTIFIC)
+
+    # Open addressing with linear probing, at most half full
+    slot_count = 1 << max(4, (2 * len(hashes)).bit_length())
+    slots = bytearray(slot_count * SLOT.size)
+    for wanted in (1, 0):
+        for key_hash, number, is_scientific in zip(hashes, numbers, scientific):
+            if is_scientific != wanted:
+                continue
+            slot = key_hash & (slot_count - 1)
+            while True:
+                stored_hash, stored = SLOT.unpack_from(slots, slot * SLOT.size)
+                if not stored:
+                    SLOT.pack_into(slots, slot * SLOT.size, key_hash, number)
+                    break
+                if stored_hash == key_hash:
+                    # The same name on another taxon: a scientific name, then the first in the file, wins
+                    break
+                slot = (slot + 1) & (slot_count - 1)
+
+    taxon_count = len(taxa) // TAXON.size
+    slots_offset = HEADER.size
+    taxa_offset = slots_offset + len(slots)
+    names_offset = taxa_offset + len(taxa)
+    tmp = out_file.with_suffix(out_file.suffix + ".tmp")
+    with open(tmp, 'wb') as out, open(names_tmp, 'rb') as names_in:
+        out.write(HEADER.pack(MAGIC, VERSION, taxon_count, slot_count, slots_offset, taxa_offset, names_offset))
+        out.write(slots)
+        out.write(taxa)
+        while True:
+            chunk = names_in.read(1 << 20)
+            if not chunk:
+                break
+            out.write(chunk)
+    os.replace(tmp, out_file)
+    os.remove(names_tmp)
+    return taxon_count
+
+
+class TaxonomyIndex:
+    """A taxonomy index built by build_index(), memory-mapped for lookups."""
+
+    def __init__(self, index_file: str = "data/taxonomy.idx"):
+        """
+        Initialize the TaxonomyIndex.
+
+        Args:
+            index_file: Path to the index (default: data/taxonomy.idx)
+
+        Raises:
+            ValueError: The file is not a taxonomy index of this version
+        """
+        self.index_file = index_file
+        with open(index_file, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.map) < HEADER.size:
+            self.map.close()
+            raise ValueError(f"{index_file} is not a taxonomy index")
+        (magic, version, self.taxon_count, self.slot_count,
+         self.slots_offset, self.taxa_offset, self.names_offset) = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.map.close()
+            raise ValueError(f"{index_file} is not a version {VERSION} taxonomy index (rebuild it)")
+
+    def __len__(self) -> int:
+        return self.taxon_count
+
+    def _names(self, number: int) -> List[Tuple[int, str]]:
+        tax_id, offset, count = TAXON.unpack_from(self.map, self.taxa_offset + (number - 1) * TAXON.size)
+        position = self.names_offset + offset
+        names = []
+        for _ in range(count):
+            name_class, length = NAME.unpack_from(self.map, position)
+            position += NAME.size
+            names.append((name_class, self.map[position:position + length].decode('utf-8')))
+            position += length
+        return names
+
+    def lookup(self, name: str) -> Optional[Taxon]:
+        """The taxon with this scientific name or synonym (case and spacing ignored), if any."""
+        key, key_hash = canonical(name), name_hash(name)
+        slot = key_hash & (self.slot_count - 1)
+        while True:
+            stored_hash, number = SLOT.unpack_from(self.map, self.slots_offset + slot * SLOT.size)
+            if not number:
+                return None
+            if stored_hash == key_hash:
+                names = self._names(number)
+                if any(name_class != COMMON and canonical(text) == key for name_class, text in names):
+                    tax_id = TAXON.unpack_from(self.map, self.taxa_offset + (number - 1) * TAXON.size)[0]
+                    return Taxon(tax_id, names[0][1],
+                                 [text for name_class, text in names if name_class == SYNONYM],
+                                 [text for name_class, text in names if name_class == COMMON])
+            slot = (slot + 1) & (self.slot_count - 1)
+
+    def expand(self, species: SpeciesQuery, common_names: bool = True) -> SpeciesQuery:
+        """
+        The species with the synonyms (and common names) of its taxon added.
+
+        The taxon is looked up by the species name, then by each listed
+        synonym; a species found under neither is returned unchanged. Common
+        names go into ``common_names``, which are searched but never used to
+        match the species to another (see src.query.shared_names).
+        """
+        for name in [species.species_name, *species.synonyms]:
+            taxon = self.lookup(name)
+            if taxon is not None:
+                break
+        else:
+            return species
+        known = {canonical(name) for name in [species.species_name, *species.synonyms, *species.common_names]}
+        added = {'synonyms': [], 'common_names': []}
+        for field_name, names in (('synonyms', [taxon.scientific_name, *taxon.synonyms]),
+                                  ('common_names', taxon.common_names if common_names else [])):
+            for name in names:
+                if canonical(name) not in known:
+                    known.add(canonical(name))
+                    added[field_name].append(name)
+        if not any(added.values()):
+            return species
+        return replace(species, synonyms=[*species.synonyms, *added['synonyms']],
+                       common_names=[*species.common_names, *added['common_names']])
+
+    def close(self):
+        """Unmap the index file."""
+        self.map.close()
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Build or query the local taxonomy index used for synonym expansion")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Index an NCBI taxdump names.dmp")
+    build.add_argument("names", help="names.dmp (or .dmp.gz, or tax_id/name/class TSV)")
+    build.add_argument("--nodes", default=None, help="nodes.dmp, to keep only species-level taxa")
+    build.add_argument("--out", default="data/taxonomy.idx", help="Index file to write")
+    lookup = commands.add_parser("lookup", help="Print the names of a taxon")
+    lookup.add_argument("index", help="Index file")
+    lookup.add_argument("names", nargs="+", help="Scientific names or synonyms")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        try:
+            count = build_index(args.names, args.out, nodes_file=args.nodes)
+        except (OSError, ValueError) as e:
+            print(f"Failed to build the taxonomy index: {e}")
+            sys.exit(1)
+        print(f"Indexed {count} taxa into {args.out} ({os.path.getsize(args.out) / 1e6:.1f} MB).")
+        return
+
+    index = TaxonomyIndex(args.index)
+    for name in args.names:
+        taxon = index.lookup(name)
+        if taxon is None:
+            print(f"{name}: not found")
+            continue
+        print(f"{name}: {taxon.scientific_name} (taxid {taxon.tax_id})")
+        for label, names in (("synonyms", taxon.synonyms), ("common names", taxon.common_names)):
+            if names:
+                print(f"  {label}: {', '.join(names)}")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,34 @@
 from pyzotero import zotero
 from typing import List
+from src.cassette import Cassette
+from src.http_pool import ConnectionPools
+from src.metrics import METRICS
 from src.providers.base import SearchResult
 
+try:
+    # pyzotero 1.15+ is built on httpx2 (and installs it)
+    import httpx2 as zotero_http
+except ImportError:
+    # Earlier pyzotero is built on httpx
+    import httpx as zotero_http
+
+# Labels Zotero's "Extra" field understands for SearchResult identifiers
+EXTRA_LABELS = {'pmid': 'PMID', 'pmcid': 'PMCID', 'arxiv': 'arXiv', 's2': 'Semantic Scholar ID'}
+
 class ZoteroManager:
-    def __init__(self, library_id: str, api_key: str, library_type: str = 'group'):
-        self.zot = zotero.Zotero(library_id, library_type, api_key)
+    def __init__(self, library_id: str, api_key: str, library_type: str = 'group', endpoint: str = None,
+                 cassette: Cassette = None, pools: ConnectionPools = None):
+        if pools is not None:
+            # Managers of concurrent upload workers share the pooled connections
+            self.zot = zotero.Zotero(library_id, library_type, api_key, client=pools.client(zotero_http))
+        else:
+            self.zot = zotero.Zotero(library_id, library_type, api_key)
+        if endpoint:
+            # Web API root to use instead of api.zotero.org (e.g. a stand-in server)
+            self.zot.endpoint = endpoint.rstrip("/")
+        if cassette is not None:
+            # Record or replay every Web API exchange
+            self.zot.client = cassette.httpx_client(zotero_http, follow_redirects=True, timeout=self.zot.client.timeout)
 
     def create_or_get_collection(self, name: str) -> str:
         """
@@ -12,7 +36,8 @@ class ZoteroManager:
         """
         try:
             # 1. Fetch all collections
-            collections = self.zot.collections()
+            with METRICS.request("zotero", "collections"):
+                collections = self.zot.collections()
             
             # 2. Check if name exists
             for col in collections:
@@ -20,7 +45,8 @@ class ZoteroManager:
                     return col['key']
             
             # 3. Create if not found
-            resp = self.zot.create_collections([{'name': name}])
+            with METRICS.request("zotero", "create_collections"):
+                resp = self.zot.create_collections([{'name': name}])
             if resp and 'successful' in resp and resp['successful']:
                 # The response structure for create_collections returns a dict with 'successful' 
                 # mapping 0 -> {'key': '...', ...}
@@ -38,7 +64,8 @@ class ZoteroManager:
         """
         try:
             # Create a template item provided by pyzotero
-            template = self.zot.item_template('journalArticle')
+            with METRICS.request("zotero", "item_template"):
+                template = self.zot.item_template('journalArticle')
             
             template['title'] = item.title
             
@@ -57,11 +84,16 @@ class ZoteroManager:
             template['url'] = item.url
             template['abstractNote'] = item.abstract
             template['libraryCatalog'] = item.source
+            extra = [f"{EXTRA_LABELS[name]}: {value}" for name, value in (item.identifiers or {}).items()
+                     if name in EXTRA_LABELS]
+            if extra:
+                template['extra'] = "\n".join(extra)
             
             # Add to collection
             template['collections'] = [collection_id]
             
-            resp = self.zot.create_items([template])
+            with METRICS.request("zotero", "create_items"):
+                resp = self.zot.create_items([template])
             if resp and 'successful' in resp and resp['successful']:
                 return resp['successful']['0']['key']
             else:
@@ -72,3 +104,21 @@ class ZoteroManager:
         except Exception as e:
             print(f"Error in Zotero add_item: {e}")
             return None
+
+    def add_to_collection(self, item_key: str, collection_id: str) -> bool:
+        """
+        Files an existing item into another collection instead of creating a duplicate.
+        Returns True if the item is in the collection afterwards.
+        """
+        try:
+            with METRICS.request("zotero", "item"):
+                item = self.zot.item(item_key)
+            if collection_id in item['data'].get('collections', []):
+                return True
+            with METRICS.request("zotero", "addto_collection"):
+                self.zot.addto_collection(collection_id, item)
+            return True
+
+        except Exception as e:
+            print(f"Error in Zotero add_to_collection: {e}")
+            return False
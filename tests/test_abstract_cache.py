@@ -210,3 +210,29 @@ def test_multiple_species(cache, sample_papers):
     assert salmo_data['name'] == "Salmo salar"
     assert len(gadus_data['papers']) == 1
     assert len(salmo_data['papers']) == 1
+
+
+def test_add_papers_stores_identifiers(cache, temp_cache_file):
+    """Test that provider identifiers are cached with each paper."""
+    paper = SearchResult(
+        title="Merged record",
+        authors=[],
+        year="2023",
+        doi="10.1/x",
+        source="PubMed",
+        identifiers={'pmid': '42', 's2': 'abc'}
+    )
+    cache.add_papers("Gadus morhua", [paper], ["ZOTERO1"])
+
+    with open(temp_cache_file, 'r', encoding='utf-8') as f:
+        data = yaml.safe_load(f)
+
+    assert data['species'][0]['papers'][0]['identifiers'] == {'pmid': '42', 's2': 'abc'}
+
+
+def test_add_papers_replay_is_idempotent(cache, sample_papers):
+    """Test that re-adding the same Zotero keys (a resumed run) adds nothing twice."""
+    cache.add_papers("Gadus morhua", sample_papers, ["ZOTERO123", "ZOTERO456"])
+    cache.add_papers("Gadus morhua", sample_papers, ["ZOTERO123", "ZOTERO456"])
+
+    assert len(cache.get_species_papers("Gadus morhua")['papers']) == 2
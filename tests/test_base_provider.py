@@ -44,3 +44,27 @@ def test_search_provider_base_method():
     provider = SuperCallingProvider()
     # Calling the abstract method usually does nothing (it's empty body)
     provider.search("q")
+
+def test_search_result_is_compact():
+    first = SearchResult("A", ["".join(["Doe", ", J"])], "".join(["20", "23"]), "", "".join(["Pub", "Med"]))
+    second = SearchResult("B", ["Doe, J"], "2023", "", "PubMed")
+    assert first.source is second.source and first.year is second.year
+    assert first.authors[0] is second.authors[0]
+    assert not hasattr(first, '__dict__')
+    assert first.compact().authors == ("Doe, J",)
+    assert first == SearchResult("A", ("Doe, J",), "2023", "", "PubMed")
+
+
+def test_search_result_from_str_subclasses():
+    class StringElement(str):
+        """Like Bio.Entrez's parsed strings: a str subclass carrying XML attributes."""
+
+    def element(text):
+        value = StringElement(text)
+        value.attributes = {'Label': "x"}
+        return value
+
+    result = SearchResult(element("A"), [element("Doe, J")], element("2023"), "", element("PubMed"))
+    plain = SearchResult("B", ["Doe, J"], "2023", "", "PubMed")
+    assert type(result.source) is str and result.source is plain.source
+    assert result.year is plain.year and result.authors[0] is plain.authors[0]
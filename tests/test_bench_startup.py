@@ -0,0 +1,34 @@
+import pytest
+
+from benchmarks.bench_startup import HEAVY, parse_importtime, run_scenario, top_level_time
+
+
+def loaded(result):
+    assert result.returncode == 0, result.stdout
+    return set(HEAVY) & set(parse_importtime(result.stderr))
+
+
+def test_parse_importtime():
+    stderr = ("import time: self [us] | cumulative | imported package\n"
+              "import time:       100 |        100 | site\n"
+              "import time:        20 |         20 |   yaml.cyaml\n"
+              "import time:        30 |         50 | yaml\n")
+    assert parse_importtime(stderr) == {'site': (100, 100), 'yaml.cyaml': (20, 20), 'yaml': (30, 50)}
+    assert top_level_time(stderr) == 50
+
+
+def test_help_imports_no_heavy_library(tmp_path):
+    result = run_scenario("help", str(tmp_path))
+    assert "eDNA Literature Miner" in result.stdout
+    assert loaded(result) == set()
+
+
+def test_offline_run_skips_network_libraries(tmp_path):
+    assert loaded(run_scenario("offline", str(tmp_path))) == {'yaml', 'dotenv'}
+
+
+@pytest.mark.parametrize("scenario, zotero", [("dry-run", False), ("full", True)])
+def test_only_uploading_runs_import_pyzotero(tmp_path, scenario, zotero):
+    heavy = loaded(run_scenario(scenario, str(tmp_path)))
+    assert {'Bio', 'semanticscholar', 'httpx'} <= heavy
+    assert ('pyzotero' in heavy) == zotero
@@ -0,0 +1,89 @@
+import pytest
+
+from benchmarks.stub_services import Corpus, StubServices
+from src.cassette import Cassette, CassetteMiss, Response, request_key
+from src.providers.pubmed import PubMedProvider
+from src.providers.semantic_scholar import SemanticScholarProvider
+from src.zotero_manager import ZoteroManager
+
+
+def test_request_key_ignores_caller_params_host_and_order():
+    a = request_key("GET", "https://eutils.ncbi.nlm.nih.gov/e/esearch.fcgi?term=cod&db=pubmed&email=a@b.c&tool=x")
+    b = request_key("get", "http://127.0.0.1:8000/e/esearch.fcgi?db=pubmed&term=cod")
+    assert a == b == "GET /e/esearch.fcgi?db=pubmed&term=cod"
+    assert request_key("POST", "http://h/items", b'[{"title": "A"}]') != request_key("POST", "http://h/items", b'[{"title": "B"}]')
+    assert (request_key("POST", "http://h/efetch.fcgi", b"id=1,2&email=a@b.c")
+            == request_key("POST", "http://h/efetch.fcgi", b"email=x@y.z&id=1,2"))
+
+
+def test_unknown_mode(tmp_path):
+    with pytest.raises(ValueError, match="Unknown cassette mode"):
+        Cassette(str(tmp_path / "c.jsonl.gz"), mode="rewind")
+
+
+def test_record_then_replay(tmp_path):
+    path = str(tmp_path / "c.jsonl.gz")
+    recorder = Cassette(path, mode="record")
+    calls = []
+
+    def live(body):
+        def call():
+            calls.append(body)
+            return Response(200, {'Content-Type': 'text/xml', 'Date': 'today'}, body)
+        return call
+
+    recorder.exchange("GET", "http://h/a?x=1", None, live(b"first"))
+    recorder.exchange("GET", "http://h/a?x=1", None, live(b"second"))
+    recorder.exchange("GET", "http://h/bin", None, live(b"\xff\x00"))
+    recorder.exchange("GET", "http://h/limited", None, lambda: Response(429, {'Retry-After': '1'}, b""))
+    recorder.close()
+    assert recorder.recorded == 3
+
+    player = Cassette(path, mode="replay")
+    assert len(player) == 3
+    never = lambda: pytest.fail("replay must not touch the network")
+    first = player.exchange("GET", "http://other/a?x=1", None, never)
+    assert first.body == b"first" and first.headers == {'content-type': 'text/xml'}
+    assert player.exchange("GET", "http://h/a?x=1", None, never).body == b"second"
+    # Exhausted: the last response repeats
+    assert player.exchange("GET", "http://h/a?x=1", None, never).body == b"second"
+    assert player.exchange("GET", "http://h/bin", None, never).body == b"\xff\x00"
+    with pytest.raises(CassetteMiss, match="GET /limited"):
+        player.exchange("GET", "http://h/limited", None, never)
+
+
+def test_replay_tolerates_truncated_recording(tmp_path):
+    path = tmp_path / "c.jsonl.gz"
+    recorder = Cassette(str(path), mode="record")
+    recorder.record("GET", "http://h/a", None, Response(200, {}, b"kept"))
+    flushed = len(path.read_bytes())
+    recorder.record("GET", "http://h/b", None, Response(200, {}, b"x" * 1000))
+    # Simulate a crash: the gzip stream is never closed and its tail is lost
+    data = path.read_bytes()
+    path.write_bytes(data[:flushed + (len(data) - flushed) // 2])
+
+    player = Cassette(str(path), mode="replay")
+    assert player.replay("GET", "http://h/a").body == b"kept"
+
+
+def test_real_clients_replay_without_network(tmp_path):
+    path = str(tmp_path / "run.jsonl.gz")
+
+    def run(cassette, env):
+        pubmed = PubMedProvider("test@example.com", base_url=env['pubmed'], cassette=cassette).search("cod", limit=5)
+        s2 = SemanticScholarProvider(api_url=env['semantic_scholar'], cassette=cassette).search("cod", limit=5)
+        manager = ZoteroManager("1", "key", endpoint=env['zotero'], cassette=cassette)
+        collection = manager.create_or_get_collection("eDNA - Gadus morhua")
+        key = manager.add_item(pubmed[0], collection)
+        return pubmed, s2, collection, key
+
+    with StubServices(corpus=Corpus(results_per_query=5)) as services:
+        recorder = Cassette(path, mode="record")
+        urls = {name: server.url for name, server in services.servers.items()}
+        recorded = run(recorder, urls)
+        recorder.close()
+
+    # The stand-ins are gone; nothing listens on these ports any more
+    replayed = run(Cassette(path, mode="replay"), urls)
+    assert replayed == recorded
+    assert recorded[3]
@@ -9,6 +9,9 @@ def clean_env(monkeypatch):
     monkeypatch.delenv("ZOTERO_LIBRARY_TYPE", raising=False)
     monkeypatch.delenv("SEMANTIC_SCHOLAR_API_KEY", raising=False)
     monkeypatch.delenv("EMAIL", raising=False)
+    monkeypatch.delenv("PUBMED_EUTILS_URL", raising=False)
+    monkeypatch.delenv("SEMANTIC_SCHOLAR_API_URL", raising=False)
+    monkeypatch.delenv("ZOTERO_API_URL", raising=False)
 
 def test_config_defaults(clean_env):
     config = Config()
@@ -17,6 +20,9 @@ def test_config_defaults(clean_env):
     assert config.ZOTERO_LIBRARY_TYPE == "group"
     assert config.SEMANTIC_SCHOLAR_API_KEY == ""
     assert config.EMAIL == ""
+    assert config.PUBMED_EUTILS_URL == ""
+    assert config.SEMANTIC_SCHOLAR_API_URL == ""
+    assert config.ZOTERO_API_URL == ""
 
 def test_config_from_env(monkeypatch):
     monkeypatch.setenv("ZOTERO_LIBRARY_ID", "12345")
@@ -24,8 +30,10 @@ def test_config_from_env(monkeypatch):
     monkeypatch.setenv("ZOTERO_LIBRARY_TYPE", "user")
     monkeypatch.setenv("SEMANTIC_SCHOLAR_API_KEY", "semkey")
     monkeypatch.setenv("EMAIL", "test@example.com")
+    monkeypatch.setenv("ZOTERO_API_URL", "http://127.0.0.1:8080")
 
     config = Config()
+    assert config.ZOTERO_API_URL == "http://127.0.0.1:8080"
     assert config.ZOTERO_LIBRARY_ID == "12345"
     assert config.ZOTERO_API_KEY == "key123"
     assert config.ZOTERO_LIBRARY_TYPE == "user"
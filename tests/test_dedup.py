@@ -0,0 +1,145 @@
+import pytest
+from src.dedup import Deduplicator, MinHasher, jaccard, merge_results, normalize_doi, normalize_title, shingles
+from src.providers.base import SearchResult
+
+
+def result(title, doi="", source="PubMed"):
+    return SearchResult(title=title, authors=[], year="2023", doi=doi, source=source)
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("10.1234/ABC.5", "10.1234/abc.5"),
+    ("https://doi.org/10.1234/abc.5", "10.1234/abc.5"),
+    ("http://dx.doi.org/10.1234/abc.5", "10.1234/abc.5"),
+    ("doi: 10.1234/abc.5.", "10.1234/abc.5"),
+    (None, ""),
+])
+def test_normalize_doi(raw, expected):
+    assert normalize_doi(raw) == expected
+
+
+def test_normalize_title():
+    assert normalize_title("  eDNA of <i>Gadus morhua</i>: A Survey. ") == "edna of gadus morhua a survey"
+    assert normalize_title("Α-diversity of fish") == normalize_title("alpha-diversity of fish")
+    assert normalize_title("Café études") == "cafe etudes"
+    assert normalize_title(None) == ""
+
+
+def test_shingles_and_jaccard():
+    assert shingles("abc", 5) == {"abc"}
+    assert shingles("", 5) == set()
+    assert shingles("abcdef", 5) == {"abcde", "bcdef"}
+    assert jaccard({"a", "b"}, {"b", "c"}) == pytest.approx(1 / 3)
+    assert jaccard(set(), {"a"}) == 0.0
+
+
+def test_minhash_is_deterministic_and_similarity_preserving():
+    hasher = MinHasher(num_perm=96)
+    a = shingles(normalize_title("Environmental DNA metabarcoding of Atlantic cod in the North Sea"))
+    b = shingles(normalize_title("Environmental DNA metabarcoding of Atlantic cod in the Nort Sea"))
+    c = shingles(normalize_title("Otolith chemistry of juvenile salmon"))
+
+    sig_a = hasher.signature(a)
+    assert sig_a == MinHasher(num_perm=96).signature(a)
+    assert len(sig_a) == 96
+    agree = lambda x, y: sum(i == j for i, j in zip(x, y)) / len(x)
+    assert agree(sig_a, hasher.signature(b)) > agree(sig_a, hasher.signature(c))
+    assert hasher.signature(set()) == ()
+
+
+def test_bands_must_divide_num_perm():
+    with pytest.raises(ValueError):
+        Deduplicator(num_perm=100, bands=12)
+
+
+def test_doi_variants_are_duplicates():
+    dedup = Deduplicator()
+    kept = dedup.deduplicate([
+        result("Cod survey", "10.1234/ABC"),
+        result("Completely different title", "https://doi.org/10.1234/abc"),
+    ])
+    assert len(kept) == 1
+
+
+def test_title_variants_are_duplicates():
+    dedup = Deduplicator()
+    kept = dedup.deduplicate([
+        result("β-diversity of eDNA in rivers", "10.1/x"),
+        result("Beta-Diversity of eDNA in Rivers.", "", source="SemanticScholar"),
+        result("Environmental DNA metabarcoding reveals fish communities in estuaries"),
+        result("Environmental DNA metabarcoding reveals fish comunities in estuaries"),
+    ])
+    assert [r.source for r in kept] == ["PubMed", "PubMed"]
+    assert len(dedup) == 2
+
+
+def test_different_dois_are_not_merged_on_title():
+    kept = Deduplicator().deduplicate([
+        result("Correction", "10.1/a"),
+        result("Correction", "10.1/b"),
+    ])
+    assert len(kept) == 2
+
+
+def test_title_match_learns_doi():
+    dedup = Deduplicator()
+    dedup.add(result("Cod survey in the Baltic"))
+    _, is_new = dedup.add(result("Cod survey in the Baltic", "10.1/cod"))
+    assert not is_new
+    # The DOI learnt from the duplicate now identifies the record on its own
+    assert dedup.find_duplicate(result("Unrelated title", "10.1/COD")) is not None
+
+
+def test_threshold_is_tunable():
+    a = result("Environmental DNA survey of cod")
+    b = result("Environmental DNA survey of cod and haddock")
+    assert len(Deduplicator(threshold=0.95).deduplicate([a, b])) == 2
+    assert len(Deduplicator(threshold=0.5).deduplicate([a, b])) == 1
+
+
+def test_merge_results_fills_gaps():
+    pubmed = SearchResult("Cod eDNA", ["Doe, J"], "2023", "", "PubMed",
+                          abstract="Short.", url="https://pubmed/1", identifiers={'pmid': '1'})
+    s2 = SearchResult("Cod eDNA.", ["J Doe"], "", "10.1/COD", "SemanticScholar",
+                      abstract="A much longer abstract.", url="https://s2/abc", identifiers={'s2': 'abc', 'pmid': '1'})
+
+    merged = merge_results(pubmed, s2)
+
+    assert merged is pubmed
+    assert merged.title == "Cod eDNA"
+    assert merged.authors == ["Doe, J"]
+    assert merged.year == "2023"
+    assert merged.doi == "10.1/COD"
+    assert merged.abstract == "A much longer abstract."
+    assert merged.url == "https://pubmed/1"
+    assert merged.identifiers == {'pmid': '1', 's2': 'abc'}
+    assert merged.source == "PubMed"
+
+
+def test_deduplicate_merges_across_providers():
+    pubmed = SearchResult("Cod eDNA survey", ["Doe, J"], "2023", "", "PubMed", identifiers={'pmid': '1'})
+    s2 = SearchResult("Cod eDNA survey", [], "2023", "10.1/cod", "SemanticScholar",
+                      abstract="Abstract", identifiers={'s2': 'abc'})
+
+    dedup = Deduplicator()
+    kept = dedup.deduplicate([pubmed, s2])
+
+    assert kept == [pubmed]
+    assert pubmed.abstract == "Abstract"
+    assert pubmed.identifiers == {'pmid': '1', 's2': 'abc'}
+    # The DOI learnt from the merge identifies the record from now on
+    assert dedup.find_duplicate(result("Other title", "10.1/cod")) is pubmed
+
+
+def test_identifiers_match_without_doi_or_title():
+    kept = Deduplicator().deduplicate([
+        SearchResult("Cod survey", [], "2023", "", "PubMed", identifiers={'pmid': '42'}),
+        SearchResult("[Cod survey in Norwegian]", [], "2023", "", "SemanticScholar", identifiers={'pmid': '42'}),
+    ])
+    assert len(kept) == 1
+
+
+def test_merge_can_be_disabled():
+    first = SearchResult("Cod eDNA survey", [], "2023", "", "PubMed")
+    Deduplicator(merge=False).deduplicate([first, SearchResult("Cod eDNA survey", [], "", "10.1/x", "S2", abstract="A")])
+    assert first.abstract == ""
@@ -0,0 +1,82 @@
+import pytest
+from src.dedup_index import DedupIndex
+from src.providers.base import SearchResult
+
+
+def result(title, doi=""):
+    return SearchResult(title=title, authors=[], year="2023", doi=doi, source="PubMed")
+
+
+@pytest.fixture
+def index_path(tmp_path):
+    return str(tmp_path / "dedup.sqlite")
+
+
+@pytest.fixture
+def index(index_path):
+    idx = DedupIndex(index_path)
+    yield idx
+    idx.close()
+
+
+def test_unknown_paper(index):
+    assert index.lookup(result("Cod survey", "10.1/cod")) is None
+    assert index.count() == 0
+
+
+def test_lookup_by_doi_variant(index):
+    record_id = index.add(result("Cod survey", "10.1/COD"), "ZKEY1", "Gadus morhua")
+
+    known = index.lookup(result("Different title", "https://doi.org/10.1/cod"))
+    assert known == {
+        'record_id': record_id,
+        'zotero_key': "ZKEY1",
+        'cache_species': "Gadus morhua",
+        'species': ["Gadus morhua"]
+    }
+
+
+def test_lookup_by_title(index):
+    index.add(result("Environmental DNA survey of Atlantic cod in the Baltic Sea"), "ZKEY1", "Gadus morhua")
+
+    assert index.lookup(result("Environmental DNA Survey of Atlantic Cod in the Baltic Sea."))['zotero_key'] == "ZKEY1"
+    assert index.lookup(result("Environmental DNA survey of Atlantic cod in the Baltc Sea"))['zotero_key'] == "ZKEY1"
+    assert index.lookup(result("Otolith chemistry of juvenile salmon")) is None
+
+
+def test_conflicting_dois_not_matched_on_title(index):
+    index.add(result("Correction", "10.1/a"), "ZKEY1", "Gadus morhua")
+    assert index.lookup(result("Correction", "10.1/b")) is None
+
+
+def test_add_species(index):
+    record_id = index.add(result("Cod survey", "10.1/cod"), "ZKEY1", "Gadus morhua")
+    index.add_species(record_id, "Atlantic cod")
+    index.add_species(record_id, "Atlantic cod")
+
+    known = index.lookup(result("Cod survey", "10.1/cod"))
+    assert known['species'] == ["Atlantic cod", "Gadus morhua"]
+    assert known['cache_species'] == "Gadus morhua"
+
+
+def test_persists_across_runs(index_path):
+    first = DedupIndex(index_path)
+    first.add(result("Cod survey in the Baltic", "10.1/cod"), "ZKEY1", "Gadus morhua")
+    first.close()
+
+    second = DedupIndex(index_path)
+    assert second.count() == 1
+    assert second.lookup(result("Cod survey in the Baltic"))['zotero_key'] == "ZKEY1"
+    second.close()
+
+
+def test_bands_must_divide_num_perm(index_path):
+    with pytest.raises(ValueError):
+        DedupIndex(index_path, num_perm=100, bands=12)
+
+
+def test_lookup_by_identifier(index):
+    index.add(SearchResult("Cod survey", [], "2023", "", "PubMed", identifiers={'pmid': '42'}), "ZKEY1", "Gadus morhua")
+
+    known = index.lookup(SearchResult("[Translated title]", [], "2023", "", "SemanticScholar", identifiers={'pmid': '42'}))
+    assert known['zotero_key'] == "ZKEY1"
@@ -0,0 +1,135 @@
+import threading
+import time
+
+import pytest
+
+from benchmarks.stub_services import Behaviour, Corpus, StubServices
+from src.hedging import MIN_SAMPLES, Hedger, RateLimiter
+from src.metrics import METRICS
+from src.providers.pubmed import PubMedProvider
+from src.providers.semantic_scholar import SemanticScholarProvider
+from src.resilience import ProviderFailed, Resilience, RetryPolicy
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    METRICS.reset()
+    yield
+    METRICS.reset()
+
+
+def counter(name, operation="op"):
+    return METRICS.counters.get(name, {}).get((('operation', operation), ('service', "svc")), 0)
+
+
+def test_rate_limiter_paces_and_never_waits_on_try():
+    limiter = RateLimiter(20.0, burst=2)
+    assert limiter.try_acquire() and limiter.try_acquire()
+    assert not limiter.try_acquire()
+    start = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - start == pytest.approx(0.05, abs=0.03)
+    with pytest.raises(ValueError):
+        RateLimiter(0)
+
+
+def test_timeout_abandons_stalled_request():
+    release = threading.Event()
+    hedger = Hedger("svc", timeout=0.1)
+    start = time.monotonic()
+    with pytest.raises(TimeoutError, match="svc op timed out after 0.1s"):
+        hedger.call("op", release.wait)
+    assert time.monotonic() - start < 0.5
+    assert counter("request_timeouts") == 1
+    release.set()
+
+
+def test_hedge_wins_over_stalled_request():
+    calls = []
+    release = threading.Event()
+
+    def request():
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait()
+            return "slow"
+        return "fast"
+
+    hedger = Hedger("svc", hedge_after=0.05, timeout=2.0)
+    assert hedger.call("op", request) == "fast"
+    assert len(calls) == 2
+    assert counter("hedged_requests") == 1 and counter("hedge_wins") == 1
+    release.set()
+
+
+def test_hedge_waits_for_observed_p95():
+    hedger = Hedger("svc", hedge=True)
+    assert hedger.hedge_delay("op") is None
+    for _ in range(MIN_SAMPLES):
+        hedger.call("op", lambda: time.sleep(0.01))
+    assert 0.005 < hedger.hedge_delay("op") < 0.05
+    assert hedger.hedge_delay("other") is None
+    assert Hedger("svc").hedge_delay("op") is None
+
+
+def test_hedge_skipped_when_quota_is_spent():
+    limiter = RateLimiter(1.0, burst=1)
+    hedger = Hedger("svc", limiter, hedge_after=0.02)
+    calls = []
+
+    def request():
+        calls.append(1)
+        time.sleep(0.1)
+        return "only"
+
+    assert hedger.call("op", request) == "only"
+    # The first attempt took the only token; a duplicate would exceed the quota
+    assert len(calls) == 1
+    assert counter("hedges_skipped") == 1 and counter("hedged_requests") == 0
+
+
+def test_failed_attempt_waits_for_the_other():
+    calls = []
+
+    def request():
+        calls.append(1)
+        if len(calls) == 1:
+            time.sleep(0.1)
+            raise ConnectionError("reset")
+        return "hedge"
+
+    assert Hedger("svc", hedge_after=0.02).call("op", request) == "hedge"
+    with pytest.raises(ConnectionError):
+        Hedger("svc").call("op", lambda: (_ for _ in ()).throw(ConnectionError("down")))
+
+
+def test_pubmed_timeout_against_slow_stand_in():
+    with StubServices(pubmed=Behaviour(latency=0.5), corpus=Corpus(results_per_query=3)) as services:
+        url = services.env()['PUBMED_EUTILS_URL']
+        slow = PubMedProvider("test@example.com", base_url=url, timeout=0.2,
+                              resilience=Resilience("pubmed", RetryPolicy(max_attempts=1)))
+        with pytest.raises(ProviderFailed, match="timed out after 0.2s"):
+            slow.search("cod", limit=3)
+        patient = PubMedProvider("test@example.com", base_url=url, timeout=5.0, hedge=True)
+        assert len(patient.search("cod", limit=3)) == 3
+    assert METRICS.counters["request_timeouts"][(('operation', "esearch"), ('service', "pubmed"))] == 1
+
+
+def test_semantic_scholar_hedged_search_against_stand_in():
+    with StubServices(corpus=Corpus(results_per_query=3)) as services:
+        provider = SemanticScholarProvider(api_url=services.env()['SEMANTIC_SCHOLAR_API_URL'], timeout=5.0, hedge=True)
+        assert len(provider.search("cod", limit=3)) == 3
+        assert provider.sch._AsyncSemanticScholar._requester.hedger.latency["search"].count == 1
+
+
+def test_semantic_scholar_paced_without_hedger():
+    with StubServices(corpus=Corpus(results_per_query=3)) as services:
+        provider = SemanticScholarProvider(api_url=services.env()['SEMANTIC_SCHOLAR_API_URL'])
+        provider.limiter.rate = 10.0
+        start = time.monotonic()
+        for query in ("cod", "salmon", "trout"):
+            assert len(provider.search(query, limit=3)) == 3
+        # The first request goes at once, each later one waits for a token
+        assert time.monotonic() - start >= 0.2
+        assert services.stats()['semantic_scholar']['requests'] == 3
+    assert SemanticScholarProvider().limiter.rate == 1.0
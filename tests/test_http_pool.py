@@ -0,0 +1,77 @@
+import threading
+import time
+
+import httpx
+import pytest
+
+from benchmarks.stub_services import Behaviour, Corpus, StubServices
+from src.http_pool import ConnectionPools
+from src.metrics import METRICS
+from src.providers.pubmed import PubMedProvider
+from src.providers.semantic_scholar import SemanticScholarProvider
+from src.zotero_manager import ZoteroManager, zotero_http
+
+
+@pytest.fixture
+def pools():
+    pools = ConnectionPools()
+    yield pools
+    pools.close()
+
+
+def test_one_client_per_http_library(pools):
+    assert pools.client() is pools.client()
+    assert isinstance(pools.client(), httpx.Client)
+    assert isinstance(pools.client(zotero_http), zotero_http.Client)
+    assert pools.client().headers['accept-encoding'] == "gzip, deflate"
+
+
+def test_providers_and_zotero_reuse_connections(pools):
+    METRICS.reset()
+    with StubServices(corpus=Corpus(results_per_query=5)) as services:
+        env = services.env()
+        pubmed = PubMedProvider("test@example.com", base_url=env['PUBMED_EUTILS_URL'], pools=pools)
+        s2 = SemanticScholarProvider(api_url=env['SEMANTIC_SCHOLAR_API_URL'], pools=pools)
+        for query in ("cod", "salmon", "trout"):
+            assert [r.identifiers['pmid'] for r in pubmed.search(query, limit=5)] == \
+                Corpus(results_per_query=5).pmids(query)
+            assert len(s2.search(query, limit=5)) == 5
+        managers = [ZoteroManager("1", "key", endpoint=env['ZOTERO_API_URL'], pools=pools) for _ in range(2)]
+        assert managers[0].zot.client is managers[1].zot.client
+        collection = managers[0].create_or_get_collection("eDNA - Gadus morhua")
+        assert managers[1].create_or_get_collection("eDNA - Gadus morhua") == collection
+        stats = services.stats()
+
+    # Six E-utilities and three Semantic Scholar requests, one connection each
+    assert stats['pubmed']['requests'] == 6 and stats['pubmed']['connections'] == 1
+    assert stats['semantic_scholar']['connections'] == 1
+    assert stats['zotero']['connections'] == 1
+    # Bodies travel gzip-compressed and are metered as received
+    assert sum(METRICS.counters['wire_bytes'].values()) == sum(s['bytes'] for s in stats.values())
+
+
+def test_pubmed_compressed_bytes_are_smaller(pools):
+    with StubServices(corpus=Corpus(results_per_query=20)) as services:
+        url = services.env()['PUBMED_EUTILS_URL']
+        PubMedProvider("test@example.com", base_url=url).search("cod", limit=20)
+        plain = services.stats()['pubmed']['bytes']
+        PubMedProvider("test@example.com", base_url=url, pools=pools).search("cod", limit=20)
+        compressed = services.stats()['pubmed']['bytes'] - plain
+    assert compressed < plain / 3
+
+
+def test_requests_per_host_are_capped():
+    pools = ConnectionPools(per_host=1)
+    with StubServices(zotero=Behaviour(latency=0.1)) as services:
+        url = services.env()['ZOTERO_API_URL'] + "/groups/1/collections"
+        start = time.monotonic()
+        threads = [threading.Thread(target=pools.client().get, args=(url,)) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - start
+        connections = services.stats()['zotero']['connections']
+    pools.close()
+    assert elapsed >= 0.3
+    assert connections == 1
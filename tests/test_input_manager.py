@@ -73,3 +73,43 @@ species:
     assert len(species_list) == 2
     assert species_list[0].species_name == "Valid Species"
     assert species_list[1].species_name == "Another Valid Species"
+
+def test_jsonl_and_csv_lists(tmp_path):
+    jsonl = tmp_path / "species.jsonl"
+    jsonl.write_text('{"name": "Gadus morhua", "synonyms": ["Atlantic cod"], "keywords": ["eDNA"]}\n'
+                     '\n{"name": "Salmo salar", "date_range": "2020:2024"}\n', encoding='utf-8')
+    csv_file = tmp_path / "species.csv"
+    csv_file.write_text("name,synonyms,keywords,date_range\n"
+                        "Gadus morhua,Atlantic cod,eDNA; environmental DNA,\n"
+                        "Salmo salar,,,2020:2024\n", encoding='utf-8')
+
+    for path in (jsonl, csv_file):
+        species_list = InputManager(str(path)).load_species_list()
+        assert [sp.species_name for sp in species_list] == ["Gadus morhua", "Salmo salar"]
+        assert species_list[0].synonyms == ["Atlantic cod"]
+        assert species_list[1].keywords == [] and species_list[1].date_range == "2020:2024"
+    assert InputManager(str(csv_file)).load_species_list()[0].keywords == ["eDNA", "environmental DNA"]
+
+def test_iter_species_streams_and_validates_as_it_goes(tmp_path, capsys):
+    file_path = tmp_path / "species.yaml"
+    file_path.write_text("species:\n"
+                         "  - name: Gadus morhua\n"
+                         "  - name: Bad\n"
+                         "    keywords: {nested: mapping}\n"
+                         "  - name: Salmo salar\n"
+                         "  - name: [unclosed\n", encoding='utf-8')
+
+    species = InputManager(str(file_path)).iter_species()
+    # Entries are yielded before the rest of the file is parsed
+    assert next(species).species_name == "Gadus morhua"
+    assert next(species).species_name == "Salmo salar"
+    assert "Skipping species entry at line 3 (Bad): 'keywords' must be a list" in capsys.readouterr().out
+    with pytest.raises(ValueError, match="Error parsing YAML file"):
+        next(species)
+
+def test_malformed_jsonl_line_is_reported(tmp_path):
+    file_path = tmp_path / "species.jsonl"
+    file_path.write_text('{"name": "Gadus morhua"}\n{"name": \n', encoding='utf-8')
+
+    with pytest.raises(ValueError, match="line 2"):
+        InputManager(str(file_path)).load_species_list()
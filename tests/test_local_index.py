@@ -0,0 +1,80 @@
+import pytest
+from src.abstract_cache import AbstractCache
+from src.local_index import LocalIndex
+from src.providers.base import SearchResult
+
+
+@pytest.fixture
+def index(tmp_path):
+    """Create a LocalIndex backed by a temporary file."""
+    idx = LocalIndex(index_file=str(tmp_path / "index.sqlite"))
+    yield idx
+    idx.close()
+
+
+@pytest.fixture
+def sample_papers():
+    return [
+        SearchResult(
+            title="eDNA detection of Gadus morhua in the North Sea",
+            authors=["Smith, John"],
+            year="2023",
+            doi="10.1234/cod",
+            source="PubMed",
+            abstract="Environmental DNA metabarcoding of Atlantic cod.",
+            url="https://pubmed.ncbi.nlm.nih.gov/1/"
+        ),
+        SearchResult(
+            title="Salmon habitat survey",
+            authors=["Doe, Jane"],
+            year="2021",
+            doi="",
+            source="SemanticScholar",
+            abstract="A survey mentioning Gadus morhua only in passing.",
+            url="https://www.semanticscholar.org/paper/2"
+        )
+    ]
+
+
+def test_add_and_count(index, sample_papers):
+    assert index.add_papers(sample_papers, ["K1", "K2"]) == 2
+    assert index.count() == 2
+
+
+def test_add_skips_duplicates(index, sample_papers):
+    index.add_papers(sample_papers)
+    assert index.add_papers(sample_papers) == 0
+    assert index.count() == 2
+
+
+def test_search_ranks_title_hits_first(index, sample_papers):
+    index.add_papers(sample_papers)
+    results = index.search('"Gadus morhua"', limit=10)
+
+    assert [r.title for r in results] == [sample_papers[0].title, sample_papers[1].title]
+    assert results[0].authors == ["Smith, John"]
+    assert results[0].source == "PubMed"
+
+
+def test_search_respects_limit(index, sample_papers):
+    index.add_papers(sample_papers)
+    assert len(index.search('"Gadus morhua"', limit=1)) == 1
+
+
+def test_index_persists_between_instances(tmp_path, sample_papers):
+    path = str(tmp_path / "index.sqlite")
+    first = LocalIndex(index_file=path)
+    first.add_papers(sample_papers)
+    first.close()
+
+    second = LocalIndex(index_file=path)
+    assert second.count() == 2
+    second.close()
+
+
+def test_index_cache(tmp_path, index, sample_papers):
+    cache = AbstractCache(cache_file=str(tmp_path / "cache.yaml"))
+    cache.add_papers("Gadus morhua", sample_papers, ["K1", "K2"])
+
+    assert index.index_cache(cache) == 2
+    assert index.search('"metabarcoding"')[0].doi == "10.1234/cod"
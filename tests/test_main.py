@@ -2,9 +2,63 @@ import sys
 from unittest.mock import MagicMock, patch
 import pytest
 from src.main import main
+from src.profiling import PROCESS_WIDE
 from src.input_manager import SpeciesQuery
 from src.providers.base import SearchResult
 
+def make_args(**overrides):
+    """MagicMock args with explicit defaults for every optional flag."""
+    args = MagicMock()
+    args.local_first = False
+    args.offline = False
+    args.index = ":memory:"
+    args.dedup_index = ":memory:"
+    args.pubmed_index = None
+    args.dedup_threshold = 0.8
+    args.target = None
+    args.page_size = None
+    args.providers = None
+    args.search_workers = 1
+    args.upload_workers = 1
+    args.queue_size = 4
+    args.resume = None
+    args.shard = None
+    args.metrics_json = None
+    args.metrics_prom = None
+    args.profile = None
+    args.profile_sample_interval = None
+    args.journal_dir = ""
+    args.record = None
+    args.replay = None
+    args.request_timeout = None
+    args.hedge = False
+    args.no_pool = False
+    args.plan = None
+    args.from_plan = None
+    args.negative_cache = ""
+    args.negative_max_days = 90
+    args.no_merge_queries = False
+    args.merge_window = 10_000
+    args.stream = False
+    args.taxonomy = None
+    args.no_common_names = False
+    for name, value in overrides.items():
+        setattr(args, name, value)
+    return args
+
+def stream_from_search(provider_cls):
+    """Make a mocked provider's iter_search stream whatever its search mock returns."""
+    provider = provider_cls.return_value
+    provider.iter_search.side_effect = lambda query, limit=10, **kwargs: iter(provider.search(query, limit=limit))
+    return provider_cls
+
+@pytest.fixture(autouse=True)
+def abstract_cache_in_tmp(tmp_path):
+    """Runs that upload write their abstract cache under tmp_path, never to data/."""
+    from src.abstract_cache import AbstractCache
+    with patch('src.main.AbstractCache', lambda: AbstractCache(str(tmp_path / "abstracts_cache.yaml"))):
+        yield
+
 @pytest.fixture
 def mock_args():
     with patch('argparse.ArgumentParser.parse_args') as mock_parse:
@@ -24,7 +78,7 @@ def mock_input_manager():
 def mock_providers():
     with patch('src.main.PubMedProvider') as mock_pubmed, \
          patch('src.main.SemanticScholarProvider') as mock_semantic:
-        yield mock_pubmed, mock_semantic
+        yield stream_from_search(mock_pubmed), stream_from_search(mock_semantic)
 
 @pytest.fixture
 def mock_zotero_manager():
@@ -33,7 +87,7 @@ def mock_zotero_manager():
 
 def test_main_dry_run_success(mock_args, mock_config, mock_input_manager, mock_providers, capsys):
     # Setup mocks
-    args = MagicMock()
+    args = make_args()
     args.species_list = "species.yaml"
     args.dry_run = True
     args.limit = 10
@@ -74,7 +128,7 @@ def test_main_dry_run_success(mock_args, mock_config, mock_input_manager, mock_p
 
 def test_main_full_run_success(mock_args, mock_config, mock_input_manager, mock_providers, mock_zotero_manager, capsys):
     # Setup mocks
-    args = MagicMock()
+    args = make_args()
     args.species_list = "species.yaml"
     args.dry_run = False
     args.limit = 5
@@ -120,7 +174,7 @@ def test_main_full_run_success(mock_args, mock_config, mock_input_manager, mock_
     zotero_instance.add_item.assert_called()
 
 def test_main_config_error(mock_args, mock_config, capsys):
-    args = MagicMock()
+    args = make_args()
     args.species_list = "species.yaml"
     args.dry_run = False
     mock_args.return_value = args
@@ -135,7 +189,7 @@ def test_main_config_error(mock_args, mock_config, capsys):
     assert "Configuration Error: Config init failed" in captured.out
 
 def test_main_input_error(mock_args, mock_config, mock_input_manager, capsys):
-    args = MagicMock()
+    args = make_args()
     args.species_list = "species.yaml"
     args.dry_run = False
     mock_args.return_value = args
@@ -150,7 +204,7 @@ def test_main_input_error(mock_args, mock_config, mock_input_manager, capsys):
     assert "Input Error: File not found" in captured.out
 
 def test_main_no_providers(mock_args, mock_config, mock_input_manager, mock_providers, capsys):
-    args = MagicMock()
+    args = make_args()
     args.species_list = "species.yaml"
     args.dry_run = False
     mock_args.return_value = args
@@ -171,7 +225,7 @@ def test_main_no_providers(mock_args, mock_config, mock_input_manager, mock_prov
     assert "No search providers available. Exiting." in captured.out
 
 def test_main_zotero_init_error(mock_args, mock_config, mock_input_manager, mock_providers, mock_zotero_manager, capsys):
-    args = MagicMock()
+    args = make_args()
     args.species_list = "species.yaml"
     args.dry_run = False
     mock_args.return_value = args
@@ -189,7 +243,7 @@ def test_main_zotero_init_error(mock_args, mock_config, mock_input_manager, mock
     assert "Zotero Init Error: Zotero Login failed" in captured.out
 
 def test_main_zotero_process_error(mock_args, mock_config, mock_input_manager, mock_providers, mock_zotero_manager, capsys):
-    args = MagicMock()
+    args = make_args()
     args.species_list = "species.yaml"
     args.dry_run = False
     mock_args.return_value = args
@@ -215,7 +269,7 @@ def test_main_zotero_process_error(mock_args, mock_config, mock_input_manager, m
     assert "Error processing Zotero for Gadus morhua: Collection error" in captured.out
 
 def test_query_building(mock_args, mock_config, mock_input_manager, mock_providers, capsys):
-    args = MagicMock()
+    args = make_args()
     args.species_list = "species.yaml"
     args.dry_run = True
     mock_args.return_value = args
@@ -239,7 +293,7 @@ def test_query_building(mock_args, mock_config, mock_input_manager, mock_provide
     assert f"Query: {expected_query}" in captured.out
 
 def test_deduplication(mock_args, mock_config, mock_input_manager, mock_providers, capsys):
-    args = MagicMock()
+    args = make_args()
     args.species_list = "species.yaml"
     args.dry_run = True
     mock_args.return_value = args
@@ -269,7 +323,7 @@ def test_deduplication(mock_args, mock_config, mock_input_manager, mock_provider
     assert "Total unique results: 2" in captured.out
 
 def test_provider_init_fail(mock_args, mock_config, mock_input_manager, mock_providers, capsys):
-    args = MagicMock()
+    args = make_args()
     args.species_list = "species.yaml"
     args.dry_run = True
     mock_args.return_value = args
@@ -294,7 +348,7 @@ def test_provider_init_fail(mock_args, mock_config, mock_input_manager, mock_pro
     assert "Semantic Scholar Provider initialized." in captured.out
 
 def test_keyword_single(mock_args, mock_config, mock_input_manager, mock_providers, capsys):
-    args = MagicMock()
+    args = make_args()
     args.species_list = "species.yaml"
     args.dry_run = True
     mock_args.return_value = args
@@ -313,3 +367,379 @@ def test_keyword_single(mock_args, mock_config, mock_input_manager, mock_provide
     captured = capsys.readouterr()
     expected_query = '"Sp1" AND "SingleKW"'
     assert f"Query: {expected_query}" in captured.out
+
+def test_local_first_skips_remote_providers(mock_args, mock_config, mock_input_manager, mock_providers, capsys):
+    mock_args.return_value = make_args(species_list="species.yaml", dry_run=True, limit=1, local_first=True)
+
+    input_instance = mock_input_manager.return_value
+    input_instance.load_species_list.return_value = [SpeciesQuery(species_name="Sp1", synonyms=[], keywords=[])]
+
+    with patch('src.main.LocalSearchProvider') as mock_local_cls:
+        stream_from_search(mock_local_cls)
+        mock_local = mock_local_cls.return_value
+        mock_local.index.count.return_value = 1
+        mock_local.search.return_value = [
+            SearchResult(source="PubMed", title="Cached", doi="d1", year="2023", url="u1", authors=["A1"])
+        ]
+        main()
+
+    captured = capsys.readouterr()
+    assert "Local index: 1 results." in captured.out
+    assert "skipping remote providers" in captured.out
+    mock_providers[0].return_value.search.assert_not_called()
+    mock_providers[1].return_value.search.assert_not_called()
+
+def test_offline_uses_only_local_index(mock_args, mock_config, mock_input_manager, mock_providers, mock_zotero_manager, capsys):
+    args = make_args(species_list="species.yaml", dry_run=False, limit=10, offline=True)
+    mock_args.return_value = args
+
+    input_instance = mock_input_manager.return_value
+    input_instance.load_species_list.return_value = [SpeciesQuery(species_name="Sp1", synonyms=[], keywords=[])]
+
+    with patch('src.main.LocalSearchProvider') as mock_local_cls:
+        stream_from_search(mock_local_cls)
+        mock_local_cls.return_value.search.return_value = []
+        main()
+
+    captured = capsys.readouterr()
+    assert "Offline mode: searching local index only." in captured.out
+    assert args.dry_run is True
+    mock_providers[0].assert_not_called()
+    mock_providers[1].assert_not_called()
+    mock_zotero_manager.assert_not_called()
+
+def test_pubmed_index_replaces_eutilities(mock_args, mock_config, mock_input_manager, mock_providers, capsys):
+    mock_args.return_value = make_args(species_list="species.yaml", dry_run=True, limit=10,
+                                       pubmed_index="pubmed.sqlite")
+
+    input_instance = mock_input_manager.return_value
+    input_instance.load_species_list.return_value = [SpeciesQuery(species_name="Sp1", synonyms=[], keywords=[])]
+    mock_providers[1].return_value.search.return_value = []
+
+    with patch('src.main.LocalPubMedProvider') as mock_local_pubmed_cls:
+        stream_from_search(mock_local_pubmed_cls)
+        mock_local_pubmed_cls.return_value.search.return_value = []
+        main()
+
+    captured = capsys.readouterr()
+    assert "Local PubMed Provider initialized." in captured.out
+    mock_local_pubmed_cls.assert_called_once_with(index_file="pubmed.sqlite")
+    mock_providers[0].assert_not_called()
+
+def test_dedup_index_reuses_items_across_species_and_runs(mock_args, mock_config, mock_input_manager, mock_providers, mock_zotero_manager, tmp_path, capsys):
+    args = make_args(species_list="species.yaml", dry_run=False, limit=10,
+                     dedup_index=str(tmp_path / "dedup.sqlite"))
+    mock_args.return_value = args
+
+    config_instance = mock_config.return_value
+    config_instance.EMAIL = "test@example.com"
+
+    input_instance = mock_input_manager.return_value
+    input_instance.load_species_list.return_value = [
+        SpeciesQuery(species_name="Gadus morhua", synonyms=[], keywords=[]),
+        SpeciesQuery(species_name="Atlantic cod", synonyms=[], keywords=[]),
+    ]
+
+    paper = SearchResult(source="PubMed", title="Cod eDNA", doi="10.1/cod", year="2023", url="u1", authors=["A1"])
+    mock_providers[0].return_value.search.return_value = [paper]
+    mock_providers[1].return_value.search.return_value = []
+
+    zotero_instance = mock_zotero_manager.return_value
+    zotero_instance.create_or_get_collection.return_value = "col123"
+    zotero_instance.add_item.return_value = "item123"
+    zotero_instance.add_to_collection.return_value = True
+
+    with patch('src.main.AbstractCache'):
+        main()
+        # A second run finds everything already filed and makes no Zotero writes
+        main()
+
+    zotero_instance.add_item.assert_called_once()
+    zotero_instance.add_to_collection.assert_called_once_with("item123", "col123")
+    captured = capsys.readouterr()
+    assert "Reused 1 items already in Zotero" in captured.out
+    assert "Reused 0 items already in Zotero; 1 already filed for this species." in captured.out
+
+def test_cross_provider_records_are_merged(mock_args, mock_config, mock_input_manager, mock_providers, mock_zotero_manager, capsys):
+    mock_args.return_value = make_args(species_list="species.yaml", dry_run=False, limit=10)
+
+    config_instance = mock_config.return_value
+    config_instance.EMAIL = "test@example.com"
+
+    input_instance = mock_input_manager.return_value
+    input_instance.load_species_list.return_value = [SpeciesQuery(species_name="Sp1", synonyms=[], keywords=[])]
+
+    mock_providers[0].return_value.search.return_value = [
+        SearchResult(source="PubMed", title="Cod eDNA", doi="", year="2023", url="u1", authors=["A1"],
+                     identifiers={'pmid': '1'})
+    ]
+    mock_providers[1].return_value.search.return_value = [
+        SearchResult(source="SemanticScholar", title="Cod eDNA.", doi="10.1/cod", year="2023", url="u2", authors=[],
+                     abstract="Only S2 has the abstract.", identifiers={'s2': 'abc'})
+    ]
+
+    zotero_instance = mock_zotero_manager.return_value
+    zotero_instance.create_or_get_collection.return_value = "col123"
+    zotero_instance.add_item.return_value = "item123"
+
+    with patch('src.main.AbstractCache'):
+        main()
+
+    uploaded = zotero_instance.add_item.call_args[0][0]
+    assert zotero_instance.add_item.call_count == 1
+    assert uploaded.source == "PubMed"
+    assert uploaded.doi == "10.1/cod"
+    assert uploaded.abstract == "Only S2 has the abstract."
+    assert uploaded.identifiers == {'pmid': '1', 's2': 'abc'}
+
+def test_target_skips_remaining_providers(mock_args, mock_config, mock_input_manager, mock_providers, capsys):
+    mock_args.return_value = make_args(species_list="species.yaml", dry_run=True, limit=10, target=2)
+
+    mock_config.return_value.EMAIL = "test@example.com"
+    mock_input_manager.return_value.load_species_list.return_value = [
+        SpeciesQuery(species_name="Sp1", synonyms=[], keywords=[])
+    ]
+
+    mock_providers[0].return_value.search.return_value = [
+        SearchResult(source="PubMed", title=f"Paper number {i}", doi=f"10.1/{i}", year="2023", authors=[])
+        for i in range(5)
+    ]
+
+    main()
+
+    mock_providers[1].return_value.iter_search.assert_not_called()
+    captured = capsys.readouterr()
+    assert "Found 2 results." in captured.out
+    assert "Reached target of 2 unique results" in captured.out
+    assert "Total unique results: 2" in captured.out
+
+def test_resume_unknown_run_exits(mock_args, mock_config, mock_input_manager, mock_providers, mock_zotero_manager, tmp_path, capsys):
+    mock_args.return_value = make_args(species_list="species.yaml", dry_run=False, limit=10,
+                                       resume="nope", journal_dir=str(tmp_path))
+    mock_input_manager.return_value.load_species_list.return_value = []
+
+    with pytest.raises(SystemExit):
+        main()
+    assert "No journal for run 'nope'" in capsys.readouterr().out
+
+def test_shard_processes_only_its_species(mock_args, mock_config, mock_input_manager, mock_providers, capsys):
+    from src.shards import shard_of
+
+    names = [f"Species {i}" for i in range(20)]
+    mock_input_manager.return_value.load_species_list.return_value = [
+        SpeciesQuery(species_name=name, synonyms=[], keywords=[]) for name in names
+    ]
+    mock_providers[0].return_value.search.return_value = []
+
+    processed = []
+    for index in (1, 2, 3):
+        mock_args.return_value = make_args(species_list="species.yaml", dry_run=True, limit=10, shard=f"{index}/3")
+        main()
+        out = capsys.readouterr().out
+        processed.extend(name for name in names if f"Processing species: {name}\n" in out)
+        assert all(shard_of(name, 3) == index for name in names if f"Processing species: {name}\n" in out)
+
+    assert sorted(processed) == sorted(names)
+
+def test_invalid_shard_exits(mock_args, mock_config, mock_input_manager, mock_providers, capsys):
+    mock_args.return_value = make_args(species_list="species.yaml", dry_run=True, shard="4/3")
+    mock_input_manager.return_value.load_species_list.return_value = []
+
+    with pytest.raises(SystemExit):
+        main()
+    assert "Invalid shard '4/3'" in capsys.readouterr().out
+
+def test_metrics_export(mock_args, mock_config, mock_input_manager, mock_providers, tmp_path, capsys):
+    import json
+    from src.metrics import METRICS
+
+    METRICS.reset()
+    mock_args.return_value = make_args(species_list="species.yaml", dry_run=True, limit=10,
+                                       metrics_json=str(tmp_path / "metrics.json"),
+                                       metrics_prom=str(tmp_path / "metrics.prom"))
+    mock_input_manager.return_value.load_species_list.return_value = [
+        SpeciesQuery(species_name="Sp1", synonyms=[], keywords=[])
+    ]
+    mock_providers[0].return_value.search.return_value = []
+
+    main()
+
+    exported = json.loads((tmp_path / "metrics.json").read_text())
+    stages = {entry['labels']['stage'] for entry in exported['histograms']['stage_seconds']}
+    assert stages == {"search", "dedup", "upload"}
+    assert "edna_lit_miner_stage_seconds_bucket" in (tmp_path / "metrics.prom").read_text()
+    assert "Metrics written to" in capsys.readouterr().out
+
+def test_profile_writes_stage_dumps(mock_args, mock_config, mock_input_manager, mock_providers, tmp_path, capsys):
+    mock_args.return_value = make_args(species_list="species.yaml", dry_run=True, limit=10,
+                                       profile=str(tmp_path / "profile"), profile_sample_interval=0.001)
+    mock_input_manager.return_value.load_species_list.return_value = [
+        SpeciesQuery(species_name="Sp1", synonyms=[], keywords=[])
+    ]
+    mock_providers[0].return_value.search.return_value = [
+        SearchResult(source="PubMed", title="T1", doi="d1", year="2023", authors=[])
+    ]
+
+    main()
+
+    profile_dir = tmp_path / "profile"
+    # From Python 3.12 one profile covers every stage and thread
+    dumps = ["run"] if PROCESS_WIDE else ["config", "input", "search", "dedup"]
+    for dump in dumps:
+        assert (profile_dir / f"{dump}.pstats").exists()
+    assert "wall s" in (profile_dir / "summary.txt").read_text()
+    assert ("run.pstats" if PROCESS_WIDE else "<stage>.pstats") in capsys.readouterr().out
+
+def test_replay_missing_cassette_exits(mock_args, mock_config, mock_input_manager, mock_providers, tmp_path, capsys):
+    mock_args.return_value = make_args(species_list="species.yaml", dry_run=True, limit=10,
+                                       replay=str(tmp_path / "missing.jsonl.gz"))
+    mock_input_manager.return_value.load_species_list.return_value = []
+
+    with pytest.raises(SystemExit):
+        main()
+    assert "Cassette Error: Cassette not found" in capsys.readouterr().out
+
+def test_record_passes_cassette_to_providers(mock_args, mock_config, mock_input_manager, mock_providers, tmp_path, capsys):
+    path = tmp_path / "run.jsonl.gz"
+    mock_args.return_value = make_args(species_list="species.yaml", dry_run=True, limit=10, record=str(path))
+    mock_input_manager.return_value.load_species_list.return_value = []
+
+    main()
+
+    cassette = mock_providers[0].call_args.kwargs['cassette']
+    assert cassette.path == path and not cassette.replaying
+    assert mock_providers[1].call_args.kwargs['cassette'] is cassette
+    assert "Recorded 0 exchanges" in capsys.readouterr().out
+
+
+def test_request_timeout_and_hedge_reach_providers(mock_args, mock_config, mock_input_manager, mock_providers):
+    mock_args.return_value = make_args(species_list="species.yaml", dry_run=True, limit=10,
+                                       request_timeout=20.0, hedge=True)
+    mock_input_manager.return_value.load_species_list.return_value = []
+
+    main()
+
+    for provider_cls in mock_providers[:2]:
+        assert provider_cls.call_args.kwargs['timeout'] == 20.0
+        assert provider_cls.call_args.kwargs['hedge'] is True
+
+
+def test_only_selected_providers_are_built(mock_args, mock_config, mock_input_manager, mock_providers, capsys):
+    mock_args.return_value = make_args(species_list="species.yaml", dry_run=True, limit=10,
+                                       providers="semantic_scholar", search_workers=None)
+    mock_input_manager.return_value.load_species_list.return_value = []
+
+    with patch('src.main.SpeciesRunner') as mock_runner_cls:
+        mock_runner_cls.return_value.failed = []
+        main()
+
+    mock_providers[0].assert_not_called()
+    provider = mock_runner_cls.call_args.args[0][0]
+    assert provider is mock_providers[1].return_value
+    assert provider.spec.name == "semantic_scholar"
+    # Planned from Semantic Scholar's concurrency cap
+    assert mock_runner_cls.return_value.run.call_args.kwargs['search_workers'] == 1
+    assert "Searching 1 species at once" in capsys.readouterr().out
+
+
+def test_plugin_provider_built_from_its_spec(mock_args, mock_config, mock_input_manager, mock_providers, capsys):
+    from tests.test_provider_registry import PLUGIN, PluginProvider
+    mock_args.return_value = make_args(species_list="species.yaml", dry_run=True, limit=10,
+                                       providers="crossref", request_timeout=5.0)
+    mock_input_manager.return_value.load_species_list.return_value = []
+
+    with patch('src.providers.registry.discover_providers', return_value={'crossref': PLUGIN}), \
+         patch('src.main.SpeciesRunner') as mock_runner_cls:
+        mock_runner_cls.return_value.failed = []
+        main()
+
+    provider = mock_runner_cls.call_args.args[0][0]
+    assert isinstance(provider, PluginProvider) and provider.spec is PLUGIN
+    assert provider.kwargs['config'] is mock_config.return_value
+    assert provider.kwargs['timeout'] == 5.0
+    assert "crossref provider initialized." in capsys.readouterr().out
+
+
+def test_unknown_provider_exits(mock_args, mock_config, mock_input_manager, mock_providers, capsys):
+    mock_args.return_value = make_args(species_list="species.yaml", dry_run=True, providers="pubmed,scopus")
+    mock_input_manager.return_value.load_species_list.return_value = []
+
+    with pytest.raises(SystemExit):
+        main()
+
+    assert "Provider Error: Unknown provider(s): scopus" in capsys.readouterr().out
+    mock_providers[0].assert_not_called()
+
+
+def test_plan_counts_and_exits_without_searching(mock_args, mock_config, mock_input_manager, mock_providers,
+                                                 tmp_path, capsys):
+    path = tmp_path / "plan.json"
+    mock_args.return_value = make_args(species_list="species.yaml", dry_run=False, limit=10, plan=str(path))
+    mock_input_manager.return_value.load_species_list.return_value = [
+        SpeciesQuery(species_name="Gadus morhua", synonyms=[], keywords=[])]
+    mock_providers[0].return_value.count.return_value = 12
+    mock_providers[1].return_value.count.return_value = 0
+
+    with patch('src.main.SpeciesRunner') as mock_runner_cls:
+        main()
+
+    mock_runner_cls.assert_not_called()
+    # --plan implies a dry run: Zotero credentials are not needed
+    mock_config.return_value.validate.assert_not_called()
+    out = capsys.readouterr().out
+    assert "Gadus morhua" in out and f"Plan written to {path}" in out
+
+    mock_args.return_value = make_args(species_list="species.yaml", dry_run=True, limit=5, from_plan=str(path))
+    with patch('src.main.SpeciesRunner') as mock_runner_cls:
+        mock_runner_cls.return_value.failed = []
+        main()
+    assert mock_runner_cls.call_args.kwargs['species_limits'] == {'Gadus morhua': {'pubmed': 5, 'semantic_scholar': 0}}
+
+
+def test_stream_feeds_species_lazily(mock_args, mock_config, mock_input_manager, mock_providers, capsys):
+    mock_args.return_value = make_args(species_list="species.jsonl", dry_run=True, limit=10, stream=True)
+    mock_input_manager.return_value.iter_species.return_value = iter(
+        [SpeciesQuery(species_name="Gadus morhua", synonyms=[], keywords=[])])
+
+    with patch('src.main.SpeciesRunner') as mock_runner_cls:
+        mock_runner_cls.return_value.failed = []
+        main()
+
+    mock_input_manager.return_value.load_species_list.assert_not_called()
+    species = mock_runner_cls.return_value.run.call_args.args[0]
+    assert not isinstance(species, list)
+    assert [sp.species_name for sp in species] == ["Gadus morhua"]
+    assert "Streaming species from species.jsonl" in capsys.readouterr().out
+
+
+def test_taxonomy_expands_species_synonyms(mock_args, mock_config, mock_input_manager, mock_providers, capsys):
+    mock_args.return_value = make_args(species_list="species.yaml", dry_run=True, limit=10, taxonomy="taxonomy.idx")
+    mock_input_manager.return_value.load_species_list.return_value = [
+        SpeciesQuery(species_name="Gadus morhua", synonyms=[], keywords=[]),
+        SpeciesQuery(species_name="Thunnus thynnus", synonyms=[], keywords=[])]
+
+    with patch('src.main.TaxonomyIndex') as mock_index_cls, patch('src.main.SpeciesRunner') as mock_runner_cls:
+        mock_index_cls.return_value.expand.side_effect = lambda sp, common_names: (
+            SpeciesQuery(sp.species_name, ["Gadus callarias"], []) if sp.species_name == "Gadus morhua" else sp)
+        mock_runner_cls.return_value.failed = []
+        main()
+
+    species = mock_runner_cls.return_value.run.call_args.args[0]
+    assert [sp.synonyms for sp in species] == [["Gadus callarias"], []]
+    mock_index_cls.return_value.close.assert_called_once()
+    assert "Expanded synonyms of 1 of 2 species from taxonomy.idx." in capsys.readouterr().out
+
+
+def test_local_index_only_opened_with_local_first(mock_args, mock_config, mock_input_manager, mock_providers,
+                                                  mock_zotero_manager, tmp_path):
+    index = tmp_path / "local_index.sqlite"
+    mock_args.return_value = make_args(species_list="species.yaml", dry_run=False, limit=10, index=str(index))
+    mock_input_manager.return_value.load_species_list.return_value = [
+        SpeciesQuery(species_name="Gadus morhua", synonyms=[], keywords=[])]
+
+    with patch('src.main.SpeciesRunner') as mock_runner_cls:
+        mock_runner_cls.return_value.failed = []
+        main()
+
+    assert mock_runner_cls.call_args.kwargs['local_index'] is None
+    assert not index.exists()
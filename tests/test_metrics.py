@@ -0,0 +1,78 @@
+import io
+import json
+
+import pytest
+from src.metrics import CountingReader, Histogram, Metrics, is_rate_limited
+
+
+class HTTPError(Exception):
+    def __init__(self, code):
+        super().__init__(f"HTTP Error {code}")
+        self.code = code
+
+
+def test_histogram_quantiles():
+    hist = Histogram()
+    for ms in range(1, 101):
+        hist.observe(ms / 1000)
+    summary = hist.to_dict()
+    assert summary['count'] == 100
+    assert summary['min'] == 0.001 and summary['max'] == 0.1
+    assert summary['p50'] == pytest.approx(0.05, abs=0.01)
+    assert summary['p95'] == pytest.approx(0.095, abs=0.01)
+    assert summary['p99'] <= 0.1
+    assert Histogram().quantile(0.5) is None
+
+
+def test_request_counts_errors_and_rate_limits():
+    metrics = Metrics()
+    with metrics.request("pubmed", "esearch"):
+        pass
+    for code in (429, 500):
+        with pytest.raises(HTTPError):
+            with metrics.request("pubmed", "esearch"):
+                raise HTTPError(code)
+
+    key = (("operation", "esearch"), ("service", "pubmed"))
+    assert metrics.counters["requests"][key] == 3
+    assert metrics.counters["request_errors"][key] == 2
+    assert metrics.counters["rate_limited"][key] == 1
+    assert metrics.histograms["request_seconds"][key].count == 3
+    assert "pubmed esearch: 3 requests, 2 errors (1 rate limited)" in metrics.summary_lines()[0]
+
+
+def test_is_rate_limited():
+    assert is_rate_limited(HTTPError(429))
+    assert is_rate_limited(Exception("429 Too Many Requests"))
+    assert not is_rate_limited(Exception("PMID 14290 not found"))
+
+
+def test_timer_and_counting_reader():
+    metrics = Metrics()
+    with pytest.raises(ValueError):
+        with metrics.timer("cache", operation="write"):
+            raise ValueError
+    assert metrics.counters["cache_errors"][(("operation", "write"),)] == 1
+
+    reader = CountingReader(io.BytesIO(b"x" * 10), "pubmed", "efetch", metrics=metrics)
+    assert reader.read(4) == b"xxxx"
+    reader.read()
+    assert metrics.counters["response_bytes"][(("operation", "efetch"), ("service", "pubmed"))] == 10
+
+
+def test_exports(tmp_path):
+    metrics = Metrics()
+    metrics.observe("request_seconds", 0.2, service="zotero", operation='create"items')
+    metrics.inc("requests", service="zotero", operation='create"items')
+
+    metrics.write_json(str(tmp_path / "m.json"))
+    data = json.loads((tmp_path / "m.json").read_text())
+    assert data['histograms']['request_seconds'][0]['count'] == 1
+
+    metrics.write_prometheus(str(tmp_path / "m.prom"))
+    text = (tmp_path / "m.prom").read_text()
+    assert '# TYPE edna_lit_miner_requests_total counter' in text
+    assert 'edna_lit_miner_request_seconds_bucket{operation="create\\"items",service="zotero",le="0.25"} 1' in text
+    assert 'edna_lit_miner_request_seconds_bucket{operation="create\\"items",service="zotero",le="+Inf"} 1' in text
+    assert 'edna_lit_miner_request_seconds_count{operation="create\\"items",service="zotero"} 1' in text
+    assert list(tmp_path.glob("*.tmp")) == []
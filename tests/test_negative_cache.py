@@ -0,0 +1,42 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+
+from src.negative_cache import NegativeCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = NegativeCache(str(tmp_path / "negative.sqlite"), max_interval=timedelta(days=10))
+    yield cache
+    cache.close()
+
+
+def test_wait_doubles_up_to_the_maximum(cache):
+    assert [cache.interval(misses).days for misses in range(1, 7)] == [1, 2, 4, 8, 10, 10]
+
+
+def test_empty_query_skipped_until_recheck(cache):
+    assert not cache.skip("pubmed", "q")
+    cache.record("pubmed", "q", 0)
+    cache.record("pubmed", "q", 0)
+    assert cache.skip("pubmed", "q")
+    assert not cache.skip("semantic_scholar", "q")
+
+    due = cache.recheck_at("pubmed", "q")
+    with patch.object(NegativeCache, '_now', return_value=due - timedelta(hours=1)):
+        assert cache.skip("pubmed", "q")
+    with patch.object(NegativeCache, '_now', return_value=due):
+        assert not cache.skip("pubmed", "q")
+
+
+def test_any_result_clears_the_query(cache, tmp_path):
+    cache.record("pubmed", "q", 0)
+    cache.record("pubmed", "other", 0)
+    cache.record("pubmed", "q", 3)
+    assert not cache.skip("pubmed", "q")
+    # Persisted across runs
+    reopened = NegativeCache(str(tmp_path / "negative.sqlite"))
+    assert reopened.count() == 1 and reopened.skip("pubmed", "other")
+    reopened.close()
@@ -0,0 +1,87 @@
+import threading
+import time
+
+import pytest
+from src.pipeline import Pipeline, Stage
+
+
+def test_items_flow_through_every_stage():
+    pipeline = Pipeline([
+        Stage("double", lambda x: x * 2, workers=3),
+        Stage("inc", lambda x: x + 1),
+    ])
+    assert sorted(pipeline.run(range(10))) == [x * 2 + 1 for x in range(10)]
+
+
+def test_single_worker_stage_preserves_order():
+    pipeline = Pipeline([Stage("a", lambda x: x), Stage("b", lambda x: x)], queue_size=1)
+    assert pipeline.run(range(50)) == list(range(50))
+
+
+def test_none_drops_item_and_errors_are_reported(capsys):
+    def fail_on_three(x):
+        if x == 3:
+            raise RuntimeError("boom")
+        return x
+
+    pipeline = Pipeline([Stage("filter", lambda x: x if x % 2 else None), Stage("check", fail_on_three)])
+    assert pipeline.run(range(6)) == [1, 5]
+    assert "Error in check stage: boom" in capsys.readouterr().out
+
+
+def test_stages_overlap():
+    # Two stages of 0.05s each over 4 items take ~0.25s pipelined, 0.4s sequentially
+    def slow(x):
+        time.sleep(0.05)
+        return x
+
+    pipeline = Pipeline([Stage("search", slow), Stage("upload", slow)])
+    start = time.perf_counter()
+    pipeline.run(range(4))
+    assert time.perf_counter() - start < 0.38
+
+
+def test_back_pressure_bounds_items_in_flight():
+    in_flight = []
+    started = []
+    lock = threading.Lock()
+    release = threading.Event()
+
+    def produce(x):
+        with lock:
+            started.append(x)
+        return x
+
+    def consume(x):
+        release.wait()
+        return x
+
+    pipeline = Pipeline([Stage("produce", produce), Stage("consume", consume)], queue_size=2)
+    runner = threading.Thread(target=lambda: in_flight.extend(pipeline.run(range(20))))
+    runner.start()
+    time.sleep(0.1)
+    # One item held by the consumer, two queued, one blocked in put, two queued for the producer
+    assert len(started) <= 6
+    release.set()
+    runner.join()
+    assert sorted(in_flight) == list(range(20))
+
+
+def test_invalid_stages():
+    with pytest.raises(ValueError):
+        Pipeline([])
+    with pytest.raises(ValueError):
+        Pipeline([Stage("none", lambda x: x, workers=0)])
+
+
+def test_items_fed_before_a_failing_producer_drain():
+    done = []
+
+    def items():
+        yield 1
+        yield 2
+        raise ValueError("bad input")
+
+    with pytest.raises(ValueError, match="bad input"):
+        Pipeline([Stage("record", done.append)]).run(items())
+    assert done == [1, 2]
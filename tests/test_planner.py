@@ -0,0 +1,118 @@
+import threading
+import time
+
+from src.input_manager import SpeciesQuery
+from src.planner import RunPlan, SpeciesPlan, estimate, plan_run
+from src.providers.base import SearchProvider
+from src.providers.pubmed import PubMedProvider
+from src.providers.registry import PUBMED, SEMANTIC_SCHOLAR, ProviderSpec
+from src.providers.semantic_scholar import SemanticScholarProvider
+from src.runner import SpeciesRunner
+
+from benchmarks.stub_services import Corpus, StubServices
+
+SPECIES = [SpeciesQuery(species_name=name, synonyms=[], keywords=["eDNA"])
+           for name in ("Gadus morhua", "Salmo trutta", "Esox lucius", "Anguilla anguilla", "Perca fluviatilis")]
+
+
+class NoCountProvider(SearchProvider):
+    def search(self, query, limit=10):
+        return []
+
+
+class SlowCountProvider(SearchProvider):
+    spec = ProviderSpec("slow", "", rate_limit=20.0, concurrency=2)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = self.most_in_flight = 0
+        self.sent = []
+
+    def search(self, query, limit=10):
+        return []
+
+    def count(self, query):
+        with self.lock:
+            self.in_flight += 1
+            self.most_in_flight = max(self.most_in_flight, self.in_flight)
+            self.sent.append(time.monotonic())
+        time.sleep(0.02)
+        with self.lock:
+            self.in_flight -= 1
+        return 1
+
+
+def stub_providers(env):
+    pubmed = PubMedProvider("test@example.com", base_url=env['PUBMED_EUTILS_URL'])
+    pubmed.spec = PUBMED
+    s2 = SemanticScholarProvider(api_url=env['SEMANTIC_SCHOLAR_API_URL'])
+    s2.spec = SEMANTIC_SCHOLAR
+    return [pubmed, s2]
+
+
+def test_plan_counts_and_estimates_the_planned_run():
+    corpus = Corpus(results_per_query=30, empty=0.4)
+    with StubServices(corpus=corpus) as services:
+        providers = stub_providers(services.env())
+        plan = plan_run(SPECIES, providers, limit=20, workers=2)
+        counted = services.stats()
+        assert counted['pubmed']['requests'] == counted['semantic_scholar']['requests'] == len(SPECIES)
+        assert plan.count_requests == 2 * len(SPECIES)
+
+        species_list, skipped = plan.order(SPECIES)
+        runner = SpeciesRunner(providers, limit=20, dry_run=True, species_limits=plan.limits())
+        runner.run(species_list)
+        ran = services.stats()
+
+    for plan_row in plan.species:
+        assert plan_row.counts['pubmed'] == len(corpus.pmids(f'"{plan_row.species_name}"[tiab] AND "eDNA"[tiab]'))
+    assert skipped and [sp.species_name for sp in skipped] == [row.species_name for row in plan.empty()]
+    expected = [row.expected(20) for row in plan.by_yield() if row not in plan.empty()]
+    assert expected == sorted(expected, reverse=True)
+    # The run sent exactly the requests the plan estimated, and less than it would have without it
+    for name, service in (("pubmed", 'pubmed'), ("semantic_scholar", 'semantic_scholar')):
+        assert ran[service]['requests'] - counted[service]['requests'] == plan.estimates[name]['requests']
+    assert sum(cost['requests'] for cost in plan.unplanned.values()) > \
+        sum(cost['requests'] for cost in plan.estimates.values())
+
+
+def test_estimate_from_declared_quotas():
+    plans = [SpeciesPlan("A", {'pubmed': 250}), SpeciesPlan("B", {'pubmed': 0}), SpeciesPlan("C", {'pubmed': None})]
+    # 200 + 0 + 200 results in pages of 100, each an esearch and an efetch, at 3 requests/s
+    cost = estimate(PUBMED, plans, limit=200)
+    assert cost == {'requests': 8, 'bytes': 400 * PUBMED.result_bytes, 'seconds': 2.7}
+    # Without the plan the empty species still costs its esearch; an API key raises the rate
+    assert estimate(PUBMED, plans, limit=200, rate=10.0, planned=False) == \
+        {'requests': 9, 'bytes': 400 * PUBMED.result_bytes, 'seconds': 0.9}
+
+
+def test_plan_round_trip_and_order(tmp_path):
+    plan = RunPlan([SpeciesPlan("A", {'pubmed': 2, 'local': None}), SpeciesPlan("B", {'pubmed': 0, 'local': 0}),
+                    SpeciesPlan("C", {'pubmed': 40, 'local': None}, failed=['local'])], limit=10)
+    plan.write(tmp_path / "plan.json")
+    loaded = RunPlan.load(tmp_path / "plan.json")
+
+    species = [SpeciesQuery(species_name=name, synonyms=[], keywords=[]) for name in "ABCD"]
+    ordered, skipped = loaded.order(species)
+    assert [sp.species_name for sp in ordered] == ["C", "A", "D"]
+    assert [sp.species_name for sp in skipped] == ["B"]
+    assert loaded.limits(5)["A"] == {'pubmed': 2, 'local': 5}
+    report = loaded.report()
+    assert "failed" in report and "Species with no results: 1" in report
+
+
+def test_providers_that_cannot_count_are_planned_at_the_limit():
+    provider = NoCountProvider()
+    plan = plan_run(SPECIES[:2], [provider], limit=7)
+    assert plan.count_requests == 0
+    assert [row.counts for row in plan.species] == [{'NoCountProvider': None}] * 2
+    assert plan.species[0].expected(7) == 7
+
+
+def test_counts_keep_to_each_provider_concurrency_and_rate():
+    provider = SlowCountProvider()
+    plan = plan_run(SPECIES, [provider], limit=5, workers=len(SPECIES))
+    assert [row.counts for row in plan.species] == [{'slow': 1}] * len(SPECIES)
+    assert provider.most_in_flight <= provider.spec.concurrency
+    # 20 requests/s: the five counts take at least four intervals
+    assert provider.sent[-1] - provider.sent[0] >= (len(SPECIES) - 1) / 20.0 - 0.01
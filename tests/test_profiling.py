@@ -0,0 +1,84 @@
+import pstats
+import threading
+import time
+
+from src.profiling import PROCESS_WIDE, Profiler
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def functions(path):
+    return {func[2] for func in pstats.Stats(str(path)).stats}
+
+
+def test_disabled_profiler_is_a_no_op(tmp_path):
+    profiler = Profiler()
+    with profiler.stage("search"):
+        pass
+    assert profiler.totals == {}
+    assert profiler.finish() is None
+
+
+def test_nested_stages_are_exclusive(tmp_path):
+    profiler = Profiler()
+    profiler.enable(str(tmp_path))
+    with profiler.stage("search"):
+        time.sleep(0.05)          # waiting, like a network call
+        with profiler.stage("parse"):
+            busy(0.05)            # CPU-bound
+    out = profiler.finish()
+
+    search, parse = profiler.totals["search"], profiler.totals["parse"]
+    assert search['calls'] == 1 and parse['calls'] == 1
+    assert 0.04 < search['wall'] < 0.09
+    assert search['cpu'] < search['wall'] / 2
+    assert parse['cpu'] > parse['wall'] / 2
+
+    if PROCESS_WIDE:
+        assert "busy" in functions(out / "run.pstats")
+        return
+    assert "busy" in functions(out / "parse.pstats")
+    assert "busy" not in functions(out / "search.pstats")
+    summary = (out / "summary.txt").read_text()
+    assert "=== parse ===" in summary and "cpu %" in summary
+
+
+def test_concurrent_stages_are_all_profiled(tmp_path):
+    profiler = Profiler()
+    profiler.enable(str(tmp_path))
+    started = threading.Barrier(2)
+
+    def work(name):
+        with profiler.stage(name):
+            started.wait()
+            busy(0.05)
+
+    threads = [threading.Thread(target=work, args=(name,)) for name in ("search", "upload")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    out = profiler.finish()
+
+    for name in ("search", "upload"):
+        assert profiler.totals[name]['calls'] == 1
+        assert profiler.totals[name]['cpu'] > 0.02
+    paths = [out / "run.pstats"] if PROCESS_WIDE else [out / "search.pstats", out / "upload.pstats"]
+    for path in paths:
+        assert "busy" in functions(path)
+
+
+def test_sampling_writes_folded_stacks(tmp_path):
+    profiler = Profiler()
+    profiler.enable(str(tmp_path), sample_interval=0.001)
+    with profiler.stage("dedup"):
+        busy(0.05)
+    profiler.finish()
+
+    lines = (tmp_path / "profile.folded").read_text().splitlines()
+    assert any(line.startswith("dedup;") and "test_profiling:busy" in line for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
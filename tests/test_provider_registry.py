@@ -0,0 +1,72 @@
+import sys
+from importlib.metadata import EntryPoint
+from unittest.mock import patch
+
+import pytest
+
+from src.providers import registry
+from src.providers.registry import (BUILTIN, PUBMED, SEMANTIC_SCHOLAR, ProviderSpec, discover_providers,
+                                    plan_search_workers, select_providers)
+
+PLUGIN = ProviderSpec("crossref", "tests.test_provider_registry:PluginProvider", rate_limit=50.0, concurrency=2,
+                      date_filter=True)
+NOT_A_SPEC = object()
+
+
+class PluginProvider:
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+
+
+def entry_points_of(*values):
+    points = [EntryPoint(name, value, registry.ENTRY_POINT_GROUP) for name, value in values]
+    return lambda group: [point for point in points if point.group == group]
+
+
+def test_builtin_specs():
+    assert list(BUILTIN) == ["pubmed", "semantic_scholar"]
+    assert PUBMED.rate() == 3.0 and PUBMED.rate(keyed=True) == 10.0
+    assert SEMANTIC_SCHOLAR.rate(keyed=True) == 1.0
+    assert PUBMED.capabilities == ["date_filter", "bulk_paging", "batch_lookup"]
+    assert SEMANTIC_SCHOLAR.load().__name__ == "SemanticScholarProvider"
+
+
+def test_select_providers_in_given_order():
+    assert select_providers() == [PUBMED, SEMANTIC_SCHOLAR]
+    assert select_providers("semantic_scholar, pubmed,semantic_scholar") == [SEMANTIC_SCHOLAR, PUBMED]
+    with pytest.raises(ValueError, match="No providers selected"):
+        select_providers(" , ")
+
+
+def test_builtin_selection_skips_entry_point_scan():
+    with patch.object(registry, "discover_providers", side_effect=AssertionError("scanned")):
+        assert select_providers("pubmed") == [PUBMED]
+
+
+def test_plugins_discovered_through_entry_points(capsys):
+    fake = entry_points_of(("crossref", "tests.test_provider_registry:PLUGIN"),
+                           ("broken", "tests.test_provider_registry:NOT_A_SPEC"),
+                           ("missing", "no_such_module:SPEC"))
+    with patch("importlib.metadata.entry_points", fake):
+        assert set(discover_providers()) == {"pubmed", "semantic_scholar", "crossref"}
+        assert select_providers("crossref,pubmed") == [PLUGIN, PUBMED]
+        with pytest.raises(ValueError, match=r"Unknown provider\(s\): scopus \(available: crossref, pubmed"):
+            select_providers("scopus")
+    out = capsys.readouterr().out
+    assert "Ignoring provider plugin broken" in out
+    assert "Failed to load provider plugin missing" in out
+
+
+def test_plugins_discovered_from_installed_metadata(tmp_path, monkeypatch):
+    dist_info = tmp_path / "edna_crossref-1.0.dist-info"
+    dist_info.mkdir()
+    (dist_info / "METADATA").write_text("Metadata-Version: 2.1\nName: edna-crossref\nVersion: 1.0\n")
+    (dist_info / "entry_points.txt").write_text(
+        f"[{registry.ENTRY_POINT_GROUP}]\ncrossref = tests.test_provider_registry:PLUGIN\n")
+    monkeypatch.setattr(sys, "path", [str(tmp_path)] + sys.path)
+    assert discover_providers()["crossref"] == PLUGIN
+
+
+def test_plan_search_workers():
+    assert plan_search_workers([PUBMED, SEMANTIC_SCHOLAR]) == 4
+    assert plan_search_workers([]) == 1
@@ -1,14 +1,26 @@
 import pytest
 from unittest.mock import MagicMock
-from src.providers.base import SearchResult
+from urllib.parse import parse_qsl, urlsplit
+from src.providers.base import SearchProvider, SearchResult
 from src.providers.pubmed import PubMedProvider
 from src.providers.semantic_scholar import SemanticScholarProvider
+from src.resilience import ProviderFailed
 
 # --- PubMed Tests ---
 
 @pytest.fixture
-def mock_entrez(mocker):
-    return mocker.patch("src.providers.pubmed.Entrez")
+def mock_urlopen(mocker):
+    return mocker.patch("src.providers.pubmed.urlopen")
+
+@pytest.fixture
+def mock_entrez(mocker, mock_urlopen):
+    # Requests go to the mocked urlopen; the parsed records come from Entrez.read
+    return mocker.patch("src.providers.pubmed.Entrez", tool="biopython", api_key=None)
+
+def eutils_requests(mock_urlopen, tool):
+    """Parameters of each request sent to an E-utility."""
+    urls = [urlsplit(c.args[0].full_url) for c in mock_urlopen.call_args_list]
+    return [dict(parse_qsl(url.query)) for url in urls if url.path.endswith(f"/{tool}.fcgi")]
 
 def test_pubmed_init(mock_entrez):
     provider = PubMedProvider("test@email.com")
@@ -59,6 +71,7 @@ def test_pubmed_search_success(mock_entrez):
     assert res.doi == "10.1000/12345"
     assert res.url == "https://pubmed.ncbi.nlm.nih.gov/12345/"
     assert res.abstract == "Abstract part 1  part 2" # space joined
+    assert res.identifiers == {'pmid': '12345'}
 
 def test_pubmed_search_no_ids(mock_entrez):
     provider = PubMedProvider("test@email.com")
@@ -67,12 +80,13 @@ def test_pubmed_search_no_ids(mock_entrez):
     results = provider.search("query")
     assert len(results) == 0
 
-def test_pubmed_search_exception(mock_entrez):
+def test_pubmed_search_exception(mock_entrez, mock_urlopen):
     provider = PubMedProvider("test@email.com")
-    mock_entrez.esearch.side_effect = Exception("Network Error")
+    mock_urlopen.side_effect = Exception("Network Error")
 
-    results = provider.search("query")
-    assert len(results) == 0
+    # A failure is not an empty result
+    with pytest.raises(ProviderFailed, match="Network Error"):
+        provider.search("query")
 
 def test_pubmed_search_abstract_string(mock_entrez):
     provider = PubMedProvider("test@email.com")
@@ -103,7 +117,7 @@ def mock_sch(mocker):
 
 def test_semantic_init(mock_sch):
     provider = SemanticScholarProvider("api_key")
-    mock_sch.assert_called_with(api_key="api_key")
+    mock_sch.assert_called_with(api_key="api_key", retry=False)
 
 def test_semantic_search_success(mock_sch):
     provider = SemanticScholarProvider()
@@ -116,6 +130,7 @@ def test_semantic_search_success(mock_sch):
     paper.externalIds = {'DOI': '10.5555/ss'}
     paper.url = "http://ss.url"
     paper.abstract = "SS Abstract"
+    paper.paperId = "abc123"
     author1 = MagicMock()
     author1.name = "Author One"
     paper.authors = [author1]
@@ -130,14 +145,15 @@ def test_semantic_search_success(mock_sch):
     assert res.year == "2022"
     assert res.doi == "10.5555/ss"
     assert res.authors == ["Author One"]
+    assert res.identifiers == {'s2': 'abc123'}
 
 def test_semantic_search_exception(mock_sch):
     provider = SemanticScholarProvider()
     sch_instance = mock_sch.return_value
     sch_instance.search_paper.side_effect = Exception("API Error")
 
-    results = provider.search("query")
-    assert len(results) == 0
+    with pytest.raises(ProviderFailed, match="API Error"):
+        provider.search("query")
 
 def test_semantic_search_empty_fields(mock_sch):
     provider = SemanticScholarProvider()
@@ -180,3 +196,193 @@ def test_semantic_search_doi_fallback(mock_sch):
     results = provider.search("query")
     assert len(results) == 1
     assert results[0].doi == ""
+
+# --- Local Index Tests ---
+
+from src.providers.local import LocalSearchProvider, to_fts_query
+
+def test_to_fts_query_main_syntax():
+    query = '("Gadus morhua" OR "Atlantic cod") AND ("eDNA" OR "metabarcoding")'
+    assert to_fts_query(query) == '(("Gadus morhua" OR "Atlantic cod") AND ("eDNA" OR "metabarcoding"))'
+
+def test_to_fts_query_bare_words_and_tags():
+    assert to_fts_query('cod[tiab] eDNA NOT salmon') == '("cod" AND ("eDNA" NOT "salmon"))'
+
+@pytest.mark.parametrize("query", ['', '("a" OR "b"', 'AND "a"', '"a" )'])
+def test_to_fts_query_invalid(query):
+    with pytest.raises(ValueError):
+        to_fts_query(query)
+
+def test_local_search(tmp_path):
+    provider = LocalSearchProvider(index_file=str(tmp_path / "index.sqlite"))
+    provider.index.add_papers([
+        SearchResult("eDNA of Gadus morhua", ["A"], "2023", "10.1/a", "PubMed"),
+        SearchResult("Cod otoliths", ["B"], "2020", "10.1/b", "PubMed"),
+    ])
+
+    results = provider.search('("Gadus morhua" OR "Atlantic cod") AND "eDNA"')
+    assert [r.doi for r in results] == ["10.1/a"]
+
+def test_local_search_invalid_query(tmp_path):
+    provider = LocalSearchProvider(index_file=str(tmp_path / "index.sqlite"))
+    assert provider.search('("unbalanced"') == []
+
+def test_pubmed_search_pmc_identifier(mock_entrez):
+    provider = PubMedProvider("test@email.com")
+    pmc_id = MagicMock(attributes={"IdType": "pmc"}, __str__=lambda x: "PMC999")
+    mock_entrez.read.side_effect = [
+        {"IdList": ["12345"]},
+        {
+            "PubmedArticle": [{
+                "MedlineCitation": {"PMID": "12345", "Article": {"ArticleTitle": "Title"}},
+                "PubmedData": {"ArticleIdList": [pmc_id]}
+            }]
+        }
+    ]
+    results = provider.search("query")
+    assert results[0].identifiers == {'pmid': '12345', 'pmcid': 'PMC999'}
+
+def test_semantic_search_external_identifiers(mock_sch):
+    provider = SemanticScholarProvider()
+    paper = MagicMock()
+    paper.title = "Title"
+    paper.year = 2023
+    paper.paperId = "abc"
+    paper.externalIds = {'DOI': '10.1/x', 'PubMed': '42', 'PubMedCentral': '777', 'ArXiv': '2301.1'}
+    paper.authors = []
+    mock_sch.return_value.search_paper.return_value = [paper]
+
+    results = provider.search("query")
+    assert results[0].identifiers == {'s2': 'abc', 'pmid': '42', 'pmcid': 'PMC777', 'arxiv': '2301.1'}
+
+# --- Streaming Tests ---
+
+def pubmed_page(*pmids):
+    return {"PubmedArticle": [
+        {"MedlineCitation": {"PMID": pmid, "Article": {"ArticleTitle": f"Title {pmid}"}}} for pmid in pmids
+    ]}
+
+def test_iter_search_default_wraps_search():
+    class Provider(SearchProvider):
+        def search(self, query, limit=10):
+            return [SearchResult("T", [], "", "", "X")] * limit
+
+    assert len(list(Provider().iter_search("q", limit=3))) == 3
+
+def test_pubmed_iter_search_pages(mock_entrez, mock_urlopen):
+    provider = PubMedProvider("test@email.com")
+    mock_entrez.read.side_effect = [
+        {"IdList": ["1", "2"], "Count": "5"}, pubmed_page("1", "2"),
+        {"IdList": ["3", "4"], "Count": "5"}, pubmed_page("3", "4"),
+        {"IdList": ["5"], "Count": "5"}, pubmed_page("5"),
+    ]
+
+    results = list(provider.iter_search("query", limit=10, page_size=2))
+
+    assert [r.identifiers['pmid'] for r in results] == ["1", "2", "3", "4", "5"]
+    assert [p["retstart"] for p in eutils_requests(mock_urlopen, "esearch")] == ["0", "2", "4"]
+
+def test_pubmed_iter_search_stops_when_closed(mock_entrez, mock_urlopen):
+    provider = PubMedProvider("test@email.com")
+    mock_entrez.read.side_effect = [
+        {"IdList": ["1", "2"], "Count": "100"}, pubmed_page("1", "2"),
+        {"IdList": ["3", "4"], "Count": "100"}, pubmed_page("3", "4"),
+    ]
+
+    results = provider.iter_search("query", limit=100, page_size=2)
+    assert next(results).title == "Title 1"
+    results.close()
+
+    # Only the first page was requested
+    assert len(eutils_requests(mock_urlopen, "esearch")) == 1
+    assert len(eutils_requests(mock_urlopen, "efetch")) == 1
+
+def test_pubmed_iter_search_respects_limit(mock_entrez, mock_urlopen):
+    provider = PubMedProvider("test@email.com")
+    mock_entrez.read.side_effect = [{"IdList": ["1", "2", "3"], "Count": "50"}, pubmed_page("1", "2", "3")]
+
+    assert len(provider.search("query", limit=3)) == 3
+    assert eutils_requests(mock_urlopen, "esearch") == [
+        {"db": "pubmed", "term": "query", "retstart": "0", "retmax": "3", "tool": "biopython", "email": "test@email.com"}]
+
+def test_semantic_iter_search_stops_at_limit(mock_sch):
+    provider = SemanticScholarProvider()
+
+    consumed = []
+    def paginated():
+        # PaginatedResults fetches further pages lazily while being iterated
+        for i in range(1000):
+            consumed.append(i)
+            yield MagicMock(title=f"T{i}", authors=[], externalIds={}, paperId=str(i))
+    provider.sch.search_paper.return_value = paginated()
+
+    results = provider.search("query", limit=5)
+
+    assert len(results) == 5
+    assert len(consumed) == 5
+    provider.sch.search_paper.assert_called_with("query", limit=5)
+
+def test_pubmed_search_records_metrics(mock_entrez):
+    from src.metrics import METRICS
+
+    METRICS.reset()
+    mock_entrez.read.side_effect = [{"IdList": ["1"], "Count": "1"}, pubmed_page("1")]
+    PubMedProvider("test@email.com").search("query")
+
+    requests = METRICS.counters["requests"]
+    assert requests[(("operation", "esearch"), ("service", "pubmed"))] == 1
+    assert requests[(("operation", "efetch"), ("service", "pubmed"))] == 1
+
+def test_pubmed_base_url_overrides_eutils_root(mock_entrez, mock_urlopen):
+    provider = PubMedProvider("test@email.com", base_url="http://127.0.0.1:8080/")
+    mock_entrez.read.side_effect = [{"IdList": []}]
+
+    provider.search("query")
+
+    request = mock_urlopen.call_args.args[0]
+    assert request.full_url.startswith("http://127.0.0.1:8080/esearch.fcgi?")
+    assert eutils_requests(mock_urlopen, "esearch")[0]["term"] == "query"
+
+def test_pubmed_leaves_entrez_settings_alone():
+    from Bio import Entrez
+    max_tries = Entrez.max_tries
+    provider = PubMedProvider("test@email.com")
+    assert Entrez.max_tries == max_tries
+
+    # NCBI asks for POST beyond 200 IDs
+    request = provider._build_request("efetch", {"db": "pubmed", "id": [str(i) for i in range(250)]})
+    assert request.get_method() == "POST"
+    assert dict(parse_qsl(request.data.decode()))["id"] == ",".join(str(i) for i in range(250))
+    assert provider._build_request("efetch", {"db": "pubmed", "id": ["1", "2"]}).get_method() == "GET"
+
+def test_pubmed_parse_returns_plain_strings():
+    import io
+    from Bio import Entrez
+    xml = (b'<?xml version="1.0" ?>\n<!DOCTYPE PubmedArticleSet PUBLIC "-//NLM//DTD PubMedArticle, 1st January 2025//EN" '
+           b'"https://dtd.nlm.nih.gov/ncbi/pubmed/out/pubmed_250101.dtd">\n<PubmedArticleSet><PubmedArticle>'
+           b'<MedlineCitation Status="MEDLINE" Owner="NLM"><PMID Version="1">1</PMID><Article PubModel="Print">'
+           b'<Journal><JournalIssue CitedMedium="Internet"><PubDate><Year>2020</Year></PubDate></JournalIssue>'
+           b'</Journal><ArticleTitle>Cod eDNA</ArticleTitle></Article></MedlineCitation></PubmedArticle>'
+           b'</PubmedArticleSet>')
+
+    result = PubMedProvider("test@email.com")._parse_articles(Entrez.read(io.BytesIO(xml)))[0]
+
+    # Entrez StringElements would be written to the YAML cache as Python objects
+    assert type(result.title) is str and result.title == "Cod eDNA"
+    assert type(result.year) is str and result.year == "2020"
+
+def test_semantic_api_url(mock_sch):
+    SemanticScholarProvider("api_key", api_url="http://127.0.0.1:8080/")
+    mock_sch.assert_called_with(api_key="api_key", retry=False, api_url="http://127.0.0.1:8080")
+
+
+def test_semantic_unsupported_client_fails_clearly(mock_sch):
+    from types import SimpleNamespace
+    from src.providers.semantic_scholar import UnsupportedClient
+
+    mock_sch.return_value = SimpleNamespace()
+    with pytest.raises(UnsupportedClient, match="semanticscholar>=0.8.4"):
+        SemanticScholarProvider()
+    mock_sch.side_effect = TypeError("__init__() got an unexpected keyword argument 'retry'")
+    with pytest.raises(UnsupportedClient, match="retry"):
+        SemanticScholarProvider()
@@ -0,0 +1,111 @@
+import gzip
+import pytest
+from src.local_index import LocalIndex
+from src.providers.local import LocalPubMedProvider
+from src.pubmed_ingest import PubMedIngestor, find_pubmed_files, iter_pubmed_file, main
+
+
+def article(pmid, title, abstract="", doi=None, year="2023"):
+    eloc = f'<ELocationID EIdType="doi">{doi}</ELocationID>' if doi else ""
+    return f"""
+  <PubmedArticle>
+    <MedlineCitation>
+      <PMID Version="1">{pmid}</PMID>
+      <Article>
+        <Journal><JournalIssue><PubDate><Year>{year}</Year></PubDate></JournalIssue></Journal>
+        <ArticleTitle>{title}</ArticleTitle>
+        {eloc}
+        <Abstract><AbstractText Label="BACKGROUND">{abstract}</AbstractText><AbstractText>More.</AbstractText></Abstract>
+        <AuthorList><Author><LastName>Doe</LastName><ForeName>John</ForeName></Author></AuthorList>
+      </Article>
+    </MedlineCitation>
+    <PubmedData><ArticleIdList><ArticleId IdType="pubmed">{pmid}</ArticleId></ArticleIdList></PubmedData>
+  </PubmedArticle>"""
+
+
+def write_file(path, articles, deletions=()):
+    delete = ""
+    if deletions:
+        delete = "<DeleteCitation>" + "".join(f"<PMID>{p}</PMID>" for p in deletions) + "</DeleteCitation>"
+    body = f"<?xml version='1.0'?><PubmedArticleSet>{''.join(articles)}{delete}</PubmedArticleSet>"
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write(body)
+    return str(path)
+
+
+@pytest.fixture
+def index(tmp_path):
+    idx = LocalIndex(index_file=str(tmp_path / "pubmed.sqlite"))
+    yield idx
+    idx.close()
+
+
+def test_iter_pubmed_file_fields(tmp_path):
+    path = write_file(tmp_path / "pubmed24n0001.xml.gz", [
+        article("111", "eDNA of <i>Gadus morhua</i>", "Cod detection.", doi="10.1/cod")
+    ], deletions=["999"])
+
+    events = list(iter_pubmed_file(path))
+
+    assert events[0] == ("article", ("111", "eDNA of Gadus morhua", ["Doe, John"], "2023",
+                                     "10.1/cod", "Cod detection. More."))
+    assert events[1] == ("delete", "999")
+
+
+def test_ingest_and_search(tmp_path, index):
+    path = write_file(tmp_path / "pubmed24n0001.xml.gz", [
+        article("111", "eDNA of Gadus morhua", "Cod detection."),
+        article("222", "Salmon genetics", "Unrelated."),
+    ])
+
+    stats = PubMedIngestor(index, workers=1).ingest([path])
+
+    assert stats == {'files': 1, 'records': 2, 'deletions': 0}
+    results = index.search('"Gadus morhua"')
+    assert len(results) == 1
+    assert results[0].source == "PubMed"
+    assert results[0].url == "https://pubmed.ncbi.nlm.nih.gov/111/"
+
+
+def test_updates_applied_in_order(tmp_path, index):
+    baseline = write_file(tmp_path / "pubmed24n0001.xml.gz", [
+        article("111", "Old title about cod"),
+        article("222", "Retracted cod paper"),
+    ])
+    update = write_file(tmp_path / "pubmed24n1300.xml.gz", [
+        article("111", "Revised title about cod"),
+    ], deletions=["222"])
+
+    PubMedIngestor(index, workers=2).ingest([update, baseline])
+
+    assert index.count() == 1
+    assert [r.title for r in index.search('"cod"')] == ["Revised title about cod"]
+
+
+def test_ingest_is_resumable(tmp_path, index):
+    first = write_file(tmp_path / "pubmed24n0001.xml.gz", [article("111", "Cod one")])
+    ingestor = PubMedIngestor(index, workers=1)
+    ingestor.ingest([first])
+
+    second = write_file(tmp_path / "pubmed24n0002.xml.gz", [article("222", "Cod two")])
+    assert ingestor.pending_files([first, second]) == [second]
+    assert ingestor.ingest([first, second])['files'] == 1
+    assert ingestor.ingest([first, second])['files'] == 0
+
+
+def test_find_pubmed_files(tmp_path):
+    write_file(tmp_path / "pubmed24n0001.xml.gz", [])
+    (tmp_path / "notes.txt").write_text("x")
+    assert find_pubmed_files([str(tmp_path)]) == [str(tmp_path / "pubmed24n0001.xml.gz")]
+
+
+def test_local_pubmed_provider(tmp_path, capsys):
+    index_path = str(tmp_path / "pubmed.sqlite")
+    write_file(tmp_path / "pubmed24n0001.xml.gz", [article("111", "eDNA of Gadus morhua")])
+
+    main([str(tmp_path), "--index", index_path, "--workers", "1"])
+    assert "Done: 1 files, 1 records" in capsys.readouterr().out
+
+    provider = LocalPubMedProvider(index_file=index_path)
+    results = provider.search('("Gadus morhua" OR "Atlantic cod") AND "eDNA"')
+    assert [r.title for r in results] == ["eDNA of Gadus morhua"]
@@ -0,0 +1,88 @@
+import pytest
+
+from benchmarks.stub_services import Corpus, StubServices
+from src.input_manager import SpeciesQuery
+from src.providers.pubmed import PubMedProvider
+from src.providers.registry import PUBMED as PUBMED_SPEC
+from src.query import BOOLEAN, PLAIN, PUBMED, And, Or, Term, render, shared_names, species_query, split
+from src.runner import SpeciesRunner
+
+
+def species(synonyms=(), keywords=("eDNA",)):
+    return SpeciesQuery(species_name="Gadus morhua", synonyms=list(synonyms), keywords=list(keywords))
+
+
+def test_species_query_tree():
+    assert species_query(species(["Atlantic cod"])) == \
+        And((Or((Term("Gadus morhua"), Term("Atlantic cod"))), Or((Term("eDNA"),))))
+    assert species_query(species(keywords=())) == Or((Term("Gadus morhua"),))
+
+
+def test_render_per_syntax():
+    tree = species_query(species(["Atlantic cod"], ["eDNA", "environmental DNA"]))
+    assert render(tree, BOOLEAN) == '("Gadus morhua" OR "Atlantic cod") AND ("eDNA" OR "environmental DNA")'
+    assert render(tree, PUBMED) == ('("Gadus morhua"[tiab] OR "Atlantic cod"[tiab]) AND '
+                                    '("eDNA"[tiab] OR "environmental DNA"[tiab])')
+    assert render(tree, PLAIN) == "Gadus morhua Atlantic cod eDNA environmental DNA"
+    assert render(species_query(species(keywords=()))) == '"Gadus morhua"'
+    with pytest.raises(ValueError, match="Unknown query syntax"):
+        render(tree, "lucene")
+
+
+def test_split_packs_synonyms_into_parts_that_fit():
+    synonyms = [f"Synonym {i}" for i in range(40)]
+    tree = species_query(species(synonyms))
+    parts = split(tree, PUBMED, 300)
+    assert len(parts) > 1
+    assert all(len(render(part, PUBMED)) <= 300 for part in parts)
+    # Every name is searched exactly once, always with the keywords
+    names = [term.text for part in parts for term in part.children[0].children]
+    assert names == ["Gadus morhua"] + synonyms
+    assert all(part.children[1] == Or((Term("eDNA"),)) for part in parts)
+    assert split(tree, PUBMED, None) == [tree]
+
+
+def test_split_falls_back_to_keywords_and_keeps_oversized_terms():
+    tree = species_query(species(["x" * 50], ["k" * 30, "l" * 30]))
+    parts = split(tree, BOOLEAN, 100)
+    assert [render(part) for part in parts] == [
+        f'"Gadus morhua" AND ("{"k" * 30}" OR "{"l" * 30}")',
+        f'"{"x" * 50}" AND "{"k" * 30}"', f'"{"x" * 50}" AND "{"l" * 30}"',
+    ]
+    assert split(Term("y" * 200), BOOLEAN, 100) == [Term("y" * 200)]
+
+
+def test_long_pubmed_query_is_split_and_posted():
+    synonyms = [f"Gadus synonym number {i}" for i in range(120)]
+    with StubServices(corpus=Corpus(results_per_query=5)) as services:
+        provider = PubMedProvider("test@example.com", base_url=services.env()['PUBMED_EUTILS_URL'])
+        provider.spec = PUBMED_SPEC
+        runner = SpeciesRunner([provider], limit=12, dry_run=True)
+        runner.run([species(synonyms)])
+        stats = services.stats()['pubmed']
+    # 120 synonyms do not fit in one 4000-character term: two esearch/efetch rounds.
+    # The long first term is POSTed; the short remainder goes out as a GET
+    assert stats['requests'] == 4
+    assert stats['posts'] == 1
+
+
+def test_names_shared_by_species():
+    species = [
+        SpeciesQuery(species_name="Salmo trutta", synonyms=["Brown trout"], keywords=["eDNA"]),
+        SpeciesQuery(species_name="Salmo  Trutta", synonyms=[], keywords=["edna"]),
+        SpeciesQuery(species_name="brown trout", synonyms=[], keywords=["eDNA"]),
+        # Two names, two species: two queries either way
+        SpeciesQuery(species_name="Sea trout", synonyms=["Salmo trutta trutta"], keywords=["eDNA"]),
+        SpeciesQuery(species_name="Salmo trutta trutta", synonyms=["Sea trout"], keywords=["eDNA"]),
+        # "Thymallus thymallus" needs a query anyway, so "Grayling" is left to the species listed under it
+        SpeciesQuery(species_name="Thymallus thymallus", synonyms=["Grayling"], keywords=["eDNA"]),
+        SpeciesQuery(species_name="Grayling", synonyms=[], keywords=["eDNA"]),
+        # Same name, different question
+        SpeciesQuery(species_name="Salmo trutta", synonyms=[], keywords=["diet"]),
+    ]
+    shared = shared_names(species)
+    # Three species, two queries
+    assert [[render(name.tree) for name in shared.get(id(sp), [])] for sp in species] == [
+        ['"Salmo trutta" AND "eDNA"', '"Brown trout" AND "eDNA"'], ['"Salmo trutta" AND "eDNA"'],
+        ['"Brown trout" AND "eDNA"'], [], [], [], [], []]
+    assert [sp.species_name for sp in shared[id(species[0])][1].members] == ["Salmo trutta", "brown trout"]
\ No newline at end of file
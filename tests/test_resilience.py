@@ -0,0 +1,181 @@
+from urllib.error import HTTPError, URLError
+
+import pytest
+
+from benchmarks.stub_services import Behaviour, Corpus, StubServices
+from src.metrics import METRICS
+from src.providers.pubmed import PubMedProvider
+from src.providers.semantic_scholar import SemanticScholarProvider
+from src.resilience import (FATAL, RATE_LIMITED, TRANSIENT, CircuitBreaker, CircuitOpen, ProviderFailed,
+                            Resilience, RetryPolicy, classify, retry_after)
+
+
+class StatusError(Exception):
+    def __init__(self, status, headers=None):
+        super().__init__(f"HTTP {status}")
+        self.status_code = status
+        self.headers = headers or {}
+
+
+class GatewayTimeoutException(Exception):
+    pass
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    METRICS.reset()
+    yield
+    METRICS.reset()
+
+
+def flaky(*outcomes):
+    """A request that raises or returns each outcome in turn."""
+    outcomes = iter(outcomes)
+    calls = []
+
+    def request():
+        calls.append(1)
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    request.calls = calls
+    return request
+
+
+def test_classify():
+    assert classify(HTTPError("http://x", 429, "Too Many Requests", {}, None)) == RATE_LIMITED
+    assert classify(ConnectionRefusedError("HTTP status 429 Too Many Requests.")) == RATE_LIMITED
+    assert classify(StatusError(503)) == TRANSIENT
+    assert classify(HTTPError("http://x", 502, "Bad Gateway", {}, None)) == TRANSIENT
+    assert classify(URLError("connection reset")) == TRANSIENT
+    assert classify(TimeoutError()) == TRANSIENT
+    assert classify(GatewayTimeoutException("upstream")) == TRANSIENT
+    assert classify(StatusError(400)) == FATAL
+    assert classify(PermissionError("HTTP status 403 Forbidden.")) == FATAL
+    assert classify(ValueError("bad XML")) == FATAL
+
+
+def test_retry_after_seconds_and_date():
+    assert retry_after(StatusError(429, {'Retry-After': '7'})) == 7.0
+    assert retry_after(StatusError(429, {'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'})) == 0.0
+    assert retry_after(StatusError(429)) is None
+    assert retry_after(ValueError()) is None
+
+
+def test_backoff_honours_retry_after_and_cap():
+    policy = RetryPolicy(base_delay=1.0, max_delay=10.0)
+    for attempt in range(6):
+        assert 0 <= policy.delay(attempt, StatusError(503)) <= min(10.0, 2 ** attempt)
+    assert policy.delay(0, StatusError(429, {'Retry-After': '5'})) >= 5
+    assert policy.delay(0, StatusError(429, {'Retry-After': '600'})) == 10.0
+
+
+def test_transient_errors_are_retried():
+    sleeps = []
+    resilience = Resilience("svc", RetryPolicy(max_attempts=3), sleep=sleeps.append)
+    request = flaky(StatusError(503), StatusError(429, {'Retry-After': '2'}), "ok")
+    assert resilience.call("op", request) == "ok"
+    assert len(request.calls) == 3
+    assert sleeps[1] >= 2
+    assert METRICS.counters["retries"][(('operation', "op"), ('service', "svc"))] == 2
+
+
+def test_fatal_error_fails_at_once():
+    resilience = Resilience("svc", sleep=lambda s: pytest.fail("fatal errors are not retried"))
+    with pytest.raises(ProviderFailed) as info:
+        resilience.call("op", flaky(StatusError(400)))
+    assert info.value.kind == FATAL and isinstance(info.value.cause, StatusError)
+
+
+def test_exhausted_retries_fail():
+    resilience = Resilience("svc", RetryPolicy(max_attempts=2), sleep=lambda s: None)
+    with pytest.raises(ProviderFailed, match=r"svc op failed \(transient\)"):
+        resilience.call("op", flaky(StatusError(503), StatusError(503)))
+
+
+def test_circuit_opens_and_probes_after_cool_down(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("src.resilience.time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30.0)
+    resilience = Resilience("svc", RetryPolicy(max_attempts=1), breaker, sleep=lambda s: None)
+
+    for _ in range(2):
+        with pytest.raises(ProviderFailed):
+            resilience.call("op", flaky(StatusError(503)))
+    assert breaker.state == "open"
+    request = flaky("ok")
+    with pytest.raises(CircuitOpen, match="next attempt in 30s"):
+        resilience.call("op", request)
+    assert request.calls == []
+
+    now[0] += 30
+    assert breaker.state == "half-open"
+    # A failed probe restarts the cool-down
+    with pytest.raises(ProviderFailed):
+        resilience.call("op", flaky(StatusError(503)))
+    assert breaker.state == "open" and breaker.retry_in() == 30.0
+
+    now[0] += 30
+    assert resilience.call("op", flaky("ok")) == "ok"
+    assert breaker.state == "closed"
+
+
+def test_fatal_error_leaves_the_breaker_alone(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("src.resilience.time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30.0)
+    resilience = Resilience("svc", RetryPolicy(max_attempts=1), breaker, sleep=lambda s: None)
+
+    with pytest.raises(ProviderFailed):
+        resilience.call("op", flaky(StatusError(503)))
+    with pytest.raises(ProviderFailed):
+        resilience.call("op", flaky(StatusError(400)))
+    # The bad request did not reset the failure count
+    assert breaker.failures == 1
+    with pytest.raises(ProviderFailed):
+        resilience.call("op", flaky(StatusError(503)))
+    assert breaker.state == "open"
+
+    now[0] += 30
+    # A bad request as the probe neither closes the circuit nor blocks the next probe
+    with pytest.raises(ProviderFailed):
+        resilience.call("op", flaky(StatusError(400)))
+    assert breaker.state == "half-open" and breaker.failures == 2
+    assert resilience.call("op", flaky("ok")) == "ok"
+    assert breaker.state == "closed"
+
+
+def test_semantic_scholar_retries_unhandled_503():
+    # The client turns a 503 into an empty payload; it must fail, not read as "no papers"
+    with StubServices(semantic_scholar=Behaviour(error_rate=1.0), corpus=Corpus(results_per_query=5)) as services:
+        provider = SemanticScholarProvider(api_url=services.env()['SEMANTIC_SCHOLAR_API_URL'],
+                                           resilience=Resilience("semantic_scholar", RetryPolicy(2, 0.01)))
+        with pytest.raises(ProviderFailed, match="503"):
+            provider.search("cod", limit=5)
+        assert services.stats()['semantic_scholar']['errors'] == 2
+
+
+def test_pubmed_rate_limit_retried_only_by_the_resilience_layer():
+    with StubServices(pubmed=Behaviour(rate_limit=0.001, burst=1, retry_after=0.2)) as services:
+        waits = []
+        provider = PubMedProvider("test@example.com", base_url=services.env()['PUBMED_EUTILS_URL'],
+                                  resilience=Resilience("pubmed", RetryPolicy(3, 0.01), sleep=waits.append))
+        with pytest.raises(ProviderFailed, match="rate_limited"):
+            provider.search("cod", limit=5)
+        # One request per attempt (Bio.Entrez would repeat each one), each retry after Retry-After
+        assert services.stats()['pubmed']['rate_limited'] == 3
+        assert waits and all(wait >= 0.2 for wait in waits)
+
+
+def test_semantic_scholar_honours_retry_after():
+    with StubServices(semantic_scholar=Behaviour(rate_limit=0.001, burst=1, retry_after=0.2)) as services:
+        waits = []
+        provider = SemanticScholarProvider(api_url=services.env()['SEMANTIC_SCHOLAR_API_URL'],
+                                           resilience=Resilience("semantic_scholar", RetryPolicy(3, 0.01),
+                                                                 sleep=waits.append))
+        assert len(provider.search("cod", limit=5)) == 5
+        with pytest.raises(ProviderFailed, match="rate_limited"):
+            provider.search("salmon", limit=5)
+        assert services.stats()['semantic_scholar']['rate_limited'] == 3
+        assert len(waits) == 2 and all(wait >= 0.2 for wait in waits)
@@ -0,0 +1,46 @@
+import json
+from dataclasses import asdict
+
+from benchmarks.bench_memory import run
+from src.providers.base import SearchResult
+from src.result_batch import SearchResultBatch
+
+
+def make_results():
+    return [
+        SearchResult("eDNA of cod", ["Doe, J", "Roe, R"], "2023", "10.1/A", "PubMed", "Abstract", "",
+                     {'pmid': "1"}),
+        SearchResult("Salmon survey", [], "2021", "", "SemanticScholar", url="http://s2"),
+        SearchResult("EDNA of cod.", ["Doe, J"], "2023", "10.1/a", "SemanticScholar", identifiers={'s2': "x"}),
+    ]
+
+
+def test_batch_round_trip():
+    results = make_results()
+    batch = SearchResultBatch(results)
+    assert len(batch) == 3
+    assert list(batch) == results
+    assert batch[-1] == results[2]
+    assert batch.authors(0) == ("Doe, J", "Roe, R")
+    assert batch.sources() == ["PubMed", "SemanticScholar", "SemanticScholar"]
+    assert batch.years() == ["2023", "2021", "2023"]
+    # Repeated sources, years and authors are stored once
+    assert len(batch._strings) == 6
+    assert list(batch.to_dicts()) == [asdict(result) for result in results]
+
+
+def test_batch_deduplicate_and_export(tmp_path):
+    unique = SearchResultBatch(make_results()).deduplicate()
+    assert unique.titles == ["eDNA of cod", "Salmon survey"]
+    assert unique.identifiers(0) == {'pmid': "1", 's2': "x"}
+
+    path = tmp_path / "results.jsonl"
+    assert unique.write_jsonl(str(path)) == 2
+    rows = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+    assert [SearchResult(**row) for row in rows] == list(unique)
+
+
+def test_memory_benchmark_shows_savings(capsys):
+    per_record = run(2000, authors=4, abstract_chars=0)
+    assert per_record['batch'] < per_record['compact'] <= per_record['slotted'] < per_record['dict']
+    assert "bytes/record" in capsys.readouterr().out
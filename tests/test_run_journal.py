@@ -0,0 +1,41 @@
+import pytest
+from src.providers.base import SearchResult
+from src.run_journal import RunJournal
+
+
+def test_record_and_reload(tmp_path):
+    journal = RunJournal(str(tmp_path), run_id="run1")
+    results = [SearchResult("Cod eDNA", ["Doe, J"], "2023", "10.1/cod", "PubMed", identifiers={'pmid': '1'})]
+    journal.record_search("Gadus morhua", results)
+    journal.record("Gadus morhua", "filed", index=0, zotero_key="KEY1")
+    journal.close()
+
+    resumed = RunJournal(str(tmp_path), run_id="run1", resume=True)
+    assert resumed.completed("Gadus morhua", "searched")
+    assert not resumed.completed("Gadus morhua", "uploaded")
+    assert not resumed.completed("Salmo salar", "searched")
+    assert resumed.search_results("Gadus morhua") == results
+    assert resumed.search_results("Salmo salar") is None
+    assert resumed.filed("Gadus morhua") == {0: "KEY1"}
+
+
+def test_truncated_last_line_is_ignored(tmp_path):
+    journal = RunJournal(str(tmp_path), run_id="run1")
+    journal.record("Sp1", "cached")
+    journal.close()
+    with open(journal.path, "a", encoding="utf-8") as f:
+        f.write('{"species": "Sp2", "stage": "cach')
+
+    resumed = RunJournal(str(tmp_path), run_id="run1", resume=True)
+    assert resumed.completed("Sp1", "cached")
+    assert not resumed.completed("Sp2", "cached")
+
+
+def test_resume_unknown_run(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        RunJournal(str(tmp_path), run_id="missing", resume=True)
+
+
+def test_unknown_stage(tmp_path):
+    with pytest.raises(ValueError):
+        RunJournal(str(tmp_path)).record("Sp1", "exploded")
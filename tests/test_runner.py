@@ -0,0 +1,375 @@
+from unittest.mock import MagicMock
+
+from src.dedup import Deduplicator
+from src.dedup_index import DedupIndex
+from src.input_manager import SpeciesQuery
+from src.providers.base import SearchResult
+from src.resilience import ProviderFailed
+from src.runner import SpeciesRunner, build_query, collect_results
+
+
+def paper(i, title=None):
+    return SearchResult(source="PubMed", title=title or f"Paper number {i}", doi=f"10.1/{i}", year="2023", authors=[])
+
+
+def provider_returning(results_by_query):
+    provider = MagicMock()
+    provider.iter_search.side_effect = lambda query, limit=10, **kwargs: iter(results_by_query.get(query, []))
+    return provider
+
+
+def test_build_query():
+    species = SpeciesQuery(species_name="Gadus morhua", synonyms=["Atlantic cod"], keywords=["eDNA"])
+    assert build_query(species) == '("Gadus morhua" OR "Atlantic cod") AND "eDNA"'
+    assert build_query(SpeciesQuery(species_name="Sp", synonyms=[], keywords=[])) == '"Sp"'
+
+
+def test_collect_results_stops_at_target():
+    closed = []
+    def stream():
+        try:
+            for i in range(100):
+                yield paper(i)
+        finally:
+            closed.append(True)
+
+    deduplicator = Deduplicator()
+    assert collect_results(stream(), deduplicator, target=3) == 3
+    assert len(deduplicator) == 3
+    assert closed == [True]
+
+
+def test_shared_paper_uploaded_once_across_concurrent_species():
+    species = [SpeciesQuery(species_name=f"Sp{i}", synonyms=[], keywords=[]) for i in range(6)]
+    # Every species finds the shared paper plus one of its own
+    provider = provider_returning({f'"Sp{i}"': [paper("shared"), paper(i)] for i in range(6)})
+
+    zotero = MagicMock()
+    zotero.create_or_get_collection.side_effect = lambda name: f"col-{name}"
+    keys = iter(f"key{i}" for i in range(100))
+    zotero.add_item.side_effect = lambda item, col_id: next(keys)
+    zotero.add_to_collection.return_value = True
+
+    runner = SpeciesRunner([provider], zotero_managers=[zotero, zotero, zotero],
+                           abstract_cache=MagicMock(), dedup_index=DedupIndex(":memory:"))
+    done = runner.run(species, search_workers=3, upload_workers=3)
+
+    assert len(done) == 6
+    uploaded = [call.args[0].doi for call in zotero.add_item.call_args_list]
+    assert uploaded.count("10.1/shared") == 1
+    assert zotero.add_to_collection.call_count == 5
+
+
+def test_local_index_hit_filed_not_uploaded_again(tmp_path):
+    from src.providers.local import LocalSearchProvider
+
+    local = LocalSearchProvider(str(tmp_path / "local.sqlite"))
+    local.index.add_papers([paper(1, title="Gadus morhua eDNA survey")], ["ABC"])
+    zotero = MagicMock()
+    zotero.create_or_get_collection.return_value = "col"
+    zotero.add_to_collection.return_value = True
+    dedup_index = DedupIndex(":memory:")
+
+    runner = SpeciesRunner([provider_returning({})], limit=1, local_provider=local, zotero_managers=[zotero],
+                           abstract_cache=MagicMock(), dedup_index=dedup_index)
+    runner.run([SpeciesQuery(species_name="Gadus morhua", synonyms=[], keywords=[])])
+
+    zotero.add_item.assert_not_called()
+    zotero.add_to_collection.assert_called_once_with("ABC", "col")
+    assert dedup_index.lookup(paper(1))['zotero_key'] == "ABC"
+    local.index.close()
+
+
+def test_failed_claim_falls_back_to_own_upload():
+    species = [SpeciesQuery(species_name=f"Sp{i}", synonyms=[], keywords=[]) for i in range(2)]
+    provider = provider_returning({'"Sp0"': [paper("shared")], '"Sp1"': [paper("shared")]})
+
+    zotero = MagicMock()
+    zotero.create_or_get_collection.side_effect = lambda name: f"col-{name}"
+    zotero.add_item.side_effect = [None, "key1"]
+
+    cache = MagicMock()
+    runner = SpeciesRunner([provider], zotero_managers=[zotero], abstract_cache=cache,
+                           dedup_index=DedupIndex(":memory:"))
+    runner.run(species)
+
+    assert zotero.add_item.call_count == 2
+    cache.add_papers.assert_called_once()
+    assert cache.add_papers.call_args.kwargs["species_name"] == "Sp1"
+
+
+def test_dry_run_stops_after_search(capsys):
+    provider = provider_returning({'"Sp"': [paper(1)]})
+    runner = SpeciesRunner([provider], dry_run=True)
+
+    assert runner.run([SpeciesQuery(species_name="Sp", synonyms=[], keywords=[])]) == []
+    out = capsys.readouterr().out
+    assert "Total unique results: 1" in out
+    assert "Dry Run: Skipping Zotero upload and cache." in out
+
+
+def test_resume_replays_only_unfinished_stages(tmp_path):
+    from src.run_journal import RunJournal
+
+    species = [SpeciesQuery(species_name=f"Sp{i}", synonyms=[], keywords=[]) for i in range(2)]
+    provider = provider_returning({'"Sp0"': [paper(0)], '"Sp1"': [paper(1), paper(2)]})
+
+    zotero = MagicMock()
+    zotero.create_or_get_collection.side_effect = ["col0", Exception("Zotero outage")]
+    zotero.add_item.return_value = "key0"
+    dedup_index = DedupIndex(str(tmp_path / "dedup.sqlite"))
+
+    journal = RunJournal(str(tmp_path), run_id="run1")
+    SpeciesRunner([provider], zotero_managers=[zotero], abstract_cache=MagicMock(),
+                  dedup_index=dedup_index, journal=journal).run(species)
+    journal.close()
+
+    # Second attempt: Sp0 is done, Sp1 was searched but never uploaded
+    provider.iter_search.reset_mock()
+    zotero.create_or_get_collection.side_effect = None
+    zotero.create_or_get_collection.return_value = "col1"
+    zotero.add_item.side_effect = ["key1", "key2"]
+    cache = MagicMock()
+    journal = RunJournal(str(tmp_path), run_id="run1", resume=True)
+    SpeciesRunner([provider], zotero_managers=[zotero], abstract_cache=cache,
+                  dedup_index=dedup_index, journal=journal).run(species)
+
+    provider.iter_search.assert_not_called()
+    cache.add_papers.assert_called_once()
+    assert cache.add_papers.call_args.kwargs["species_name"] == "Sp1"
+    assert cache.add_papers.call_args.kwargs["zotero_keys"] == ["key1", "key2"]
+    assert journal.completed("Sp1", "cached")
+
+
+def test_resume_skips_papers_already_filed(tmp_path):
+    from src.run_journal import RunJournal
+
+    journal = RunJournal(str(tmp_path), run_id="run1")
+    journal.record_search("Sp0", [paper(0), paper(1)])
+    journal.record("Sp0", "filed", index=0, zotero_key="key0")
+
+    zotero = MagicMock()
+    zotero.add_item.return_value = "key1"
+    cache = MagicMock()
+    SpeciesRunner([MagicMock()], zotero_managers=[zotero], abstract_cache=cache,
+                  journal=journal).run([SpeciesQuery(species_name="Sp0", synonyms=[], keywords=[])])
+
+    zotero.add_item.assert_called_once()
+    assert zotero.add_item.call_args.args[0].doi == "10.1/1"
+    assert cache.add_papers.call_args.kwargs["zotero_keys"] == ["key0", "key1"]
+
+
+def test_failed_search_is_requeued_not_uploaded_empty(capsys):
+    species = [SpeciesQuery(species_name="Sp1", synonyms=[], keywords=[])]
+    outcomes = iter([ProviderFailed("pubmed", "esearch", "transient", ConnectionError("reset")), [paper(1)]])
+
+    def iter_search(query, limit=10, **kwargs):
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return iter(outcome)
+
+    provider = MagicMock()
+    provider.iter_search.side_effect = iter_search
+    zotero = MagicMock()
+    zotero.add_item.return_value = "key1"
+
+    runner = SpeciesRunner([provider], zotero_managers=[zotero], abstract_cache=MagicMock())
+    done = runner.run(species)
+
+    assert [work.species.species_name for work in done] == ["Sp1"]
+    assert zotero.add_item.call_count == 1
+    assert runner.failed == []
+    out = capsys.readouterr().out
+    assert "Failed: pubmed esearch failed (transient): reset" in out
+    assert "Requeuing 1 species" in out
+
+
+def test_search_still_failing_after_requeue_is_reported():
+    species = [SpeciesQuery(species_name="Sp1", synonyms=[], keywords=[])]
+    provider = MagicMock()
+    provider.iter_search.side_effect = ProviderFailed("pubmed", "esearch", "transient", ConnectionError("reset"))
+    zotero = MagicMock()
+
+    runner = SpeciesRunner([provider], zotero_managers=[zotero], abstract_cache=MagicMock())
+    assert runner.run(species, requeue=1) == []
+    assert [sp.species_name for sp in runner.failed] == ["Sp1"]
+    assert provider.iter_search.call_count == 2
+    zotero.create_or_get_collection.assert_not_called()
+
+
+def test_provider_concurrency_cap_limits_searches_in_flight():
+    import threading
+    import time
+    from src.providers.registry import ProviderSpec
+
+    in_flight, peak = [0], [0]
+    lock = threading.Lock()
+
+    def search(query, limit=10, **kwargs):
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        time.sleep(0.02)
+        with lock:
+            in_flight[0] -= 1
+        return iter([paper(query)])
+
+    provider = MagicMock()
+    provider.iter_search.side_effect = search
+    provider.spec = ProviderSpec("slow", "tests:Slow", concurrency=2)
+    species = [SpeciesQuery(species_name=f"Species {i}", synonyms=[], keywords=[]) for i in range(8)]
+    runner = SpeciesRunner([provider], dry_run=True)
+    runner.run(species, search_workers=6)
+    assert provider.iter_search.call_count == 8
+    assert peak[0] == 2
+
+
+def test_long_query_parts_share_the_provider_limit(capsys):
+    from src.providers.registry import ProviderSpec
+
+    calls = []
+
+    def search(query, limit=10, **kwargs):
+        calls.append((query, limit))
+        return iter([paper(f"{query}-{i}") for i in range(2)])
+
+    provider = MagicMock()
+    provider.iter_search.side_effect = search
+    provider.spec = ProviderSpec("plain", "tests:Plain", query_syntax="plain", max_query_length=30)
+    species = SpeciesQuery(species_name="Gadus morhua", synonyms=["Atlantic cod", "Codling"], keywords=["eDNA"])
+    SpeciesRunner([provider], limit=5, dry_run=True).run([species])
+
+    assert calls == [("Gadus morhua Atlantic cod eDNA", 3), ("Codling eDNA", 3)]
+    assert "searching 2 parts" in capsys.readouterr().out
+
+
+def test_negative_cache_skips_queries_that_found_nothing(tmp_path, capsys):
+    from src.negative_cache import NegativeCache
+    species = [SpeciesQuery(species_name=name, synonyms=[], keywords=[]) for name in ("Rare", "Common")]
+    provider = provider_returning({'"Common"': [paper(1)]})
+    provider.reports_failures = True
+    cache = NegativeCache(str(tmp_path / "negative.sqlite"))
+
+    for _ in range(2):
+        SpeciesRunner([provider], negative_cache=cache, dry_run=True).run(species)
+
+    searched = [call.args[0] for call in provider.iter_search.call_args_list]
+    assert searched == ['"Rare"', '"Common"', '"Common"']
+    assert "no results recently" in capsys.readouterr().out
+    cache.close()
+
+
+def test_negative_cache_ignores_providers_that_swallow_errors(tmp_path):
+    from src.negative_cache import NegativeCache
+    from src.providers.base import SearchProvider
+
+    class Swallowing(SearchProvider):
+        def search(self, query, limit=10):
+            # e.g. LocalSearchProvider: prints the error, returns nothing
+            return []
+
+    species = [SpeciesQuery(species_name="Rare", synonyms=[], keywords=[])]
+    provider = Swallowing()
+    cache = NegativeCache(str(tmp_path / "negative.sqlite"))
+    SpeciesRunner([provider, provider_returning({})], negative_cache=cache, dry_run=True).run(species)
+
+    # Neither the plugin-style provider nor the mock says its empty results are real
+    assert cache.count() == 0
+    cache.close()
+
+
+def test_species_sharing_a_synonym_are_searched_once(capsys):
+    species = [SpeciesQuery(species_name="Salmo trutta", synonyms=["Brown trout"], keywords=[]),
+               SpeciesQuery(species_name="Brown trout", synonyms=[], keywords=[]),
+               SpeciesQuery(species_name="salmo  trutta", synonyms=[], keywords=[]),
+               # Has a name of its own: searched with its one query
+               SpeciesQuery(species_name="Salmo trutta fario", synonyms=["brown trout"], keywords=[])]
+    provider = provider_returning({'"Salmo trutta"': [paper(1)], '"Brown trout"': [paper(2), paper(3)],
+                                   '("Salmo trutta fario" OR "brown trout")': [paper(4)]})
+
+    SpeciesRunner([provider], dry_run=True).run(species, search_workers=3)
+
+    assert sorted(call.args[0] for call in provider.iter_search.call_args_list) == [
+        '"Brown trout"', '"Salmo trutta"', '("Salmo trutta fario" OR "brown trout")']
+    out = capsys.readouterr().out
+    assert "3 species share all their names and synonyms with others" in out
+    # Each species gets the results of its own names, not those of the names it does not have
+    for name, found in (("Salmo trutta", (1, 2, 3)), ("Brown trout", (2, 3)), ("salmo  trutta", (1,))):
+        block = out.split(f"Results for {name}\n")[1].split("\n\n")[0]
+        assert [i for i in range(1, 5) if f"Paper number {i} (" in block] == list(found)
+
+    # Opting out searches each species with its own query
+    provider.iter_search.reset_mock()
+    SpeciesRunner([provider], dry_run=True, merge_queries=False).run(species)
+    assert provider.iter_search.call_count == 4
+
+
+def test_shared_name_searched_once_for_the_largest_limit(capsys):
+    species = [SpeciesQuery(species_name=name, synonyms=[], keywords=[]) for name in ("Salmo trutta", "salmo trutta")]
+    provider = provider_returning({'"Salmo trutta"': [paper(i) for i in range(1, 5)]})
+
+    SpeciesRunner([provider], limit=3, dry_run=True,
+                  species_limits={"Salmo trutta": {"MagicMock": 1}}).run(species)
+
+    assert len(provider.iter_search.call_args_list) == 1
+    assert provider.iter_search.call_args.kwargs['limit'] == 3
+    # Each species still takes no more than its own limit
+    out = capsys.readouterr().out
+    totals = [block.split("Total unique results: ")[1].split("\n")[0] for block in out.split("Processing species")[1:]]
+    assert totals == ["1", "3"]
+
+
+def test_merging_leaves_shared_results_untouched():
+    species = [SpeciesQuery(species_name="Salmo trutta", synonyms=["Brown trout"], keywords=[]),
+               SpeciesQuery(species_name="salmo trutta", synonyms=[], keywords=[]),
+               SpeciesQuery(species_name="Brown trout", synonyms=[], keywords=[])]
+    shared = paper(1)
+    duplicate = SearchResult(source="SemanticScholar", title="Paper number 1", doi="10.1/1", year="2023", authors=[],
+                             abstract="Found under the synonym only", identifiers={'s2': 'abc'})
+    provider = provider_returning({'"Salmo trutta"': [shared], '"Brown trout"': [duplicate]})
+
+    SpeciesRunner([provider], dry_run=True).run(species, search_workers=3)
+
+    # "Salmo trutta" merged the synonym's duplicate into its own copy, not into the other species' record
+    assert shared.abstract == "" and shared.identifiers == {}
+
+
+def test_streamed_species_are_grouped_per_window():
+    species = [SpeciesQuery(species_name=name, synonyms=[], keywords=[])
+               for name in ("Salmo trutta", "salmo trutta", "SALMO TRUTTA")]
+    provider = provider_returning({})
+
+    # The first two species share a window and a search; the third is searched alone
+    SpeciesRunner([provider], dry_run=True, merge_window=2).run(iter(species))
+
+    assert [call.args[0] for call in provider.iter_search.call_args_list] == ['"Salmo trutta"', '"SALMO TRUTTA"']
+
+
+def test_shared_search_released_when_it_raises_or_is_resumed(tmp_path):
+    from src.run_journal import RunJournal
+
+    species = [SpeciesQuery(species_name=name, synonyms=[], keywords=[])
+               for name in ("Salmo trutta", "salmo trutta", "Salmo  trutta")]
+    provider = MagicMock()
+
+    def search(query, limit=10, **kwargs):
+        if query == '"Salmo trutta"':
+            raise RuntimeError("parser bug")
+        return iter([])
+
+    provider.iter_search.side_effect = search
+    runner = SpeciesRunner([provider], dry_run=True)
+    runner.run(species, search_workers=3, requeue=0)
+    # The species whose shared search raised is dropped; the others fail that provider and are requeued
+    assert len(runner.failed) == 2
+    assert runner._searches == {} and runner._shared_names == {}
+
+    # One member was searched and one finished by an earlier attempt; neither leaves the group behind
+    journal = RunJournal(str(tmp_path), run_id="run1")
+    journal.record_search("Salmo trutta", [paper(1)])
+    journal.record("salmo trutta", 'cached')
+    provider.iter_search.side_effect = lambda query, limit=10, **kwargs: iter([paper(2)])
+    runner = SpeciesRunner([provider], dry_run=True, journal=journal)
+    runner.run(species, search_workers=2)
+    assert runner._searches == {} and runner._shared_names == {}
@@ -0,0 +1,72 @@
+import pytest
+from src.abstract_cache import AbstractCache
+from src.providers.base import SearchResult
+from src.run_journal import RunJournal
+from src.shards import main, merge_caches, merge_journals, parse_shard, shard_of
+
+
+def paper(title):
+    return SearchResult(title=title, authors=[], year="2023", doi="", source="PubMed")
+
+
+@pytest.mark.parametrize("spec, expected", [("1/4", (1, 4)), ("4/4", (4, 4)), ("1/1", (1, 1))])
+def test_parse_shard(spec, expected):
+    assert parse_shard(spec) == expected
+
+
+@pytest.mark.parametrize("spec", ["0/4", "5/4", "1/0", "1", "a/b", "1/2/3"])
+def test_parse_shard_invalid(spec):
+    with pytest.raises(ValueError):
+        parse_shard(spec)
+
+
+def test_shard_of_is_stable_and_balanced():
+    names = [f"Species {i}" for i in range(2000)]
+    shards = [shard_of(name, 4) for name in names]
+    assert set(shards) == {1, 2, 3, 4}
+    assert all(350 < shards.count(i) < 650 for i in range(1, 5))
+    # Case and surrounding whitespace do not move a species
+    assert shard_of(" Gadus Morhua ", 4) == shard_of("gadus morhua", 4)
+    assert shard_of("Gadus morhua", 4) == shard_of("Gadus morhua", 4)
+
+
+def test_merge_caches(tmp_path):
+    shard1 = AbstractCache(str(tmp_path / "s1.yaml"))
+    shard1.add_papers("Gadus morhua", [paper("Cod 1")], ["K1"], keywords=["eDNA"])
+    shard2 = AbstractCache(str(tmp_path / "s2.yaml"))
+    shard2.add_papers("Salmo salar", [paper("Salmon 1")], ["K2"])
+    shard2.add_papers("Gadus morhua", [paper("Cod 1"), paper("Cod 2")], ["K1", "K3"], keywords=["qPCR"])
+
+    out = str(tmp_path / "merged.yaml")
+    assert merge_caches([shard1.cache_file, shard2.cache_file], out) == 3
+
+    merged = AbstractCache(out)
+    cod = merged.get_species_papers("Gadus morhua")
+    assert [p['zotero_key'] for p in cod['papers']] == ["K1", "K3"]
+    assert cod['keywords'] == ["eDNA", "qPCR"]
+    assert merged.get_statistics()['total_papers'] == 3
+    assert merged.get_statistics()['total_species'] == 2
+
+
+def test_merge_journals(tmp_path):
+    j1 = RunJournal(str(tmp_path / "a"), run_id="r1")
+    j1.record("Sp1", "cached")
+    j1.close()
+    j2 = RunJournal(str(tmp_path / "b"), run_id="r2")
+    j2.record("Sp2", "uploaded", zotero_keys=[])
+    j2.close()
+
+    out = tmp_path / "runs" / "merged.jsonl"
+    assert merge_journals([j1.path, j2.path], str(out)) == 2
+
+    merged = RunJournal(str(out.parent), run_id="merged", resume=True)
+    assert merged.completed("Sp1", "cached")
+    assert merged.completed("Sp2", "uploaded")
+
+
+def test_merge_cli(tmp_path, capsys):
+    shard = AbstractCache(str(tmp_path / "s1.yaml"))
+    shard.add_papers("Gadus morhua", [paper("Cod 1")], ["K1"])
+
+    main(["merge", str(shard.cache_file), "--out", str(tmp_path / "merged.yaml")])
+    assert "1 papers added" in capsys.readouterr().out
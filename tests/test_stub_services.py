@@ -0,0 +1,51 @@
+import pytest
+
+from benchmarks.stub_services import Behaviour, Corpus, StubServer, StubServices
+from src.providers.pubmed import PubMedProvider
+from src.providers.semantic_scholar import SemanticScholarProvider
+from src.zotero_manager import ZoteroManager
+
+
+@pytest.fixture
+def services():
+    with StubServices(corpus=Corpus(results_per_query=5)) as services:
+        yield services
+
+
+def test_corpus_is_deterministic():
+    corpus = Corpus(results_per_query=10)
+    assert corpus.pmids("cod") == corpus.pmids("cod")
+    assert corpus.pmids("cod") != corpus.pmids("salmon")
+    assert corpus.paper("1234") == corpus.paper("1234")
+
+
+def test_unknown_service():
+    with pytest.raises(ValueError, match="Unknown service"):
+        StubServer("crossref")
+
+
+def test_real_clients_against_stand_ins(services):
+    env = services.env()
+    pubmed = PubMedProvider("test@example.com", base_url=env['PUBMED_EUTILS_URL']).search("cod", limit=5)
+    s2 = SemanticScholarProvider(api_url=env['SEMANTIC_SCHOLAR_API_URL']).search("cod", limit=5)
+    assert [r.identifiers['pmid'] for r in pubmed] == Corpus(results_per_query=5).pmids("cod")
+    assert len(s2) == 5 and all(r.source == "SemanticScholar" for r in s2)
+
+    manager = ZoteroManager("1", "key", endpoint=env['ZOTERO_API_URL'])
+    first = manager.create_or_get_collection("eDNA - Gadus morhua")
+    assert manager.create_or_get_collection("eDNA - Gadus morhua") == first
+    key = manager.add_item(pubmed[0], first)
+    second = manager.create_or_get_collection("eDNA - Atlantic cod")
+    assert manager.add_to_collection(key, second)
+    assert services.servers['zotero'].items[key]['data']['collections'] == [first, second]
+
+
+def test_zotero_rate_limited_reads_are_retried():
+    with StubServices(zotero=Behaviour(rate_limit=5, burst=1, retry_after=0.3)) as services:
+        stub = services.servers['zotero']
+        stub.collections['COL1'] = {'key': 'COL1', 'version': 1, 'data': {'key': 'COL1', 'name': 'eDNA - Gadus morhua'}}
+        manager = ZoteroManager("1", "key", endpoint=services.env()['ZOTERO_API_URL'])
+        # pyzotero waits out the Retry-After of a 429 and repeats the read
+        for _ in range(3):
+            assert manager.create_or_get_collection("eDNA - Gadus morhua") == 'COL1'
+        assert services.stats()['zotero']['rate_limited'] >= 1
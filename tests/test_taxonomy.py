@@ -0,0 +1,82 @@
+import pytest
+
+from src.input_manager import SpeciesQuery
+from src.query import render, shared_names, species_query
+from src.taxonomy import TaxonomyIndex, build_index
+
+NAMES = [
+    (8049, "Gadus morhua", "scientific name"),
+    (8049, "Gadus callarias", "synonym"),
+    (8049, "Linnaeus, 1758", "authority"),
+    (8049, "Atlantic cod", "genbank common name"),
+    (8049, "cod", "common name"),
+    (8048, "Gadus", "scientific name"),
+    (8030, "Salmo salar", "scientific name"),
+    (8030, "Atlantic salmon", "genbank common name"),
+]
+NODES = [(8049, 8048, "species"), (8048, 8047, "genus"), (8030, 8028, "species")]
+
+
+def write_dmp(path, rows):
+    path.write_text("".join("\t|\t".join(str(field) for field in row) + "\t|\n" for row in rows))
+    return str(path)
+
+
+@pytest.fixture
+def index(tmp_path):
+    names = write_dmp(tmp_path / "names.dmp", [(tax_id, name, "", name_class) for tax_id, name, name_class in NAMES])
+    nodes = write_dmp(tmp_path / "nodes.dmp", NODES)
+    assert build_index(names, str(tmp_path / "taxonomy.idx"), nodes) == 2
+    index = TaxonomyIndex(str(tmp_path / "taxonomy.idx"))
+    yield index
+    index.close()
+
+
+def test_lookup_by_name_or_synonym(index):
+    taxon = index.lookup("gadus  MORHUA")
+    assert taxon.tax_id == 8049
+    assert taxon.synonyms == ["Gadus callarias"]
+    assert taxon.common_names == ["Atlantic cod", "cod"]
+    assert index.lookup("Gadus callarias").tax_id == 8049
+    # Genera are dropped by nodes.dmp; common names never identify a taxon
+    assert index.lookup("Gadus") is None
+    assert index.lookup("Atlantic cod") is None
+
+
+def test_expand_adds_missing_names(index):
+    species = SpeciesQuery("Gadus callarias", ["Atlantic cod"], ["eDNA"])
+    expanded = index.expand(species)
+    assert expanded.synonyms == ["Atlantic cod", "Gadus morhua"]
+    assert expanded.common_names == ["cod"]
+    assert expanded.keywords == ["eDNA"]
+    assert species.synonyms == ["Atlantic cod"] and species.common_names == []
+
+    assert index.expand(SpeciesQuery("Salmo salar", [], [])).common_names == ["Atlantic salmon"]
+    assert index.expand(SpeciesQuery("Salmo salar", [], []), common_names=False).common_names == []
+    unknown = SpeciesQuery("Thunnus thynnus", [], [])
+    assert index.expand(unknown) is unknown
+
+
+def test_common_names_searched_but_never_shared(index):
+    cod = index.expand(SpeciesQuery("Gadus morhua", [], ["eDNA"]))
+    # Another taxon some list also calls "cod"
+    poor_cod = SpeciesQuery("Trisopterus minutus", [], ["eDNA"], common_names=["cod"])
+    assert render(species_query(cod)) == '("Gadus morhua" OR "Gadus callarias" OR "Atlantic cod" OR "cod") AND "eDNA"'
+    assert shared_names([cod, poor_cod]) == {}
+    # A listed name is still shared, but a common name is searched with a query of its own
+    listed_twice = SpeciesQuery("trisopterus  minutus", [], ["eDNA"])
+    assert shared_names([poor_cod, listed_twice]) == {}
+    poor_cod.common_names.clear()
+    assert [sp.species_name for sp in shared_names([poor_cod, listed_twice])[id(poor_cod)][0].members] == \
+        ["Trisopterus minutus", "trisopterus  minutus"]
+
+
+def test_ungrouped_dump_and_bad_index_rejected(tmp_path):
+    names = write_dmp(tmp_path / "names.dmp", [(1, "A a", "", "scientific name"), (2, "B b", "", "scientific name"),
+                                               (1, "A b", "", "synonym")])
+    with pytest.raises(ValueError, match="not grouped by tax_id"):
+        build_index(names, str(tmp_path / "taxonomy.idx"))
+
+    (tmp_path / "bad.idx").write_bytes(b"not an index" * 10)
+    with pytest.raises(ValueError):
+        TaxonomyIndex(str(tmp_path / "bad.idx"))
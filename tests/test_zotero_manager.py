@@ -108,3 +108,61 @@ def test_add_item_exception(mock_zotero):
 
     key = manager.add_item(item, "COL_ID")
     assert key is None
+
+def test_add_to_collection(mock_zotero):
+    zot_instance = mock_zotero.return_value
+    item = {'key': 'ITEM1', 'version': 3, 'data': {'collections': ['OTHER']}}
+    zot_instance.item.return_value = item
+
+    manager = ZoteroManager("id", "key")
+    assert manager.add_to_collection("ITEM1", "COL1") is True
+
+    zot_instance.item.assert_called_with("ITEM1")
+    zot_instance.addto_collection.assert_called_with("COL1", item)
+
+def test_add_to_collection_already_member(mock_zotero):
+    zot_instance = mock_zotero.return_value
+    zot_instance.item.return_value = {'key': 'ITEM1', 'version': 3, 'data': {'collections': ['COL1']}}
+
+    manager = ZoteroManager("id", "key")
+    assert manager.add_to_collection("ITEM1", "COL1") is True
+    zot_instance.addto_collection.assert_not_called()
+
+def test_add_to_collection_exception(mock_zotero):
+    zot_instance = mock_zotero.return_value
+    zot_instance.item.side_effect = Exception("Not found")
+
+    manager = ZoteroManager("id", "key")
+    assert manager.add_to_collection("ITEM1", "COL1") is False
+
+def test_add_item_identifiers_in_extra(mock_zotero):
+    zot_instance = mock_zotero.return_value
+    zot_instance.item_template.return_value = {}
+    zot_instance.create_items.return_value = {'successful': {'0': {'key': 'ITEM_KEY'}}}
+
+    manager = ZoteroManager("id", "key")
+    item = SearchResult(title="Title", authors=[], year="2023", doi="", source="PubMed",
+                        identifiers={'pmid': '42', 's2': 'abc', 'unknown': 'x'})
+    manager.add_item(item, "COL_ID")
+
+    created_item = zot_instance.create_items.call_args[0][0][0]
+    assert created_item['extra'] == "PMID: 42\nSemantic Scholar ID: abc"
+
+def test_init_endpoint(mock_zotero):
+    manager = ZoteroManager("lib_id", "key", "user", endpoint="http://127.0.0.1:8080/")
+    assert manager.zot.endpoint == "http://127.0.0.1:8080"
+
+def test_zotero_client_falls_back_to_httpx(monkeypatch):
+    import importlib
+    import sys
+
+    import httpx
+    import src.zotero_manager as zotero_manager
+
+    # Without httpx2 (pyzotero before 1.15) the pooled client is an httpx one
+    monkeypatch.setitem(sys.modules, 'httpx2', None)
+    try:
+        assert importlib.reload(zotero_manager).zotero_http is httpx
+    finally:
+        monkeypatch.undo()
+        importlib.reload(zotero_manager)